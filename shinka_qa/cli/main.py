@@ -9,19 +9,42 @@ from pathlib import Path
 from datetime import datetime
 import json
 import os
+import random
+import signal
+import tempfile
 from dotenv import load_dotenv
 
 # .envファイルを読み込み
 load_dotenv()
 
 from ..core.evaluator import QualityEvaluator
+from ..core.budget import BudgetManager
 from ..evolution.test_mutator import TestMutator
 from ..evolution.island_model import IslandModel
+from ..evolution.map_elites import MapElites, BehaviorDescriptor, function_statement_lines
+from ..evolution.crossover import SuiteCrossover
+from ..evolution.behavior_novelty import BehaviorNoveltyArchive
+from ..evolution.novelty_filter import NoveltyFilter
+from ..evolution.persistent_archive import PersistentArchive
+from ..evolution.ucb_bandit import (
+    BANDIT_POLICIES,
+    StrategyBandit,
+    ContextualStrategyBandit,
+    CostAwareModelBandit,
+    policy_parameters
+)
+from ..evolution.bandit_state import BanditStateStore
+from ..evolution.context_features import TargetStructure, context_features, NUM_CONTEXT_FEATURES
+from ..evolution.prompt_slicer import TargetPromptBuilder
+from ..evolution.multi_objective import DEFAULT_OBJECTIVES
 from ..evolution.saturation_detector import CoverageSaturationDetector
 from ..utils.test_runner import TestRunner
 from ..visualization.report_generator import ReportGenerator
 from ..visualization.lineage_tree import LineageTreeVisualizer
-from ..llm.llm_client import create_llm_client, create_multi_provider_client
+from ..llm.llm_client import (
+    CachedLLMClient, ResponseCache, create_llm_client, create_multi_provider_client
+)
+from ..llm.async_pool import AsyncLLMPool
 
 
 def safe_echo(message: str, **kwargs):
@@ -66,7 +89,9 @@ def cli():
 @click.option('--verbose', is_flag=True, help='詳細ログを表示')
 @click.option('--llm/--no-llm', default=False,
               help='LLMを使用するかどうか（デフォルト: 無効）')
-def evolve(config, output_dir, verbose, llm):
+@click.option('--seed', type=int, default=None,
+              help='乱数シード（同じシードで探索の軌跡を再現する。設定ファイルのevolution.seedより優先）')
+def evolve(config, output_dir, verbose, llm, seed):
     """
     テストスイートを進化させる
 
@@ -80,6 +105,12 @@ def evolve(config, output_dir, verbose, llm):
     with open(config_path, 'r', encoding='utf-8') as f:
         config_data = yaml.safe_load(f)
 
+    # 実行予算（limitsセクション）。ベースライン測定を含めた全体の時間で管理する
+    budget = BudgetManager.from_config(config_data)
+
+    # CIのタイムアウトなどでSIGTERMを受けたら、実行中の世代の後で停止して結果を保存する
+    signal.signal(signal.SIGTERM, lambda signum, frame: budget.request_stop('terminated'))
+
     if verbose:
         click.echo(f"\nConfiguration loaded from: {config_path}")
 
@@ -105,7 +136,8 @@ def evolve(config, output_dir, verbose, llm):
     evaluator = QualityEvaluator(
         target_module_path=target_module,
         seeded_bugs_path=seeded_bugs if seeded_bugs else None,
-        weights=weights
+        weights=weights,
+        budget=budget
     )
 
     # ベースラインを設定
@@ -117,6 +149,7 @@ def evolve(config, output_dir, verbose, llm):
     # 初期評価
     click.echo("\nEvaluating initial test suite...")
     fitness, metrics = evaluator.evaluate(initial_test)
+    budget.record_evaluations(1)
 
     click.echo(f"  Coverage: {metrics['coverage']:.1f}%")
     click.echo(f"  Bug Detection: {metrics['bugs_detected']:.2f}")
@@ -135,9 +168,21 @@ def evolve(config, output_dir, verbose, llm):
     num_generations = evolution_config.get('num_generations', 10)
     population_size = evolution_config.get('population_size', 20)
     num_islands = evolution_config.get('num_islands', 4)
+    selection_mode = evolution_config.get('selection_mode', 'scalar')
+    engine = evolution_config.get('engine', 'island')
+    max_workers = evolution_config.get('max_workers', 1)
+    crossover_config = evolution_config.get('crossover', {})
+    migration_config = evolution_config.get('migration', {})
+    crossover_rate = crossover_config.get('rate', 0.0)
+    behavior_novelty_config = evolution_config.get('behavior_novelty', {}) or {}
+    use_behavior_novelty = engine != 'map_elites' and behavior_novelty_config.get('enabled', False)
+    if seed is None:
+        seed = evolution_config.get('seed')
 
     # LLMクライアントを初期化
     llm_client = None
+    # 複数プロバイダーの場合に、呼び出すプロバイダーを選ぶバンディット
+    model_router = None
 
     # コマンドライン引数が優先（--llm/--no-llm）
     if not llm:
@@ -154,7 +199,11 @@ def evolve(config, output_dir, verbose, llm):
         elif llm_provider == "auto":
             # 複数プロバイダーの自動検出（コストの安い順に使用）
             safe_echo("🔍 Auto-detecting available LLM providers...")
-            llm_client = create_multi_provider_client(auto_detect=True)
+            # providersを指定した場合はそのリスト（疑似プロバイダーでのフォールバックの試験など）
+            providers = llm_config.get('providers')
+            llm_client = create_multi_provider_client(
+                auto_detect=not providers, providers=providers
+            )
 
             if llm_client:
                 safe_echo(f"✅ LLM enabled with multi-provider fallback")
@@ -162,13 +211,33 @@ def evolve(config, output_dir, verbose, llm):
                     safe_echo("📊 Available providers (cheapest first):")
                     for provider in llm_client.get_available_providers():
                         safe_echo(f"   - {provider}")
+
+                # 適応度の改善をコストとレイテンシで割った効率でプロバイダーを選ぶ（無効の場合は最安から）
+                # 腕は"<プロバイダー名>/<モデル名>"（llm.banditはモデル選択のUCB1用の設定）
+                router_config = llm_config.get('router', {}) or {}
+                num_providers = len(getattr(llm_client, 'clients', []))
+                if router_config.get('enabled', True) and num_providers > 1:
+                    model_router = CostAwareModelBandit(
+                        [client.get_route_name() for client in llm_client.clients],
+                        window=router_config.get('window', 50),
+                        exploration_coefficient=router_config.get('exploration_coefficient', 0.2),
+                        cost_weight=router_config.get('cost_weight', 1.0),
+                        latency_weight=router_config.get('latency_weight', 1.0)
+                    )
+                    llm_client.router = model_router
+                    safe_echo(
+                        "🎰 Provider routing: sliding-window bandit "
+                        "(improvement per cost and latency)"
+                    )
             else:
                 safe_echo("⚠️  No LLM providers detected: Using template-based mutations only")
         else:
             # 単一プロバイダーを使用
             llm_client = create_llm_client(
                 provider=llm_provider,
-                model=llm_model
+                model=llm_model,
+                base_url=llm_config.get('base_url'),
+                options=llm_config.get('fake')
             )
 
             if llm_client:
@@ -182,7 +251,62 @@ def evolve(config, output_dir, verbose, llm):
     # ハイブリッドアプローチ: 最初は常にテンプレートベースから開始
     # カバレッジサチュレーション検出後、LLMが利用可能ならLLMモードに切り替え
     mutation_strategies = config_data.get('mutation_strategies', ['add_edge_cases'])
-    mutator = TestMutator(llm_client=llm_client, force_template=True)
+
+    # 同じプロンプトの応答を再利用するキャッシュ（replayモードではキャッシュからのみ返す）
+    llm_cache = None
+    cache_config = (config_data.get('llm', {}) or {}).get('cache', {}) or {}
+    if llm_client and cache_config.get('enabled', False):
+        llm_cache = ResponseCache(
+            cache_config.get('path', '.shinka_qa/llm_cache.sqlite'),
+            max_size_mb=cache_config.get('max_size_mb', 200)
+        )
+        llm_client = CachedLLMClient(
+            llm_client, llm_cache, mode=cache_config.get('mode', 'readwrite')
+        )
+        click.echo(
+            f"LLM response cache: {llm_cache.path} ({llm_client.mode}, {len(llm_cache)} entries)"
+        )
+
+    if llm_client:
+        llm_client.set_budget(budget)
+        # ストリーミングで受け取り、最初のコードブロックが閉じたら打ち切る（後に続く説明文のトークンを省く）
+        if (config_data.get('llm', {}) or {}).get('streaming', False):
+            if llm_client.supports_streaming:
+                llm_client.set_streaming(True)
+                click.echo("LLM streaming: stop at the end of the first code block")
+            else:
+                safe_echo("⚠️  LLM streaming: not supported by the provider, generating normally")
+
+    # 1世代分のLLM変異を並行に送るプール（プロバイダーごとのレート制限付き）
+    llm_pool = None
+    concurrency_config = (config_data.get('llm', {}) or {}).get('concurrency', {}) or {}
+    if llm_client and concurrency_config.get('enabled', False):
+        llm_pool = AsyncLLMPool(
+            llm_client,
+            max_concurrency=concurrency_config.get('max_concurrency', 8),
+            rate_limits=concurrency_config.get('rate_limits')
+        )
+        click.echo(f"LLM request pool: up to {llm_pool.max_concurrency} concurrent requests")
+
+    # テスト対象から変異戦略と未カバーの行に関係する関数だけを切り出してプロンプトに載せる
+    prompt_builder = None
+    prompt_config = (config_data.get('llm', {}) or {}).get('prompt', {}) or {}
+    if llm_client and prompt_config.get('slice_target', True):
+        prompt_builder = TargetPromptBuilder(
+            max_units=prompt_config.get('max_target_units', 6),
+            max_prompt_tokens=prompt_config.get('max_prompt_tokens')
+        )
+    mutator = TestMutator(
+        llm_client=llm_client,
+        force_template=True,
+        budget=budget,
+        llm_pool=llm_pool,
+        # 同じ親の子個体を1回の呼び出しにまとめる（テストコードと対象の入力トークンを1回分にする）
+        max_variants_per_request=(config_data.get('llm', {}) or {}).get('variants_per_request', 1),
+        # 'functions'では追加・変更する関数だけを出力させ、親のテストコードに統合する
+        output_mode=(config_data.get('llm', {}) or {}).get('output_mode', 'full'),
+        prompt_builder=prompt_builder
+    )
 
     # カバレッジサチュレーション検出器を初期化
     saturation_config = config_data.get('saturation_detection', {})
@@ -196,49 +320,330 @@ def evolve(config, output_dir, verbose, llm):
     click.echo(f"\nStarting evolution...")
     click.echo(f"  Generations: {num_generations}")
     click.echo(f"  Population per island: {population_size}")
-    click.echo(f"  Islands: {num_islands}")
-
-    island_model = IslandModel(
-        num_islands=num_islands,
-        population_size=population_size,
-        migration_interval=max(2, num_generations // 3),
-        migration_rate=0.1,
-        elite_ratio=0.3
+    click.echo(f"  Engine: {engine}")
+    click.echo(f"  Parallel workers: {max_workers}")
+
+    if engine == 'map_elites':
+        # MAP-Elites: 行動記述子グリッドで多様性を維持
+        map_elites_config = evolution_config.get('map_elites', {})
+        descriptors = [
+            BehaviorDescriptor(d['metric'], d['low'], d['high'], d['bins'])
+            for d in map_elites_config.get('descriptors', [])
+        ] or None
+        # 'function_coverage:<関数名>'の記述子は、テスト対象の関数ごとの実行文の行を分母にする
+        function_lines = function_statement_lines(target_module.read_text(encoding='utf-8'))
+        unknown = [
+            d.metric for d in descriptors or []
+            if d.metric.startswith('function_coverage:')
+            and d.metric.split(':', 1)[1] not in function_lines
+        ]
+        if unknown:
+            click.echo(f"Error: Unknown function in map_elites descriptors: {unknown}", err=True)
+            return
+        click.echo(f"  Batch size: {map_elites_config.get('batch_size', population_size)}")
+
+        island_model = MapElites(
+            descriptors=descriptors,
+            batch_size=map_elites_config.get('batch_size', population_size),
+            max_workers=max_workers,
+            seed=seed,
+            function_lines=function_lines
+        )
+    else:
+        migration_interval = evolution_config.get(
+            'migration_interval', max(2, num_generations // 3)
+        )
+        topology = migration_config.get('topology', 'ring')
+        async_migration = migration_config.get('async', False)
+        click.echo(f"  Islands: {num_islands}")
+        click.echo(f"  Selection: {selection_mode}")
+        click.echo(f"  Migration: {topology} every {migration_interval} generations"
+                   f"{' (async)' if async_migration else ''}")
+
+        # 行動（カバー行・検出したシードバグ）の新規性: nsga2では目的に追加、scalarでは選択時に重み付けで加える
+        behavior_novelty = None
+        objectives = None
+        if use_behavior_novelty:
+            behavior_novelty = BehaviorNoveltyArchive(
+                k=behavior_novelty_config.get('k', 10),
+                metric=behavior_novelty_config.get('metric', 'jaccard'),
+                archive_size=behavior_novelty_config.get('archive_size', 500),
+                kill_weight=behavior_novelty_config.get('kill_weight', 0.5)
+            )
+            if selection_mode == 'nsga2':
+                objectives = DEFAULT_OBJECTIVES + [('novelty', True)]
+            click.echo(f"  Behavioural novelty: k={behavior_novelty.k}, {behavior_novelty.metric}")
+
+        island_model = IslandModel(
+            num_islands=num_islands,
+            population_size=population_size,
+            migration_interval=migration_interval,
+            migration_rate=evolution_config.get('migration_rate', 0.1),
+            elite_ratio=evolution_config.get('elite_ratio', 0.3),
+            selection_mode=selection_mode,
+            objectives=objectives,
+            max_workers=max_workers,
+            crossover_rate=crossover_rate,
+            topology=topology,
+            topology_degree=migration_config.get('degree', 2),
+            async_migration=async_migration,
+            seed=seed,
+            behavior_novelty=behavior_novelty,
+            novelty_weight=(
+                behavior_novelty_config.get('weight', 0.1) if selection_mode == 'scalar' else 0.0
+            )
+        )
+        if crossover_rate > 0:
+            crossover_mode = crossover_config.get('mode', 'union')
+            click.echo(f"  Crossover rate: {crossover_rate} ({crossover_mode})")
+
+    click.echo(f"  Seed: {island_model.seed}")
+
+    # 評価前の新規性フィルタ（重複・準重複の子個体をpytestの実行前に除外する）
+    novelty_filter = NoveltyFilter.from_config(config_data)
+    if novelty_filter is not None:
+        click.echo(f"  Novelty filter: threshold={novelty_filter.similarity_threshold}, "
+                   f"on_reject={novelty_filter.on_reject}")
+    if budget.max_total_time:
+        click.echo(f"  Time budget: {budget.max_total_time:.0f}s ({budget.elapsed():.1f}s used)")
+
+    # 交叉オペレータ（テストごとのカバレッジがあれば補完的なテストを優先して組み合わせる）
+    crossover = SuiteCrossover(mode=crossover_config.get('mode', 'union'))
+    collect_behavior = engine != 'map_elites' and (crossover_rate > 0 or use_behavior_novelty)
+    # 実行をまたぐアーカイブは、エリートがカバーした関数を記録するためにカバー行を個体に持たせる
+    # （MAP-Elitesの記述子が関数ごとのカバレッジや検出したシードバグを使う場合も同じ）
+    archive_enabled = bool((config_data.get('archive', {}) or {}).get('enabled', False))
+    return_behavior = collect_behavior or archive_enabled or (
+        engine == 'map_elites' and island_model.archive.uses_behavior
     )
 
     # 初期個体として現在のテストファイルを読み込み
     with open(initial_test, 'r', encoding='utf-8') as f:
         initial_code = f.read()
 
+    # 変異戦略の選択（親から子への適応度の改善を報酬とするバンディット。無効の場合は一様ランダム）
+    bandit_config = config_data.get('strategy_bandit', {}) or {}
+    contextual_config = config_data.get('contextual_bandit', {}) or {}
+    strategy_bandit = None
+    # 文脈付きバンディットの場合の、評価済みのコード -> 文脈ベクトル（親として選ばれたときに使う）
+    known_contexts = {}
+    target_structure = None
+    if contextual_config.get('enabled', False) and len(mutation_strategies) > 1:
+        # 親ごとに、カバレッジの穴・ミュータントの残り具合から戦略を選ぶ（LinUCB）
+        strategy_bandit = ContextualStrategyBandit(
+            mutation_strategies,
+            NUM_CONTEXT_FEATURES,
+            alpha=contextual_config.get('alpha', 0.3),
+            regularization=contextual_config.get('regularization', 1.0)
+        )
+        target_structure = TargetStructure.from_source(target_module.read_text(encoding='utf-8'))
+        click.echo(
+            "  Strategy selection: LinUCB contextual bandit "
+            f"over {len(mutation_strategies)} strategies"
+        )
+    elif bandit_config.get('enabled', True) and len(mutation_strategies) > 1:
+        policy = bandit_config.get('policy', 'ucb1')
+        # 設定には全ての方策のパラメータを書けるので、どの方策も受け取らないキー（書き間違い）だけを拒否し、
+        # 選んだ方策が受け取るパラメータだけを渡す
+        known_keys = {'enabled', 'policy'}.union(
+            *(policy_parameters(name) for name in BANDIT_POLICIES)
+        )
+        unknown_keys = sorted(set(bandit_config) - known_keys)
+        if unknown_keys:
+            click.echo(f"Error: Unknown strategy_bandit keys: {', '.join(unknown_keys)}", err=True)
+            return
+        policy_defaults = {'exploration_coefficient': 0.2, 'seed': island_model.seed}
+        strategy_bandit = StrategyBandit(
+            mutation_strategies,
+            policy=policy,
+            **{
+                name: bandit_config.get(name, policy_defaults.get(name))
+                for name in policy_parameters(policy)
+                if name in bandit_config or name in policy_defaults
+            }
+        )
+        click.echo(
+            f"  Strategy selection: {policy} bandit over {len(mutation_strategies)} strategies"
+        )
+    # 評価済みのコード -> 適応度（変異の報酬を計算するときの親の適応度）
+    known_fitness = {hash(initial_code): fitness}
+    # 評価済みのコード -> カバーされた行（LLMのプロンプトに親の未カバーの行を添える）
+    known_covered = {}
+    # プロンプトに載せるテスト対象のソースコード
+    target_source = target_module.read_text(encoding='utf-8')
+
+    # 過去の実行のバンディットの状態を事前分布として読み込む（毎回の強制探索を省く）
+    state_config = config_data.get('bandit_state', {}) or {}
+    bandit_store = None
+    persisted_bandits = {}
+    if state_config.get('enabled', False):
+        if state_config.get('scope', 'target') == 'target':
+            scope = str(target_module.resolve())
+        else:
+            scope = 'project'
+        bandit_store = BanditStateStore(
+            state_config.get('path', '.shinka_qa/bandit_state.json'), scope
+        )
+        if strategy_bandit is not None:
+            key = 'contextual_strategy' if target_structure is not None else 'strategy'
+            persisted_bandits[key] = strategy_bandit
+        if model_router is not None:
+            persisted_bandits['model_router'] = model_router
+        decay = state_config.get('decay', 0.5)
+        for name, bandit in persisted_bandits.items():
+            state = bandit_store.load(name)
+            if state is not None:
+                bandit.load_state(state, decay)
+                click.echo(f"  Bandit state: warm-started '{name}' (decay={decay})")
+
     # 適応度評価関数を定義
     def fitness_func(code_str):
         """テストコードの適応度を評価"""
         # テストファイルをtarget_moduleと同じディレクトリに保存
         # （インポートが正しく動作するように）
-        temp_test_file = target_module.parent / 'temp_test_evolved.py'
-        with open(temp_test_file, 'w', encoding='utf-8') as f:
+        # 並列評価でも衝突しないよう、評価ごとに一意なファイル名を使う
+        fd, temp_name = tempfile.mkstemp(
+            prefix='temp_test_evolved_', suffix='.py', dir=str(target_module.parent)
+        )
+        temp_test_file = Path(temp_name)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
             f.write(code_str)
         try:
-            fitness, metrics = evaluator.evaluate(temp_test_file)
-            return fitness, metrics
+            # プロンプトを切り出す場合は、親の未カバーの行を求めるためにカバー行も記録する
+            # （テンプレートモードの間も記録し、LLMモードに切り替えた直後の親にも使えるようにする）
+            needs_coverage = prompt_builder is not None
+            needs_behavior = return_behavior or target_structure is not None or needs_coverage
+            behavior = {} if needs_behavior else None
+            fitness, metrics = evaluator.evaluate(temp_test_file, behavior)
         finally:
             # 評価後にクリーンアップ
             if temp_test_file.exists():
                 temp_test_file.unlink()
 
+        # 評価が終わった時点で、この子個体を生成した戦略に報酬を渡す
+        known_fitness[hash(code_str)] = fitness
+        if behavior and 'covered_lines' in behavior and prompt_builder is not None:
+            known_covered[hash(code_str)] = behavior['covered_lines']
+        if target_structure is not None:
+            known_contexts[hash(code_str)] = context_features(
+                code_str, metrics, behavior, target_structure, evaluator.total_seeded_bugs
+            )
+        if strategy_bandit is not None:
+            strategy_bandit.complete_pull(hash(code_str), fitness)
+        if model_router is not None:
+            model_router.complete_pull(hash(code_str), fitness)
+
+        if return_behavior:
+            return fitness, metrics, behavior
+        return fitness, metrics
+
+    def choose_strategy(code_str, rng):
+        """親の変異戦略を選ぶ（戻り値: (戦略, 文脈付きバンディットの文脈)）"""
+        if strategy_bandit is None:
+            # ランダムに戦略を選択
+            return rng.choice(mutation_strategies), None
+        if target_structure is not None:
+            # 親の文脈で戦略を選ぶ（未評価の親はテストコードだけから文脈を計算）
+            context = known_contexts.get(hash(code_str))
+            if context is None:
+                context = context_features(code_str, None, None, target_structure)
+            return strategy_bandit.select_strategy(context, pending=True), context
+        # バンディットで戦略を選び、子個体の評価が終わるまで報酬待ちとして登録
+        return strategy_bandit.select_strategy(pending=True), None
+
+    def track_child(code_str, mutated, strategy, context, call):
+        """子個体を、評価後に戦略とプロバイダーへ報酬を渡すために登録"""
+        parent_fitness = known_fitness.get(hash(code_str), fitness)
+        if strategy_bandit is not None:
+            strategy_bandit.track(hash(mutated), strategy, parent_fitness, context)
+        if model_router is not None and call is not None and 'route' in call:
+            # LLMで生成した場合は、応答したプロバイダーにコストとレイテンシ込みの報酬を渡す
+            model_router.track(
+                hash(mutated), call['route'], parent_fitness, call['cost'], call['latency']
+            )
+
+    def discard_child(mutated):
+        """新規性フィルタで評価しないことにした子個体の報酬待ちを、報酬なしで取り消す"""
+        if strategy_bandit is not None:
+            strategy_bandit.discard_pull(hash(mutated))
+        if model_router is not None:
+            model_router.discard_pull(hash(mutated))
+
+    def mutation_context(code_str):
+        """親のカバー行（プロンプトにテスト対象の未カバーの行を添える）"""
+        covered = known_covered.get(hash(code_str))
+        return {'covered_lines': covered} if covered is not None else None
+
     # 変異関数を定義
-    def mutate_func(code_str, target_code=""):
-        """テストコードを変異させる"""
-        # ランダムに戦略を選択
-        import random
-        strategy = random.choice(mutation_strategies)
-        return mutator.mutate(code_str, str(target_module), strategy)
+    def mutate_func(code_str, target_code="", rng=None):
+        """テストコードを変異させる（rngは島モデルが子個体ごとに渡す乱数生成器）"""
+        rng = rng or random
+        strategy, context = choose_strategy(code_str, rng)
+
+        if model_router is not None:
+            llm_client.take_last_call()
+        mutated = mutator.mutate(code_str, target_source, strategy, mutation_context(code_str), rng)
+
+        call = llm_client.take_last_call() if model_router else None
+        track_child(code_str, mutated, strategy, context, call)
+        return mutated
+
+    def batch_mutate_func(code_strs, target_code="", rngs=None):
+        """1世代分のテストコードをまとめて変異させる（LLMモードではLLM呼び出しを並行に送る）"""
+        rngs = [rng or random for rng in (rngs or [None] * len(code_strs))]
+        choices = [choose_strategy(code_str, rng) for code_str, rng in zip(code_strs, rngs)]
+        calls = {}
+        mutated_codes = mutator.mutate_batch(
+            [(code_str, strategy) for code_str, (strategy, _) in zip(code_strs, choices)],
+            target_source,
+            rngs=rngs,
+            on_call=calls.__setitem__,
+            contexts=[mutation_context(code_str) for code_str in code_strs]
+        )
+        for i, (code_str, mutated, choice) in enumerate(zip(code_strs, mutated_codes, choices)):
+            strategy, context = choice
+            track_child(code_str, mutated, strategy, context, calls.get(i))
+        return mutated_codes
+
+    def initial_fitness_func(code_str):
+        """初期集団の評価（世代の評価と違って予約しないので、実行した回数を予算に記録する）"""
+        budget.record_evaluations(1)
+        return fitness_func(code_str)
 
     # 島を初期化
-    island_model.initialize(initial_code, fitness_func)
+    island_model.initialize(initial_code, initial_fitness_func)
+
+    # 過去の実行のエリートで初期集団と新規性フィルタを補う（テスト対象の変更されたエリートは破棄）
+    archive_config = config_data.get('archive', {}) or {}
+    persistent_archive = None
+    if archive_config.get('enabled', False):
+        # 実行するディレクトリによって別のアーカイブにならないよう、相対パスは設定ファイルの場所から解決する
+        archive_path = Path(archive_config.get('path', '.shinka_qa/archive.sqlite'))
+        if not archive_path.is_absolute():
+            archive_path = config_path.parent / archive_path
+        persistent_archive = PersistentArchive(
+            archive_path,
+            target_module,
+            max_entries=archive_config.get('max_entries', 200),
+            weights=evaluator.weights
+        )
+        invalidated = persistent_archive.invalidate()
+        seeds = persistent_archive.load_elites(
+            archive_config.get('seed_elites', 4), initial_fitness_func
+        )
+        if seeds:
+            island_model.seed_population(seeds)
+            known_fitness.update((hash(seed.test_code), seed.fitness) for seed in seeds)
+        if novelty_filter is not None:
+            for elite in persistent_archive.load_elites(novelty_filter.archive_size):
+                novelty_filter.add_to_archive(elite.test_code, elite.fitness)
+        click.echo(f"  Archive: {len(persistent_archive)} elites, seeded {len(seeds)}"
+                   f"{f', invalidated {invalidated}' if invalidated else ''}")
 
     # 各世代の進化を記録
     all_generations = []
+    # 新規性フィルタの前世代までの累計（世代ごとの除外数を求めるため）
+    novelty_totals = {'checked': 0, 'rejected': 0, 'remutated': 0}
 
     def generation_callback(gen, generation_bests, global_best):
         """各世代後に呼ばれるコールバック"""
@@ -283,6 +688,37 @@ def evolve(config, output_dir, verbose, llm):
             'mode': 'llm' if not mutator.force_template else 'template',
             'saturation_stats': saturation_detector.get_statistics()
         }
+
+        # 評価されないまま残った戦略の選択（評価に失敗した子個体など）を報酬0で打ち切る
+        # （新規性フィルタで除外した子個体はdiscard_childで取り消し済み）
+        if strategy_bandit is not None:
+            gen_data['strategy_pulls_expired'] = strategy_bandit.end_generation()
+        if model_router is not None:
+            model_router.end_generation()
+
+        if novelty_filter is not None:
+            checked = novelty_filter.num_checked - novelty_totals['checked']
+            rejected = novelty_filter.num_rejected - novelty_totals['rejected']
+            remutated = novelty_filter.num_remutated - novelty_totals['remutated']
+            novelty_totals.update(
+                checked=novelty_filter.num_checked,
+                rejected=novelty_filter.num_rejected,
+                remutated=novelty_filter.num_remutated
+            )
+            # 最終的に除外した子個体はそれぞれpytestの実行1回分（評価回数）を省いている
+            # （変異し直して通過した子個体は評価されるので含めない）
+            gen_data['novelty'] = {
+                'checked': checked,
+                'rejected': rejected,
+                'remutated': remutated,
+                'rejection_rate': rejected / checked if checked else 0.0,
+                'evaluations_saved': rejected
+            }
+            if verbose:
+                rejection_rate = gen_data['novelty']['rejection_rate']
+                click.echo(f"  Novelty: rejected {rejected}/{checked} candidates "
+                           f"({rejection_rate:.0%}), saved {rejected} evaluations")
+
         all_generations.append(gen_data)
 
         # この世代の最良個体を保存
@@ -291,13 +727,24 @@ def evolve(config, output_dir, verbose, llm):
             f.write(global_best.test_code)
 
     # 進化を実行
+    evolve_kwargs = {}
+    if collect_behavior and crossover_rate > 0:
+        evolve_kwargs['crossover_func'] = crossover.crossover_individuals
+
     best_individual = island_model.evolve(
         generations=num_generations,
         mutate_func=mutate_func,
         fitness_func=fitness_func,
         target_code=str(target_module),
-        callback=generation_callback
+        callback=generation_callback,
+        budget=budget,
+        novelty_filter=novelty_filter,
+        batch_mutate_func=batch_mutate_func if llm_pool is not None else None,
+        discard_func=discard_child,
+        **evolve_kwargs
     )
+    if llm_pool is not None:
+        llm_pool.close()
 
     # 最終結果を保存
     results = {
@@ -315,9 +762,78 @@ def evolve(config, output_dir, verbose, llm):
             'fitness': best_individual.fitness - fitness
         },
         'generations': all_generations,
+        'seed': island_model.seed,
+        'stop_reason': island_model.stop_reason,
+        'budget': budget.get_statistics(),
         'timestamp': timestamp
     }
 
+    if novelty_filter is not None:
+        results['novelty'] = novelty_filter.get_statistics()
+    if strategy_bandit is not None:
+        results['strategy_bandit'] = strategy_bandit.get_statistics()
+    if model_router is not None:
+        results['model_router'] = model_router.get_statistics()
+    if llm_pool is not None:
+        results['llm_pool'] = llm_pool.get_statistics()
+    if llm_client is not None and llm_client.get_streaming_statistics()['calls']:
+        results['llm_streaming'] = llm_client.get_streaming_statistics()
+    if prompt_builder is not None:
+        results['prompt_slicing'] = prompt_builder.get_statistics()
+    if llm_cache is not None:
+        results['llm_cache'] = llm_cache.get_statistics()
+        llm_cache.close()
+
+    # バンディットの状態を次の実行のために保存
+    for name, bandit in persisted_bandits.items():
+        bandit_store.save(name, bandit.get_state(), run_id=timestamp)
+
+    # MAP-Elitesの場合はアーカイブの統計、島モデルの場合は移住イベントも保存
+    if engine == 'map_elites':
+        results['archive'] = island_model.get_statistics()['archive']
+    else:
+        results['migration'] = {
+            'statistics': island_model.get_statistics()['migration'],
+            'events': island_model.get_migration_events()
+        }
+        if use_behavior_novelty:
+            results['behavior_novelty'] = island_model.get_statistics()['behavior_novelty']
+
+    # 多目的選択の場合はパレートフロントも保存（重みを変えずにトレードオフを比較できる）
+    if engine != 'map_elites' and selection_mode == 'nsga2':
+        pareto_dir = run_dir / 'pareto_front'
+        pareto_dir.mkdir(exist_ok=True)
+        pareto_front = []
+        for i, ind in enumerate(island_model.get_pareto_front()):
+            pareto_file = pareto_dir / f'pareto_{i}.py'
+            with open(pareto_file, 'w', encoding='utf-8') as f:
+                f.write(ind.test_code)
+            pareto_front.append({
+                'file': str(pareto_file.relative_to(run_dir)),
+                'fitness': ind.fitness,
+                'metrics': ind.metrics
+            })
+        results['pareto_front'] = pareto_front
+
+    # 最終集団を実行をまたぐアーカイブに保存
+    if persistent_archive is not None:
+        if engine == 'map_elites':
+            survivors = island_model.archive.get_elites()
+        else:
+            survivors = [ind for island in island_model.islands for ind in island.population]
+        persistent_archive.save(survivors + [best_individual], run_id=timestamp)
+        results['persistent_archive'] = persistent_archive.get_statistics()
+        persistent_archive.close()
+
+    # チェックポイント（全集団）を保存。予算切れで停止した場合も結果と一緒に残す
+    checkpoint_file = run_dir / 'checkpoint.json'
+    with open(checkpoint_file, 'w', encoding='utf-8') as f:
+        json.dump(island_model.get_checkpoint(), f, indent=2, ensure_ascii=False)
+
+    # 文脈付きバンディットの学習結果（LinUCBの状態）を実行ディレクトリに保存
+    if target_structure is not None and strategy_bandit is not None:
+        strategy_bandit.save(run_dir / 'strategy_bandit.json')
+
     results_file = run_dir / 'metrics.json'
     with open(results_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
@@ -327,6 +843,8 @@ def evolve(config, output_dir, verbose, llm):
     with open(final_test_file, 'w', encoding='utf-8') as f:
         f.write(best_individual.test_code)
 
+    if island_model.stop_reason:
+        click.echo(f"\nEvolution stopped early: {island_model.stop_reason} budget exhausted")
     click.echo(f"\nEvolution Complete!")
     click.echo("=" * 40)
     click.echo(f"\nFinal Results:")
@@ -339,6 +857,9 @@ def evolve(config, output_dir, verbose, llm):
     click.echo(f"\nResults saved to: {run_dir}/")
     click.echo(f"  - evolved_test.py (best test suite)")
     click.echo(f"  - metrics.json (detailed metrics)")
+    click.echo(f"  - checkpoint.json (final populations)")
+    if target_structure is not None and strategy_bandit is not None:
+        click.echo(f"  - strategy_bandit.json (contextual bandit state)")
     click.echo(f"  - best_test_gen*.py (best from each generation)")
 
     if verbose:
@@ -3,5 +3,6 @@
 """
 
 from .evaluator import QualityEvaluator
+from .budget import BudgetManager
 
-__all__ = ["QualityEvaluator"]
+__all__ = ["QualityEvaluator", "BudgetManager"]
@@ -0,0 +1,282 @@
+"""
+実行予算の管理
+経過時間・評価回数・LLMトークン数・LLMコストを集計し、
+予算が尽きる前に進化を打ち切ったり、残り予算に応じて処理を軽くしたりする
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class BudgetManager:
+    """島モデル・評価器・LLMクライアントで共有する実行予算"""
+
+    def __init__(
+        self,
+        max_total_time: Optional[float] = None,
+        max_evaluations: Optional[int] = None,
+        max_llm_tokens: Optional[int] = None,
+        max_llm_cost: Optional[float] = None,
+        reserve_time: float = 5.0,
+        reduce_population_below: float = 0.5,
+        skip_timing_below: float = 0.3,
+        disable_llm_below: float = 0.15
+    ):
+        """
+        Args:
+            max_total_time: 全体の最大実行時間（秒、Noneの場合は無制限）
+            max_evaluations: 最大評価回数（Noneの場合は無制限）
+            max_llm_tokens: LLMの最大トークン数（入力+出力、Noneの場合は無制限）
+            max_llm_cost: LLMの最大コスト（USD、Noneの場合は無制限）
+            reserve_time: 結果とチェックポイントの保存のために残しておく時間（秒）
+            reduce_population_below: 残り予算の割合がこれを下回ると子個体数を減らす
+            skip_timing_below: 残り予算の割合がこれを下回ると実行時間の計測を省略する
+            disable_llm_below: 残り予算の割合がこれを下回るとLLM呼び出しを止める
+        """
+        self.max_total_time = max_total_time
+        self.max_evaluations = max_evaluations
+        self.max_llm_tokens = max_llm_tokens
+        self.max_llm_cost = max_llm_cost
+        self.reserve_time = reserve_time
+        self.reduce_population_below = reduce_population_below
+        self.skip_timing_below = skip_timing_below
+        self.disable_llm_below = disable_llm_below
+
+        self.start_time = time.monotonic()
+        self.evaluations = 0
+        self.llm_calls = 0
+        self.llm_input_tokens = 0
+        self.llm_output_tokens = 0
+        self.llm_cost = 0.0
+
+        # 世代の所要時間（次の世代が時間内に終わるかの見積もりに使う）
+        self._generation_time_total = 0.0
+        self._generation_count = 0
+        self._stop_reason: Optional[str] = None
+
+        # 評価スレッド・島スレッドから同時に更新される
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config_data: Dict[str, Any]) -> 'BudgetManager':
+        """
+        設定ファイルの'limits'セクションから作成
+
+        Args:
+            config_data: 設定ファイル全体の辞書
+
+        Returns:
+            BudgetManagerインスタンス
+        """
+        limits = config_data.get('limits', {}) or {}
+        adaptive = limits.get('adaptive', {}) or {}
+        return cls(
+            max_total_time=limits.get('max_total_time'),
+            max_evaluations=limits.get('max_evaluations'),
+            max_llm_tokens=limits.get('max_llm_tokens'),
+            max_llm_cost=limits.get('max_llm_cost'),
+            reserve_time=limits.get('reserve_time', 5.0),
+            reduce_population_below=adaptive.get('reduce_population_below', 0.5),
+            skip_timing_below=adaptive.get('skip_timing_below', 0.3),
+            disable_llm_below=adaptive.get('disable_llm_below', 0.15)
+        )
+
+    def elapsed(self) -> float:
+        """開始からの経過時間（秒）"""
+        return time.monotonic() - self.start_time
+
+    def request_stop(self, reason: str = 'interrupted'):
+        """
+        外部から停止を要求（SIGTERMなど）。実行中の世代が終わった時点で停止する
+
+        Args:
+            reason: 停止理由
+        """
+        self._stop_reason = reason
+
+    def record_generation(self, duration: float):
+        """
+        1世代の所要時間を記録
+
+        Args:
+            duration: 所要時間（秒）
+        """
+        with self._lock:
+            self._generation_time_total += duration
+            self._generation_count += 1
+
+    def reserve_evaluations(self, count: int) -> int:
+        """
+        評価回数を予約（残りの評価回数を超える分は切り詰める）
+
+        Args:
+            count: 予約したい評価回数
+
+        Returns:
+            実際に予約できた評価回数
+        """
+        with self._lock:
+            if self.max_evaluations is not None:
+                count = max(0, min(count, self.max_evaluations - self.evaluations))
+            self.evaluations += count
+            return count
+
+    def record_evaluations(self, count: int):
+        """
+        予約せずに実行した評価回数を記録（ベースライン・初期集団の評価など。上限を超えても記録する）
+
+        Args:
+            count: 実行した評価回数
+        """
+        with self._lock:
+            self.evaluations += count
+
+    def release_evaluations(self, count: int):
+        """
+        予約したが実行しなかった評価回数を返却
+
+        Args:
+            count: 返却する評価回数
+        """
+        with self._lock:
+            self.evaluations = max(0, self.evaluations - count)
+
+    def record_llm_usage(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cost_per_1m_tokens: Tuple[float, float] = (0.0, 0.0)
+    ):
+        """
+        LLM呼び出しのトークン数とコストを記録
+
+        Args:
+            input_tokens: 入力トークン数
+            output_tokens: 出力トークン数
+            cost_per_1m_tokens: (入力コスト, 出力コスト) USD per 1M tokens
+        """
+        cost = (
+            input_tokens * cost_per_1m_tokens[0] +
+            output_tokens * cost_per_1m_tokens[1]
+        ) / 1_000_000
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_input_tokens += input_tokens
+            self.llm_output_tokens += output_tokens
+            self.llm_cost += cost
+
+    @property
+    def llm_tokens(self) -> int:
+        """LLMの総トークン数（入力+出力）"""
+        return self.llm_input_tokens + self.llm_output_tokens
+
+    def remaining_fraction(self) -> float:
+        """
+        残り予算の割合（時間・評価回数のうち最も少ないもの）
+
+        Returns:
+            0.0〜1.0（制限がない場合は1.0）
+        """
+        fractions = [1.0]
+        if self.max_total_time:
+            fractions.append(1.0 - self.elapsed() / self.max_total_time)
+        if self.max_evaluations:
+            fractions.append(1.0 - self.evaluations / self.max_evaluations)
+        return max(0.0, min(fractions))
+
+    def llm_remaining_fraction(self) -> float:
+        """
+        LLM予算（トークン数・コスト）の残りの割合
+
+        Returns:
+            0.0〜1.0（制限がない場合は1.0）
+        """
+        fractions = [1.0]
+        if self.max_llm_tokens:
+            fractions.append(1.0 - self.llm_tokens / self.max_llm_tokens)
+        if self.max_llm_cost:
+            fractions.append(1.0 - self.llm_cost / self.max_llm_cost)
+        return max(0.0, min(fractions))
+
+    def exhausted(self) -> Optional[str]:
+        """
+        使い切った予算を返す
+
+        Returns:
+            使い切った予算の名前（'time', 'evaluations'、停止要求の理由）、残っている場合はNone
+        """
+        if self._stop_reason:
+            return self._stop_reason
+        if (
+            self.max_total_time is not None
+            and self.elapsed() + self.reserve_time >= self.max_total_time
+        ):
+            return 'time'
+        if self.max_evaluations is not None and self.evaluations >= self.max_evaluations:
+            return 'evaluations'
+        return None
+
+    def should_stop(self) -> Optional[str]:
+        """
+        次の世代を始めるべきでないかを判定
+
+        予算を使い切った場合に加えて、これまでの平均所要時間から見て
+        次の世代が時間内に終わらない場合も停止する
+
+        Returns:
+            停止理由、続行できる場合はNone
+        """
+        reason = self.exhausted()
+        if reason or self.max_total_time is None or not self._generation_count:
+            return reason
+
+        estimated = self._generation_time_total / self._generation_count
+        if self.elapsed() + estimated + self.reserve_time > self.max_total_time:
+            return 'time'
+        return None
+
+    def population_scale(self) -> float:
+        """
+        子個体数に掛ける係数（残り予算が少ないほど小さくする）
+
+        Returns:
+            0.25〜1.0
+        """
+        fraction = self.remaining_fraction()
+        if fraction >= self.reduce_population_below:
+            return 1.0
+        return max(0.25, fraction / self.reduce_population_below)
+
+    def skip_timing(self) -> bool:
+        """実行時間の計測（pytestの追加実行）を省略すべきか"""
+        return self.remaining_fraction() < self.skip_timing_below
+
+    def allow_llm(self) -> bool:
+        """LLMを呼び出してよいか"""
+        return (
+            self.llm_remaining_fraction() > 0.0 and
+            self.remaining_fraction() >= self.disable_llm_below
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        予算の使用状況を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            'elapsed_time': self.elapsed(),
+            'max_total_time': self.max_total_time,
+            'evaluations': self.evaluations,
+            'max_evaluations': self.max_evaluations,
+            'llm_calls': self.llm_calls,
+            'llm_input_tokens': self.llm_input_tokens,
+            'llm_output_tokens': self.llm_output_tokens,
+            'max_llm_tokens': self.max_llm_tokens,
+            'llm_cost': self.llm_cost,
+            'max_llm_cost': self.max_llm_cost,
+            'remaining_fraction': self.remaining_fraction(),
+            'exhausted': self.exhausted()
+        }
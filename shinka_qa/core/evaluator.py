@@ -3,14 +3,21 @@
 テストスイートの品質を多角的に評価する
 """
 
+import difflib
+import os
+import re
 import subprocess
 import time
 import ast
 import tempfile
 import shutil
-from typing import Dict, Tuple
+from typing import Any, Dict, List, Set, Tuple, Optional
 from pathlib import Path
 
+from coverage import CoverageData
+
+from .budget import BudgetManager
+
 
 class QualityEvaluator:
     """テストスイートの品質評価クラス"""
@@ -19,13 +26,15 @@ class QualityEvaluator:
         self,
         target_module_path: Path,
         seeded_bugs_path: Path = None,
-        weights: Dict[str, float] = None
+        weights: Optional[Dict[str, float]] = None,
+        budget: Optional[BudgetManager] = None
     ):
         """
         Args:
             target_module_path: テスト対象モジュールのパス
             seeded_bugs_path: バグを仕込んだバージョンのパス
             weights: 各指標の重み（デフォルト: coverage=0.4, bugs=0.35, efficiency=0.15, quality=0.1）
+            budget: 実行予算（残りが少ない場合は実行時間の計測を省略する）
         """
         self.target_module = Path(target_module_path)
         self.seeded_bugs = Path(seeded_bugs_path) if seeded_bugs_path else None
@@ -43,12 +52,23 @@ class QualityEvaluator:
         self.baseline_time = 1.0
         self.total_seeded_bugs = 5  # デフォルト値
 
-    def evaluate(self, test_file_path: Path) -> Tuple[float, Dict[str, float]]:
+        self.budget = budget
+        # シードバグ（バグ版との差分のハンク）ごとの元のモジュールの行（初回に計算する）
+        self._bug_hunks: Optional[List[Set[int]]] = None
+        # 通常の実行時間 / カバレッジ計測付きの実行時間（ベースラインで測る。計測を省略するときの推定に使う）
+        self._coverage_time_ratio = 1.0
+
+    def evaluate(
+        self,
+        test_file_path: Path,
+        behavior: Optional[Dict[str, Any]] = None
+    ) -> Tuple[float, Dict[str, float]]:
         """
         テストファイルを評価して適応度スコアを返す
 
         Args:
             test_file_path: 評価するテストファイルのパス
+            behavior: 指定した場合、行動データ（カバー行、テストごとのカバー行、検出したシードバグ）を書き込む
 
         Returns:
             (total_fitness, metrics_dict): 総合スコアと各指標の詳細
@@ -56,18 +76,26 @@ class QualityEvaluator:
         metrics = {}
 
         # 1. カバレッジ測定
-        metrics['coverage'] = self._measure_coverage(test_file_path)
+        start_time = time.time()
+        metrics['coverage'] = self._measure_coverage(test_file_path, behavior)
+        coverage_time = time.time() - start_time
         metrics['coverage_improvement'] = self._calculate_coverage_improvement(
             metrics['coverage']
         )
 
         # 2. バグ検出率測定
-        metrics['bugs_detected'] = self._measure_bug_detection(test_file_path)
-
-        # 3. 実行効率測定
-        metrics['execution_time'], metrics['efficiency'] = self._measure_efficiency(
-            test_file_path
-        )
+        metrics['bugs_detected'] = self._measure_bug_detection(test_file_path, behavior)
+
+        # 3. 実行効率測定（予算が少ない場合はpytestの追加実行を省略し、
+        #    このスイートのカバレッジ計測付きの実行時間から推定する）
+        if self.budget is not None and self.budget.skip_timing():
+            execution_time = coverage_time * self._coverage_time_ratio
+            metrics['execution_time'] = execution_time
+            metrics['efficiency'] = self._efficiency_score(execution_time)
+        else:
+            metrics['execution_time'], metrics['efficiency'] = self._measure_efficiency(
+                test_file_path
+            )
 
         # 4. コード品質測定
         metrics['maintainability'] = self._measure_code_quality(test_file_path)
@@ -82,25 +110,45 @@ class QualityEvaluator:
 
         return fitness, metrics
 
-    def _measure_coverage(self, test_file: Path) -> float:
-        """pytest-covを使用してカバレッジを測定"""
+    def _measure_coverage(
+        self, test_file: Path, behavior: Optional[Dict[str, Any]] = None
+    ) -> float:
+        """
+        pytest-covを使用してカバレッジを測定
+
+        behaviorが指定された場合はテストごとのカバレッジコンテキストも記録し、
+        'covered_lines'（カバーされた行）と'test_coverage'（テスト名 -> カバー行）を書き込む
+        """
         # EVOLVE-BLOCK-START: coverage_measurement
         try:
-            # pytest-covを使用してカバレッジを測定
-            result = subprocess.run(
-                [
+            # 並列評価時にカバレッジデータが衝突しないよう、データファイルを評価ごとに分離
+            with tempfile.TemporaryDirectory(prefix='shinka_cov_') as cov_dir:
+                data_file = Path(cov_dir) / '.coverage'
+                env = dict(os.environ, COVERAGE_FILE=str(data_file))
+
+                # pytest-covを使用してカバレッジを測定
+                command = [
                     'pytest',
                     test_file.name,  # ファイル名のみを渡す（cwdが親ディレクトリなので）
                     f'--cov={self.target_module.stem}',
                     '--cov-report=term-missing',
                     '--tb=short',
                     '-v'
-                ],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                cwd=str(self.target_module.parent)
-            )
+                ]
+                if behavior is not None:
+                    command.append('--cov-context=test')
+
+                result = subprocess.run(
+                    command,
+                    capture_output=True,
+                    text=True,
+                    timeout=10,
+                    cwd=str(self.target_module.parent),
+                    env=env
+                )
+
+                if behavior is not None:
+                    behavior.update(self._read_coverage_behavior(data_file))
 
             # カバレッジ結果を解析
             output = result.stdout + result.stderr
@@ -130,6 +178,35 @@ class QualityEvaluator:
             return 0.0
         # EVOLVE-BLOCK-END
 
+    def _read_coverage_behavior(self, data_file: Path) -> Dict[str, Any]:
+        """カバレッジデータファイルからカバー行とテストごとのカバー行を読み出す"""
+        if not data_file.exists():
+            return {}
+
+        data = CoverageData(basename=str(data_file))
+        data.read()
+
+        for measured_file in data.measured_files():
+            if Path(measured_file).name != self.target_module.name:
+                continue
+
+            test_coverage: Dict[str, set] = {}
+            for lineno, contexts in data.contexts_by_lineno(measured_file).items():
+                for context in contexts:
+                    if '::' not in context:
+                        continue
+                    # "path::TestClass::test_name[param]|run" からテスト名（クラス名）を取り出す
+                    node_id = context.split('|')[0]
+                    test_name = node_id.split('::')[1].split('[')[0]
+                    test_coverage.setdefault(test_name, set()).add(lineno)
+
+            return {
+                'covered_lines': set(data.lines(measured_file) or []),
+                'test_coverage': test_coverage
+            }
+
+        return {}
+
     def _calculate_coverage_improvement(self, current_coverage: float) -> float:
         """ベースラインからのカバレッジ改善率を計算"""
         if self.baseline_coverage >= 100:
@@ -141,8 +218,14 @@ class QualityEvaluator:
         )
         return max(0.0, min(1.0, improvement))  # 0-1に正規化
 
-    def _measure_bug_detection(self, test_file: Path) -> float:
-        """バグ検出率を測定"""
+    def _measure_bug_detection(
+        self, test_file: Path, behavior: Optional[Dict[str, Any]] = None
+    ) -> float:
+        """
+        バグ検出率を測定
+
+        behaviorが指定された場合は、検出したシードバグの番号の集合を'killed_mutants'に書き込む
+        """
         if not self.seeded_bugs or not self.seeded_bugs.exists():
             # バグファイルがない場合はスキップ
             return 0.0
@@ -173,6 +256,11 @@ class QualityEvaluator:
                 # 失敗したテストの数をカウント（= 検出されたバグ）
                 output = result.stdout + result.stderr
 
+                if behavior is not None:
+                    behavior['killed_mutants'] = self._killed_mutants(
+                        output, behavior.get('test_coverage', {})
+                    )
+
                 # "FAILED" または "ERROR" の数をカウント
                 failures = output.count('FAILED') + output.count('ERROR')
 
@@ -184,6 +272,43 @@ class QualityEvaluator:
             return 0.0
         # EVOLVE-BLOCK-END
 
+    def _seeded_bug_hunks(self) -> List[Set[int]]:
+        """
+        バグ版と元のモジュールの差分を、ハンク（= シードバグ1つ）ごとの元のモジュールの行番号に分ける
+
+        Returns:
+            ハンクごとの行番号（1始まり）の集合のリスト
+        """
+        if self._bug_hunks is None:
+            original = self.target_module.read_text(encoding='utf-8').splitlines()
+            buggy = self.seeded_bugs.read_text(encoding='utf-8').splitlines()
+            matcher = difflib.SequenceMatcher(None, original, buggy, autojunk=False)
+            self._bug_hunks = [
+                # 挿入だけのハンクは前後の行に割り当てる
+                set(range(i1 + 1, i2 + 1)) if i2 > i1 else {max(i1, 1), i1 + 1}
+                for tag, i1, i2, _, _ in matcher.get_opcodes() if tag != 'equal'
+            ]
+        return self._bug_hunks
+
+    def _killed_mutants(self, output: str, test_coverage: Dict[str, set]) -> Set[int]:
+        """
+        バグ版で失敗したテストが実行した行から、検出したシードバグを特定
+
+        Args:
+            output: バグ版に対するpytest -vの出力
+            test_coverage: テスト名 -> 元のモジュールでカバーした行
+
+        Returns:
+            検出したシードバグ（ハンク）の番号の集合
+        """
+        # "test_file.py::test_name[param] FAILED" / "test_file.py::TestClass::test_name ERROR"
+        failed = set(re.findall(r'^\S+?::([^:\s\[]+)\S*\s+(?:FAILED|ERROR)', output, re.MULTILINE))
+        covered = set()
+        for test_name in failed:
+            covered |= test_coverage.get(test_name, set())
+
+        return {index for index, lines in enumerate(self._seeded_bug_hunks()) if lines & covered}
+
     def _measure_efficiency(self, test_file: Path) -> Tuple[float, float]:
         """テスト実行時間を測定"""
         start_time = time.time()
@@ -199,7 +324,10 @@ class QualityEvaluator:
             return 10.0, 0.0
 
         execution_time = time.time() - start_time
+        return execution_time, self._efficiency_score(execution_time)
 
+    def _efficiency_score(self, execution_time: float) -> float:
+        """実行時間の効率スコア（0-1）"""
         # 効率スコア: 速いほど高スコア
         efficiency = self.baseline_time / max(execution_time, 0.1)
 
@@ -207,7 +335,7 @@ class QualityEvaluator:
         if execution_time > 5.0:
             efficiency *= 0.5
 
-        return execution_time, min(1.0, efficiency)
+        return min(1.0, efficiency)
 
     def _measure_code_quality(self, test_file: Path) -> float:
         """テストコードの品質を測定"""
@@ -277,7 +405,12 @@ class QualityEvaluator:
 
     def set_baseline(self, initial_test_file: Path):
         """初期テストでベースライン値を設定"""
+        start_time = time.time()
         self.baseline_coverage = self._measure_coverage(initial_test_file)
+        coverage_time = time.time() - start_time
         self.baseline_time, _ = self._measure_efficiency(initial_test_file)
+        self._coverage_time_ratio = self.baseline_time / max(coverage_time, 1e-3)
+        if self.budget is not None:
+            self.budget.record_evaluations(1)
 
         print(f"Baseline set: Coverage={self.baseline_coverage:.1f}%, Time={self.baseline_time:.2f}s")
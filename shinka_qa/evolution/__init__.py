@@ -4,8 +4,31 @@
 
 from .test_mutator import TestMutator
 from .island_model import IslandModel, Island, Individual
-from .ucb_bandit import UCB1Bandit, StrategyBandit, ModelBandit, AdaptiveBanditSelector
+from .map_elites import MapElites, MapElitesArchive, BehaviorDescriptor
+from .parallel_evaluator import ParallelEvaluator
+from .crossover import SuiteCrossover, merge_suite_fragment
+from .migration import MigrationQueues, MigrationEvent, create_topology
+from .ucb_bandit import (
+    UCB1Bandit,
+    SlidingWindowUCBBandit,
+    DiscountedUCBBandit,
+    ThompsonSamplingBandit,
+    EXP3Bandit,
+    create_bandit,
+    LinUCBBandit,
+    StrategyBandit,
+    ContextualStrategyBandit,
+    ModelBandit,
+    CostAwareModelBandit,
+    AdaptiveBanditSelector,
+)
 from .novelty_filter import NoveltyFilter
+from .near_duplicate import NearDuplicateIndex
+from .behavior_novelty import BehaviorNoveltyArchive
+from .persistent_archive import PersistentArchive
+from .bandit_state import BanditStateStore
+from .context_features import TargetStructure, context_features
+from .prompt_slicer import TargetPromptBuilder
 from .meta_scratchpad import MetaScratchpad, Insight, SuccessPattern
 
 __all__ = [
@@ -13,11 +36,35 @@ __all__ = [
     "IslandModel",
     "Island",
     "Individual",
+    "MapElites",
+    "MapElitesArchive",
+    "BehaviorDescriptor",
+    "ParallelEvaluator",
+    "SuiteCrossover",
+    "merge_suite_fragment",
+    "MigrationQueues",
+    "MigrationEvent",
+    "create_topology",
     "UCB1Bandit",
+    "SlidingWindowUCBBandit",
+    "DiscountedUCBBandit",
+    "ThompsonSamplingBandit",
+    "EXP3Bandit",
+    "create_bandit",
+    "LinUCBBandit",
     "StrategyBandit",
+    "ContextualStrategyBandit",
     "ModelBandit",
+    "CostAwareModelBandit",
     "AdaptiveBanditSelector",
     "NoveltyFilter",
+    "NearDuplicateIndex",
+    "BehaviorNoveltyArchive",
+    "PersistentArchive",
+    "BanditStateStore",
+    "TargetStructure",
+    "context_features",
+    "TargetPromptBuilder",
     "MetaScratchpad",
     "Insight",
     "SuccessPattern",
@@ -0,0 +1,105 @@
+"""
+実行をまたいで引き継ぐバンディットの状態
+テスト対象（またはプロジェクト）ごとに各バンディットのget_state()をJSONファイルに保存し、
+次回の実行でload_state()の事前分布として読み込む（毎回の強制探索を省く）
+"""
+
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class BanditStateStore:
+    """バンディットの状態を保存するJSONファイル"""
+
+    def __init__(self, path: Path, scope: str):
+        """
+        Args:
+            path: JSONファイルのパス（親ディレクトリがなければ作成する）
+            scope: 状態を共有する範囲のキー（テスト対象モジュールのパス、またはプロジェクト名）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.scope = scope
+
+    def _read(self) -> Dict[str, Any]:
+        """ファイル全体を読み込む（存在しない・壊れている場合は空）"""
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Bandit state read error: {e}")
+            return {}
+
+    @contextmanager
+    def _lock(self) -> Iterator[None]:
+        """同じファイルに保存する他のプロセスと排他する（隣の.lockファイルをロックする）"""
+        lock_path = self.path.with_suffix(self.path.suffix + '.lock')
+        with open(lock_path, 'a+b') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        保存されたバンディットの状態を読み込む
+
+        Args:
+            name: バンディットの名前（'strategy', 'model_router'など）
+
+        Returns:
+            get_state()の辞書、保存されていない場合はNone
+        """
+        entry = self._read().get(self.scope, {}).get(name)
+        return entry['state'] if entry else None
+
+    def save(self, name: str, state: Dict[str, Any], run_id: Optional[str] = None):
+        """
+        バンディットの状態を保存（同じ範囲・名前の状態は上書きする）
+
+        Args:
+            name: バンディットの名前
+            state: get_state()の辞書
+            run_id: 保存元の実行ID
+        """
+        # 他の実行が同時に保存しても互いの状態を消さないよう、ロック中に読み直して書き込む
+        with self._lock():
+            data = self._read()
+            data.setdefault(self.scope, {})[name] = {
+                'state': state,
+                'run_id': run_id,
+                'saved_at': time.time()
+            }
+            # 書き込み途中で中断しても既存のファイルが壊れないよう、一時ファイルから置き換える
+            fd, temp_name = tempfile.mkstemp(
+                prefix=self.path.name + '.', suffix='.tmp', dir=str(self.path.parent)
+            )
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(json.dumps(data))
+                os.replace(temp_name, self.path)
+            except BaseException:
+                if os.path.exists(temp_name):
+                    os.unlink(temp_name)
+                raise
@@ -0,0 +1,224 @@
+"""
+行動ベースの新規性
+評価済みの個体のカバー行と検出したシードバグ（ミュータント）をビット集合として保持し、
+アーカイブ中のk近傍との距離の平均を新規性スコアとする
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+
+# バイト値 -> 立っているビット数 の表（パックしたビット集合のpopcountに使う）
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.int32)
+
+DISTANCE_METRICS = ('jaccard', 'hamming')
+
+
+def pack_bits(indices: Iterable[int], num_bytes: int) -> np.ndarray:
+    """
+    ビット位置の集合をuint8配列にパック
+
+    Args:
+        indices: 立てるビットの位置（0以上の整数）
+        num_bytes: 出力のバイト数（足りない場合は切り詰めずに拡張する）
+
+    Returns:
+        パックしたビット集合（ビットiはバイトi // 8に入る）
+    """
+    positions = np.fromiter((int(i) for i in indices), dtype=np.int64)
+    positions = positions[positions >= 0]
+    num_bits = max(num_bytes * 8, int(positions.max()) + 1 if len(positions) else 0)
+    bits = np.zeros(num_bits, dtype=bool)
+    bits[positions] = True
+    packed = np.packbits(bits)
+    if len(packed) < num_bytes:
+        packed = np.concatenate([packed, np.zeros(num_bytes - len(packed), dtype=np.uint8)])
+    return packed
+
+
+def bit_distances(
+    candidate: np.ndarray, archive: np.ndarray, metric: str = 'jaccard'
+) -> np.ndarray:
+    """
+    パックしたビット集合と、アーカイブの各行との距離
+
+    Args:
+        candidate: パックしたビット集合（長さnum_bytes）
+        archive: パックしたビット集合の行列（n × num_bytes）
+        metric: 'jaccard'（1 - |A∩B| / |A∪B|）または 'hamming'（異なるビット数 / ビット数）
+
+    Returns:
+        距離の配列（0.0〜1.0）。両方が空のビット集合の距離は0.0
+    """
+    if metric == 'hamming':
+        differing = _POPCOUNT[archive ^ candidate].sum(axis=1)
+        return differing / max(archive.shape[1] * 8, 1)
+
+    intersection = _POPCOUNT[archive & candidate].sum(axis=1)
+    union = _POPCOUNT[archive | candidate].sum(axis=1)
+    return np.where(union > 0, 1.0 - intersection / np.maximum(union, 1), 0.0)
+
+
+class BehaviorNoveltyArchive:
+    """カバレッジ・ミュータント検出のビット集合によるk近傍新規性アーカイブ"""
+
+    def __init__(
+        self,
+        k: int = 10,
+        metric: str = 'jaccard',
+        archive_size: int = 500,
+        kill_weight: float = 0.5
+    ):
+        """
+        Args:
+            k: 新規性スコアの計算に使う近傍の数
+            metric: ビット集合の距離（'jaccard' または 'hamming'）
+            archive_size: アーカイブの最大サイズ（超えた場合は古いものから置き換える）
+            kill_weight: 距離に占めるミュータント検出ビット集合の重み（残りはカバー行）
+        """
+        if metric not in DISTANCE_METRICS:
+            raise ValueError(f"Unknown distance metric: {metric}")
+
+        self.k = k
+        self.metric = metric
+        self.archive_size = archive_size
+        self.kill_weight = kill_weight
+
+        # パックしたビット集合の行列（行: アーカイブの項目）。行番号が増えたら列を拡張する
+        self._coverage = np.zeros((archive_size, 1), dtype=np.uint8)
+        self._kills = np.zeros((archive_size, 1), dtype=np.uint8)
+        self._size = 0
+        # 次に書き込む行（満杯になったら最も古い行を上書きする）
+        self._next = 0
+
+        # 非同期移住モードでは島のスレッドから同時に呼ばれる
+        self._lock = threading.Lock()
+
+    def _pack(self, behavior: Dict[str, Any]) -> List[np.ndarray]:
+        """行動データを (カバー行, 検出したミュータント) のビット集合にパックし、必要なら列を拡張"""
+        behavior = behavior or {}
+        coverage = pack_bits(behavior.get('covered_lines', ()), self._coverage.shape[1])
+        kills = pack_bits(behavior.get('killed_mutants', ()), self._kills.shape[1])
+        self._coverage = self._widen(self._coverage, len(coverage))
+        self._kills = self._widen(self._kills, len(kills))
+        return [coverage, kills]
+
+    @staticmethod
+    def _widen(matrix: np.ndarray, num_bytes: int) -> np.ndarray:
+        """ビット集合の行列の列数をnum_bytesまで拡張（既存のビット位置は変わらない）"""
+        if matrix.shape[1] >= num_bytes:
+            return matrix
+        padding = np.zeros((matrix.shape[0], num_bytes - matrix.shape[1]), dtype=np.uint8)
+        return np.concatenate([matrix, padding], axis=1)
+
+    def _distances(self, coverage: np.ndarray, kills: np.ndarray, rows: slice) -> np.ndarray:
+        """カバー行とミュータント検出の距離を重み付きで合成"""
+        coverage = np.pad(coverage, (0, self._coverage.shape[1] - len(coverage)))
+        kills = np.pad(kills, (0, self._kills.shape[1] - len(kills)))
+        return (
+            (1.0 - self.kill_weight) * bit_distances(coverage, self._coverage[rows], self.metric) +
+            self.kill_weight * bit_distances(kills, self._kills[rows], self.metric)
+        )
+
+    def novelty_many(self, behaviors: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """
+        複数の個体の新規性スコアをまとめて計算
+
+        アーカイブとbehaviors自身（自分自身を除く）の中からk近傍を取り、距離の平均をスコアとする
+
+        Args:
+            behaviors: 各個体の行動データ（'covered_lines'と'killed_mutants'）
+
+        Returns:
+            新規性スコアの配列（0.0〜1.0、大きいほど新規）
+        """
+        if not behaviors:
+            return np.empty(0)
+
+        with self._lock:
+            packed = [self._pack(behavior) for behavior in behaviors]
+            archive_rows = slice(0, self._size)
+
+            # 候補同士の距離を測るため、候補を一時的にアーカイブの後ろに並べる
+            batch_coverage = np.stack(
+                [np.pad(c, (0, self._coverage.shape[1] - len(c))) for c, _ in packed]
+            )
+            batch_kills = np.stack(
+                [np.pad(k, (0, self._kills.shape[1] - len(k))) for _, k in packed]
+            )
+            reference_coverage = np.concatenate([self._coverage[archive_rows], batch_coverage])
+            reference_kills = np.concatenate([self._kills[archive_rows], batch_kills])
+
+            scores = np.zeros(len(behaviors))
+            for i, (coverage, kills) in enumerate(zip(batch_coverage, batch_kills)):
+                distances = (
+                    (1.0 - self.kill_weight)
+                    * bit_distances(coverage, reference_coverage, self.metric) +
+                    self.kill_weight * bit_distances(kills, reference_kills, self.metric)
+                )
+                distances = np.delete(distances, self._size + i)
+                if len(distances) == 0:
+                    continue
+                k = min(self.k, len(distances))
+                scores[i] = np.partition(distances, k - 1)[:k].mean()
+
+        return scores
+
+    def novelty(self, behavior: Dict[str, Any]) -> float:
+        """
+        1個体の新規性スコア（アーカイブ中のk近傍との距離の平均）
+
+        Args:
+            behavior: 行動データ
+
+        Returns:
+            新規性スコア（0.0〜1.0）
+        """
+        with self._lock:
+            if self._size == 0:
+                return 0.0
+            coverage, kills = self._pack(behavior)
+            distances = self._distances(coverage, kills, slice(0, self._size))
+            k = min(self.k, len(distances))
+            return float(np.partition(distances, k - 1)[:k].mean())
+
+    def add_many(self, behaviors: Sequence[Dict[str, Any]]):
+        """
+        行動データをアーカイブに追加（満杯の場合は古いものから置き換える）
+
+        Args:
+            behaviors: 各個体の行動データ
+        """
+        with self._lock:
+            for behavior in behaviors:
+                coverage, kills = self._pack(behavior)
+                self._coverage[self._next] = np.pad(
+                    coverage, (0, self._coverage.shape[1] - len(coverage))
+                )
+                self._kills[self._next] = np.pad(kills, (0, self._kills.shape[1] - len(kills)))
+                self._next = (self._next + 1) % self.archive_size
+                self._size = min(self._size + 1, self.archive_size)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        with self._lock:
+            rows = slice(0, self._size)
+            covered = _POPCOUNT[self._coverage[rows]].sum(axis=1)
+            killed = _POPCOUNT[self._kills[rows]].sum(axis=1)
+            return {
+                'archive_size': self._size,
+                'metric': self.metric,
+                'k': self.k,
+                'avg_covered_lines': float(covered.mean()) if self._size else 0.0,
+                'avg_killed_mutants': float(killed.mean()) if self._size else 0.0
+            }
@@ -0,0 +1,167 @@
+"""
+文脈付きバンディットの特徴量
+親のテストスイートのカバレッジ・ミュータント検出とテスト対象のASTから、
+どの変異戦略が効きそうかを表す小さな特徴ベクトルを作る
+"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set
+
+import numpy as np
+
+
+# 特徴ベクトルの各要素（先頭はバイアス項、残りは0.0〜1.0で大きいほど「足りない」）
+CONTEXT_FEATURES = (
+    'bias',
+    'uncovered_lines',            # カバーされていない文の割合
+    'uncovered_branches',         # カバーされていない分岐（if/for/while/tryの各ブロック）の割合
+    'uncovered_exception_paths',  # カバーされていないraise・exceptの割合
+    'unparametrized_tests',       # parametrizeされていないテスト関数の割合
+    'weak_assertions',            # テスト関数あたりのassertが少ない度合い
+    'surviving_bugs',             # 検出されていないシードバグの割合
+)
+
+NUM_CONTEXT_FEATURES = len(CONTEXT_FEATURES)
+
+# テスト関数あたりこの数のassertがあれば weak_assertions = 0 とする
+_ASSERTIONS_PER_TEST = 3
+
+
+@dataclass
+class TargetStructure:
+    """テスト対象モジュールの行の分類（特徴量の分母）"""
+    statement_lines: Set[int] = field(default_factory=set)
+    branch_lines: Set[int] = field(default_factory=set)
+    exception_lines: Set[int] = field(default_factory=set)
+
+    @classmethod
+    def from_source(cls, source: str) -> 'TargetStructure':
+        """
+        ソースコードのASTから文・分岐・例外経路の行を集める
+
+        Args:
+            source: テスト対象モジュールのソースコード
+
+        Returns:
+            TargetStructure（構文エラーの場合は空）
+        """
+        structure = cls()
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            return structure
+
+        # docstringは実行される文として数えない（coverageも実行行に含めない）
+        docstrings = {
+            id(node.body[0]) for node in ast.walk(tree)
+            if isinstance(node, (ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            and node.body and _is_docstring(node.body[0])
+        }
+        definitions = (
+            ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Import, ast.ImportFrom
+        )
+        for node in ast.walk(tree):
+            if (
+                isinstance(node, ast.stmt) and id(node) not in docstrings
+                and not isinstance(node, definitions)
+            ):
+                structure.statement_lines.add(node.lineno)
+            # 分岐は各ブロックの先頭の文の行で表す（そのブロックが実行されたか）
+            if isinstance(node, (ast.If, ast.For, ast.AsyncFor, ast.While, ast.Try)):
+                for block in (node.body, node.orelse):
+                    if block:
+                        structure.branch_lines.add(block[0].lineno)
+            if isinstance(node, ast.Raise):
+                structure.exception_lines.add(node.lineno)
+            elif isinstance(node, ast.ExceptHandler) and node.body:
+                structure.exception_lines.add(node.body[0].lineno)
+        return structure
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    """文字列だけの式文（docstring）の場合True"""
+    return (
+        isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
+
+
+def _uncovered_fraction(lines: Set[int], covered: Set[int]) -> float:
+    """lines のうちカバーされていない割合（linesが空の場合は0.0）"""
+    if not lines:
+        return 0.0
+    return len(lines - covered) / len(lines)
+
+
+def _test_shape(test_code: str) -> Dict[str, int]:
+    """テストコードのテスト関数数・parametrizeされた数・assert数"""
+    shape = {'tests': 0, 'parametrized': 0, 'assertions': 0}
+    try:
+        tree = ast.parse(test_code)
+    except SyntaxError:
+        return shape
+
+    for node in ast.walk(tree):
+        if (
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and node.name.startswith('test')
+        ):
+            shape['tests'] += 1
+            if any('parametrize' in ast.unparse(decorator) for decorator in node.decorator_list):
+                shape['parametrized'] += 1
+        elif isinstance(node, ast.Assert):
+            shape['assertions'] += 1
+    return shape
+
+
+def context_features(
+    test_code: str,
+    metrics: Optional[Dict[str, float]],
+    behavior: Optional[Dict[str, Any]],
+    structure: TargetStructure,
+    num_seeded_bugs: int = 0
+) -> np.ndarray:
+    """
+    親のテストスイートの特徴ベクトルを計算
+
+    Args:
+        test_code: 親のテストコード
+        metrics: 親の評価メトリクス（'coverage', 'bugs_detected'）
+        behavior: 親の行動データ（'covered_lines', 'killed_mutants'）。Noneの場合はメトリクスで近似する
+        structure: テスト対象モジュールの行の分類
+        num_seeded_bugs: シードバグの数（0の場合は'bugs_detected'で近似する）
+
+    Returns:
+        CONTEXT_FEATURESの順の特徴ベクトル
+    """
+    metrics = metrics or {}
+    behavior = behavior or {}
+    features = np.zeros(NUM_CONTEXT_FEATURES)
+    features[0] = 1.0
+
+    covered = behavior.get('covered_lines')
+    if covered is not None:
+        covered = set(covered)
+        features[1] = _uncovered_fraction(structure.statement_lines, covered)
+        features[2] = _uncovered_fraction(structure.branch_lines, covered)
+        features[3] = _uncovered_fraction(structure.exception_lines, covered)
+    else:
+        # 行単位のデータがない場合は、全体のカバレッジで分岐・例外経路も近似する
+        uncovered = 1.0 - min(max(metrics.get('coverage', 0.0) / 100.0, 0.0), 1.0)
+        features[1:4] = uncovered
+
+    shape = _test_shape(test_code)
+    if shape['tests']:
+        features[4] = 1.0 - shape['parametrized'] / shape['tests']
+        features[5] = 1.0 - min(1.0, shape['assertions'] / (_ASSERTIONS_PER_TEST * shape['tests']))
+    else:
+        features[4] = features[5] = 1.0
+
+    killed = behavior.get('killed_mutants')
+    if killed is not None and num_seeded_bugs > 0:
+        features[6] = 1.0 - min(1.0, len(killed) / num_seeded_bugs)
+    else:
+        features[6] = 1.0 - min(max(metrics.get('bugs_detected', 0.0), 0.0), 1.0)
+
+    return features
@@ -0,0 +1,439 @@
+"""
+テストスイート間の交叉オペレータ
+2つの親スイートをテスト関数単位で組み合わせ、LLMを使わずに子スイートを生成する
+"""
+
+import ast
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+
+@dataclass
+class SuiteParts:
+    """テストスイートを構成要素ごとに分解した結果"""
+    docstring: str = ''
+    imports: List[ast.stmt] = field(default_factory=list)
+    fixtures: Dict[str, str] = field(default_factory=dict)
+    helpers: Dict[str, str] = field(default_factory=dict)
+    tests: Dict[str, str] = field(default_factory=dict)
+
+
+class SuiteCrossover:
+    """テスト関数レベルの交叉オペレータ"""
+
+    def __init__(self, mode: str = 'union', sample_rate: float = 0.5):
+        """
+        Args:
+            mode: 交叉方式（'union': 両親のテストを全て統合, 'sample': テストをランダムに選択）
+            sample_rate: 'sample'モードで各テストを採用する確率
+        """
+        if mode not in ('union', 'sample'):
+            raise ValueError(f"Unknown crossover mode: {mode}")
+
+        self.mode = mode
+        self.sample_rate = sample_rate
+
+    def crossover(
+        self,
+        code_a: str,
+        code_b: str,
+        coverage_a: Optional[Dict[str, Set[int]]] = None,
+        coverage_b: Optional[Dict[str, Set[int]]] = None,
+        rng: Optional[random.Random] = None
+    ) -> str:
+        """
+        2つのテストスイートを交叉させる
+
+        Args:
+            code_a: 親Aのテストコード
+            code_b: 親Bのテストコード
+            coverage_a: 親Aのテストごとのカバー行（テスト名 -> 行番号の集合）
+            coverage_b: 親Bのテストごとのカバー行
+            rng: 'sample'モードで使う乱数生成器（Noneの場合はrandomモジュール）
+
+        Returns:
+            子のテストコード（どちらかの親が解析できない場合は親Aをそのまま返す）
+        """
+        parts_a = self._parse_suite(code_a)
+        parts_b = self._parse_suite(code_b)
+        if parts_a is None or parts_b is None:
+            return code_a
+
+        tests_b = self._rename_conflicts(parts_a.tests, parts_b.tests)
+
+        if coverage_a and coverage_b:
+            # カバレッジ情報がある場合は、親Aに足りない行を補うテストだけを親Bから選ぶ
+            renamed_coverage_b = {
+                new_name: coverage_b.get(old_name, set())
+                for new_name, old_name in tests_b.items()
+            }
+            tests = dict(parts_a.tests)
+            for name in self._select_complementary(coverage_a, renamed_coverage_b):
+                tests[name] = self._rename_function(
+                    parts_b.tests[tests_b[name]], tests_b[name], name
+                )
+        else:
+            candidates = list(parts_a.tests.items()) + [
+                (name, self._rename_function(parts_b.tests[old_name], old_name, name))
+                for name, old_name in tests_b.items()
+            ]
+            tests = dict(self._choose_tests(candidates, len(parts_a.tests), rng or random))
+
+        # フィクスチャとヘルパーは両親の和集合（同名の場合は親Aを優先）
+        fixtures = {**parts_b.fixtures, **parts_a.fixtures}
+        helpers = {**parts_b.helpers, **parts_a.helpers}
+        imports = self._merge_imports(parts_a.imports + parts_b.imports)
+
+        # モジュールdocstringは親Aのものを優先
+        sections = [
+            parts_a.docstring or parts_b.docstring,
+            '\n'.join(imports),
+            *helpers.values(),
+            *fixtures.values(),
+            *tests.values()
+        ]
+        return '\n\n\n'.join(section for section in sections if section.strip()) + '\n'
+
+    def crossover_individuals(self, parent_a, parent_b, rng: Optional[random.Random] = None) -> str:
+        """
+        個体同士を交叉させる（島モデルのcrossover_funcとして使用）
+
+        Args:
+            parent_a: 親個体A
+            parent_b: 親個体B
+            rng: 乱数生成器
+
+        Returns:
+            子のテストコード
+        """
+        coverage_a = getattr(parent_a, 'behavior', {}).get('test_coverage')
+        coverage_b = getattr(parent_b, 'behavior', {}).get('test_coverage')
+        return self.crossover(parent_a.test_code, parent_b.test_code, coverage_a, coverage_b, rng)
+
+    def _parse_suite(self, code: str) -> Optional[SuiteParts]:
+        """テストコードをimport・フィクスチャ・ヘルパー・テストに分解"""
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return None
+
+        lines = code.split('\n')
+        parts = SuiteParts()
+
+        for index, node in enumerate(tree.body):
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                parts.imports.append(node)
+                continue
+
+            # デコレータを含めたソースを切り出す
+            start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+            source = '\n'.join(lines[start - 1:node.end_lineno])
+
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                if node.name.startswith('test_'):
+                    parts.tests[node.name] = source
+                elif self._is_fixture(node):
+                    parts.fixtures[node.name] = source
+                else:
+                    parts.helpers[node.name] = source
+            elif isinstance(node, ast.ClassDef) and node.name.startswith('Test'):
+                parts.tests[node.name] = source
+            elif isinstance(node, ast.ClassDef):
+                parts.helpers[node.name] = source
+            elif index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+                parts.docstring = source
+            else:
+                # 定数などのトップレベル文はソースをキーにして重複を除く
+                parts.helpers[source] = source
+
+        return parts
+
+    def _is_fixture(self, node: ast.AST) -> bool:
+        """関数がpytestフィクスチャかどうか"""
+        for decorator in node.decorator_list:
+            target = decorator.func if isinstance(decorator, ast.Call) else decorator
+            name = target.attr if isinstance(target, ast.Attribute) else getattr(target, 'id', '')
+            if name == 'fixture':
+                return True
+        return False
+
+    def _rename_conflicts(self, tests_a: Dict[str, str], tests_b: Dict[str, str]) -> Dict[str, str]:
+        """
+        親Bのテスト名を親Aと衝突しない名前に割り当てる
+
+        Returns:
+            新しい名前 -> 親Bでの元の名前（親Aと同一内容のテストは除外）
+        """
+        mapping = {}
+        for name, source in tests_b.items():
+            if tests_a.get(name) == source:
+                continue
+
+            new_name = name
+            suffix = 2
+            while new_name in tests_a or new_name in mapping:
+                new_name = f"{name}_{suffix}"
+                suffix += 1
+            mapping[new_name] = name
+        return mapping
+
+    def _rename_function(self, source: str, old_name: str, new_name: str) -> str:
+        """関数・クラス定義の名前を置き換える"""
+        if old_name == new_name:
+            return source
+        for keyword in ('def ', 'class '):
+            if f"{keyword}{old_name}" in source:
+                return source.replace(f"{keyword}{old_name}", f"{keyword}{new_name}", 1)
+        return source
+
+    def _choose_tests(
+        self,
+        candidates: List[Tuple[str, str]],
+        num_from_a: int,
+        rng
+    ) -> List[Tuple[str, str]]:
+        """交叉方式に応じてテストを選択"""
+        if self.mode == 'union' or not candidates:
+            return candidates
+
+        chosen = [item for item in candidates if rng.random() < self.sample_rate]
+
+        # 両親から少なくとも1つずつテストを残す
+        from_a, from_b = candidates[:num_from_a], candidates[num_from_a:]
+        if from_a and not any(item in chosen for item in from_a):
+            chosen.insert(0, rng.choice(from_a))
+        if from_b and not any(item in chosen for item in from_b):
+            chosen.append(rng.choice(from_b))
+        return chosen
+
+    def _select_complementary(
+        self,
+        coverage_a: Dict[str, Set[int]],
+        coverage_b: Dict[str, Set[int]]
+    ) -> List[str]:
+        """
+        親Aのカバー行に対して新しい行を最も多く追加する親Bのテストを貪欲に選ぶ
+
+        Returns:
+            採用する親Bのテスト名のリスト
+        """
+        covered: Set[int] = set().union(*coverage_a.values()) if coverage_a else set()
+        remaining = dict(coverage_b)
+        selected = []
+
+        while remaining:
+            name, lines = max(remaining.items(), key=lambda item: len(item[1] - covered))
+            if not lines - covered:
+                break
+            selected.append(name)
+            covered |= lines
+            del remaining[name]
+
+        return selected
+
+    def _merge_imports(self, nodes: List[ast.stmt]) -> List[str]:
+        """import文を統合（同じモジュールからのfrom importは1行にまとめる）"""
+        plain_imports: Dict[str, None] = {}
+        from_imports: Dict[Tuple[str, int], Dict[str, None]] = {}
+
+        for node in nodes:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    plain_imports[self._format_alias(alias)] = None
+            else:
+                key = (node.module or '', node.level)
+                names = from_imports.setdefault(key, {})
+                for alias in node.names:
+                    names[self._format_alias(alias)] = None
+
+        merged = [f"import {name}" for name in plain_imports]
+        for (module, level), names in from_imports.items():
+            merged.append(f"from {'.' * level}{module} import {', '.join(names)}")
+        return merged
+
+    def _format_alias(self, alias: ast.alias) -> str:
+        """import名を文字列化"""
+        return f"{alias.name} as {alias.asname}" if alias.asname else alias.name
+
+
+_DEFINITIONS = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    """文字列だけの式文（モジュール・クラスのdocstring）の場合True"""
+    return (
+        isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
+
+
+def _merge_class(
+    base_node: ast.ClassDef,
+    node: ast.ClassDef,
+    base_lines: List[str],
+    fragment_lines: List[str],
+    replacements: Dict[int, Tuple[int, str]],
+    insertions: Dict[int, List[str]]
+):
+    """
+    差分の同じ名前のクラスを、元のクラスにメンバーごとに統合する（クラスの定義行は元のものを残す）
+
+    同じ名前のメソッド・入れ子のクラスはreplacementsで置き換え、新しいメンバーと元にない文は
+    insertionsでクラスの末尾に追加する。差分のクラスのdocstringは使わない
+    """
+    members = {member.name: member for member in base_node.body if isinstance(member, _DEFINITIONS)}
+    statements = {ast.dump(member) for member in base_node.body}
+    body_indent = _indent_of(base_lines, base_node.body[0])
+    added: List[str] = []
+    for index, member in enumerate(node.body):
+        if index == 0 and _is_docstring(member):
+            continue
+        start, end = _node_span(member)
+        lines = fragment_lines[start - 1:end]
+        fragment_indent = _indent_of(fragment_lines, member)
+        if isinstance(member, _DEFINITIONS) and member.name in members:
+            base_member = members[member.name]
+            if ast.dump(base_member) != ast.dump(member):
+                base_start, base_end = _node_span(base_member)
+                indent = _indent_of(base_lines, base_member)
+                replacements[base_start] = (
+                    base_end, '\n'.join(_reindent(lines, fragment_indent, indent))
+                )
+        elif ast.dump(member) not in statements:
+            added.extend([''] + _reindent(lines, fragment_indent, body_indent))
+            statements.add(ast.dump(member))
+    if added:
+        insertions.setdefault(base_node.end_lineno, []).extend(added)
+
+
+def _indent_of(lines: List[str], node: ast.stmt) -> str:
+    """文の先頭行（デコレータを含む）のインデント"""
+    line = lines[_node_span(node)[0] - 1]
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _reindent(lines: List[str], old_indent: str, new_indent: str) -> List[str]:
+    """行のインデントをold_indentからnew_indentに付け替える（old_indentで始まらない行はそのまま）"""
+    return [
+        new_indent + line[len(old_indent):]
+        if line.startswith(old_indent) and line.strip() else line
+        for line in lines
+    ]
+
+
+def _node_span(node: ast.stmt) -> Tuple[int, int]:
+    """トップレベルの文の行範囲（デコレータを含む）"""
+    start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+    return start, node.end_lineno
+
+
+def _imported_names(node: ast.stmt) -> List[Tuple]:
+    """import文が取り込む名前のキー（重複の判定に使う）"""
+    if isinstance(node, ast.Import):
+        return [('import', alias.name, alias.asname) for alias in node.names]
+    return [
+        ('from', node.module or '', node.level, alias.name, alias.asname)
+        for alias in node.names
+    ]
+
+
+def merge_suite_fragment(base_code: str, fragment_code: str) -> Optional[str]:
+    """
+    追加・変更されたテスト関数だけのコード（差分）を、元のテストスイートに統合する
+
+    元のスイートの並びはそのまま残す。同じ名前の関数は差分のものに置き換え、同じ名前のクラスはメンバーごとに
+    統合する（同じ名前のメソッドは置き換え、新しいメソッドはクラスの末尾に追加）。
+    新しい関数・クラスとトップレベルの文は末尾に追加し、足りないimportは最後のimport文の後に入れる
+
+    Args:
+        base_code: 元のテストコード
+        fragment_code: LLMが返した、追加・変更する定義とimport文
+
+    Returns:
+        統合したテストコード（どちらかが解析できない場合、または変更がない場合はNone）
+    """
+    try:
+        base_tree = ast.parse(base_code)
+        fragment_tree = ast.parse(fragment_code)
+    except SyntaxError:
+        return None
+
+    base_lines = base_code.split('\n')
+    fragment_lines = fragment_code.split('\n')
+    definitions = {node.name: node for node in base_tree.body if isinstance(node, _DEFINITIONS)}
+    base_imports = [
+        node for node in base_tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    ]
+    imported = {key for node in base_imports for key in _imported_names(node)}
+    statements = {ast.dump(node) for node in base_tree.body}
+
+    replacements: Dict[int, Tuple[int, str]] = {}
+    # 元のスイートの行番号 -> その行の後に入れる行（クラスに追加するメンバー）
+    insertions: Dict[int, List[str]] = {}
+    new_imports: List[str] = []
+    appended: List[str] = []
+    for index, node in enumerate(fragment_tree.body):
+        start, end = _node_span(node)
+        source = '\n'.join(fragment_lines[start - 1:end])
+
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            missing = [
+                alias for alias, key in zip(node.names, _imported_names(node))
+                if key not in imported
+            ]
+            if missing:
+                names = ', '.join(
+                    f"{a.name} as {a.asname}" if a.asname else a.name for a in missing
+                )
+                new_imports.append(
+                    f"import {names}" if isinstance(node, ast.Import)
+                    else f"from {'.' * node.level}{node.module or ''} import {names}"
+                )
+                imported.update(_imported_names(node))
+        elif isinstance(node, _DEFINITIONS) and node.name in definitions:
+            base_node = definitions[node.name]
+            if ast.dump(base_node) == ast.dump(node):
+                continue
+            # 本体が定義行と同じ行にあるクラス（class A: pass）は、メンバーを足す行がないので置き換える
+            if (isinstance(base_node, ast.ClassDef) and isinstance(node, ast.ClassDef)
+                    and base_node.body[0].lineno > base_node.lineno):
+                _merge_class(base_node, node, base_lines, fragment_lines, replacements, insertions)
+            else:
+                base_start, base_end = _node_span(base_node)
+                replacements[base_start] = (base_end, source)
+        elif index == 0 and _is_docstring(node):
+            continue  # 差分のモジュールdocstringは使わない
+        elif ast.dump(node) not in statements:
+            appended.append(source)
+            statements.add(ast.dump(node))
+
+    if not (replacements or insertions or new_imports or appended):
+        return None
+
+    # 足りないimportは最後のimport文の後（importがない場合はモジュールdocstringの後、なければ先頭）
+    if base_imports:
+        import_line = base_imports[-1].end_lineno
+    elif base_tree.body and _is_docstring(base_tree.body[0]):
+        import_line = base_tree.body[0].end_lineno
+    else:
+        import_line = 0
+
+    merged: List[str] = new_imports[:] if import_line == 0 else []
+    line = 1
+    while line <= len(base_lines):
+        if line in replacements:
+            end, source = replacements[line]
+            merged.append(source)
+        else:
+            end = line
+            merged.append(base_lines[line - 1])
+            if line == import_line:
+                merged.extend(new_imports)
+        merged.extend(insertions.get(end, []))
+        line = end + 1
+
+    code = '\n'.join(merged).rstrip('\n')
+    if appended:
+        code += '\n\n\n' + '\n\n\n'.join(appended)
+    return code + '\n'
@@ -4,11 +4,27 @@
 """
 
 import random
-from typing import List, Dict, Tuple, Callable
-from dataclasses import dataclass
+import threading
+import time
+from typing import Any, List, Dict, Tuple, Callable, Optional
+from dataclasses import dataclass, field
 from pathlib import Path
 import copy
 
+import numpy as np
+
+from ..core.budget import BudgetManager
+from .parallel_evaluator import ParallelEvaluator
+from .novelty_filter import NoveltyFilter
+from .behavior_novelty import BehaviorNoveltyArchive
+from .migration import MigrationQueues, create_topology
+from .multi_objective import (
+    DEFAULT_OBJECTIVES,
+    build_objective_matrix,
+    fast_non_dominated_sort,
+    nsga2_order
+)
+
 
 @dataclass
 class Individual:
@@ -18,6 +34,65 @@ class Individual:
     metrics: Dict[str, float]
     generation: int
     island_id: int
+    # 行動データ（カバー行、テストごとのカバー行など）。fitness_funcが返した場合のみ
+    behavior: Dict[str, Any] = field(default_factory=dict)
+
+
+def unpack_evaluation(result: Tuple) -> Tuple[float, Dict[str, float], Dict[str, Any]]:
+    """
+    fitness_funcの戻り値を (fitness, metrics, behavior) に揃える
+
+    fitness_funcは (fitness, metrics) または (fitness, metrics, behavior) を返せる
+    """
+    if len(result) >= 3:
+        return result[0], result[1], result[2] or {}
+    return result[0], result[1], {}
+
+
+def individual_to_dict(individual: Individual) -> Dict[str, Any]:
+    """
+    個体をJSONに変換可能な辞書にする（行動データは含めない）
+
+    Args:
+        individual: 個体
+
+    Returns:
+        個体の辞書
+    """
+    if individual is None:
+        return None
+    return {
+        'test_code': individual.test_code,
+        'fitness': individual.fitness,
+        'metrics': individual.metrics,
+        'generation': individual.generation,
+        'island_id': individual.island_id
+    }
+
+
+def python_rng(seed_sequence: np.random.SeedSequence) -> random.Random:
+    """
+    SeedSequenceからrandom.Randomを生成（変異関数・交叉関数に渡す乱数生成器）
+
+    Args:
+        seed_sequence: 乱数ストリームの元になるSeedSequence
+
+    Returns:
+        SeedSequenceで初期化したrandom.Random
+    """
+    return random.Random(int.from_bytes(seed_sequence.generate_state(4).tobytes(), 'little'))
+
+
+# 集団のメトリクス行列に保持するメトリクス（列の順序）
+METRIC_KEYS: Tuple[str, ...] = (
+    'coverage',
+    'coverage_improvement',
+    'bugs_detected',
+    'execution_time',
+    'efficiency',
+    'maintainability',
+    'novelty',
+)
 
 
 class Island:
@@ -27,20 +102,67 @@ class Island:
         self,
         island_id: int,
         population_size: int,
-        elite_ratio: float = 0.3
+        elite_ratio: float = 0.3,
+        selection_mode: str = 'scalar',
+        objectives: Optional[List[Tuple[str, bool]]] = None,
+        crossover_rate: float = 0.0,
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        behavior_novelty: Optional[BehaviorNoveltyArchive] = None,
+        novelty_weight: float = 0.0
     ):
         """
         Args:
             island_id: 島のID
             population_size: 集団サイズ
             elite_ratio: エリート選択比率
+            selection_mode: 選択方式（'scalar': 適応度による選択, 'nsga2': 多目的選択）
+            objectives: 多目的選択で使う (メトリクス名, 最大化フラグ) のリスト
+            crossover_rate: 子個体を交叉で生成する確率
+            seed_sequence: この島の乱数ストリームの元になるSeedSequence（Noneの場合は非決定的）
+            behavior_novelty: 指定した場合、各個体の行動（カバー行・検出したミュータント）の新規性を
+                メトリクス'novelty'に記録する（nsga2モードでは目的に'novelty'を含めると選択に使われる）
+            novelty_weight: scalarモードのトーナメント選択で適応度に加える新規性スコアの重み
         """
+        if selection_mode not in ('scalar', 'nsga2'):
+            raise ValueError(f"Unknown selection mode: {selection_mode}")
+
         self.island_id = island_id
         self.population_size = population_size
         self.elite_ratio = elite_ratio
+        self.selection_mode = selection_mode
+        self.objectives = objectives or DEFAULT_OBJECTIVES
+        self.crossover_rate = crossover_rate
+        self.behavior_novelty = behavior_novelty
+        self.novelty_weight = novelty_weight
         self.population: List[Individual] = []
         self.generation = 0
         self.best_individual: Individual = None
+        # 評価前に除外した子個体の累計
+        self.num_rejected = 0
+
+        # 選択用の乱数ストリームと、子個体ごとに乱数ストリームを派生させる親
+        self.seed_sequence = seed_sequence or np.random.SeedSequence()
+        selection_seed, self._child_seeds = self.seed_sequence.spawn(2)
+        self.rng = np.random.default_rng(selection_seed)
+
+        # 集団の適応度配列とメトリクス行列（選択・統計をPythonのループなしで行うため）
+        self.metric_keys = list(METRIC_KEYS) + [
+            name for name, _ in self.objectives if name not in METRIC_KEYS
+        ]
+        self.fitness_array = np.empty(0)
+        self.metrics_matrix = np.empty((0, len(self.metric_keys)))
+        self.fitness_sum = 0.0
+        self._novelty_column = self.metric_keys.index('novelty')
+
+        # 多目的選択用の目的関数行列と混雑比較の結果
+        self._objective_columns = [self.metric_keys.index(name) for name, _ in self.objectives]
+        self._objective_signs = np.array(
+            [-1.0 if maximize else 1.0 for _, maximize in self.objectives]
+        )
+        self.objective_matrix = np.empty((0, len(self.objectives)))
+        self.ranks = np.empty(0, dtype=int)
+        self.crowding = np.empty(0)
+        self._order = np.empty(0, dtype=int)
 
     def initialize_population(self, initial_code: str, fitness_func: Callable):
         """
@@ -51,7 +173,7 @@ class Island:
             fitness_func: 適応度評価関数
         """
         # 初期コードを評価
-        fitness, metrics = fitness_func(initial_code)
+        fitness, metrics, behavior = unpack_evaluation(fitness_func(initial_code))
 
         # 初期個体を作成
         initial_individual = Individual(
@@ -59,34 +181,60 @@ class Island:
             fitness=fitness,
             metrics=metrics,
             generation=0,
-            island_id=self.island_id
+            island_id=self.island_id,
+            behavior=behavior
         )
 
         # 集団を初期化（初期は同じ個体のコピー）
-        self.population = [copy.deepcopy(initial_individual) for _ in range(self.population_size)]
+        self._set_population(
+            [copy.deepcopy(initial_individual) for _ in range(self.population_size)]
+        )
         self.best_individual = initial_individual
 
     def evolve_generation(
         self,
         mutate_func: Callable,
         fitness_func: Callable,
-        target_code: str = ""
+        target_code: str = "",
+        evaluator: Optional[ParallelEvaluator] = None,
+        crossover_func: Optional[Callable] = None,
+        budget: Optional[BudgetManager] = None,
+        novelty_filter: Optional[NoveltyFilter] = None,
+        batch_mutate_func: Optional[Callable] = None,
+        discard_func: Optional[Callable[[str], None]] = None
     ) -> Individual:
         """
         1世代分進化させる
 
         Args:
-            mutate_func: 変異関数
+            mutate_func: 変異関数（テストコード, テスト対象コード, rng=random.Random -> テストコード）
             fitness_func: 適応度評価関数
             target_code: テスト対象コード
+            evaluator: 子個体をまとめて評価する並列評価器（Noneの場合は逐次評価）
+            crossover_func: 交叉関数（親個体A, 親個体B, rng=random.Random -> テストコード）
+            budget: 実行予算（残りが少ない場合は子個体数を減らす）
+            novelty_filter: 指定した場合、評価前に重複・準重複の子個体を除外する
+            batch_mutate_func: 指定した場合、変異で作る子個体をまとめて1回で生成する
+                （親のテストコードのリスト, テスト対象コード, rngs=乱数生成器のリスト -> テストコードのリスト）。
+                LLMの呼び出しを並行に送るために使う
+            discard_func: 新規性フィルタで評価しないことにした子個体のコードを受け取る関数
 
         Returns:
             この世代の最良個体
         """
         # エリート選択
         elite_count = max(1, int(self.population_size * self.elite_ratio))
-        sorted_population = sorted(self.population, key=lambda x: x.fitness, reverse=True)
-        elites = sorted_population[:elite_count]
+        elites = [self.population[i] for i in self._top_indices(elite_count)]
+
+        # 残りを変異（または交叉）で生成する子個体数
+        num_children = max(0, self.population_size - len(elites))
+        if budget is not None:
+            num_children = budget.reserve_evaluations(
+                max(1, int(num_children * budget.population_scale()))
+            )
+            if num_children == 0:
+                # 評価回数の予算が残っていない場合は集団をそのまま残す
+                return self.population[int(np.argmax(self.fitness_array))]
 
         # 新しい集団を生成
         new_population = []
@@ -94,16 +242,67 @@ class Island:
         # エリートをそのまま残す
         new_population.extend(copy.deepcopy(elites))
 
-        # 残りを変異で生成
-        while len(new_population) < self.population_size:
-            # 親を選択（トーナメント選択）
-            parent = self._tournament_selection()
-
-            # 変異を適用
-            mutated_code = mutate_func(parent.test_code, target_code)
+        # 親はトーナメント選択でまとめて選ぶ
+        parent_indices = self._tournament_indices(num_children)
+        use_crossover = (
+            self.rng.random(num_children) < self.crossover_rate
+            if crossover_func else np.zeros(num_children, dtype=bool)
+        )
 
-            # 適応度を評価
-            fitness, metrics = fitness_func(mutated_code)
+        # 子個体ごとに独立した乱数ストリームを渡す（評価の並列度に関係なく同じ子が生成される）
+        child_rngs = [python_rng(seed) for seed in self._child_seeds.spawn(num_children)]
+
+        mutated_codes = []
+        batched = []
+        children = zip(parent_indices, use_crossover, child_rngs)
+        for i, (parent_index, crossover, child_rng) in enumerate(children):
+            parent = self.population[parent_index]
+
+            if crossover:
+                # 2つ目の親を選んで交叉
+                other = self.population[self._tournament_indices(1)[0]]
+                mutated_codes.append(crossover_func(parent, other, rng=child_rng))
+            elif batch_mutate_func is not None:
+                # 変異はあとでまとめて生成する
+                mutated_codes.append(None)
+                batched.append(i)
+            else:
+                # 変異を適用
+                mutated_codes.append(mutate_func(parent.test_code, target_code, rng=child_rng))
+
+        if batched:
+            batch_codes = batch_mutate_func(
+                [self.population[parent_indices[i]].test_code for i in batched],
+                target_code,
+                rngs=[child_rngs[i] for i in batched]
+            )
+            for i, code in zip(batched, batch_codes):
+                mutated_codes[i] = code
+
+        # 重複・準重複の子個体はpytestを実行する前に除外（設定により親から変異し直す）
+        if novelty_filter is not None and mutated_codes:
+            screened = novelty_filter.screen(
+                mutated_codes,
+                lambda i: mutate_func(
+                    self.population[parent_indices[i]].test_code, target_code, rng=child_rngs[i]
+                ),
+                discard_func
+            )
+            mutated_codes = [code for code in screened if code is not None]
+            self.num_rejected += len(screened) - len(mutated_codes)
+            if budget is not None:
+                budget.release_evaluations(len(screened) - len(mutated_codes))
+
+        # 適応度をまとめて評価
+        if evaluator is not None:
+            results = evaluator.evaluate_batch(mutated_codes)
+        else:
+            results = [fitness_func(code) for code in mutated_codes]
+
+        for mutated_code, result in zip(mutated_codes, results):
+            fitness, metrics, behavior = unpack_evaluation(result)
+            if novelty_filter is not None:
+                novelty_filter.add_to_archive(mutated_code, fitness)
 
             # 新しい個体を作成
             new_individual = Individual(
@@ -111,22 +310,34 @@ class Island:
                 fitness=fitness,
                 metrics=metrics,
                 generation=self.generation + 1,
-                island_id=self.island_id
+                island_id=self.island_id,
+                behavior=behavior
             )
 
             new_population.append(new_individual)
 
+        # 行動の新規性を集団全体について計算し直し、新しい子個体の行動をアーカイブに追加
+        if self.behavior_novelty is not None:
+            self._update_novelty(new_population)
+            self.behavior_novelty.add_many([ind.behavior for ind in new_population[len(elites):]])
+
         # 集団を更新
-        self.population = new_population
+        self._set_population(new_population)
         self.generation += 1
 
         # 最良個体を更新
-        current_best = max(self.population, key=lambda x: x.fitness)
+        current_best = self.population[int(np.argmax(self.fitness_array))]
         if current_best.fitness > self.best_individual.fitness:
             self.best_individual = current_best
 
         return current_best
 
+    def _update_novelty(self, population: List[Individual]):
+        """集団の各個体の行動の新規性スコアをメトリクス'novelty'に書き込む"""
+        scores = self.behavior_novelty.novelty_many([ind.behavior for ind in population])
+        for individual, score in zip(population, scores):
+            individual.metrics = dict(individual.metrics or {}, novelty=float(score))
+
     def _tournament_selection(self, tournament_size: int = 3) -> Individual:
         """
         トーナメント選択
@@ -137,8 +348,154 @@ class Island:
         Returns:
             選択された個体
         """
-        tournament = random.sample(self.population, min(tournament_size, len(self.population)))
-        return max(tournament, key=lambda x: x.fitness)
+        return self.population[self._tournament_indices(1, tournament_size)[0]]
+
+    def _tournament_indices(self, count: int, tournament_size: int = 3) -> np.ndarray:
+        """
+        トーナメント選択をまとめて行う（ベクトル化版）
+
+        各トーナメントの参加者は復元抽出で選ぶ
+
+        Args:
+            count: 選択する個体数
+            tournament_size: トーナメントサイズ
+
+        Returns:
+            選択された個体のインデックス配列
+        """
+        n = len(self.population)
+        if count <= 0 or n == 0:
+            return np.empty(0, dtype=int)
+
+        contestants = self.rng.integers(0, n, size=(count, min(tournament_size, n)))
+        scores = self._selection_scores()[contestants]
+        return contestants[np.arange(count), np.argmax(scores, axis=1)]
+
+    def _selection_scores(self) -> np.ndarray:
+        """
+        選択に使うスコア（大きいほど良い）
+
+        nsga2モードではランクを優先し、同ランク内は混雑距離の大きい個体を優先する
+        """
+        if self.selection_mode == 'nsga2':
+            # 混雑距離を[0, 1]に写像（境界個体の無限大は1になる）
+            crowding = 1.0 - 1.0 / (1.0 + self.crowding)
+            return -self.ranks + 0.5 * crowding
+        if self.novelty_weight:
+            # 適応度を主、行動の新規性を副とする
+            novelty = self.metrics_matrix[:, self._novelty_column]
+            return self.fitness_array + self.novelty_weight * novelty
+        return self.fitness_array
+
+    def _top_indices(self, count: int) -> np.ndarray:
+        """
+        良い順に上位count個体のインデックスを返す
+
+        Args:
+            count: 取得する個体数
+
+        Returns:
+            インデックス配列（良い順）
+        """
+        count = min(count, len(self.population))
+        if count <= 0:
+            return np.empty(0, dtype=int)
+
+        if self.selection_mode == 'nsga2':
+            return self._order[:count]
+
+        scores = self.fitness_array
+        top = np.argpartition(-scores, count - 1)[:count]
+        return top[np.argsort(-scores[top], kind='stable')]
+
+    def _bottom_indices(self, count: int) -> np.ndarray:
+        """
+        悪い順に下位count個体のインデックスを返す
+
+        Args:
+            count: 取得する個体数
+
+        Returns:
+            インデックス配列（悪い順）
+        """
+        count = min(count, len(self.population))
+        if count <= 0:
+            return np.empty(0, dtype=int)
+
+        if self.selection_mode == 'nsga2':
+            return self._order[::-1][:count]
+
+        scores = self.fitness_array
+        bottom = np.argpartition(scores, count - 1)[:count]
+        return bottom[np.argsort(scores[bottom], kind='stable')]
+
+    def _metrics_row(self, metrics: Dict[str, float]) -> List[float]:
+        """メトリクス辞書をメトリクス行列の1行に変換"""
+        metrics = metrics or {}
+        return [metrics.get(key, 0.0) for key in self.metric_keys]
+
+    def _set_population(self, population: List[Individual]):
+        """集団を置き換え、適応度配列・メトリクス行列・集計値を作り直す"""
+        self.population = population
+        self.fitness_array = np.fromiter(
+            (ind.fitness for ind in population), dtype=float, count=len(population)
+        )
+        self.metrics_matrix = np.array(
+            [self._metrics_row(ind.metrics) for ind in population], dtype=float
+        ).reshape(len(population), len(self.metric_keys))
+        self.fitness_sum = float(self.fitness_array.sum())
+        self._update_objectives()
+
+    def _replace(self, index: int, individual: Individual):
+        """
+        集団の1個体を置き換え、配列と集計値を差分更新
+
+        Args:
+            index: 置き換える位置
+            individual: 新しい個体
+        """
+        self.fitness_sum += individual.fitness - self.fitness_array[index]
+        self.population[index] = individual
+        self.fitness_array[index] = individual.fitness
+        self.metrics_matrix[index] = self._metrics_row(individual.metrics)
+
+    @property
+    def avg_fitness(self) -> float:
+        """集団の平均適応度"""
+        return self.fitness_sum / len(self.population) if self.population else 0.0
+
+    def _ranked_population(self) -> List[Individual]:
+        """
+        選択方式に応じて良い順に並べた集団を返す
+
+        Returns:
+            並び替えた個体のリスト
+        """
+        return [self.population[i] for i in self._top_indices(len(self.population))]
+
+    def _update_objectives(self):
+        """集団の目的関数行列と非優越ランク・混雑距離を更新"""
+        if self.selection_mode != 'nsga2':
+            return
+
+        self.objective_matrix = (
+            self.metrics_matrix[:, self._objective_columns] * self._objective_signs
+        )
+        self._order, self.ranks, self.crowding = nsga2_order(self.objective_matrix)
+
+    def get_pareto_front(self) -> List[Individual]:
+        """
+        集団内のパレートフロント（第1フロント）を取得
+
+        Returns:
+            非優越な個体のリスト
+        """
+        if self.selection_mode == 'nsga2':
+            return [self.population[i] for i in np.flatnonzero(self.ranks == 0)]
+
+        matrix = self.metrics_matrix[:, self._objective_columns] * self._objective_signs
+        ranks = fast_non_dominated_sort(matrix)
+        return [self.population[i] for i in np.flatnonzero(ranks == 0)]
 
     def get_migrants(self, migration_rate: float) -> List[Individual]:
         """
@@ -151,8 +508,7 @@ class Island:
             移住する個体のリスト
         """
         num_migrants = max(1, int(self.population_size * migration_rate))
-        sorted_population = sorted(self.population, key=lambda x: x.fitness, reverse=True)
-        return sorted_population[:num_migrants]
+        return [self.population[i] for i in self._top_indices(num_migrants)]
 
     def accept_migrants(self, migrants: List[Individual]):
         """
@@ -162,16 +518,15 @@ class Island:
             migrants: 移住者のリスト
         """
         # 最悪の個体を移住者で置き換え
-        sorted_population = sorted(self.population, key=lambda x: x.fitness, reverse=False)
+        worst_indices = self._bottom_indices(len(migrants))
 
-        for i, migrant in enumerate(migrants):
-            if i < len(sorted_population):
-                # 移住者の島IDを更新
-                migrant_copy = copy.deepcopy(migrant)
-                migrant_copy.island_id = self.island_id
-                sorted_population[i] = migrant_copy
+        for index, migrant in zip(worst_indices, migrants):
+            # 移住者の島IDを更新
+            migrant_copy = copy.deepcopy(migrant)
+            migrant_copy.island_id = self.island_id
+            self._replace(int(index), migrant_copy)
 
-        self.population = sorted_population
+        self._update_objectives()
 
 
 class IslandModel:
@@ -183,7 +538,17 @@ class IslandModel:
         population_size: int = 20,
         migration_interval: int = 10,
         migration_rate: float = 0.1,
-        elite_ratio: float = 0.3
+        elite_ratio: float = 0.3,
+        selection_mode: str = 'scalar',
+        objectives: Optional[List[Tuple[str, bool]]] = None,
+        max_workers: int = 1,
+        crossover_rate: float = 0.0,
+        topology: str = 'ring',
+        topology_degree: int = 2,
+        async_migration: bool = False,
+        seed: Optional[int] = None,
+        behavior_novelty: Optional[BehaviorNoveltyArchive] = None,
+        novelty_weight: float = 0.0
     ):
         """
         Args:
@@ -192,20 +557,52 @@ class IslandModel:
             migration_interval: 移住間隔（世代）
             migration_rate: 移住率
             elite_ratio: エリート選択比率
+            selection_mode: 選択方式（'scalar' または 'nsga2'）
+            objectives: 多目的選択で使う (メトリクス名, 最大化フラグ) のリスト
+            max_workers: 適応度評価の並列ワーカー数
+            crossover_rate: 子個体を交叉で生成する確率
+            topology: 移住トポロジー（'ring', 'fully_connected', 'random_k_regular', 'hub_and_spoke'）
+            topology_degree: random_k_regularの次数
+            async_migration: Trueの場合、各島を独立したスレッドで進化させ、移住は受信キュー経由で
+                非同期に行う（島同士が互いの世代の完了を待たない）
+            seed: 乱数シード。島ごと・子個体ごとの乱数ストリームはここから派生させる
+                （Noneの場合は自動生成したエントロピーを使い、statisticsの'seed'に記録する）
+            behavior_novelty: 全ての島で共有する行動の新規性アーカイブ（Noneの場合は使わない）
+            novelty_weight: scalarモードの選択で適応度に加える新規性スコアの重み
         """
         self.num_islands = num_islands
         self.population_size = population_size
         self.migration_interval = migration_interval
         self.migration_rate = migration_rate
+        self.selection_mode = selection_mode
+        self.objectives = objectives or DEFAULT_OBJECTIVES
+        self.max_workers = max_workers
+        self.async_migration = async_migration
+        self.behavior_novelty = behavior_novelty
+
+        # シードから、トポロジー用と島ごとの独立した乱数ストリームを派生させる
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        topology_seed, *island_seeds = self.seed_sequence.spawn(num_islands + 1)
+
+        # 移住トポロジーと島ごとの受信キュー
+        self.topology = create_topology(
+            topology, num_islands, degree=topology_degree, rng=python_rng(topology_seed)
+        )
+        self.migration_queues = MigrationQueues(num_islands)
 
         # 島を初期化
         self.islands = [
-            Island(i, population_size, elite_ratio)
+            Island(
+                i, population_size, elite_ratio, selection_mode, self.objectives,
+                crossover_rate, island_seeds[i], behavior_novelty, novelty_weight
+            )
             for i in range(num_islands)
         ]
 
         self.global_best: Individual = None
         self.generation = 0
+        self.stop_reason: Optional[str] = None
 
     def initialize(self, initial_code: str, fitness_func: Callable):
         """
@@ -218,66 +615,276 @@ class IslandModel:
         for island in self.islands:
             island.initialize_population(initial_code, fitness_func)
 
+        # 初期個体の行動をアーカイブに登録（全ての島で同じ個体なので1つだけ）
+        if self.behavior_novelty is not None:
+            self.behavior_novelty.add_many([self.islands[0].best_individual.behavior])
+
         # グローバル最良個体を設定
         self.global_best = max(
             [island.best_individual for island in self.islands],
             key=lambda x: x.fitness
         )
 
+    def seed_population(self, individuals: List[Individual]):
+        """
+        初期化済みの島に既知の個体（過去の実行のエリートなど）を加える
+
+        個体は島に順番に振り分け、各島の最も悪い個体と置き換える
+
+        Args:
+            individuals: 加える個体のリスト
+        """
+        for island in self.islands:
+            seeds = individuals[island.island_id::self.num_islands]
+            if seeds:
+                island.accept_migrants(seeds[:island.population_size])
+                current_best = island.population[int(np.argmax(island.fitness_array))]
+                if current_best.fitness > island.best_individual.fitness:
+                    island.best_individual = current_best
+
+        if self.behavior_novelty is not None:
+            self.behavior_novelty.add_many([ind.behavior for ind in individuals])
+
+        self.global_best = max(
+            [self.global_best] + [island.best_individual for island in self.islands],
+            key=lambda x: x.fitness
+        )
+
     def evolve(
         self,
         generations: int,
         mutate_func: Callable,
         fitness_func: Callable,
         target_code: str = "",
-        callback: Callable = None
+        callback: Optional[Callable] = None,
+        crossover_func: Optional[Callable] = None,
+        budget: Optional[BudgetManager] = None,
+        novelty_filter: Optional[NoveltyFilter] = None,
+        batch_mutate_func: Optional[Callable] = None,
+        discard_func: Optional[Callable[[str], None]] = None
     ) -> Individual:
         """
         指定世代数だけ進化させる
 
         Args:
             generations: 世代数
-            mutate_func: 変異関数
+            mutate_func: 変異関数（テストコード, テスト対象コード, rng=random.Random -> テストコード）
             fitness_func: 適応度評価関数
             target_code: テスト対象コード
             callback: 各世代後に呼ばれるコールバック関数
+            crossover_func: 交叉関数（親個体A, 親個体B, rng=random.Random -> テストコード）
+            budget: 実行予算。使い切る前に世代の区切りで停止し、stop_reasonに理由を記録する
+            novelty_filter: 指定した場合、評価前に重複・準重複の子個体を除外する（全ての島で共有）
+            batch_mutate_func: 指定した場合、島ごとに1世代分の変異をまとめて生成する（Island.evolve_generationを参照）
+            discard_func: 新規性フィルタで評価しないことにした子個体のコードを受け取る関数
+                （変異戦略の報酬待ちを報酬なしで取り消すために使う）
 
         Returns:
             最終的な最良個体
         """
+        self.stop_reason = None
+
+        # 現在の集団を新規性アーカイブに登録（変異で変化しなかった子個体を評価前に除外できるように）
+        if novelty_filter is not None:
+            current = {ind.test_code: ind for island in self.islands for ind in island.population}
+            for ind in current.values():
+                novelty_filter.add_to_archive(ind.test_code, ind.fitness)
+
+        # 子個体の評価は世代ごとにまとめて並列評価器へ渡す
+        with ParallelEvaluator(fitness_func, self.max_workers) as evaluator:
+            if self.async_migration and self.num_islands > 1:
+                self._evolve_async(
+                    generations, mutate_func, fitness_func, target_code,
+                    callback, crossover_func, evaluator, budget, novelty_filter, batch_mutate_func,
+                    discard_func
+                )
+            else:
+                self._evolve_sync(
+                    generations, mutate_func, fitness_func, target_code,
+                    callback, crossover_func, evaluator, budget, novelty_filter, batch_mutate_func,
+                    discard_func
+                )
+
+        # 予算切れで途中の世代が揃わなかった島の最良個体も反映する
+        self.global_best = max(
+            [self.global_best] + [island.best_individual for island in self.islands],
+            key=lambda x: x.fitness
+        )
+
+        return self.global_best
+
+    def _evolve_sync(
+        self,
+        generations: int,
+        mutate_func: Callable,
+        fitness_func: Callable,
+        target_code: str,
+        callback: Callable,
+        crossover_func: Callable,
+        evaluator: ParallelEvaluator,
+        budget: BudgetManager,
+        novelty_filter: NoveltyFilter,
+        batch_mutate_func: Callable,
+        discard_func: Callable
+    ):
+        """全ての島を世代ごとに揃えて進化させる"""
         for gen in range(generations):
+            if self._check_budget(budget, gen, generations):
+                break
+
             # 各島で1世代進化
+            started = time.monotonic()
             generation_bests = []
             for island in self.islands:
-                best = island.evolve_generation(mutate_func, fitness_func, target_code)
+                best = island.evolve_generation(
+                    mutate_func, fitness_func, target_code, evaluator, crossover_func,
+                    budget, novelty_filter, batch_mutate_func, discard_func
+                )
                 generation_bests.append(best)
 
-            # グローバル最良個体を更新
-            current_gen_best = max(generation_bests, key=lambda x: x.fitness)
-            if current_gen_best.fitness > self.global_best.fitness:
-                self.global_best = current_gen_best
+            if budget is not None:
+                budget.record_generation(time.monotonic() - started)
 
             # 移住処理
             if (gen + 1) % self.migration_interval == 0:
                 self._migrate()
 
-            # コールバック実行
-            if callback:
-                callback(gen + 1, generation_bests, self.global_best)
+            if self._finish_generation(gen, generations, generation_bests, callback):
+                break
 
-            self.generation = gen + 1
+    def _evolve_async(
+        self,
+        generations: int,
+        mutate_func: Callable,
+        fitness_func: Callable,
+        target_code: str,
+        callback: Callable,
+        crossover_func: Callable,
+        evaluator: ParallelEvaluator,
+        budget: BudgetManager,
+        novelty_filter: NoveltyFilter,
+        batch_mutate_func: Callable,
+        discard_func: Callable
+    ):
+        """各島を独立したスレッドで進化させ、移住は受信キュー経由で行う"""
+        stop_event = threading.Event()
+        lock = threading.Lock()
+        reported: Dict[int, Dict[int, Individual]] = {}
+        next_generation = [0]
+        errors: List[BaseException] = []
+
+        def report(island_id: int, gen: int, best: Individual):
+            # 全ての島が揃った世代から順にコールバックを実行する
+            with lock:
+                reported.setdefault(gen, {})[island_id] = best
+                while len(reported.get(next_generation[0], {})) == self.num_islands:
+                    current = next_generation[0]
+                    bests = reported.pop(current)
+                    generation_bests = [bests[i] for i in range(self.num_islands)]
+                    next_generation[0] += 1
+                    if self._finish_generation(current, generations, generation_bests, callback):
+                        stop_event.set()
+                        break
+
+        def run_island(island: Island):
+            try:
+                for gen in range(generations):
+                    if stop_event.is_set():
+                        return
+                    if self._check_budget(budget, gen, generations):
+                        stop_event.set()
+                        return
+
+                    # 届いている移住者を待たずに受け入れる
+                    self._receive_migrants(island, gen)
+
+                    started = time.monotonic()
+                    best = island.evolve_generation(
+                        mutate_func, fitness_func, target_code, evaluator, crossover_func,
+                        budget, novelty_filter, batch_mutate_func, discard_func
+                    )
+                    if budget is not None:
+                        budget.record_generation(time.monotonic() - started)
+
+                    if (gen + 1) % self.migration_interval == 0:
+                        self._send_migrants(island, gen + 1)
+
+                    report(island.island_id, gen, best)
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+
+        threads = [
+            threading.Thread(target=run_island, args=(island,), name=f"island-{island.island_id}")
+            for island in self.islands
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
 
-            # アーリーストッピング: 完璧なテストが生成されたら終了
-            if self._check_perfect_solution():
-                try:
-                    print(f"\n🎯 Perfect solution achieved at generation {gen + 1}!")
-                except UnicodeEncodeError:
-                    print(f"\n[*] Perfect solution achieved at generation {gen + 1}!")
-                print(f"   Coverage: 100%, Bug Detection: 100%, Fitness: {self.global_best.fitness:.3f}")
-                print(f"   Early stopping - skipping remaining {generations - gen - 1} generations\n")
-                break
+        if errors:
+            raise errors[0]
 
-        return self.global_best
+    def _finish_generation(
+        self,
+        gen: int,
+        generations: int,
+        generation_bests: List[Individual],
+        callback: Callable
+    ) -> bool:
+        """
+        世代の終了処理（最良個体の更新、コールバック、早期終了判定）
+
+        Returns:
+            進化を打ち切る場合True
+        """
+        # グローバル最良個体を更新
+        current_gen_best = max(generation_bests, key=lambda x: x.fitness)
+        if current_gen_best.fitness > self.global_best.fitness:
+            self.global_best = current_gen_best
+
+        # コールバック実行
+        if callback:
+            callback(gen + 1, generation_bests, self.global_best)
+
+        self.generation = gen + 1
+
+        # アーリーストッピング: 完璧なテストが生成されたら終了
+        if self._check_perfect_solution():
+            try:
+                print(f"\n🎯 Perfect solution achieved at generation {gen + 1}!")
+            except UnicodeEncodeError:
+                print(f"\n[*] Perfect solution achieved at generation {gen + 1}!")
+            print(
+                f"   Coverage: 100%, Bug Detection: 100%, "
+                f"Fitness: {self.global_best.fitness:.3f}"
+            )
+            print(f"   Early stopping - skipping remaining {generations - gen - 1} generations\n")
+            return True
+
+        return False
+
+    def _check_budget(self, budget: BudgetManager, gen: int, generations: int) -> bool:
+        """
+        次の世代を始める前に予算を確認
+
+        Returns:
+            予算切れで進化を打ち切る場合True
+        """
+        if budget is None or self.stop_reason is not None:
+            return self.stop_reason is not None
+
+        reason = budget.should_stop()
+        if reason is None:
+            return False
+
+        self.stop_reason = reason
+        print(f"\n[Budget] {reason} budget exhausted before generation {gen + 1}")
+        print(f"   Elapsed: {budget.elapsed():.1f}s, Evaluations: {budget.evaluations}, "
+              f"LLM cost: ${budget.llm_cost:.4f}")
+        print(f"   Stopping early - skipping remaining {generations - gen} generations\n")
+        return True
 
     def _check_perfect_solution(self) -> bool:
         """
@@ -306,17 +913,79 @@ class IslandModel:
         return is_perfect
 
     def _migrate(self):
-        """島間で個体を移住させる"""
-        # 各島から移住者を取得
-        all_migrants = []
+        """島間で個体を移住させる（全島が送信してから受信する同期移住）"""
+        for island in self.islands:
+            self._send_migrants(island, island.generation)
+
         for island in self.islands:
-            migrants = island.get_migrants(self.migration_rate)
-            all_migrants.append(migrants)
+            self._receive_migrants(island, island.generation)
 
-        # リング型の移住（島iの移住者は島i+1に移動）
-        for i, island in enumerate(self.islands):
-            next_island_idx = (i + 1) % self.num_islands
-            island.accept_migrants(all_migrants[next_island_idx])
+    def _send_migrants(self, island: Island, generation: int):
+        """トポロジーに従って移住者を送信先の受信キューへ送る"""
+        destinations = self.topology.get(island.island_id, [])
+        if not destinations:
+            return
+
+        migrants = copy.deepcopy(island.get_migrants(self.migration_rate))
+        for destination in destinations:
+            self.migration_queues.send(generation, island.island_id, destination, migrants)
+
+    def _receive_migrants(self, island: Island, generation: int):
+        """受信キューに届いている移住者を受け入れる"""
+        for packet in self.migration_queues.receive(island.island_id, generation):
+            island.accept_migrants(packet.migrants)
+
+    def get_migration_events(self) -> List[Dict[str, any]]:
+        """
+        移住イベントの記録を取得
+
+        Returns:
+            移住イベントの辞書のリスト
+        """
+        return [event.to_dict() for event in self.migration_queues.events]
+
+    def get_checkpoint(self) -> Dict[str, any]:
+        """
+        再開・事後分析用のチェックポイントを作成（JSONに変換可能な辞書）
+
+        Returns:
+            世代、シード、停止理由、各島の集団を含む辞書
+        """
+        return {
+            'engine': 'island',
+            'generation': self.generation,
+            'seed': self.seed,
+            'stop_reason': self.stop_reason,
+            'global_best': individual_to_dict(self.global_best),
+            'islands': [
+                {
+                    'island_id': island.island_id,
+                    'generation': island.generation,
+                    'population': [individual_to_dict(ind) for ind in island.population]
+                }
+                for island in self.islands
+            ]
+        }
+
+    def get_pareto_front(self) -> List[Individual]:
+        """
+        全ての島を通したパレートフロントを取得
+
+        Returns:
+            非優越な個体のリスト（同一テストコードは1つにまとめる）
+        """
+        candidates = {}
+        for island in self.islands:
+            for ind in island.get_pareto_front():
+                candidates.setdefault(ind.test_code, ind)
+
+        individuals = list(candidates.values())
+        if not individuals:
+            return []
+
+        matrix = build_objective_matrix([ind.metrics for ind in individuals], self.objectives)
+        ranks = fast_non_dominated_sort(matrix)
+        return [individuals[i] for i in np.flatnonzero(ranks == 0)]
 
     def get_statistics(self) -> Dict[str, any]:
         """
@@ -327,16 +996,26 @@ class IslandModel:
         """
         island_stats = []
         for island in self.islands:
-            avg_fitness = sum(ind.fitness for ind in island.population) / len(island.population)
             island_stats.append({
                 'island_id': island.island_id,
                 'best_fitness': island.best_individual.fitness,
-                'avg_fitness': avg_fitness,
+                'avg_fitness': island.avg_fitness,
                 'generation': island.generation
             })
+            if self.behavior_novelty is not None and island.population:
+                island_stats[-1]['avg_novelty'] = float(
+                    island.metrics_matrix[:, island._novelty_column].mean()
+                )
 
-        return {
+        statistics = {
             'generation': self.generation,
+            'seed': self.seed,
+            'stop_reason': self.stop_reason,
             'global_best_fitness': self.global_best.fitness,
-            'island_stats': island_stats
+            'num_rejected': sum(island.num_rejected for island in self.islands),
+            'island_stats': island_stats,
+            'migration': self.migration_queues.get_statistics()
         }
+        if self.behavior_novelty is not None:
+            statistics['behavior_novelty'] = self.behavior_novelty.get_statistics()
+        return statistics
@@ -0,0 +1,502 @@
+"""
+MAP-Elites（品質多様性アーカイブ）の実装
+行動記述子で張られたグリッドの各セルに最良個体を保持し、
+島モデルとは別の方法で多様なテストスイートを探索する
+"""
+
+import ast
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Sequence, Set, Optional
+
+import numpy as np
+
+from ..core.budget import BudgetManager
+from .context_features import TargetStructure
+from .island_model import Individual, individual_to_dict, python_rng, unpack_evaluation
+from .novelty_filter import NoveltyFilter
+from .parallel_evaluator import ParallelEvaluator
+
+
+@dataclass
+class BehaviorDescriptor:
+    """
+    アーカイブの1軸となる行動記述子
+
+    metricにはメトリクス名のほか、行動データから計算する次の値を指定できる:
+    'function_coverage:<関数名>'（その関数の実行文のうちカバーした割合）、
+    'killed_mutants'（検出したシードバグの数）、'killed_mutant:<番号>'（そのシードバグを検出したら1）
+    """
+    metric: str
+    low: float
+    high: float
+    bins: int
+
+
+# デフォルトの行動記述子: カバレッジ、バグ検出率、実行時間
+DEFAULT_DESCRIPTORS: List[BehaviorDescriptor] = [
+    BehaviorDescriptor('coverage', 0.0, 100.0, 20),
+    BehaviorDescriptor('bugs_detected', 0.0, 1.0, 10),
+    BehaviorDescriptor('execution_time', 0.0, 10.0, 10),
+]
+
+# 行動データ（'covered_lines'・'killed_mutants'）から計算する記述子の接頭辞
+_BEHAVIOR_PREFIXES = ('function_coverage:', 'killed_mutant:')
+
+
+def uses_behavior(metric: str) -> bool:
+    """記述子の値の計算に行動データが必要な場合True"""
+    return metric == 'killed_mutants' or metric.startswith(_BEHAVIOR_PREFIXES)
+
+
+def function_statement_lines(source: str) -> Dict[str, Set[int]]:
+    """
+    テスト対象の関数ごとの実行文の行（'function_coverage:<関数名>'の分母）
+
+    Args:
+        source: テスト対象モジュールのソースコード
+
+    Returns:
+        関数名（メソッドは'クラス名.メソッド名'）-> 実行文の行。構文エラーの場合は空
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return {}
+
+    statements = TargetStructure.from_source(source).statement_lines
+    functions = ast.FunctionDef, ast.AsyncFunctionDef
+    ranges = {}
+    for node in tree.body:
+        if isinstance(node, functions):
+            ranges[node.name] = node
+        elif isinstance(node, ast.ClassDef):
+            for member in node.body:
+                if isinstance(member, functions):
+                    ranges[f'{node.name}.{member.name}'] = member
+    return {
+        name: {line for line in statements if node.lineno < line <= node.end_lineno}
+        for name, node in ranges.items()
+    }
+
+
+def descriptor_value(
+    metric: str,
+    metrics: Optional[Dict[str, float]],
+    behavior: Optional[Dict[str, Any]],
+    function_lines: Optional[Dict[str, Set[int]]] = None
+) -> float:
+    """
+    個体の記述子の値を計算
+
+    Args:
+        metric: 記述子のメトリクス名（BehaviorDescriptor.metric）
+        metrics: 個体のメトリクス
+        behavior: 個体の行動データ（ない場合、行動データから計算する値は0.0）
+        function_lines: function_statement_linesの戻り値
+
+    Returns:
+        記述子の値
+    """
+    behavior = behavior or {}
+    if metric.startswith('function_coverage:'):
+        lines = (function_lines or {}).get(metric.split(':', 1)[1])
+        if not lines:
+            return 0.0
+        return len(lines & set(behavior.get('covered_lines') or ())) / len(lines)
+    if metric == 'killed_mutants':
+        return float(len(behavior.get('killed_mutants') or ()))
+    if metric.startswith('killed_mutant:'):
+        return float(int(metric.split(':', 1)[1]) in (behavior.get('killed_mutants') or ()))
+    return (metrics or {}).get(metric, 0.0)
+
+
+class MapElitesArchive:
+    """密なNumPy配列で表現したMAP-Elitesアーカイブ"""
+
+    def __init__(
+        self,
+        descriptors: Optional[Sequence[BehaviorDescriptor]] = None,
+        function_lines: Optional[Dict[str, Set[int]]] = None
+    ):
+        """
+        Args:
+            descriptors: 行動記述子のリスト
+            function_lines: 'function_coverage:<関数名>'の記述子に使う関数ごとの実行文の行
+        """
+        self.descriptors = list(descriptors or DEFAULT_DESCRIPTORS)
+        self.function_lines = function_lines or {}
+        # 行動データが必要な記述子がある場合、fitness_funcは(fitness, metrics, behavior)を返す必要がある
+        self.uses_behavior = any(uses_behavior(d.metric) for d in self.descriptors)
+        self.shape = tuple(d.bins for d in self.descriptors)
+        self.num_cells = int(np.prod(self.shape))
+
+        self._metric_names = [d.metric for d in self.descriptors]
+        self._lows = np.array([d.low for d in self.descriptors], dtype=float)
+        self._spans = np.array([d.high - d.low for d in self.descriptors], dtype=float)
+        self._spans[self._spans <= 0] = 1.0
+        self._bins = np.array(self.shape, dtype=int)
+
+        # セルごとの適応度と個体
+        self.fitness = np.full(self.num_cells, -np.inf)
+        self.elites = np.empty(self.num_cells, dtype=object)
+
+        # 占有セルの一覧（親のサンプリングを全セル走査なしで行うため）
+        self._occupied_cells: List[int] = []
+        self._qd_score = 0.0
+        self.best_cell: int = -1
+
+    def cell_indices(
+        self,
+        metrics_list: Sequence[Dict[str, float]],
+        behaviors: Optional[Sequence[Dict[str, Any]]] = None
+    ) -> np.ndarray:
+        """
+        メトリクスと行動データからセル番号を計算（バッチ版）
+
+        Args:
+            metrics_list: メトリクス辞書のリスト
+            behaviors: 各個体の行動データ（Noneの場合、行動データから計算する値は0.0）
+
+        Returns:
+            各個体のセル番号
+        """
+        behaviors = behaviors or [None] * len(metrics_list)
+        values = np.array(
+            [
+                [
+                    descriptor_value(name, metrics, behavior, self.function_lines)
+                    for name in self._metric_names
+                ]
+                for metrics, behavior in zip(metrics_list, behaviors)
+            ],
+            dtype=float
+        ).reshape(len(metrics_list), len(self._metric_names))
+
+        coords = ((values - self._lows) / self._spans * self._bins).astype(int)
+        coords = np.clip(coords, 0, self._bins - 1)
+        return np.ravel_multi_index(coords.T, self.shape)
+
+    def cell_index(
+        self, metrics: Dict[str, float], behavior: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        メトリクスと行動データからセル番号を計算
+
+        Args:
+            metrics: メトリクス辞書
+            behavior: 行動データ
+
+        Returns:
+            セル番号
+        """
+        return int(self.cell_indices([metrics], [behavior])[0])
+
+    def add(self, individual: Individual, cell: Optional[int] = None) -> bool:
+        """
+        個体をアーカイブに挿入（O(1)）
+
+        Args:
+            individual: 挿入する個体
+            cell: セル番号（Noneの場合はメトリクスから計算）
+
+        Returns:
+            セルが更新された場合True
+        """
+        if cell is None:
+            cell = self.cell_index(individual.metrics, individual.behavior)
+
+        current = self.fitness[cell]
+        if individual.fitness <= current:
+            return False
+
+        if current == -np.inf:
+            self._occupied_cells.append(cell)
+        else:
+            self._qd_score -= current
+
+        self.fitness[cell] = individual.fitness
+        self.elites[cell] = individual
+        self._qd_score += individual.fitness
+
+        if self.best_cell < 0 or individual.fitness > self.fitness[self.best_cell]:
+            self.best_cell = cell
+
+        return True
+
+    def add_many(self, individuals: Sequence[Individual]) -> int:
+        """
+        複数の個体をまとめて挿入
+
+        Args:
+            individuals: 挿入する個体のリスト
+
+        Returns:
+            更新されたセル数
+        """
+        if not individuals:
+            return 0
+
+        cells = self.cell_indices(
+            [ind.metrics for ind in individuals], [ind.behavior for ind in individuals]
+        )
+        return sum(1 for ind, cell in zip(individuals, cells) if self.add(ind, int(cell)))
+
+    def sample(self, count: int, rng: Optional[np.random.Generator] = None) -> List[Individual]:
+        """
+        占有セルから一様に個体をサンプリング
+
+        Args:
+            count: サンプル数
+            rng: 乱数生成器（Noneの場合は非決定的）
+
+        Returns:
+            サンプルされた個体のリスト
+        """
+        if not self._occupied_cells:
+            return []
+        rng = rng or np.random.default_rng()
+        picks = rng.integers(0, len(self._occupied_cells), size=count)
+        return [self.elites[self._occupied_cells[i]] for i in picks]
+
+    def get_elites(self) -> List[Individual]:
+        """占有セルの全エリートを取得"""
+        return [self.elites[cell] for cell in self._occupied_cells]
+
+    def get_best(self) -> Individual:
+        """最良個体を返す"""
+        return self.elites[self.best_cell] if self.best_cell >= 0 else None
+
+    def __len__(self) -> int:
+        return len(self._occupied_cells)
+
+    def get_statistics(self) -> Dict[str, any]:
+        """
+        アーカイブの統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        filled = len(self._occupied_cells)
+        return {
+            'num_cells': self.num_cells,
+            'filled_cells': filled,
+            'coverage': filled / self.num_cells,
+            'qd_score': self._qd_score,
+            'best_fitness': float(self.fitness[self.best_cell]) if self.best_cell >= 0 else 0.0,
+            'avg_fitness': self._qd_score / filled if filled else 0.0
+        }
+
+
+class MapElites:
+    """MAP-Elites進化エンジン（IslandModelと同じインターフェース）"""
+
+    def __init__(
+        self,
+        descriptors: Optional[Sequence[BehaviorDescriptor]] = None,
+        batch_size: int = 20,
+        max_workers: int = 1,
+        seed: Optional[int] = None,
+        function_lines: Optional[Dict[str, Set[int]]] = None
+    ):
+        """
+        Args:
+            descriptors: 行動記述子のリスト
+            batch_size: 1世代あたりに生成・評価する子個体数
+            max_workers: 適応度評価の並列ワーカー数
+            seed: 乱数シード（Noneの場合は自動生成したエントロピーを使い、statisticsの'seed'に記録する）
+            function_lines: 'function_coverage:<関数名>'の記述子に使う関数ごとの実行文の行
+        """
+        self.archive = MapElitesArchive(descriptors, function_lines)
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+
+        # 親のサンプリング用と、子個体ごとに乱数ストリームを派生させる親
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.seed = self.seed_sequence.entropy
+        selection_seed, self._child_seeds = self.seed_sequence.spawn(2)
+        self.rng = np.random.default_rng(selection_seed)
+        self.global_best: Optional[Individual] = None
+        self.generation = 0
+        self.stop_reason: Optional[str] = None
+        # 評価前に除外した子個体の累計
+        self.num_rejected = 0
+
+    def initialize(self, initial_code: str, fitness_func: Callable):
+        """
+        アーカイブを初期個体で初期化
+
+        Args:
+            initial_code: 初期テストコード
+            fitness_func: 適応度評価関数
+        """
+        fitness, metrics, behavior = unpack_evaluation(fitness_func(initial_code))
+        initial_individual = Individual(
+            test_code=initial_code,
+            fitness=fitness,
+            metrics=metrics,
+            generation=0,
+            island_id=0,
+            behavior=behavior
+        )
+        self.archive.add(initial_individual)
+        self.global_best = initial_individual
+
+    def seed_population(self, individuals: List[Individual]):
+        """
+        初期化済みのアーカイブに既知の個体（過去の実行のエリートなど）を加える
+
+        Args:
+            individuals: 加える個体のリスト
+        """
+        self.archive.add_many(individuals)
+        best = self.archive.get_best()
+        if best is not None and best.fitness > self.global_best.fitness:
+            self.global_best = best
+
+    def evolve(
+        self,
+        generations: int,
+        mutate_func: Callable,
+        fitness_func: Callable,
+        target_code: str = "",
+        callback: Optional[Callable] = None,
+        budget: Optional[BudgetManager] = None,
+        novelty_filter: Optional[NoveltyFilter] = None,
+        batch_mutate_func: Optional[Callable] = None,
+        discard_func: Optional[Callable[[str], None]] = None
+    ) -> Individual:
+        """
+        指定世代数だけ進化させる
+
+        Args:
+            generations: 世代数
+            mutate_func: 変異関数（テストコード, テスト対象コード, rng=random.Random -> テストコード）
+            fitness_func: 適応度評価関数
+            target_code: テスト対象コード
+            callback: 各世代後に呼ばれるコールバック関数
+            budget: 実行予算。使い切る前に世代の区切りで停止し、stop_reasonに理由を記録する
+            novelty_filter: 指定した場合、評価前に重複・準重複の子個体を除外する
+            batch_mutate_func: 指定した場合、1世代分の変異をまとめて生成する
+                （親のテストコードのリスト, テスト対象コード, rngs=乱数生成器のリスト -> テストコードのリスト）
+            discard_func: 新規性フィルタで評価しないことにした子個体のコードを受け取る関数
+
+        Returns:
+            最終的な最良個体
+        """
+        self.stop_reason = None
+
+        if novelty_filter is not None:
+            for elite in self.archive.get_elites():
+                novelty_filter.add_to_archive(elite.test_code, elite.fitness)
+
+        with ParallelEvaluator(fitness_func, self.max_workers) as evaluator:
+            for gen in range(generations):
+                batch_size = self.batch_size
+                if budget is not None:
+                    self.stop_reason = budget.should_stop()
+                    if self.stop_reason:
+                        print(
+                            f"\n[Budget] {self.stop_reason} budget exhausted "
+                            f"before generation {gen + 1}"
+                        )
+                        break
+                    batch_size = budget.reserve_evaluations(
+                        max(1, int(batch_size * budget.population_scale()))
+                    )
+                started = time.monotonic()
+
+                # 占有セルから親を選び、変異させてまとめて評価
+                parents = self.archive.sample(batch_size, self.rng)
+                child_seeds = self._child_seeds.spawn(len(parents))
+                child_rngs = [python_rng(seed) for seed in child_seeds]
+                if batch_mutate_func is not None:
+                    mutated_codes = batch_mutate_func(
+                        [parent.test_code for parent in parents], target_code, rngs=child_rngs
+                    ) if parents else []
+                else:
+                    mutated_codes = [
+                        mutate_func(parent.test_code, target_code, rng=child_rng)
+                        for parent, child_rng in zip(parents, child_rngs)
+                    ]
+
+                # 重複・準重複の子個体はpytestを実行する前に除外（設定により親から変異し直す）
+                if novelty_filter is not None and mutated_codes:
+                    screened = novelty_filter.screen(
+                        mutated_codes,
+                        lambda i: mutate_func(parents[i].test_code, target_code, rng=child_rngs[i]),
+                        discard_func
+                    )
+                    mutated_codes = [code for code in screened if code is not None]
+                    self.num_rejected += len(screened) - len(mutated_codes)
+                    if budget is not None:
+                        budget.release_evaluations(len(screened) - len(mutated_codes))
+
+                results = evaluator.evaluate_batch(mutated_codes)
+
+                children = []
+                for code, result in zip(mutated_codes, results):
+                    fitness, metrics, behavior = unpack_evaluation(result)
+                    if novelty_filter is not None:
+                        novelty_filter.add_to_archive(code, fitness)
+                    children.append(Individual(
+                        test_code=code,
+                        fitness=fitness,
+                        metrics=metrics,
+                        generation=gen + 1,
+                        island_id=0,
+                        behavior=behavior
+                    ))
+                self.archive.add_many(children)
+
+                generation_best = (
+                    max(children, key=lambda x: x.fitness) if children else self.global_best
+                )
+                archive_best = self.archive.get_best()
+                if archive_best is not None and archive_best.fitness > self.global_best.fitness:
+                    self.global_best = archive_best
+
+                self.generation = gen + 1
+                if budget is not None:
+                    budget.record_generation(time.monotonic() - started)
+
+                if callback:
+                    callback(gen + 1, [generation_best], self.global_best)
+
+        return self.global_best
+
+    def get_elites(self) -> List[Individual]:
+        """アーカイブ内の全エリートを取得"""
+        return self.archive.get_elites()
+
+    def get_checkpoint(self) -> Dict[str, any]:
+        """
+        再開・事後分析用のチェックポイントを作成（JSONに変換可能な辞書）
+
+        Returns:
+            世代、シード、停止理由、アーカイブの全エリートを含む辞書
+        """
+        return {
+            'engine': 'map_elites',
+            'generation': self.generation,
+            'seed': self.seed,
+            'stop_reason': self.stop_reason,
+            'global_best': individual_to_dict(self.global_best),
+            'elites': [individual_to_dict(ind) for ind in self.archive.get_elites()]
+        }
+
+    def get_statistics(self) -> Dict[str, any]:
+        """
+        現在の統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            'generation': self.generation,
+            'seed': self.seed,
+            'stop_reason': self.stop_reason,
+            'global_best_fitness': self.global_best.fitness if self.global_best else 0.0,
+            'num_rejected': self.num_rejected,
+            'archive': self.archive.get_statistics()
+        }
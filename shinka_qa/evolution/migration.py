@@ -0,0 +1,169 @@
+"""
+島間移住のトポロジーと非同期移住キュー
+どの島からどの島へ移住するかを定義し、移住を島ごとの受信キュー経由で行う
+"""
+
+import queue
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+TOPOLOGIES = ('ring', 'fully_connected', 'random_k_regular', 'hub_and_spoke')
+
+
+def create_topology(
+    name: str,
+    num_islands: int,
+    degree: int = 2,
+    hub: int = 0,
+    rng: Optional[random.Random] = None
+) -> Dict[int, List[int]]:
+    """
+    移住トポロジーを作成
+
+    Args:
+        name: トポロジー名（'ring', 'fully_connected', 'random_k_regular', 'hub_and_spoke'）
+        num_islands: 島の数
+        degree: random_k_regularの次数（各島の送信先・受信元の数）
+        hub: hub_and_spokeのハブとなる島のID
+        rng: random_k_regularで使う乱数生成器
+
+    Returns:
+        送信元の島ID -> 送信先の島IDリスト
+    """
+    islands = list(range(num_islands))
+    if num_islands < 2:
+        return {i: [] for i in islands}
+
+    if name == 'ring':
+        # 島iは島i+1から移住者を受け取る（島jは島j-1へ送る）
+        return {i: [(i - 1) % num_islands] for i in islands}
+
+    if name == 'fully_connected':
+        return {i: [j for j in islands if j != i] for i in islands}
+
+    if name == 'random_k_regular':
+        # 重複しないk個のずらし幅を選んだ巡回グラフ（全ての島の入次数・出次数がk）
+        rng = rng or random.Random()
+        k = max(1, min(degree, num_islands - 1))
+        offsets = rng.sample(range(1, num_islands), k)
+        return {i: [(i + offset) % num_islands for offset in offsets] for i in islands}
+
+    if name == 'hub_and_spoke':
+        return {
+            i: [j for j in islands if j != hub] if i == hub else [hub]
+            for i in islands
+        }
+
+    raise ValueError(f"Unknown migration topology: {name}")
+
+
+@dataclass
+class MigrationEvent:
+    """1回の移住イベントの記録"""
+    generation: int
+    source: int
+    destination: int
+    num_migrants: int
+    best_fitness: float
+    sent_at: float
+    received_at: Optional[float] = None
+    received_generation: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, any]:
+        """辞書に変換"""
+        return {
+            'generation': self.generation,
+            'source': self.source,
+            'destination': self.destination,
+            'num_migrants': self.num_migrants,
+            'best_fitness': self.best_fitness,
+            'latency': (
+                self.received_at - self.sent_at if self.received_at is not None else None
+            ),
+            'received_generation': self.received_generation
+        }
+
+
+@dataclass
+class MigrationPacket:
+    """受信キューに入る移住者のまとまり"""
+    event: MigrationEvent
+    migrants: List = field(default_factory=list)
+
+
+class MigrationQueues:
+    """島ごとの受信キュー（送信側も受信側も相手を待たない）"""
+
+    def __init__(self, num_islands: int):
+        """
+        Args:
+            num_islands: 島の数
+        """
+        self.inboxes = [queue.Queue() for _ in range(num_islands)]
+        self.events: List[MigrationEvent] = []
+
+    def send(self, generation: int, source: int, destination: int, migrants: List):
+        """
+        移住者を送信先の受信キューに入れる
+
+        Args:
+            generation: 送信元の世代
+            source: 送信元の島ID
+            destination: 送信先の島ID
+            migrants: 移住者のリスト
+        """
+        event = MigrationEvent(
+            generation=generation,
+            source=source,
+            destination=destination,
+            num_migrants=len(migrants),
+            best_fitness=max((m.fitness for m in migrants), default=0.0),
+            sent_at=time.time()
+        )
+        # list.appendはスレッドセーフ
+        self.events.append(event)
+        self.inboxes[destination].put_nowait(MigrationPacket(event, migrants))
+
+    def receive(self, island_id: int, generation: int) -> List[MigrationPacket]:
+        """
+        受信キューに届いている移住者を待たずに全て取り出す
+
+        Args:
+            island_id: 受信する島ID
+            generation: 受信側の現在の世代
+
+        Returns:
+            届いていた移住パケットのリスト
+        """
+        packets = []
+        inbox = self.inboxes[island_id]
+        while True:
+            try:
+                packet = inbox.get_nowait()
+            except queue.Empty:
+                break
+            packet.event.received_at = time.time()
+            packet.event.received_generation = generation
+            packets.append(packet)
+        return packets
+
+    def get_statistics(self) -> Dict[str, any]:
+        """
+        移住の統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        received = [e for e in self.events if e.received_at is not None]
+        return {
+            'num_events': len(self.events),
+            'num_received': len(received),
+            'total_migrants': sum(e.num_migrants for e in self.events),
+            'avg_latency': (
+                sum(e.received_at - e.sent_at for e in received) / len(received)
+                if received else 0.0
+            )
+        }
@@ -0,0 +1,135 @@
+"""
+多目的最適化（NSGA-II）の実装
+カバレッジ・バグ検出・実行時間・保守性をパレート支配で比較し、
+重みを変えて再実行することなくトレードオフを探索する
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+# 目的関数の定義: (メトリクス名, 最大化する場合True)
+DEFAULT_OBJECTIVES: List[Tuple[str, bool]] = [
+    ('coverage', True),
+    ('bugs_detected', True),
+    ('execution_time', False),
+    ('maintainability', True),
+]
+
+
+def build_objective_matrix(
+    metrics_list: Sequence[Dict[str, float]],
+    objectives: Sequence[Tuple[str, bool]] = DEFAULT_OBJECTIVES
+) -> np.ndarray:
+    """
+    メトリクス辞書のリストから目的関数行列を構築
+
+    全ての目的は最小化問題に統一する（最大化する目的は符号を反転）
+
+    Args:
+        metrics_list: 各個体のメトリクス辞書
+        objectives: (メトリクス名, 最大化フラグ) のリスト
+
+    Returns:
+        形状 (個体数, 目的数) の行列
+    """
+    matrix = np.array(
+        [[(metrics or {}).get(name, 0.0) for name, _ in objectives] for metrics in metrics_list],
+        dtype=float
+    ).reshape(len(metrics_list), len(objectives))
+
+    signs = np.array([-1.0 if maximize else 1.0 for _, maximize in objectives])
+    return matrix * signs
+
+
+def fast_non_dominated_sort(objectives: np.ndarray) -> np.ndarray:
+    """
+    高速非優越ソート（ベクトル化版）
+
+    Args:
+        objectives: 形状 (個体数, 目的数) の最小化目的行列
+
+    Returns:
+        各個体のランク（0が第1フロント）
+    """
+    n = objectives.shape[0]
+    ranks = np.zeros(n, dtype=int)
+    if n == 0:
+        return ranks
+
+    # dominates[i, j]: 個体iが個体jを支配する
+    le = (objectives[:, None, :] <= objectives[None, :, :]).all(axis=2)
+    lt = (objectives[:, None, :] < objectives[None, :, :]).any(axis=2)
+    dominates = le & lt
+
+    # 各個体を支配している個体数
+    dominated_count = dominates.sum(axis=0)
+    remaining = np.ones(n, dtype=bool)
+
+    rank = 0
+    while remaining.any():
+        front = remaining & (dominated_count == 0)
+        ranks[front] = rank
+        remaining &= ~front
+        # フロントの個体による支配を取り除く
+        dominated_count = dominated_count - dominates[front].sum(axis=0)
+        rank += 1
+
+    return ranks
+
+
+def crowding_distance(objectives: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """
+    混雑距離を計算
+
+    Args:
+        objectives: 形状 (個体数, 目的数) の最小化目的行列
+        ranks: fast_non_dominated_sortで得たランク
+
+    Returns:
+        各個体の混雑距離（フロント端の個体は無限大）
+    """
+    n, m = objectives.shape
+    distances = np.zeros(n)
+
+    for rank in np.unique(ranks):
+        members = np.flatnonzero(ranks == rank)
+        if len(members) <= 2:
+            distances[members] = np.inf
+            continue
+
+        front = objectives[members]
+        order = np.argsort(front, axis=0, kind='stable')
+        sorted_values = np.take_along_axis(front, order, axis=0)
+
+        span = sorted_values[-1] - sorted_values[0]
+        span[span == 0] = 1.0
+
+        contribution = np.zeros((len(members), m))
+        contribution[1:-1] = (sorted_values[2:] - sorted_values[:-2]) / span
+        contribution[0] = np.inf
+        contribution[-1] = np.inf
+
+        # ソート順の寄与を元の並びに戻す
+        unsorted = np.zeros_like(contribution)
+        np.put_along_axis(unsorted, order, contribution, axis=0)
+        distances[members] = unsorted.sum(axis=1)
+
+    return distances
+
+
+def nsga2_order(objectives: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    NSGA-IIの混雑比較順（ランク昇順、混雑距離降順）で個体を並べる
+
+    Args:
+        objectives: 形状 (個体数, 目的数) の最小化目的行列
+
+    Returns:
+        (並び替えインデックス, ランク, 混雑距離)
+    """
+    ranks = fast_non_dominated_sort(objectives)
+    distances = crowding_distance(objectives, ranks)
+    order = np.lexsort((-distances, ranks))
+    return order, ranks, distances
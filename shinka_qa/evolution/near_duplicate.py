@@ -0,0 +1,233 @@
+"""
+MinHash/LSHによるテストコードの準重複検出
+正規化したASTトークンのシングル（連続するk個のトークン）からMinHash署名を作り、
+LSHのバケットで候補を絞り込んでから推定Jaccard類似度で判定する
+"""
+
+import ast
+import builtins
+import zlib
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+# 正規化せずに残す名前（組み込み関数とpytestの基本API）
+_KEPT_NAMES: Set[str] = set(dir(builtins)) | {
+    'pytest', 'raises', 'approx', 'mark', 'fixture', 'parametrize'
+}
+
+_DEFINITION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+_OPERATOR_TYPES = (ast.BinOp, ast.UnaryOp, ast.BoolOp)
+
+# 署名の値が取り得る最大値（空のコードの署名に使う）
+_EMPTY_HASH = np.uint32(0xFFFFFFFF)
+
+
+def ast_tokens(code: str) -> List[str]:
+    """
+    コードを正規化したASTトークン列に変換
+
+    テスト関数名やローカル変数名は'VAR'/'FUNC'に置き換え、importした名前・属性名・
+    定数は残す（名前を付け替えただけのテストは同じトークン列になる）。docstringも定数として残る
+
+    Args:
+        code: テストコード
+
+    Returns:
+        トークン列（構文エラーの場合は空白区切りの単語列）
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return code.split()
+
+    # importした名前（テストファイルのimportはトップレベルにある）
+    imported: Set[str] = set()
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                imported.add((alias.asname or alias.name).split('.')[0])
+    kept = imported | _KEPT_NAMES
+
+    tokens = []
+    append = tokens.append
+    for node in ast.walk(tree):
+        node_type = type(node)
+        append(node_type.__name__)
+
+        if node_type is ast.Name:
+            append(node.id if node.id in kept else 'VAR')
+        elif node_type is ast.Attribute:
+            append(node.attr)
+        elif node_type is ast.Constant:
+            append(repr(node.value)[:32])
+        elif node_type in _DEFINITION_TYPES:
+            append('FUNC')
+        elif node_type in _OPERATOR_TYPES:
+            append(type(node.op).__name__)
+        elif node_type is ast.Compare:
+            tokens.extend(type(op).__name__ for op in node.ops)
+
+    return tokens
+
+
+def shingle_hashes(tokens: List[str], shingle_size: int = 5) -> np.ndarray:
+    """
+    トークン列のシングルを32bitハッシュの集合に変換
+
+    Args:
+        tokens: トークン列
+        shingle_size: シングルのトークン数
+
+    Returns:
+        重複を除いたハッシュ値の配列（uint64）
+    """
+    if len(tokens) < shingle_size:
+        shingles = [' '.join(tokens)] if tokens else []
+    else:
+        shingles = [
+            ' '.join(tokens[i:i + shingle_size])
+            for i in range(len(tokens) - shingle_size + 1)
+        ]
+    # プロセスごとに値が変わるhash()ではなくcrc32を使う（シード付きの実行を再現可能にするため）
+    return np.unique(np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+    ))
+
+
+class NearDuplicateIndex:
+    """MinHash署名とLSHバケットによる準重複インデックス"""
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 5,
+        seed: int = 1
+    ):
+        """
+        Args:
+            threshold: 推定Jaccard類似度がこれ以上なら準重複とみなす
+            num_perm: MinHashの置換（ハッシュ関数）の数
+            bands: LSHのバンド数（num_permを割り切る数）。多いほど低い類似度でも候補に挙がる
+            shingle_size: シングルのトークン数
+            seed: ハッシュ関数の係数を決める乱数シード
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        # multiply-shift方式のハッシュ関数 h(x) = ((a * x + b) mod 2^64) >> 32 の係数（aは奇数）
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[Hashable]]] = [{} for _ in range(bands)]
+
+    def signature(self, code: str) -> np.ndarray:
+        """
+        コードのMinHash署名を計算
+
+        Args:
+            code: テストコード
+
+        Returns:
+            長さnum_permの署名（uint32）
+        """
+        hashes = shingle_hashes(ast_tokens(code), self.shingle_size)
+        if len(hashes) == 0:
+            return np.full(self.num_perm, _EMPTY_HASH, dtype=np.uint32)
+
+        # (置換数 × シングル数) のハッシュ値を一度に計算し、置換ごとの最小値を取る
+        with np.errstate(over='ignore'):
+            values = (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(32)
+        return values.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        """署名をバンドごとのバケットキーに分割"""
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: Hashable, signature: np.ndarray):
+        """
+        署名をインデックスに追加
+
+        Args:
+            key: 登録する項目のキー
+            signature: MinHash署名
+        """
+        if key in self._signatures:
+            self.remove(key)
+
+        self._signatures[key] = signature
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            band.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """
+        インデックスから項目を削除
+
+        Args:
+            key: 削除する項目のキー
+        """
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            members = band.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del band[band_key]
+
+    def query(self, signature: np.ndarray) -> Optional[Tuple[Hashable, float]]:
+        """
+        署名に最も似ている登録済みの準重複を探す
+
+        LSHバケットで候補を絞り込み、候補とだけ署名を比較する（全件走査しない）
+
+        Args:
+            signature: MinHash署名
+
+        Returns:
+            (キー, 推定Jaccard類似度)。閾値以上の項目がない場合はNone
+        """
+        candidates: Set[Hashable] = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(band.get(band_key, ()))
+
+        best = None
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def is_near_duplicate(self, code: str) -> bool:
+        """
+        コードが登録済みの項目の準重複かどうか
+
+        Args:
+            code: テストコード
+
+        Returns:
+            準重複ならTrue
+        """
+        return self.query(self.signature(code)) is not None
+
+    def clear(self):
+        """インデックスを空にする"""
+        self._signatures.clear()
+        for band in self._buckets:
+            band.clear()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
@@ -4,10 +4,35 @@
 """
 
 import hashlib
-from typing import List, Set, Dict, Tuple
+import heapq
+import threading
+from typing import Any, Callable, List, Optional, Set, Dict, Sequence, Tuple
 from difflib import SequenceMatcher
 import re
 
+import numpy as np
+
+from .near_duplicate import NearDuplicateIndex
+
+
+# 類似度計算に使う数値特徴とブール特徴（特徴行列の列の順序）
+NUMERIC_FEATURES: Tuple[str, ...] = (
+    'num_lines', 'num_test_functions', 'num_assertions',
+    'num_imports', 'edge_case_coverage', 'code_length',
+    'unique_identifiers'
+)
+BOOLEAN_FEATURES: Tuple[str, ...] = (
+    'has_parametrize', 'has_fixture', 'has_mock', 'has_raises'
+)
+
+# 新規性のない子個体の扱い（discard: 評価せずに捨てる, remutate: 変異し直して再チェック）
+REJECT_ACTIONS = ('discard', 'remutate')
+
+# ブール特徴をビットにまとめた値のXOR -> 不一致数 の表
+_MISMATCH_COUNT = np.array(
+    [bin(bits).count('1') for bits in range(1 << len(BOOLEAN_FEATURES))], dtype=np.float32
+)
+
 
 class NoveltyFilter:
     """新規性フィルタリングクラス"""
@@ -15,21 +40,105 @@ class NoveltyFilter:
     def __init__(
         self,
         similarity_threshold: float = 0.9,
-        archive_size: int = 100
+        archive_size: int = 100,
+        near_duplicate_threshold: Optional[float] = None,
+        on_reject: str = 'discard',
+        max_retries: int = 2
     ):
         """
         Args:
             similarity_threshold: 類似度の閾値（これ以上似ている場合は除外）
             archive_size: アーカイブの最大サイズ
+            near_duplicate_threshold: 指定した場合、ASTトークンのMinHash署名による推定Jaccard類似度が
+                これ以上のコードを準重複として除外する
+            on_reject: screenで新規性のない子個体をどう扱うか（'discard' または 'remutate'）
+            max_retries: on_reject='remutate'の場合に変異し直す最大回数
         """
+        if on_reject not in REJECT_ACTIONS:
+            raise ValueError(f"Unknown reject action: {on_reject}")
+
         self.similarity_threshold = similarity_threshold
         self.archive_size = archive_size
+        self.on_reject = on_reject
+        self.max_retries = max_retries
+
+        # screenでの累計（チェックした子個体の数、最終的に除いた子個体の数 = 省いた評価回数、変異し直した回数）
+        # 変異し直して通過した子個体は評価されるので、除いた数には含めない
+        self.num_checked = 0
+        self.num_rejected = 0
+        self.num_remutated = 0
+
+        # 準重複インデックス（キーはアーカイブのスロット番号）
+        self.near_duplicates = (
+            NearDuplicateIndex(threshold=near_duplicate_threshold)
+            if near_duplicate_threshold is not None else None
+        )
+        # 直前のis_novel_manyで計算した署名（add_to_archiveで再計算しないため）
+        self._pending_signatures: Dict[str, np.ndarray] = {}
+
+        # 複数の島スレッドから共有される
+        self._lock = threading.RLock()
 
         # コードのハッシュを保存するアーカイブ
         self.code_hashes: Set[str] = set()
 
-        # コードの特徴ベクトルを保存するアーカイブ
-        self.code_archive: List[Dict[str, any]] = []
+        # アーカイブ本体。特徴ごとに全スロットの値が連続するよう (特徴数 × スロット数) で持つ
+        self._num_features = len(NUMERIC_FEATURES) + len(BOOLEAN_FEATURES)
+        self._numeric = np.zeros((len(NUMERIC_FEATURES), archive_size), dtype=np.float32)
+        # 数値特徴の正規化項 max(値, 1) を事前計算しておく
+        self._numeric_norm = np.ones((len(NUMERIC_FEATURES), archive_size), dtype=np.float32)
+        # ブール特徴は1スロット1バイトのビット列にまとめる
+        self._boolean_bits = np.zeros(archive_size, dtype=np.uint8)
+        self._codes: List[str] = []
+        self._hashes: List[str] = []
+        self._features: List[Dict[str, any]] = []
+        self._fitness = np.zeros(archive_size)
+        self._size = 0
+        # _similarity_to_slotsの作業領域（アーカイブ全体の大きさで一度だけ確保する）
+        self._buffers = self._allocate_buffers(archive_size)
+
+        # 全ペアの類似度の合計。追加・削除のたびにそのスロットと他のスロットの類似度だけを足し引きし、
+        # 多様性スコアを全ペアの比較なしで求める
+        self._pair_similarity_total = 0.0
+
+        # 適応度の最小ヒープ (fitness, 追加順, スロット)。削除対象をO(log n)で求める
+        self._eviction_heap: List[Tuple[float, int, int]] = []
+        self._insertions = 0
+
+    @classmethod
+    def from_config(cls, config_data: Dict[str, Any]) -> Optional['NoveltyFilter']:
+        """
+        設定ファイルの'novelty'セクションから作成
+
+        Args:
+            config_data: 設定ファイル全体の辞書
+
+        Returns:
+            NoveltyFilterインスタンス（enabledがfalseの場合はNone）
+        """
+        novelty = config_data.get('novelty', {}) or {}
+        if not novelty.get('enabled', False):
+            return None
+        return cls(
+            similarity_threshold=novelty.get('similarity_threshold', 0.95),
+            archive_size=novelty.get('archive_size', 500),
+            near_duplicate_threshold=novelty.get('near_duplicate_threshold'),
+            on_reject=novelty.get('on_reject', 'discard'),
+            max_retries=novelty.get('max_retries', 2)
+        )
+
+    @property
+    def code_archive(self) -> List[Dict[str, any]]:
+        """アーカイブの内容（コード、ハッシュ、特徴、適応度の辞書のリスト）"""
+        return [
+            {
+                'code': self._codes[i],
+                'hash': self._hashes[i],
+                'features': self._features[i],
+                'fitness': float(self._fitness[i])
+            }
+            for i in range(self._size)
+        ]
 
     def is_novel(self, code: str) -> bool:
         """
@@ -41,20 +150,136 @@ class NoveltyFilter:
         Returns:
             新規性があればTrue
         """
-        # 完全一致チェック（高速）
-        code_hash = self._compute_hash(code)
-        if code_hash in self.code_hashes:
-            return False
+        return self.is_novel_many([code])[0]
 
-        # 特徴ベクトルによる類似度チェック
-        features = self._extract_features(code)
+    def is_novel_many(self, codes: Sequence[str]) -> List[bool]:
+        """
+        複数のコードの新規性をまとめてチェック
 
-        for archived_item in self.code_archive:
-            similarity = self._compute_similarity(features, archived_item['features'])
-            if similarity >= self.similarity_threshold:
-                return False
+        アーカイブ全体との類似度を候補ごとのPythonループなしで計算する。
+        完全一致と準重複はバッチ内の候補同士でも判定し、最初の1つだけを残す
 
-        return True
+        Args:
+            codes: チェックするコードのリスト
+
+        Returns:
+            各コードについて新規性があればTrue
+        """
+        with self._lock:
+            # 完全一致チェック（高速）
+            hashes = [self._compute_hash(code) for code in codes]
+            results = []
+            seen: Set[str] = set()
+            for code_hash in hashes:
+                results.append(code_hash not in self.code_hashes and code_hash not in seen)
+                seen.add(code_hash)
+
+            # 準重複チェック（LSHバケットで候補を絞ってからMinHash署名を比較）
+            if self.near_duplicates is not None:
+                self._screen_near_duplicates(codes, hashes, results)
+
+            candidates = [i for i, novel in enumerate(results) if novel]
+            if not candidates or self._size == 0:
+                return results
+
+            # 特徴ベクトルによる類似度チェック（候補ごとにアーカイブ全体と一度に比較）
+            numeric, bits = self._feature_matrix(
+                [self._extract_features(codes[i]) for i in candidates]
+            )
+            for row, index in enumerate(candidates):
+                similarity = self._similarity_to_slots(
+                    numeric[row], bits[row], 0, self._size, self._buffers
+                )
+                if similarity.max() >= self.similarity_threshold:
+                    results[index] = False
+
+            return results
+
+    def screen(
+        self,
+        codes: Sequence[str],
+        remutate: Optional[Callable[[int], str]] = None,
+        on_discard: Optional[Callable[[str], None]] = None
+    ) -> List[Optional[str]]:
+        """
+        評価前の子個体から新規性のないものを除く
+
+        on_reject='remutate'でremutateが指定されている場合は、除いた子個体を変異し直して
+        max_retries回まで再チェックする（通過済みの子個体とも重複しないように一緒にチェックする）
+
+        Args:
+            codes: 子個体のコードのリスト
+            remutate: 子個体の番号を受け取り、変異し直したコードを返す関数
+            on_discard: 評価しないことにした子個体（除外した子個体と、変異し直す前の子個体）の
+                コードを受け取る関数（戦略のバンディットの報酬待ちの取り消しなど）
+
+        Returns:
+            各子個体のコード（除いた子個体はNone）
+        """
+        codes = list(codes)
+        if not codes:
+            return []
+
+        novel = self.is_novel_many(codes)
+        remutated = 0
+
+        retries = self.max_retries if remutate is not None and self.on_reject == 'remutate' else 0
+        for _ in range(retries):
+            retry = [i for i, keep in enumerate(novel) if not keep]
+            if not retry:
+                break
+            for i in retry:
+                if on_discard is not None:
+                    on_discard(codes[i])
+                codes[i] = remutate(i)
+            remutated += len(retry)
+
+            accepted = [i for i, keep in enumerate(novel) if keep]
+            flags = self.is_novel_many([codes[i] for i in accepted + retry])[len(accepted):]
+            for i, keep in zip(retry, flags):
+                novel[i] = keep
+
+        # 変異し直す間（LLM呼び出しを含む）はロックを持たず、集計だけをロックして更新する。
+        # チェック数と除外数は元の子個体ごとに1回だけ数える（再チェックの回数は数えない）
+        with self._lock:
+            self.num_checked += len(codes)
+            self.num_rejected += novel.count(False)
+            self.num_remutated += remutated
+
+        if on_discard is not None:
+            for code, keep in zip(codes, novel):
+                if not keep:
+                    on_discard(code)
+        return [code if keep else None for code, keep in zip(codes, novel)]
+
+    def _screen_near_duplicates(self, codes: Sequence[str], hashes: List[str], results: List[bool]):
+        """
+        準重複の候補をresultsから除外（バッチ内で先に残った候補とも比較する）
+
+        Args:
+            codes: チェックするコードのリスト
+            hashes: 各コードのハッシュ
+            results: 新規性の判定結果（この関数内で更新する）
+        """
+        self._pending_signatures = {}
+        batch_keys = []
+
+        for index, code in enumerate(codes):
+            if not results[index]:
+                continue
+
+            signature = self.near_duplicates.signature(code)
+            self._pending_signatures[hashes[index]] = signature
+            if self.near_duplicates.query(signature) is not None:
+                results[index] = False
+                continue
+
+            key = ('batch', index)
+            self.near_duplicates.add(key, signature)
+            batch_keys.append(key)
+
+        for key in batch_keys:
+            self.near_duplicates.remove(key)
 
     def add_to_archive(self, code: str, fitness: float = 0.0):
         """
@@ -64,23 +289,54 @@ class NoveltyFilter:
             code: 追加するコード
             fitness: コードの適応度
         """
-        code_hash = self._compute_hash(code)
-        self.code_hashes.add(code_hash)
+        with self._lock:
+            self._add_to_archive(code, fitness)
 
+    def _add_to_archive(self, code: str, fitness: float):
+        """add_to_archiveの本体（ロック取得済みで呼ぶ）"""
+        code_hash = self._compute_hash(code)
         features = self._extract_features(code)
-        self.code_archive.append({
-            'code': code,
-            'hash': code_hash,
-            'features': features,
-            'fitness': fitness
-        })
-
-        # アーカイブサイズを制限
-        if len(self.code_archive) > self.archive_size:
-            # 適応度の低いものから削除
-            self.code_archive.sort(key=lambda x: x['fitness'], reverse=True)
-            removed = self.code_archive.pop()
-            self.code_hashes.discard(removed['hash'])
+
+        if self._size < self.archive_size:
+            slot = self._size
+            self._size += 1
+            self._codes.append(code)
+            self._hashes.append(code_hash)
+            self._features.append(features)
+        else:
+            # アーカイブサイズを制限: 適応度の低いものから削除（同点なら新しいものを残さない）
+            if not self._eviction_heap or fitness <= self._eviction_heap[0][0]:
+                return
+            _, _, slot = heapq.heappop(self._eviction_heap)
+            self._pair_similarity_total -= self._slot_similarity_sum(slot)
+            self.code_hashes.discard(self._hashes[slot])
+            self._codes[slot] = code
+            self._hashes[slot] = code_hash
+            self._features[slot] = features
+
+        self.code_hashes.add(code_hash)
+        numeric, bits = self._feature_matrix([features])
+        self._numeric[:, slot] = numeric[0]
+        self._numeric_norm[:, slot] = np.maximum(numeric[0], 1.0)
+        self._boolean_bits[slot] = bits[0]
+        self._fitness[slot] = fitness
+        self._pair_similarity_total += self._slot_similarity_sum(slot)
+
+        heapq.heappush(self._eviction_heap, (fitness, self._insertions, slot))
+        self._insertions += 1
+
+        if self.near_duplicates is not None:
+            signature = self._pending_signatures.pop(code_hash, None)
+            if signature is None:
+                signature = self.near_duplicates.signature(code)
+            self.near_duplicates.add(slot, signature)
+
+    def _slot_similarity_sum(self, slot: int) -> float:
+        """スロットと他の全スロットとの類似度の合計（O(n)、ベクトル演算1回）"""
+        similarity = self._similarity_to_slots(
+            self._numeric[:, slot], self._boolean_bits[slot], 0, self._size, self._buffers
+        )
+        return float(similarity.sum(dtype=np.float64)) - float(similarity[slot])
 
     def _compute_hash(self, code: str) -> str:
         """
@@ -143,6 +399,71 @@ class NoveltyFilter:
 
         return features
 
+    def _feature_matrix(
+        self, features_list: Sequence[Dict[str, any]]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        特徴の辞書のリストを数値特徴行列とブール特徴のビット列に変換
+
+        Returns:
+            (数値特徴行列 (件数 × 数値特徴数), ブール特徴のビット列 (件数))
+        """
+        numeric = np.array(
+            [[features.get(name, 0) for name in NUMERIC_FEATURES] for features in features_list],
+            dtype=np.float32
+        ).reshape(len(features_list), len(NUMERIC_FEATURES))
+        bits = np.array(
+            [
+                sum(1 << i for i, name in enumerate(BOOLEAN_FEATURES) if features.get(name, False))
+                for features in features_list
+            ],
+            dtype=np.uint8
+        )
+        return numeric, bits
+
+    def _allocate_buffers(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """_similarity_to_slotsで使い回す作業領域を確保"""
+        shape = (len(NUMERIC_FEATURES), size)
+        return np.empty(shape, dtype=np.float32), np.empty(shape, dtype=np.float32)
+
+    def _similarity_to_slots(
+        self,
+        numeric: np.ndarray,
+        bits: int,
+        start: int,
+        stop: int,
+        buffers: Tuple[np.ndarray, np.ndarray]
+    ) -> np.ndarray:
+        """
+        1つの特徴ベクトルとアーカイブのスロット[start, stop)との類似度を計算
+        （_compute_similarityのベクトル化版）
+
+        Args:
+            numeric: 数値特徴ベクトル
+            bits: ブール特徴のビット列
+            start: 比較するスロットの開始位置
+            stop: 比較するスロットの終了位置
+            buffers: _allocate_buffersで確保した作業領域（stop - start以上の大きさ）
+
+        Returns:
+            各スロットとの類似度
+        """
+        count = stop - start
+        diff, norm = buffers[0][:, :count], buffers[1][:, :count]
+        column = numeric[:, None]
+
+        # 数値特徴: |a - b| / max(a, b, 1) の和
+        np.subtract(self._numeric[:, start:stop], column, out=diff)
+        np.abs(diff, out=diff)
+        np.maximum(self._numeric_norm[:, start:stop], column, out=norm)
+        np.divide(diff, norm, out=diff)
+        dissimilarity = diff.sum(axis=0)
+
+        # ブール特徴: 不一致数
+        dissimilarity += _MISMATCH_COUNT[self._boolean_bits[start:stop] ^ bits]
+
+        return 1.0 - dissimilarity / self._num_features
+
     def _compute_similarity(
         self,
         features1: Dict[str, any],
@@ -158,16 +479,10 @@ class NoveltyFilter:
         Returns:
             類似度（0.0〜1.0）
         """
-        # 数値特徴の正規化類似度
-        numeric_features = [
-            'num_lines', 'num_test_functions', 'num_assertions',
-            'num_imports', 'edge_case_coverage', 'code_length',
-            'unique_identifiers'
-        ]
-
         similarities = []
 
-        for feature in numeric_features:
+        # 数値特徴の正規化類似度
+        for feature in NUMERIC_FEATURES:
             val1 = features1.get(feature, 0)
             val2 = features2.get(feature, 0)
 
@@ -177,11 +492,7 @@ class NoveltyFilter:
             similarities.append(similarity)
 
         # ブール特徴の一致度
-        boolean_features = [
-            'has_parametrize', 'has_fixture', 'has_mock', 'has_raises'
-        ]
-
-        for feature in boolean_features:
+        for feature in BOOLEAN_FEATURES:
             val1 = features1.get(feature, False)
             val2 = features2.get(feature, False)
             similarities.append(1.0 if val1 == val2 else 0.0)
@@ -193,26 +504,17 @@ class NoveltyFilter:
         """
         現在のアーカイブの多様性スコアを計算
 
+        全ペアの類似度の合計は追加・削除時に差分更新しているため、O(1)で求まる
+        （結果は全ペアを比較し直した値と浮動小数点の丸め誤差の範囲で一致する）
+
         Returns:
             多様性スコア（0.0〜1.0、高いほど多様）
         """
-        if len(self.code_archive) < 2:
+        if self._size < 2:
             return 1.0
 
-        # ペアワイズ類似度の平均を計算
-        total_similarity = 0.0
-        num_pairs = 0
-
-        for i in range(len(self.code_archive)):
-            for j in range(i + 1, len(self.code_archive)):
-                similarity = self._compute_similarity(
-                    self.code_archive[i]['features'],
-                    self.code_archive[j]['features']
-                )
-                total_similarity += similarity
-                num_pairs += 1
-
-        avg_similarity = total_similarity / num_pairs if num_pairs > 0 else 0.0
+        num_pairs = self._size * (self._size - 1) // 2
+        avg_similarity = self._pair_similarity_total / num_pairs
 
         # 多様性は平均類似度の逆
         diversity = 1.0 - avg_similarity
@@ -226,15 +528,27 @@ class NoveltyFilter:
             統計情報の辞書
         """
         return {
-            'archive_size': len(self.code_archive),
+            'archive_size': self._size,
+            'near_duplicate_index_size': (
+                len(self.near_duplicates) if self.near_duplicates is not None else 0
+            ),
             'diversity_score': self.get_diversity_score(),
-            'avg_fitness': (
-                sum(item['fitness'] for item in self.code_archive) / len(self.code_archive)
-                if self.code_archive else 0.0
-            )
+            'num_checked': self.num_checked,
+            'num_rejected': self.num_rejected,
+            'num_remutated': self.num_remutated,
+            'rejection_rate': self.num_rejected / self.num_checked if self.num_checked else 0.0,
+            'avg_fitness': float(self._fitness[:self._size].mean()) if self._size else 0.0
         }
 
     def clear(self):
         """アーカイブをクリア"""
         self.code_hashes.clear()
-        self.code_archive.clear()
+        self._codes.clear()
+        self._hashes.clear()
+        self._features.clear()
+        self._eviction_heap.clear()
+        self._pending_signatures.clear()
+        self._size = 0
+        self._pair_similarity_total = 0.0
+        if self.near_duplicates is not None:
+            self.near_duplicates.clear()
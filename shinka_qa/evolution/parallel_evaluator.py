@@ -0,0 +1,76 @@
+"""
+並列適応度評価
+1世代分の子個体をまとめて評価し、pytest実行をワーカー間で並列化する
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+class ParallelEvaluator:
+    """fitness_funcをバッチ単位で並列実行する評価器"""
+
+    def __init__(self, fitness_func: Callable, max_workers: int = 1):
+        """
+        Args:
+            fitness_func: 適応度評価関数（code -> (fitness, metrics)）
+            max_workers: 並列ワーカー数（1の場合は逐次評価）
+        """
+        self.fitness_func = fitness_func
+        self.max_workers = max(1, max_workers)
+        self.num_evaluations = 0
+        self._lock = threading.Lock()
+
+        # 評価はpytestのサブプロセス待ちが大半なのでスレッドで十分
+        self._executor = (
+            ThreadPoolExecutor(max_workers=self.max_workers)
+            if self.max_workers > 1 else None
+        )
+
+    def evaluate(self, code: str) -> Tuple[float, Dict[str, float]]:
+        """
+        単一のコードを評価
+
+        Args:
+            code: テストコード
+
+        Returns:
+            (fitness, metrics)
+        """
+        self._count(1)
+        return self.fitness_func(code)
+
+    def evaluate_batch(self, codes: Sequence[str]) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        複数のコードをまとめて評価
+
+        Args:
+            codes: テストコードのリスト
+
+        Returns:
+            入力と同じ順序の (fitness, metrics) のリスト
+        """
+        self._count(len(codes))
+
+        if self._executor is None or len(codes) <= 1:
+            return [self.fitness_func(code) for code in codes]
+
+        return list(self._executor.map(self.fitness_func, codes))
+
+    def _count(self, num: int):
+        """評価回数を加算（複数の島スレッドから呼ばれる）"""
+        with self._lock:
+            self.num_evaluations += num
+
+    def shutdown(self):
+        """ワーカーを停止"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
@@ -0,0 +1,327 @@
+"""
+実行をまたいで残すエリートのアーカイブ
+テスト対象モジュールごとに、エリートのテストスイート・適応度・行動データをSQLiteに保存し、
+次回の実行の初期集団と新規性フィルタの元にする
+"""
+
+import ast
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .island_model import Individual, unpack_evaluation
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS elites (
+    target TEXT NOT NULL,
+    code_hash TEXT NOT NULL,
+    test_code TEXT NOT NULL,
+    fitness REAL NOT NULL,
+    metrics TEXT NOT NULL,
+    behavior TEXT NOT NULL,
+    module_hash TEXT NOT NULL,
+    functions TEXT NOT NULL,
+    run_id TEXT,
+    created_at REAL NOT NULL,
+    score REAL NOT NULL,
+    PRIMARY KEY (target, code_hash)
+);
+CREATE INDEX IF NOT EXISTS elites_by_score ON elites (target, score DESC);
+"""
+
+# 行動データのうち集合として持つ項目（JSONではリストで保存する）
+_SET_BEHAVIORS = ('covered_lines', 'killed_mutants')
+
+# archive_scoreのデフォルトの重み（QualityEvaluatorのデフォルトと同じ）
+_DEFAULT_WEIGHTS = {'coverage': 0.4, 'bug_detection': 0.35, 'maintainability': 0.1}
+
+
+def archive_score(metrics: Dict[str, float], weights: Optional[Dict[str, float]] = None) -> float:
+    """
+    実行をまたいで比べられるスコア（アーカイブの順位付けに使う）
+
+    適応度のcoverage_improvementとefficiencyは実行ごとのベースラインに対する値なので、
+    代わりにカバレッジそのものを使い、efficiencyは含めない
+
+    Args:
+        metrics: 評価メトリクス（'coverage'はパーセント）
+        weights: 指標の重み（QualityEvaluator.weights。Noneの場合はデフォルト）
+
+    Returns:
+        スコア
+    """
+    weights = weights or _DEFAULT_WEIGHTS
+    metrics = metrics or {}
+    return (
+        weights.get('coverage', 0.0) * metrics.get('coverage', 0.0) / 100.0 +
+        weights.get('bug_detection', 0.0) * metrics.get('bugs_detected', 0.0) +
+        weights.get('maintainability', 0.0) * metrics.get('maintainability', 0.0)
+    )
+
+
+def function_hashes(source: str) -> Dict[str, Tuple[str, int, int]]:
+    """
+    モジュールのトップレベルの関数・クラスごとのハッシュと行範囲
+
+    ハッシュはASTのダンプから計算する（コメントや空白だけの変更では変わらない）。
+    関数のdef行はインポート時に必ず実行されるので、関数の開始行は本体の最初の行とする
+
+    Args:
+        source: モジュールのソースコード
+
+    Returns:
+        名前 -> (ハッシュ, 開始行, 終了行)。構文エラーの場合はモジュール全体を'<module>'とする
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        digest = hashlib.sha256(source.encode()).hexdigest()
+        return {'<module>': (digest, 1, source.count('\n') + 1)}
+
+    hashes = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            digest = hashlib.sha256(ast.dump(node).encode()).hexdigest()
+            start = node.lineno if isinstance(node, ast.ClassDef) else node.body[0].lineno
+            hashes[node.name] = (digest, start, node.end_lineno)
+    return hashes
+
+
+def _encode_behavior(behavior: Dict[str, Any]) -> str:
+    """行動データをJSONに変換（集合はソートしたリストにする）"""
+    return json.dumps(
+        behavior or {},
+        default=lambda value: sorted(value) if isinstance(value, (set, frozenset)) else str(value)
+    )
+
+
+def _decode_behavior(text: str) -> Dict[str, Any]:
+    """_encode_behaviorの逆変換"""
+    behavior = json.loads(text)
+    for key in _SET_BEHAVIORS:
+        if key in behavior:
+            behavior[key] = set(behavior[key])
+    if 'test_coverage' in behavior:
+        behavior['test_coverage'] = {
+            name: set(lines) for name, lines in behavior['test_coverage'].items()
+        }
+    return behavior
+
+
+class PersistentArchive:
+    """テスト対象モジュールごとのエリートをSQLiteに保存するアーカイブ"""
+
+    def __init__(
+        self,
+        path: Path,
+        target_module_path: Path,
+        max_entries: int = 200,
+        weights: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            path: SQLiteファイルのパス（親ディレクトリがなければ作成する）
+            target_module_path: テスト対象モジュールのパス
+            max_entries: テスト対象ごとに残すエリートの最大数（archive_scoreの高いものを残す）
+            weights: archive_scoreの重み（QualityEvaluator.weights）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.target_module = Path(target_module_path)
+        self.target = str(self.target_module.resolve())
+        self.max_entries = max_entries
+        self.weights = weights
+
+        source = self.target_module.read_text(encoding='utf-8')
+        self.module_hash = hashlib.sha256(source.encode()).hexdigest()
+        self.functions = function_hashes(source)
+
+        self._connection = sqlite3.connect(str(self.path))
+        self._connection.executescript(_SCHEMA)
+
+    def _covered_functions(self, behavior: Dict[str, Any]) -> Dict[str, str]:
+        """
+        テストスイートがカバーした関数のハッシュ（行動データがない場合は全ての関数）
+
+        Args:
+            behavior: 行動データ（'covered_lines'）
+
+        Returns:
+            関数名 -> ハッシュ
+        """
+        covered = (behavior or {}).get('covered_lines')
+        return {
+            name: digest
+            for name, (digest, start, end) in self.functions.items()
+            if not covered or any(start <= line <= end for line in covered)
+        }
+
+    def invalidate(self) -> int:
+        """
+        カバーしていた関数のいずれかが変更・削除されたエリートを削除
+
+        Returns:
+            削除したエリートの数
+        """
+        rows = self._connection.execute(
+            'SELECT code_hash, functions FROM elites WHERE target = ?', (self.target,)
+        ).fetchall()
+
+        stale = []
+        for code_hash, functions in rows:
+            recorded = json.loads(functions)
+            if any(
+                self.functions.get(name, (None,))[0] != digest
+                for name, digest in recorded.items()
+            ):
+                stale.append((self.target, code_hash))
+
+        with self._connection:
+            self._connection.executemany(
+                'DELETE FROM elites WHERE target = ? AND code_hash = ?', stale
+            )
+        return len(stale)
+
+    def save(self, individuals: Sequence[Individual], run_id: Optional[str] = None) -> int:
+        """
+        個体をエリートとして保存（同じコードはスコアが高いか、モジュールが変わった場合に上書き）
+
+        適応度は実行ごとのベースラインに対する値なので、順位付けと上書きの判定にはarchive_scoreを使う
+
+        Args:
+            individuals: 保存する個体
+            run_id: 保存元の実行ID
+
+        Returns:
+            保存後のテスト対象のエリート数
+        """
+        now = time.time()
+        rows = {}
+        for individual in individuals:
+            code_hash = hashlib.sha256(individual.test_code.encode()).hexdigest()
+            score = archive_score(individual.metrics, self.weights)
+            if code_hash in rows and rows[code_hash][-1] >= score:
+                continue
+            rows[code_hash] = (
+                self.target, code_hash, individual.test_code, individual.fitness,
+                json.dumps(individual.metrics or {}), _encode_behavior(individual.behavior),
+                self.module_hash, json.dumps(self._covered_functions(individual.behavior)),
+                run_id, now, score
+            )
+
+        with self._connection:
+            self._connection.executemany(
+                """
+                INSERT INTO elites (
+                    target, code_hash, test_code, fitness, metrics, behavior,
+                    module_hash, functions, run_id, created_at, score
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (target, code_hash) DO UPDATE SET
+                    fitness = excluded.fitness, metrics = excluded.metrics,
+                    behavior = excluded.behavior, module_hash = excluded.module_hash,
+                    functions = excluded.functions,
+                    run_id = COALESCE(excluded.run_id, elites.run_id),
+                    created_at = excluded.created_at, score = excluded.score
+                WHERE excluded.score > elites.score OR excluded.module_hash != elites.module_hash
+                """,
+                list(rows.values())
+            )
+            # スコアの低いものから削除してテスト対象ごとの上限に収める
+            self._connection.execute(
+                """
+                DELETE FROM elites WHERE target = ? AND code_hash NOT IN (
+                    SELECT code_hash FROM elites WHERE target = ? ORDER BY score DESC LIMIT ?
+                )
+                """,
+                (self.target, self.target, self.max_entries)
+            )
+        return len(self)
+
+    def load_elites(self, limit: int, fitness_func: Optional[Callable] = None) -> List[Individual]:
+        """
+        スコアの高い順にエリートを読み込む
+
+        Args:
+            limit: 読み込む最大数
+            fitness_func: 指定した場合、全てのエリートを評価し直す（保存された適応度は保存時の実行の
+                ベースラインに対する値なので、この実行の個体と比べられるようにする）。モジュールが変わってから
+                保存されていないエリートはアーカイブも更新する（Noneの場合は保存された値のまま）
+
+        Returns:
+            エリートの個体のリスト
+        """
+        if limit <= 0:
+            return []
+
+        rows = self._connection.execute(
+            """
+            SELECT test_code, fitness, metrics, behavior, module_hash FROM elites
+            WHERE target = ? ORDER BY score DESC LIMIT ?
+            """,
+            (self.target, limit)
+        ).fetchall()
+
+        elites = []
+        refreshed = []
+        for test_code, fitness, metrics, behavior, module_hash in rows:
+            individual = Individual(
+                test_code=test_code,
+                fitness=fitness,
+                metrics=json.loads(metrics),
+                generation=0,
+                island_id=0,
+                behavior=_decode_behavior(behavior)
+            )
+            if fitness_func is not None:
+                individual.fitness, individual.metrics, individual.behavior = unpack_evaluation(
+                    fitness_func(test_code)
+                )
+                if module_hash != self.module_hash:
+                    refreshed.append(individual)
+            elites.append(individual)
+
+        if refreshed:
+            self.save(refreshed)
+        if fitness_func is not None:
+            elites.sort(key=lambda ind: ind.fitness, reverse=True)
+        return elites
+
+    def __len__(self) -> int:
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM elites WHERE target = ?', (self.target,)
+        ).fetchone()[0]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        count, best, best_score, runs = self._connection.execute(
+            'SELECT COUNT(*), MAX(fitness), MAX(score), COUNT(DISTINCT run_id) '
+            'FROM elites WHERE target = ?',
+            (self.target,)
+        ).fetchone()
+        return {
+            'path': str(self.path),
+            'entries': count,
+            'best_fitness': best,
+            'best_score': best_score,
+            'runs': runs,
+            'module_hash': self.module_hash
+        }
+
+    def close(self):
+        """データベースを閉じる"""
+        self._connection.close()
+
+    def __enter__(self) -> 'PersistentArchive':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
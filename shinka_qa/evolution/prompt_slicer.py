@@ -0,0 +1,371 @@
+"""
+対象に合わせたプロンプトの切り出し
+テスト対象モジュールのASTから、変異戦略とカバレッジの穴に関係する関数・メソッドだけを抜き出し、
+未カバーの行の範囲を添える。プロンプトのトークン数の上限を超える場合はテストスイートの文脈を削る
+"""
+
+import ast
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from ..llm.llm_client import estimate_tokens
+from .context_features import TargetStructure
+
+
+# 変異戦略ごとに、関係が深い関数の特徴（_unit_featuresのキー）
+# ここにない戦略（improve_assertions, add_fixturesなど）はカバレッジの穴とテストからの参照だけで選ぶ
+STRATEGY_FEATURES: Dict[str, Tuple[str, ...]] = {
+    'add_edge_cases': ('comparisons', 'branches', 'none_checks'),
+    'add_boundary_value_tests': ('comparisons',),
+    'add_equivalence_partitioning': ('branches', 'comparisons'),
+    'add_null_safety_tests': ('none_checks',),
+    'add_state_transition_tests': ('state_changes',),
+    'add_combination_tests': ('parameters', 'branches'),
+    'add_property_based_tests': ('parameters', 'loops'),
+    'add_performance_edge_cases': ('loops',),
+    'add_negative_tests': ('raises',),
+    'add_security_tests': ('raises', 'none_checks'),
+    'add_parametrize': ('parameters',),
+}
+
+
+@dataclass
+class _Unit:
+    """切り出しの単位（トップレベルの関数、またはクラスのメソッド）"""
+    name: str
+    start: int                       # デコレータを含む先頭行（1始まり）
+    end: int
+    owner: Optional[str] = None      # メソッドの場合はクラス名
+    always: bool = False             # 選択に関係なく含める（__init__）
+    statement_lines: Set[int] = field(default_factory=set)
+    features: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _ParsedTarget:
+    """テスト対象モジュールの解析結果（ソースごとにキャッシュする）"""
+    lines: List[str]
+    header: List[Tuple[int, int]]            # 常に含める範囲（import文・定数・メソッドのないクラスなど）
+    class_headers: Dict[str, Tuple[int, int]]  # クラス名 -> クラスの行から最初のメソッドの前まで
+    units: List[_Unit]
+    structure: TargetStructure
+
+
+def _span(node: ast.AST) -> Tuple[int, int]:
+    """デコレータを含むノードの行範囲"""
+    decorators = getattr(node, 'decorator_list', [])
+    start = min([node.lineno] + [decorator.lineno for decorator in decorators])
+    return start, node.end_lineno
+
+
+def _unit_features(node: ast.AST) -> Dict[str, int]:
+    """関数の特徴（比較・分岐・Noneチェック・ループ・例外・引数・状態の変更の数）"""
+    features = dict.fromkeys((
+        'comparisons', 'branches', 'none_checks', 'loops', 'raises', 'parameters', 'state_changes'
+    ), 0)
+    args = node.args
+    features['parameters'] = len([
+        arg for arg in args.posonlyargs + args.args + args.kwonlyargs
+        if arg.arg not in ('self', 'cls')
+    ])
+    for child in ast.walk(node):
+        if isinstance(child, ast.Compare):
+            features['comparisons'] += 1
+            if any(isinstance(c, ast.Constant) and c.value is None for c in child.comparators):
+                features['none_checks'] += 1
+        elif (isinstance(child, ast.Call) and isinstance(child.func, ast.Name)
+              and child.func.id == 'isinstance'):
+            features['none_checks'] += 1
+        elif isinstance(child, (ast.If, ast.IfExp)):
+            features['branches'] += 1
+        elif isinstance(child, (ast.For, ast.AsyncFor, ast.While, ast.comprehension)):
+            features['loops'] += 1
+        elif isinstance(child, (ast.Raise, ast.ExceptHandler)):
+            features['raises'] += 1
+        elif isinstance(child, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+            targets = child.targets if isinstance(child, ast.Assign) else [child.target]
+            features['state_changes'] += sum(
+                1 for target in targets
+                if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name)
+                and target.value.id == 'self'
+            )
+    return features
+
+
+def _make_unit(
+    node: ast.AST,
+    structure: TargetStructure,
+    owner: Optional[str] = None
+) -> _Unit:
+    start, end = _span(node)
+    return _Unit(
+        name=node.name,
+        start=start,
+        end=end,
+        owner=owner,
+        statement_lines={line for line in structure.statement_lines if start <= line <= end},
+        features=_unit_features(node)
+    )
+
+
+def format_line_ranges(lines: Iterable[int]) -> str:
+    """
+    行番号を範囲の文字列にまとめる
+
+    Args:
+        lines: 行番号
+
+    Returns:
+        "12-15, 20, 31-33" の形式の文字列（空の場合は空文字列）
+    """
+    ranges = []
+    for line in sorted(set(lines)):
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ', '.join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+def _referenced_names(test_code: str) -> Set[str]:
+    """テストコードで参照している名前（関数呼び出し・属性アクセス）"""
+    try:
+        tree = ast.parse(test_code)
+    except SyntaxError:
+        return set()
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            names.add(node.id)
+        elif isinstance(node, ast.Attribute):
+            names.add(node.attr)
+    return names
+
+
+class TargetPromptBuilder:
+    """
+    変異プロンプトに載せるテスト対象とテストスイートの文脈を作る
+
+    テスト対象は、トップレベルの関数とクラスのメソッドを単位に、(未カバーの文の数 + 戦略に関係する特徴の数 +
+    テストから参照されているか) の大きい順に max_units 個を選び、元のファイルの行番号と未カバーの行の範囲を添えて
+    元の順に並べる。import文・定数・メソッドのないクラス（Enum・例外など）とクラスの定義行・__init__は常に含める
+    """
+
+    def __init__(self, max_units: int = 6, max_prompt_tokens: Optional[int] = None):
+        """
+        Args:
+            max_units: 切り出す関数・メソッドの最大数
+            max_prompt_tokens: プロンプト全体のトークン数の上限（Noneで無制限）。
+                超える場合はテストスイートのテスト関数を削って収める
+        """
+        self.max_units = max_units
+        self.max_prompt_tokens = max_prompt_tokens
+        self._parsed: Dict[str, Optional[_ParsedTarget]] = {}
+        self.num_sliced = 0
+        self.num_trimmed = 0
+
+    def _parse(self, source: str) -> Optional[_ParsedTarget]:
+        """テスト対象を解析（構文エラーの場合はNone）"""
+        if source in self._parsed:
+            return self._parsed[source]
+        try:
+            tree = ast.parse(source)
+        except SyntaxError:
+            self._parsed[source] = None
+            return None
+
+        structure = TargetStructure.from_source(source)
+        parsed = _ParsedTarget(source.splitlines(), [], {}, [], structure)
+        # モジュールのdocstringは載せない
+        body = tree.body[1:] if ast.get_docstring(tree) is not None else tree.body
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                parsed.units.append(_make_unit(node, structure))
+            elif isinstance(node, ast.ClassDef):
+                methods = [
+                    child for child in node.body
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef))
+                    and child.name != '__init__'
+                ]
+                if not methods:
+                    parsed.header.append(_span(node))
+                    continue
+                start, _ = _span(node)
+                first_method = min(_span(child)[0] for child in node.body
+                                   if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)))
+                parsed.class_headers[node.name] = (start, first_method - 1)
+                for child in node.body:
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        unit = _make_unit(child, structure, owner=node.name)
+                        # __init__は状態を決めるので常に含める
+                        unit.always = child.name == '__init__'
+                        parsed.units.append(unit)
+            else:
+                parsed.header.append(_span(node))
+        self._parsed[source] = parsed
+        return parsed
+
+    def _score(
+        self,
+        unit: _Unit,
+        strategies: Sequence[str],
+        uncovered: Set[int],
+        referenced: Set[str]
+    ) -> float:
+        """単位の関係の強さ"""
+        score = len(unit.statement_lines & uncovered)
+        features = {
+            feature for strategy in strategies for feature in STRATEGY_FEATURES.get(strategy, ())
+        }
+        score += sum(unit.features.get(feature, 0) for feature in features)
+        if unit.name in referenced:
+            score += 1
+        return score
+
+    def slice_target(
+        self,
+        source: str,
+        strategies: Sequence[str],
+        covered_lines: Optional[Iterable[int]] = None,
+        test_code: str = ''
+    ) -> str:
+        """
+        変異戦略に関係する部分だけを切り出したテスト対象のコード
+
+        Args:
+            source: テスト対象モジュールのソースコード
+            strategies: 変異戦略（複数の変異版を1回で生成する場合は全ての戦略）
+            covered_lines: 親のテストスイートでカバーされた行（Noneの場合はカバレッジを使わない）
+            test_code: 親のテストコード（参照している関数を優先する）
+
+        Returns:
+            切り出したコード（解析できない場合はsourceをそのまま返す）
+        """
+        parsed = self._parse(source)
+        if parsed is None or not parsed.units:
+            return source
+
+        uncovered = set()
+        if covered_lines is not None:
+            uncovered = parsed.structure.statement_lines - set(covered_lines)
+        referenced = _referenced_names(test_code)
+        ranked = sorted(
+            [unit for unit in parsed.units if not unit.always],
+            key=lambda unit: self._score(unit, strategies, uncovered, referenced),
+            reverse=True
+        )
+        selected = [unit for unit in parsed.units if unit.always] + ranked[:self.max_units]
+        if len(selected) < len(parsed.units):
+            self.num_sliced += 1
+
+        # 元の順に、ヘッダー・クラスの定義行・選んだメソッドを (先頭行, 末尾行, テキスト) で並べる
+        pieces: List[Tuple[float, int, str]] = []
+        for start, end in parsed.header:
+            pieces.append((start, end, '\n'.join(parsed.lines[start - 1:end])))
+        selected_names = {(unit.owner, unit.name) for unit in selected}
+        for owner, (start, end) in parsed.class_headers.items():
+            pieces.append((start, end, '\n'.join(parsed.lines[start - 1:end]).rstrip()))
+            omitted = [unit.name for unit in parsed.units
+                       if unit.owner == owner and (owner, unit.name) not in selected_names]
+            if omitted:
+                header = parsed.lines[start - 1]
+                indent = ' ' * (len(header) - len(header.lstrip()) + 4)
+                pieces.append((end + 0.5, end, f"{indent}# （省略したメソッド: {', '.join(omitted)}）"))
+        for unit in selected:
+            first_line = parsed.lines[unit.start - 1]
+            indent = first_line[:len(first_line) - len(first_line.lstrip())]
+            note = f"{indent}# L{unit.start}-{unit.end}"
+            missing = unit.statement_lines & uncovered
+            if missing:
+                note += f" 未カバーの行: {format_line_ranges(missing)}"
+            body = '\n'.join(parsed.lines[unit.start - 1:unit.end])
+            pieces.append((unit.start, unit.end, note + '\n' + body))
+
+        pieces.sort(key=lambda piece: piece[0])
+        text = pieces[0][2]
+        for (_, previous_end, _), (start, _, piece) in zip(pieces, pieces[1:]):
+            # 元のファイルで続いている行（連続するimport文など）は空行を挟まない
+            text += ('\n' if start == previous_end + 1 else '\n\n') + piece
+        omitted_functions = [unit.name for unit in parsed.units
+                             if unit.owner is None and (None, unit.name) not in selected_names]
+        if omitted_functions:
+            text += f"\n\n# （省略した関数: {', '.join(omitted_functions)}）"
+        return (
+            f"# 関係する関数・メソッドだけを抜粋（全{len(parsed.units)}個中{len(selected)}個、"
+            f"行番号は元のファイルの行）\n{text}"
+        )
+
+    def fit_test_code(self, test_code: str, max_tokens: int) -> Tuple[str, List[str]]:
+        """
+        テストコードをmax_tokensに収まるように削る
+
+        import文・フィクスチャ・ヘルパーは残し、テスト関数（とTestクラス）を先頭から収まるだけ残す
+        （最初のテストは例として必ず残す）。削ったテストの名前はコメントで示す
+
+        Args:
+            test_code: テストコード
+            max_tokens: テストコードに使えるトークン数
+
+        Returns:
+            (削ったテストコード, 削ったテストの名前のリスト)
+        """
+        if estimate_tokens(test_code) <= max_tokens:
+            return test_code, []
+        try:
+            tree = ast.parse(test_code)
+        except SyntaxError:
+            return test_code, []
+
+        lines = test_code.splitlines()
+        tests = [
+            node for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+            and node.name.lower().startswith('test')
+        ]
+        if len(tests) <= 1:
+            return test_code, []
+
+        spans = {id(node): _span(node) for node in tests}
+        used = estimate_tokens(test_code) - sum(
+            estimate_tokens('\n'.join(lines[start - 1:end])) for start, end in spans.values()
+        )
+        kept, omitted = set(), []
+        for node in tests:
+            start, end = spans[id(node)]
+            cost = estimate_tokens('\n'.join(lines[start - 1:end]))
+            if not kept or used + cost <= max_tokens:
+                kept.add(id(node))
+                used += cost
+            else:
+                omitted.append(node.name)
+        if not omitted:
+            return test_code, []
+
+        drop = set()
+        for node in tests:
+            if id(node) not in kept:
+                start, end = spans[id(node)]
+                drop.update(range(start, end + 1))
+        trimmed = '\n'.join(
+            line for number, line in enumerate(lines, 1) if number not in drop
+        ).rstrip()
+        self.num_trimmed += 1
+        note = (
+            f"# （プロンプトの長さの上限のため省略したテスト: {', '.join(omitted)}。"
+            "出力に含めなくても残ります）"
+        )
+        return f"{trimmed}\n\n\n{note}\n", omitted
+
+    def get_statistics(self) -> Dict[str, int]:
+        """
+        統計情報を取得
+
+        Returns:
+            切り出した回数とテストスイートを削った回数
+        """
+        return {
+            'max_units': self.max_units,
+            'max_prompt_tokens': self.max_prompt_tokens,
+            'num_sliced': self.num_sliced,
+            'num_trimmed': self.num_trimmed
+        }
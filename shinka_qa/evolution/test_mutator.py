@@ -3,10 +3,28 @@
 LLMを使用してテストコードを進化させる
 """
 
+import ast
+import random
 import re
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
 from pathlib import Path
 
+from ..llm.async_pool import LLMRequest
+from ..llm.llm_client import CacheMissError, estimate_tokens
+from .crossover import merge_suite_fragment
+
+
+# テストファイル全体の出力を求める指示（output_mode='functions'のプロンプトから除く）
+_INCLUDE_ALL = re.compile(r'(各変異版には)?(既存の|元の)テストコード(とimport文)?[をも]すべて含め(てください。?|、)')
+_EMPTY_INSTRUCTION = re.compile(r'\s*(重要:|\d+\.|-)?\s*')
+
+# mutate_manyの応答で、変異版の先頭に置く区切り行
+_VARIANT_MARKER = re.compile(
+    r'^[ \t]*#\s*=+\s*variant\s+(\d+)\s*=+[ \t]*$', re.MULTILINE | re.IGNORECASE
+)
+# コードブロックのフェンスだけの行
+_FENCE_LINE = re.compile(r'^\s*```\w*\s*$')
+
 
 class TestMutator:
     """テストコード変異クラス"""
@@ -700,14 +718,88 @@ def test_add_parametrized(a, b, expected):
 """
     }
 
-    def __init__(self, llm_client=None, force_template=True):
+    # LLM呼び出しのシステムプロンプト
+    LLM_SYSTEM_PROMPT = (
+        "あなたは優秀なソフトウェアテストエンジニアです。"
+        "高品質なpytestテストコードを生成してください。"
+    )
+
+    # 1回の呼び出しで複数の変異版を生成するプロンプト（テストコードと対象は1回だけ送る）
+    VARIANTS_PROMPT = """
+以下のテストコードから、{num_variants}個の独立した変異版を作成してください。
+各変異版は、割り当てられた指示に従って現在のテストコードを変更した、完全なテストファイルです。
+変異版どうしは互いに異なる変更にしてください。
+
+{variant_instructions}
+
+出力形式:
+- 全ての変異版を1つの```pythonコードブロックにまとめてください
+- 各変異版の先頭に `# === variant 番号 ===` の行を置いてください（番号は1から{num_variants}まで）
+- 各変異版には既存のテストコードとimport文をすべて含めてください
+- コードブロックの外に説明を書かないでください
+
+現在のテストコード:
+```python
+{current_test_code}
+```
+
+テスト対象の関数:
+```python
+{target_function}
+```
+"""
+
+    # 応答1つ（変異版1つ）あたりの最大トークン数
+    MAX_TOKENS = 2000
+
+    # LLMの出力形式（'full': テストファイル全体, 'functions': 追加・変更する関数だけを返させて親に統合する）
+    OUTPUT_MODES = ('full', 'functions')
+
+    # output_mode='functions'のプロンプトの末尾に付ける出力形式の指示
+    FUNCTIONS_OUTPUT_PROMPT = """
+
+出力形式（上の「元のテストコードをすべて含める」指示より優先）:
+- 追加または変更するテスト関数・フィクスチャ・ヘルパーと、それらに必要なimport文だけを返してください
+- 変更しない既存の関数は含めないでください（現在のテストコードに自動で統合されます）
+- 既存の関数を変更する場合は、同じ名前で関数全体を返してください
+- 新しいテスト関数には既存と重複しない名前を付けてください
+"""
+
+    def __init__(
+        self,
+        llm_client=None,
+        force_template=True,
+        budget=None,
+        llm_pool=None,
+        max_variants_per_request=1,
+        output_mode='full',
+        prompt_builder=None
+    ):
         """
         Args:
             llm_client: LLMクライアント（shinka_qa.llm.LLMClientインスタンス）
             force_template: Trueの場合、LLMを使わずテンプレートベースを強制
+            budget: 実行予算（shinka_qa.core.BudgetManager）。LLM予算が尽きたらテンプレートベースに戻る
+            llm_pool: 非同期LLMリクエストプール（shinka_qa.llm.AsyncLLMPool）。
+                指定した場合、mutate_batchのLLM呼び出しを並行に送る
+            max_variants_per_request: mutate_batchで同じ親の子個体を1回のLLM呼び出しにまとめる最大数（1でまとめない）
+            output_mode: LLMの出力形式（'full' または 'functions'）。'functions'の場合は追加・変更する関数だけを
+                返させ、親のテストコードのASTに統合する（出力トークンを減らし、既存のテストの欠落を防ぐ）
+            prompt_builder: テスト対象の切り出しとプロンプト長の上限（shinka_qa.evolution.TargetPromptBuilder）。
+                指定した場合、target_codeをソースコードとして戦略と未カバーの行に関係する関数だけをプロンプトに載せる
         """
+        if output_mode not in self.OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {output_mode}")
+
         self.llm = llm_client
         self.force_template = force_template
+        self.budget = budget
+        self.llm_pool = llm_pool
+        self.max_variants_per_request = max(1, max_variants_per_request)
+        self.output_mode = output_mode
+        self.prompt_builder = prompt_builder
+        # プロンプトでテスト関数を省略したテストコードのハッシュ（応答を親に統合する）
+        self._trimmed_suites = set()
 
     def set_use_llm(self, use_llm: bool):
         """
@@ -723,7 +815,8 @@ def test_add_parametrized(a, b, expected):
         test_code: str,
         target_code: str,
         strategy: str,
-        context: Dict = None
+        context: Optional[Dict] = None,
+        rng: Optional[random.Random] = None
     ) -> str:
         """
         テストコードを変異させる
@@ -733,13 +826,14 @@ def test_add_parametrized(a, b, expected):
             target_code: テスト対象のコード
             strategy: 変異戦略（'add_edge_cases', 'improve_assertions'等）
             context: 追加コンテキスト（カバレッジ情報等）
+            rng: テンプレート選択に使う乱数生成器（Noneの場合はrandomモジュール）
 
         Returns:
             変異後のテストコード
         """
-        # force_templateがTrueの場合、直接テンプレートベースを使用
-        if self.force_template:
-            return self._simple_mutation(test_code, strategy)
+        # force_templateがTrueの場合、またはLLM予算が残っていない場合は直接テンプレートベースを使用
+        if not self._llm_allowed():
+            return self._simple_mutation(test_code, strategy, rng)
 
         # プロンプトを構築
         prompt = self._build_prompt(test_code, target_code, strategy, context)
@@ -749,14 +843,342 @@ def test_add_parametrized(a, b, expected):
         if self.llm:
             mutated_code = self._call_llm(prompt)
 
-        # LLMが失敗した場合、またはLLMが利用できない場合はフォールバックを使用
-        if mutated_code is None:
-            mutated_code = self._simple_mutation(test_code, strategy)
+        return self._finish_mutation(mutated_code, test_code, strategy, rng)
+
+    def mutate_many(
+        self,
+        test_code: str,
+        target_code: str,
+        strategies: Sequence[str],
+        n: Optional[int] = None,
+        context: Optional[Dict] = None,
+        rng: Optional[random.Random] = None
+    ) -> List[str]:
+        """
+        1つのテストコードから複数の変異版を、1回のLLM呼び出しで生成する
+
+        変異版iの戦略は strategies[i % len(strategies)]。全ての戦略が同じで、LLMがgenerate_nに対応する場合は
+        プロバイダーのnパラメータで独立した応答を生成し、それ以外は1つの応答に全ての変異版を書かせて分割する。
+        変異版ごとに構文を確認し、取り出せなかった変異版はテンプレートベースにフォールバックする
+
+        Args:
+            test_code: 現在のテストコード
+            target_code: テスト対象のコード
+            strategies: 変異戦略のリスト
+            n: 変異版の数（Noneの場合はlen(strategies)）
+            context: 追加コンテキスト（カバレッジ情報等）
+            rng: テンプレート選択に使う乱数生成器
+
+        Returns:
+            n個の変異後のテストコード
+        """
+        assigned = self._assign_strategies(strategies, n)
+        if not self._llm_allowed() or not self.llm:
+            return [self._simple_mutation(test_code, strategy, rng) for strategy in assigned]
+        if len(assigned) == 1:
+            return [self.mutate(test_code, target_code, assigned[0], context, rng)]
+
+        if self._uses_n(assigned):
+            prompt = self._build_prompt(test_code, target_code, assigned[0], context)
+            variants = self._n_variants(self._call_llm_n(prompt, len(assigned)), len(assigned))
+        else:
+            response = self._call_llm(
+                self._build_variants_prompt(test_code, target_code, assigned, context),
+                max_tokens=self.MAX_TOKENS * len(assigned)
+            )
+            variants = self._split_variants(response, len(assigned))
+        variants = [
+            self._apply_output(test_code, code) if code is not None else None
+            for code in variants
+        ]
+
+        return [
+            code if code is not None else self._simple_mutation(test_code, strategy, rng)
+            for code, strategy in zip(variants, assigned)
+        ]
+
+    def mutate_batch(
+        self,
+        jobs: Sequence[Tuple[str, str]],
+        target_code: str,
+        rngs: Optional[Sequence[Optional[random.Random]]] = None,
+        on_call: Optional[Callable[[int, Dict], None]] = None,
+        contexts: Optional[Sequence[Optional[Dict]]] = None
+    ) -> List[str]:
+        """
+        複数のテストコードをまとめて変異させる
+
+        LLMモードでは、同じテストコードのjobをmax_variants_per_request個ずつ1回の呼び出しにまとめる
+        （mutate_manyと同じ形式）。llm_poolがある場合は全てのLLM呼び出しを並行に送る。
+        LLM予算はリクエストごとに確認し、使い切った後のjobはテンプレートベースで変異させる
+
+        Args:
+            jobs: (テストコード, 変異戦略) のリスト
+            target_code: テスト対象のコード
+            rngs: jobsごとの乱数生成器（テンプレートベースのフォールバックに使う）
+            on_call: LLMが応答したjobごとに (jobの番号, 呼び出しの記録) で呼ばれる関数。
+                まとめた呼び出しのコスト・トークン数・レイテンシは、まとめたjobの数で等分する
+            contexts: jobsごとの追加コンテキスト（まとめたjobでは先頭のjobのものを使う）
+
+        Returns:
+            jobsの順に変異後のテストコード
+        """
+        rngs = list(rngs) if rngs is not None else [None] * len(jobs)
+        contexts = list(contexts) if contexts is not None else [None] * len(jobs)
+        if not self.llm or not self._llm_allowed():
+            return [
+                self.mutate(test_code, target_code, strategy, context, rng)
+                for (test_code, strategy), rng, context in zip(jobs, rngs, contexts)
+            ]
+
+        groups = self._group_jobs(jobs)
+        if self.llm_pool is None:
+            mutated_codes = [None] * len(jobs)
+            for group in groups:
+                test_code = jobs[group[0]][0]
+                codes = self.mutate_many(
+                    test_code, target_code, [jobs[i][1] for i in group],
+                    context=contexts[group[0]], rng=rngs[group[0]]
+                )
+                for i, code in zip(group, codes):
+                    mutated_codes[i] = code
+            return mutated_codes
+
+        requests = []
+        for group in groups:
+            test_code = jobs[group[0]][0]
+            strategies = [jobs[i][1] for i in group]
+            context = contexts[group[0]]
+            if len(group) == 1 or self._uses_n(strategies):
+                # 戦略が1つなら、mutate_manyと同じくプロバイダーのnパラメータで独立した応答を生成する
+                requests.append(LLMRequest(
+                    self.LLM_SYSTEM_PROMPT,
+                    self._build_prompt(test_code, target_code, strategies[0], context),
+                    n=len(group)
+                ))
+            else:
+                requests.append(LLMRequest(
+                    self.LLM_SYSTEM_PROMPT,
+                    self._build_variants_prompt(test_code, target_code, strategies, context),
+                    max_tokens=self.MAX_TOKENS * len(group)
+                ))
+        # 並行に送る間に予算を使い切ることがあるため、リクエストごとに送る直前に確認する
+        # （送らなかったリクエストのjobはテンプレートベースにフォールバックする）
+        responses = self.llm_pool.generate_many_with_calls(requests, should_send=self._llm_allowed)
+
+        mutated_codes = [None] * len(jobs)
+        for group, request, (response, call) in zip(groups, requests, responses):
+            if response is not None and call is not None and on_call is not None:
+                share = dict(call)
+                for key in ('input_tokens', 'output_tokens', 'cost'):
+                    share[key] = call.get(key, 0) / len(group)
+                if 'latency' in call:
+                    share['latency'] = call['latency'] / len(group)
+                for i in group:
+                    on_call(i, dict(share))
+
+            if len(group) == 1:
+                test_code, strategy = jobs[group[0]]
+                mutated_codes[group[0]] = self._finish_mutation(
+                    response, test_code, strategy, rngs[group[0]]
+                )
+                continue
+            if request.n > 1:
+                variants = self._n_variants(response, len(group))
+            else:
+                variants = self._split_variants(response, len(group))
+            for i, code in zip(group, variants):
+                test_code, strategy = jobs[i]
+                if code is not None:
+                    code = self._apply_output(test_code, code)
+                if code is None:
+                    code = self._simple_mutation(test_code, strategy, rngs[i])
+                mutated_codes[i] = code
+        return mutated_codes
+
+    def _uses_n(self, strategies: Sequence[str]) -> bool:
+        """全ての変異版が同じ戦略で、LLMがgenerate_nに対応する場合True"""
+        return len(set(strategies)) == 1 and self.llm.supports_n
+
+    def _n_variants(self, responses: Optional[List[str]], n: int) -> List[Optional[str]]:
+        """generate_nの応答を変異版ごとのコードにする（足りない・取り出せない変異版はNone）"""
+        variants = [self._variant_code(text) if text else None for text in (responses or [])[:n]]
+        return variants + [None] * (n - len(variants))
+
+    def _assign_strategies(self, strategies: Sequence[str], n: Optional[int]) -> List[str]:
+        """変異版ごとの戦略（strategiesを順に繰り返す）"""
+        strategies = list(strategies) or ['add_edge_cases']
+        count = n if n is not None else len(strategies)
+        return [strategies[i % len(strategies)] for i in range(count)]
+
+    def _group_jobs(self, jobs: Sequence[Tuple[str, str]]) -> List[List[int]]:
+        """同じテストコードのjobの番号を、max_variants_per_request個ずつのグループにまとめる"""
+        by_code: Dict[str, List[int]] = {}
+        for i, (test_code, _) in enumerate(jobs):
+            by_code.setdefault(test_code, []).append(i)
+        return [
+            indices[start:start + self.max_variants_per_request]
+            for indices in by_code.values()
+            for start in range(0, len(indices), self.max_variants_per_request)
+        ]
+
+    def _build_variants_prompt(
+        self,
+        test_code: str,
+        target_code: str,
+        strategies: Sequence[str],
+        context: Optional[Dict]
+    ) -> str:
+        """複数の変異版を1つの応答に書かせるプロンプトを構築（同じ戦略の指示は1回だけ書く）"""
+        numbers: Dict[str, List[str]] = {}
+        for i, strategy in enumerate(strategies, 1):
+            numbers.setdefault(strategy, []).append(str(i))
+
+        sections = []
+        for strategy, variant_numbers in numbers.items():
+            base_prompt = self.MUTATION_PROMPTS.get(
+                strategy, self.MUTATION_PROMPTS['add_edge_cases']
+            )
+            # 戦略ごとのプロンプトから、テストコードと対象の前の指示部分だけを使う
+            instruction = self._output_template(base_prompt).split('現在のテストコード:')[0].strip()
+            sections.append(f"## 変異版 {', '.join(variant_numbers)}（{strategy}）\n{instruction}")
+
+        prompt = self._render_prompt(
+            lambda tests, target: self._output_template(self.VARIANTS_PROMPT).format(
+                num_variants=len(strategies),
+                variant_instructions='\n\n'.join(sections),
+                current_test_code=tests,
+                target_function=target
+            ),
+            test_code, target_code, strategies, context
+        )
+        if context and 'uncovered_lines' in context:
+            prompt += f"\n\n未カバーの行: {context['uncovered_lines']}"
+        if context and 'previous_failures' in context:
+            prompt += f"\n\n以前の失敗: {context['previous_failures']}"
+        return self._apply_output_mode(prompt)
+
+    def _split_variants(self, response: Optional[str], n: int) -> List[Optional[str]]:
+        """
+        VARIANTS_PROMPTの応答を変異版ごとのコードに分ける
+
+        Returns:
+            n個のコード（見つからない・構文エラーの変異版はNone）
+        """
+        variants: List[Optional[str]] = [None] * n
+        if response is None:
+            return variants
+        # 区切り行はコードブロックの中でも外でも受け付ける
+        parts = _VARIANT_MARKER.split(response)
+        for number, part in zip(parts[1::2], parts[2::2]):
+            index = int(number) - 1
+            if 0 <= index < n and variants[index] is None:
+                variants[index] = self._variant_code(part)
+        return variants
+
+    def _variant_code(self, text: str) -> Optional[str]:
+        """応答の断片からコードを取り出し、構文を確認する（空または構文エラーの場合はNone）"""
+        if re.search(r'```\w*\n.*?```', text, re.DOTALL):
+            code = self._extract_code_block(text)
         else:
-            # コードブロックを抽出（```python ... ``` を除去）
-            mutated_code = self._extract_code_block(mutated_code)
+            # 1つのコードブロックを区切り行で分けた断片には、開き・閉じフェンスの片方だけが残る
+            lines = [line for line in text.splitlines() if not _FENCE_LINE.match(line)]
+            code = '\n'.join(lines).strip()
+        if not code:
+            return None
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            return None
+        return code
+
+    def _llm_allowed(self) -> bool:
+        """LLMモードで、LLM予算が残っている場合True"""
+        return not self.force_template and (self.budget is None or self.budget.allow_llm())
+
+    def _finish_mutation(
+        self,
+        response: Optional[str],
+        test_code: str,
+        strategy: str,
+        rng: Optional[random.Random]
+    ) -> str:
+        """LLMの応答からコードを取り出す（応答がない場合はテンプレートベースにフォールバック）"""
+        # LLMが失敗した場合、またはLLMが利用できない場合はフォールバックを使用
+        if response is None:
+            return self._simple_mutation(test_code, strategy, rng)
+        # コードブロックを抽出（```python ... ``` を除去）
+        merged = self._apply_output(test_code, self._extract_code_block(response))
+        return merged if merged is not None else self._simple_mutation(test_code, strategy, rng)
 
-        return mutated_code
+    def _apply_output(self, test_code: str, code: str) -> Optional[str]:
+        """
+        応答のコードから子のテストコードを作る
+
+        'functions'モード、またはプロンプトでテスト関数を省略した場合は、応答の関数を親のテストコードに統合する
+        （統合できない・変更がない場合はNone）
+        """
+        if self.output_mode == 'full' and hash(test_code) not in self._trimmed_suites:
+            return code
+        return merge_suite_fragment(test_code, code)
+
+    def _render_prompt(
+        self,
+        render: Callable[[str, str], str],
+        test_code: str,
+        target_code: str,
+        strategies: Sequence[str],
+        context: Optional[Dict]
+    ) -> str:
+        """
+        テスト対象を切り出し、プロンプトがmax_prompt_tokensに収まるようにテストコードを削って組み立てる
+
+        Args:
+            render: (テストコード, テスト対象) からプロンプトを作る関数
+            test_code: 現在のテストコード
+            target_code: テスト対象のコード
+            strategies: 変異戦略
+            context: 追加コンテキスト（'covered_lines'があれば未カバーの行を添える）
+        """
+        builder = self.prompt_builder
+        if builder is None:
+            return render(test_code, target_code)
+
+        covered_lines = (context or {}).get('covered_lines')
+        target_code = builder.slice_target(target_code, strategies, covered_lines, test_code)
+        prompt = render(test_code, target_code)
+        if builder.max_prompt_tokens is None:
+            return prompt
+        # 指示・テスト対象・システムプロンプトのトークン数を差し引いた残りにテストコードを収める
+        overhead = estimate_tokens(self.LLM_SYSTEM_PROMPT + prompt) - estimate_tokens(test_code)
+        fitted, omitted = builder.fit_test_code(test_code, builder.max_prompt_tokens - overhead)
+        if not omitted:
+            return prompt
+        self._trimmed_suites.add(hash(test_code))
+        return render(fitted, target_code)
+
+    def _output_template(self, template: str) -> str:
+        """
+        'functions'モードでは、テンプレートの指示（「現在のテストコード:」より前）から
+        テストファイル全体を求める指示を除く。埋め込むテストコードとテスト対象の部分は変更しない
+        """
+        if self.output_mode == 'full':
+            return template
+        instructions, marker, rest = template.partition('現在のテストコード:')
+        lines = []
+        for line in instructions.split('\n'):
+            stripped = _INCLUDE_ALL.sub('', line)
+            # 指示を除いて空になった行（「重要: 」や番号だけの行）は落とす
+            if stripped != line and _EMPTY_INSTRUCTION.fullmatch(stripped):
+                continue
+            lines.append(stripped)
+        return '\n'.join(lines) + marker + rest
+
+    def _apply_output_mode(self, prompt: str) -> str:
+        """'functions'モードでは、プロンプトの末尾に出力形式の指示を付ける"""
+        if self.output_mode == 'full':
+            return prompt
+        return prompt + self.FUNCTIONS_OUTPUT_PROMPT
 
     def _build_prompt(
         self,
@@ -766,14 +1188,16 @@ def test_add_parametrized(a, b, expected):
         context: Optional[Dict]
     ) -> str:
         """変異プロンプトを構築"""
-        base_prompt = self.MUTATION_PROMPTS.get(
+        base_prompt = self._output_template(self.MUTATION_PROMPTS.get(
             strategy,
             self.MUTATION_PROMPTS['add_edge_cases']
-        )
+        ))
 
-        prompt = base_prompt.format(
-            current_test_code=test_code,
-            target_function=target_code
+        prompt = self._render_prompt(
+            lambda tests, target: base_prompt.format(
+                current_test_code=tests, target_function=target
+            ),
+            test_code, target_code, [strategy], context
         )
 
         # コンテキスト情報を追加
@@ -783,30 +1207,44 @@ def test_add_parametrized(a, b, expected):
         if context and 'previous_failures' in context:
             prompt += f"\n\n以前の失敗: {context['previous_failures']}"
 
-        return prompt
+        return self._apply_output_mode(prompt)
 
-    def _call_llm(self, prompt: str) -> str:
+    def _call_llm(self, prompt: str, max_tokens: int = MAX_TOKENS) -> str:
         """LLMを呼び出してコードを生成"""
         # EVOLVE-BLOCK-START: llm_call
         try:
-            system_prompt = (
-                "あなたは優秀なソフトウェアテストエンジニアです。"
-                "高品質なpytestテストコードを生成してください。"
-            )
-
             response = self.llm.generate(
-                system_prompt=system_prompt,
+                system_prompt=self.LLM_SYSTEM_PROMPT,
                 user_prompt=prompt,
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=max_tokens
             )
 
             return response
+        except CacheMissError:
+            # replayモードのキャッシュミスはフォールバックせずに実行を止める
+            raise
         except Exception as e:
             print(f"LLM call error: {e}")
             return None  # エラー時はNoneを返してフォールバックを使う
         # EVOLVE-BLOCK-END
 
+    def _call_llm_n(self, prompt: str, n: int) -> Optional[List[str]]:
+        """LLMのnパラメータで、同じプロンプトから独立した応答をn個生成"""
+        try:
+            return self.llm.generate_n(
+                system_prompt=self.LLM_SYSTEM_PROMPT,
+                user_prompt=prompt,
+                n=n,
+                temperature=0.7,
+                max_tokens=self.MAX_TOKENS
+            )
+        except CacheMissError:
+            raise
+        except Exception as e:
+            print(f"LLM call error: {e}")
+            return None
+
     def _extract_code_block(self, llm_response: str) -> str:
         """LLMの応答からコードブロックを抽出"""
         # ```python ... ``` を検出
@@ -826,7 +1264,12 @@ def test_add_parametrized(a, b, expected):
         # コードブロックがない場合はそのまま返す
         return llm_response.strip()
 
-    def _simple_mutation(self, test_code: str, strategy: str) -> str:
+    def _simple_mutation(
+        self,
+        test_code: str,
+        strategy: str,
+        rng: Optional[random.Random] = None
+    ) -> str:
         """LLMなしで簡単な変異を適用（フォールバック）
 
         包括的なテストテンプレートシステム:
@@ -842,7 +1285,7 @@ def test_add_parametrized(a, b, expected):
         - セキュリティテスト
         - リグレッションテスト
         """
-        import random
+        rng = rng or random
 
         if strategy == 'add_edge_cases':
             # テスト対象の関数を抽出
@@ -850,7 +1293,7 @@ def test_add_parametrized(a, b, expected):
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
                 # ランダムに関数を選択してエッジケーステストを追加
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 # 関数ごとに特化したテストを生成
                 if func == 'divide':
@@ -1010,7 +1453,7 @@ def test_{func_name}_parametrized(a, b, expected):
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 boundary_tests = f"""
 import sys
@@ -1044,7 +1487,7 @@ def test_{func}_boundary_min_max():
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 equivalence_tests = f"""
 
@@ -1080,7 +1523,7 @@ def test_{func}_invalid_type_equivalence(value):
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 null_safety_tests = f"""
 import math
@@ -1174,7 +1617,7 @@ def test_pairwise_combinations(param1, param2, expected_type):
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 # 数学関数の性質をテスト
                 property_tests = f"""
@@ -1228,7 +1671,7 @@ def test_{func}_associative():
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 performance_tests = f"""
 import time
@@ -1272,7 +1715,7 @@ def test_{func}_repeated_calls():
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 negative_tests = f"""
 
@@ -1374,7 +1817,7 @@ def test_sequential_operations():
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 security_tests = f"""
 
@@ -1423,7 +1866,7 @@ def test_{func}_special_characters():
             imports = re.findall(r'from \w+ import (.+)', test_code)
             if imports:
                 functions = [f.strip() for f in imports[0].split(',')]
-                func = random.choice(functions)
+                func = rng.choice(functions)
 
                 regression_tests = f"""
 
@@ -1,20 +1,35 @@
 """
 UCB1（Upper Confidence Bound）バンディットアルゴリズムの実装
 複数のLLMモデルや変異戦略から最適なものを選択する
+報酬が時間とともに変わる場合のために、スライディングウィンドウUCB・割引UCB・
+トンプソンサンプリング・EXP3も同じインターフェースで提供する
 """
 
+import inspect
+import json
 import math
-from typing import List, Dict, Any
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Hashable, List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 
+import numpy as np
+
 
 @dataclass
 class Arm:
     """バンディットアルゴリズムの腕（選択肢）"""
     name: str
     total_reward: float = 0.0
-    num_plays: int = 0
+    # load_stateで引き継いだ分はdecay倍されるので小数になることがある
+    num_plays: float = 0
     average_reward: float = 0.0
+    # 選択済みで報酬がまだ届いていない回数
+    num_pending: int = 0
+    # load_stateで引き継いだプレイ回数（num_playsに含まれる）
+    prior_plays: float = 0.0
 
 
 class UCB1Bandit:
@@ -34,61 +49,94 @@ class UCB1Bandit:
         self.arms = {name: Arm(name=name) for name in arms}
         self.total_plays = 0
 
-    def select_arm(self) -> str:
+    def select_arm(self, pending: bool = False) -> str:
         """
         UCB1アルゴリズムで腕を選択
 
+        報酬待ちの選択もプレイ回数に数える（並列評価中に同じ腕ばかり選ばないように）
+
+        Args:
+            pending: Trueの場合、選択を報酬待ちとして記録する（update(..., pending=True)で解消）
+
         Returns:
             選択された腕の名前
         """
+        arm_name = self._select_arm()
+        if pending:
+            self.arms[arm_name].num_pending += 1
+        return arm_name
+
+    def _select_arm(self) -> str:
+        """select_armの本体"""
         # 各腕を少なくとも1回は選択
         for arm_name, arm in self.arms.items():
-            if arm.num_plays == 0:
+            if arm.num_plays + arm.num_pending == 0:
                 return arm_name
 
+        # 引き継いだプレイ回数はdecay倍されて1未満になることがある（対数が負にならないように）
+        total = max(self.total_plays + sum(arm.num_pending for arm in self.arms.values()), 1)
+
         # UCB1スコアを計算して最大の腕を選択
         ucb_scores = {}
         for arm_name, arm in self.arms.items():
             # UCB1スコア = 平均報酬 + c * sqrt(ln(総プレイ数) / プレイ数)
             exploration_bonus = self.exploration_coefficient * math.sqrt(
-                math.log(self.total_plays) / arm.num_plays
+                math.log(total) / (arm.num_plays + arm.num_pending)
             )
             ucb_scores[arm_name] = arm.average_reward + exploration_bonus
 
         # 最大スコアの腕を返す
         return max(ucb_scores, key=ucb_scores.get)
 
-    def update(self, arm_name: str, reward: float):
+    def update(self, arm_name: str, reward: float, pending: bool = False):
         """
         選択した腕の報酬を更新
 
         Args:
             arm_name: 選択した腕の名前
             reward: 得られた報酬（0.0〜1.0）
+            pending: Trueの場合、select_arm(pending=True)で記録した報酬待ちを1つ解消する
         """
         if arm_name not in self.arms:
             raise ValueError(f"Unknown arm: {arm_name}")
 
         arm = self.arms[arm_name]
+        if pending and arm.num_pending > 0:
+            arm.num_pending -= 1
         arm.num_plays += 1
         arm.total_reward += reward
         arm.average_reward = arm.total_reward / arm.num_plays
 
         self.total_plays += 1
 
+    def cancel_pending(self, arm_name: str):
+        """
+        select_arm(pending=True)で記録した報酬待ちを、報酬を与えずに1つ取り消す
+
+        Args:
+            arm_name: 選択した腕の名前
+        """
+        arm = self.arms[arm_name]
+        if arm.num_pending > 0:
+            arm.num_pending -= 1
+
     def get_statistics(self) -> Dict[str, Any]:
         """
         各腕の統計情報を取得
 
+        'num_plays'はこの実行で選ばれた回数、'effective_plays'はload_stateで引き継いだ分を含む回数
+
         Returns:
             統計情報の辞書
         """
         stats = {}
         for arm_name, arm in self.arms.items():
             stats[arm_name] = {
-                'num_plays': arm.num_plays,
+                'num_plays': int(round(arm.num_plays - arm.prior_plays)),
+                'effective_plays': float(arm.num_plays),
                 'total_reward': arm.total_reward,
                 'average_reward': arm.average_reward,
+                'num_pending': arm.num_pending,
                 'play_rate': arm.num_plays / self.total_plays if self.total_plays > 0 else 0.0
             }
         return stats
@@ -102,6 +150,664 @@ class UCB1Bandit:
         """
         return max(self.arms, key=lambda name: self.arms[name].average_reward)
 
+    def get_state(self) -> Dict[str, Any]:
+        """
+        次の実行に引き継ぐ状態（JSONに変換可能）。報酬待ちの数は含めない
+
+        num_playsはload_stateで引き継いだ分を含む実効的な回数で、小数になることがある
+
+        Returns:
+            {'policy', 'arms': {腕: {'num_plays', 'total_reward'}}}
+        """
+        return {
+            'policy': 'ucb1',
+            'arms': {
+                name: {'num_plays': arm.num_plays, 'total_reward': arm.total_reward}
+                for name, arm in self.arms.items()
+            }
+        }
+
+    def load_state(self, state: Dict[str, Any], decay: float = 1.0):
+        """
+        過去の実行の状態を事前分布として読み込む
+
+        プレイ回数と報酬の合計をdecay倍して引き継ぐ（プレイ回数は丸めずに小数のまま持つ）。
+        引き継いだ腕は強制探索（各腕1回）の対象にならない。
+        状態にない腕（新しい戦略など）は0から始める
+
+        Args:
+            state: get_stateで取得した状態（方策が異なっていてもよい）
+            decay: 引き継ぐ割合（0.0〜1.0）
+        """
+        for name, arm_state in state.get('arms', {}).items():
+            if name not in self.arms or arm_state.get('num_plays', 0) <= 0:
+                continue
+            arm = self.arms[name]
+            arm.num_plays = arm_state['num_plays'] * decay
+            arm.prior_plays = arm.num_plays
+            arm.total_reward = arm_state['total_reward'] * decay
+            arm.average_reward = arm.total_reward / arm.num_plays if arm.num_plays > 0 else 0.0
+        self.total_plays = sum(arm.num_plays for arm in self.arms.values())
+
+
+class ArrayBandit(ABC):
+    """
+    腕ごとの状態をNumPy配列で持つバンディットの基底クラス（UCB1Banditと同じインターフェース）
+
+    サブクラスは_select_index（腕の選択）と_observe（報酬の反映）、_estimates（腕ごとの推定報酬）を実装する
+    """
+
+    policy = None
+
+    def __init__(self, arms: List[str]):
+        """
+        Args:
+            arms: 選択肢のリスト（モデル名、戦略名など）
+        """
+        self.arm_names = list(arms)
+        self._index = {name: i for i, name in enumerate(self.arm_names)}
+        num_arms = len(self.arm_names)
+        self.num_plays = np.zeros(num_arms)
+        # load_stateで引き継いだプレイ回数（num_playsに含まれる）
+        self.prior_plays = np.zeros(num_arms)
+        self.total_reward = np.zeros(num_arms)
+        # 選択済みで報酬がまだ届いていない回数
+        self.num_pending = np.zeros(num_arms, dtype=np.int64)
+        self.total_plays = 0
+
+    def select_arm(self, pending: bool = False) -> str:
+        """
+        腕を選択
+
+        Args:
+            pending: Trueの場合、選択を報酬待ちとして記録する（update(..., pending=True)で解消）
+
+        Returns:
+            選択された腕の名前
+        """
+        index = self._select_index()
+        if pending:
+            self.num_pending[index] += 1
+        return self.arm_names[index]
+
+    def update(self, arm_name: str, reward: float, pending: bool = False):
+        """
+        選択した腕の報酬を更新
+
+        Args:
+            arm_name: 選択した腕の名前
+            reward: 得られた報酬（0.0〜1.0）
+            pending: Trueの場合、select_arm(pending=True)で記録した報酬待ちを1つ解消する
+        """
+        if arm_name not in self._index:
+            raise ValueError(f"Unknown arm: {arm_name}")
+
+        index = self._index[arm_name]
+        if pending and self.num_pending[index] > 0:
+            self.num_pending[index] -= 1
+        self.num_plays[index] += 1
+        self.total_reward[index] += reward
+        self.total_plays += 1
+        self._observe(index, reward)
+
+    def cancel_pending(self, arm_name: str):
+        """
+        select_arm(pending=True)で記録した報酬待ちを、報酬を与えずに1つ取り消す
+
+        Args:
+            arm_name: 選択した腕の名前
+        """
+        index = self._index[arm_name]
+        if self.num_pending[index] > 0:
+            self.num_pending[index] -= 1
+
+    def _untried_arm(self) -> int:
+        """まだ選ばれていない腕（報酬待ちを含む）の番号、なければ-1"""
+        untried = np.flatnonzero(self.num_plays + self.num_pending == 0)
+        return int(untried[0]) if len(untried) else -1
+
+    @abstractmethod
+    def _select_index(self) -> int:
+        """選択する腕の番号"""
+        pass
+
+    def _observe(self, index: int, reward: float):
+        """報酬を方策の状態に反映（デフォルトでは何もしない）"""
+
+    def _estimates(self) -> np.ndarray:
+        """腕ごとの推定報酬（デフォルトは平均報酬）"""
+        return self.total_reward / np.maximum(self.num_plays, 1)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        各腕の統計情報を取得
+
+        'num_plays'はこの実行で選ばれた回数、'effective_plays'はload_stateで引き継いだ分を含む回数
+
+        Returns:
+            統計情報の辞書
+        """
+        estimates = self._estimates()
+        stats = {}
+        for index, arm_name in enumerate(self.arm_names):
+            plays = self.num_plays[index]
+            stats[arm_name] = {
+                'num_plays': int(round(plays - self.prior_plays[index])),
+                'effective_plays': float(plays),
+                'total_reward': float(self.total_reward[index]),
+                'average_reward': float(self.total_reward[index] / plays) if plays else 0.0,
+                'estimated_reward': float(estimates[index]),
+                'num_pending': int(self.num_pending[index]),
+                'play_rate': float(plays / self.total_plays) if self.total_plays > 0 else 0.0
+            }
+        return stats
+
+    def get_best_arm(self) -> str:
+        """
+        推定報酬が最も高い腕を返す
+
+        Returns:
+            最良の腕の名前
+        """
+        return self.arm_names[int(np.argmax(self._estimates()))]
+
+    def _arm_state(self, index: int) -> Dict[str, Any]:
+        """腕ごとの方策固有の状態（サブクラスで拡張する）"""
+        return {}
+
+    def _load_arm_state(self, index: int, arm_state: Dict[str, Any], decay: float):
+        """_arm_stateの読み込み（方策が異なる状態から読む場合は項目がないことがある）"""
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        次の実行に引き継ぐ状態（JSONに変換可能）。報酬待ちの数は含めない
+
+        Returns:
+            {'policy', 'arms': {腕: {'num_plays', 'total_reward', 方策固有の項目}}}
+        """
+        return {
+            'policy': self.policy,
+            'arms': {
+                name: {
+                    'num_plays': float(self.num_plays[index]),
+                    'total_reward': float(self.total_reward[index]),
+                    **self._arm_state(index)
+                }
+                for index, name in enumerate(self.arm_names)
+            }
+        }
+
+    def load_state(self, state: Dict[str, Any], decay: float = 1.0):
+        """
+        過去の実行の状態を事前分布として読み込む（UCB1Bandit.load_stateと同じ）
+
+        Args:
+            state: get_stateで取得した状態（方策が異なっていてもよい）
+            decay: 引き継ぐ割合（0.0〜1.0）
+        """
+        for name, arm_state in state.get('arms', {}).items():
+            if name not in self._index or arm_state.get('num_plays', 0) <= 0:
+                continue
+            index = self._index[name]
+            self.num_plays[index] = arm_state['num_plays'] * decay
+            self.prior_plays[index] = self.num_plays[index]
+            self.total_reward[index] = arm_state['total_reward'] * decay
+            self._load_arm_state(index, arm_state, decay)
+        self.total_plays = float(self.num_plays.sum())
+
+
+class SlidingWindowUCBBandit(ArrayBandit):
+    """直近window回の報酬だけを使うUCB（非定常な報酬に追従する）"""
+
+    policy = 'sliding_window_ucb'
+
+    def __init__(self, arms: List[str], exploration_coefficient: float = 1.0, window: int = 100):
+        """
+        Args:
+            arms: 選択肢のリスト
+            exploration_coefficient: 探索係数
+            window: 報酬の計算に使う直近の報酬の数
+        """
+        super().__init__(arms)
+        self.exploration_coefficient = exploration_coefficient
+        self.window = window
+        # ウィンドウ内の (腕, 報酬) と、腕ごとの回数・報酬の合計
+        self._history: deque = deque()
+        self.window_plays = np.zeros(len(self.arm_names))
+        self.window_reward = np.zeros(len(self.arm_names))
+
+    def _observe(self, index: int, reward: float):
+        self._history.append((index, reward))
+        self.window_plays[index] += 1
+        self.window_reward[index] += reward
+        if len(self._history) > self.window:
+            old_index, old_reward = self._history.popleft()
+            self.window_plays[old_index] -= 1
+            self.window_reward[old_index] -= old_reward
+
+    def _estimates(self) -> np.ndarray:
+        return self.window_reward / np.maximum(self.window_plays, 1)
+
+    def get_state(self) -> Dict[str, Any]:
+        state = super().get_state()
+        state['history'] = [[self.arm_names[index], reward] for index, reward in self._history]
+        return state
+
+    def load_state(self, state: Dict[str, Any], decay: float = 1.0):
+        """
+        過去の実行の状態を読み込む（ウィンドウは直近のdecayの割合の報酬だけを引き継ぐ）
+
+        Args:
+            state: get_stateで取得した状態
+            decay: 引き継ぐ割合（0.0〜1.0）
+        """
+        super().load_state(state, decay)
+        history = [
+            (name, reward) for name, reward in state.get('history', []) if name in self._index
+        ]
+        for name, reward in history[len(history) - int(round(len(history) * decay)):]:
+            self._observe(self._index[name], reward)
+
+    def _select_index(self) -> int:
+        untried = self._untried_arm()
+        if untried >= 0:
+            return untried
+
+        # ウィンドウから外れた腕（回数0）は探索ボーナスが無限大になり、再び試される
+        plays = self.window_plays + self.num_pending
+        total = max(plays.sum(), 1.0)
+        bonus = self.exploration_coefficient * np.sqrt(np.log(total) / np.maximum(plays, 1))
+        return int(np.argmax(self._estimates() + np.where(plays > 0, bonus, np.inf)))
+
+
+class DiscountedUCBBandit(ArrayBandit):
+    """過去の報酬を割引率で減衰させるUCB（非定常な報酬に追従する）"""
+
+    policy = 'discounted_ucb'
+
+    def __init__(
+        self, arms: List[str], exploration_coefficient: float = 1.0, discount: float = 0.95
+    ):
+        """
+        Args:
+            arms: 選択肢のリスト
+            exploration_coefficient: 探索係数
+            discount: 報酬1回ごとに過去の回数・報酬に掛ける割引率（0.0〜1.0）
+        """
+        super().__init__(arms)
+        self.exploration_coefficient = exploration_coefficient
+        self.discount = discount
+        self.discounted_plays = np.zeros(len(self.arm_names))
+        self.discounted_reward = np.zeros(len(self.arm_names))
+
+    def _observe(self, index: int, reward: float):
+        self.discounted_plays *= self.discount
+        self.discounted_reward *= self.discount
+        self.discounted_plays[index] += 1
+        self.discounted_reward[index] += reward
+
+    def _estimates(self) -> np.ndarray:
+        return self.discounted_reward / np.maximum(self.discounted_plays, 1e-12)
+
+    def _arm_state(self, index: int) -> Dict[str, Any]:
+        return {
+            'discounted_plays': float(self.discounted_plays[index]),
+            'discounted_reward': float(self.discounted_reward[index])
+        }
+
+    def _load_arm_state(self, index: int, arm_state: Dict[str, Any], decay: float):
+        plays = arm_state.get('discounted_plays', arm_state['num_plays'])
+        reward = arm_state.get('discounted_reward', arm_state['total_reward'])
+        self.discounted_plays[index] = plays * decay
+        self.discounted_reward[index] = reward * decay
+
+    def _select_index(self) -> int:
+        untried = self._untried_arm()
+        if untried >= 0:
+            return untried
+
+        plays = self.discounted_plays + self.num_pending
+        total = max(plays.sum(), 1.0 + 1e-12)
+        bonus = self.exploration_coefficient * np.sqrt(np.log(total) / np.maximum(plays, 1e-12))
+        return int(np.argmax(self._estimates() + bonus))
+
+
+class ThompsonSamplingBandit(ArrayBandit):
+    """トンプソンサンプリング（ベータ分布または正規分布の事後分布から報酬をサンプリング）"""
+
+    policy = 'thompson'
+
+    def __init__(self, arms: List[str], distribution: str = 'beta', seed: Optional[int] = None):
+        """
+        Args:
+            arms: 選択肢のリスト
+            distribution: 事後分布（'beta': 報酬を成功確率として扱う、'gaussian': 平均報酬の正規近似）
+            seed: 乱数シード
+        """
+        if distribution not in ('beta', 'gaussian'):
+            raise ValueError(f"Unknown distribution: {distribution}")
+        super().__init__(arms)
+        self.distribution = distribution
+        self.rng = np.random.default_rng(seed)
+
+    def _estimates(self) -> np.ndarray:
+        # 事後分布の平均（一様事前分布）
+        return (self.total_reward + 1.0) / (self.num_plays + 2.0)
+
+    def _select_index(self) -> int:
+        # 報酬待ちの選択は報酬0として数え、並列評価中に同じ腕ばかり選ばないようにする
+        plays = self.num_plays + self.num_pending
+        if self.distribution == 'beta':
+            samples = self.rng.beta(self.total_reward + 1.0, plays - self.total_reward + 1.0)
+        else:
+            means = self.total_reward / np.maximum(plays, 1)
+            samples = self.rng.normal(means, 1.0 / np.sqrt(plays + 1.0))
+        return int(np.argmax(samples))
+
+
+class EXP3Bandit(ArrayBandit):
+    """EXP3（報酬の分布を仮定しない敵対的バンディット）"""
+
+    policy = 'exp3'
+
+    def __init__(self, arms: List[str], gamma: float = 0.1, seed: Optional[int] = None):
+        """
+        Args:
+            arms: 選択肢のリスト
+            gamma: 一様探索の割合（0.0〜1.0）
+            seed: 乱数シード
+        """
+        super().__init__(arms)
+        self.gamma = gamma
+        self.rng = np.random.default_rng(seed)
+        # 重みの対数（オーバーフローを避けるため）
+        self.log_weights = np.zeros(len(self.arm_names))
+
+    def probabilities(self) -> np.ndarray:
+        """
+        各腕を選ぶ確率
+
+        Returns:
+            確率の配列
+        """
+        weights = np.exp(self.log_weights - self.log_weights.max())
+        return (1.0 - self.gamma) * weights / weights.sum() + self.gamma / len(self.arm_names)
+
+    def _observe(self, index: int, reward: float):
+        # 報酬は選んだ確率で割って不偏推定にする（遅延報酬の場合は更新時点の確率で近似する）
+        estimate = reward / self.probabilities()[index]
+        self.log_weights[index] += self.gamma * estimate / len(self.arm_names)
+
+    def _estimates(self) -> np.ndarray:
+        return self.probabilities()
+
+    def _arm_state(self, index: int) -> Dict[str, Any]:
+        return {'log_weight': float(self.log_weights[index])}
+
+    def _load_arm_state(self, index: int, arm_state: Dict[str, Any], decay: float):
+        self.log_weights[index] = arm_state.get('log_weight', 0.0) * decay
+
+    def _select_index(self) -> int:
+        return int(self.rng.choice(len(self.arm_names), p=self.probabilities()))
+
+
+# 設定ファイルで選べるバンディットの方策
+BANDIT_POLICIES = {
+    'ucb1': UCB1Bandit,
+    'sliding_window_ucb': SlidingWindowUCBBandit,
+    'discounted_ucb': DiscountedUCBBandit,
+    'thompson': ThompsonSamplingBandit,
+    'exp3': EXP3Bandit,
+}
+
+
+def policy_parameters(policy: str) -> Tuple[str, ...]:
+    """
+    方策が受け取るパラメータの名前
+
+    Args:
+        policy: 方策名（BANDIT_POLICIESのキー）
+
+    Returns:
+        パラメータ名のタプル（arms以外）
+    """
+    if policy not in BANDIT_POLICIES:
+        raise ValueError(f"Unknown bandit policy: {policy}")
+    parameters = inspect.signature(BANDIT_POLICIES[policy].__init__).parameters
+    return tuple(name for name in parameters if name not in ('self', 'arms'))
+
+
+def create_bandit(arms: List[str], policy: str = 'ucb1', **params):
+    """
+    方策名からバンディットを作成
+
+    Args:
+        arms: 選択肢のリスト
+        policy: 方策名（BANDIT_POLICIESのキー）
+        **params: 方策のパラメータ（policy_parameters(policy)のいずれか）
+
+    Returns:
+        バンディット
+
+    Raises:
+        ValueError: 方策名が不明な場合、または方策が受け取らないパラメータを指定した場合
+    """
+    accepted = policy_parameters(policy)
+    unknown = sorted(name for name in params if name not in accepted)
+    if unknown:
+        raise ValueError(
+            f"Unknown parameters for bandit policy '{policy}': {', '.join(unknown)} "
+            f"(accepted: {', '.join(accepted)})"
+        )
+    return BANDIT_POLICIES[policy](arms, **params)
+
+
+class LinUCBBandit:
+    """
+    LinUCB（文脈付きバンディット）
+
+    腕ごとに報酬を文脈の線形関数として推定し、推定値 + alpha * 信頼幅 が最大の腕を選ぶ。
+    腕ごとの A^-1（d × d）と b（d）を配列で持ち、A^-1はSherman-Morrisonの公式で更新する
+    """
+
+    policy = 'linucb'
+
+    def __init__(
+        self,
+        arms: List[str],
+        num_features: int,
+        alpha: float = 1.0,
+        regularization: float = 1.0
+    ):
+        """
+        Args:
+            arms: 選択肢のリスト
+            num_features: 文脈ベクトルの次元
+            alpha: 信頼幅の係数（探索の強さ）
+            regularization: リッジ回帰の正則化係数（Aの初期値 = regularization * I）
+        """
+        self.arm_names = list(arms)
+        self._index = {name: i for i, name in enumerate(self.arm_names)}
+        self.num_features = num_features
+        self.alpha = alpha
+        self.regularization = regularization
+        num_arms = len(self.arm_names)
+        self.A_inv = np.repeat(np.eye(num_features)[None] / regularization, num_arms, axis=0)
+        self.b = np.zeros((num_arms, num_features))
+        self.num_plays = np.zeros(num_arms)
+        # load_stateで引き継いだプレイ回数（num_playsに含まれる）
+        self.prior_plays = np.zeros(num_arms)
+        self.total_reward = np.zeros(num_arms)
+        self.num_pending = np.zeros(num_arms, dtype=np.int64)
+        self.total_plays = 0
+
+    def _scores(self, context: np.ndarray) -> np.ndarray:
+        """腕ごとの 推定報酬 + alpha * 信頼幅"""
+        theta = np.einsum('kij,kj->ki', self.A_inv, self.b)
+        A_inv_x = self.A_inv @ context
+        return theta @ context + self.alpha * np.sqrt(np.maximum(A_inv_x @ context, 0.0))
+
+    def _add_context(self, index: int, context: np.ndarray):
+        """A += x x^T をA^-1に反映（Sherman-Morrison）"""
+        A_inv_x = self.A_inv[index] @ context
+        self.A_inv[index] -= np.outer(A_inv_x, A_inv_x) / (1.0 + context @ A_inv_x)
+
+    def _remove_context(self, index: int, context: np.ndarray):
+        """A -= x x^T をA^-1に反映（_add_contextの逆）"""
+        A_inv_x = self.A_inv[index] @ context
+        self.A_inv[index] += np.outer(A_inv_x, A_inv_x) / (1.0 - context @ A_inv_x)
+
+    def select_arm(self, context: np.ndarray, pending: bool = False) -> str:
+        """
+        文脈から腕を選択
+
+        Args:
+            context: 文脈ベクトル
+            pending: Trueの場合、選択を報酬待ちとして記録する。文脈はこの時点でAに加えるため、
+                報酬待ちの間に同じ文脈で同じ腕ばかり選ばない（update(..., pending=True)では報酬だけ加える）
+
+        Returns:
+            選択された腕の名前
+        """
+        context = np.asarray(context, dtype=float)
+        index = int(np.argmax(self._scores(context)))
+        if pending:
+            self._add_context(index, context)
+            self.num_pending[index] += 1
+        return self.arm_names[index]
+
+    def update(self, arm_name: str, context: np.ndarray, reward: float, pending: bool = False):
+        """
+        選択した腕の報酬を更新
+
+        Args:
+            arm_name: 選択した腕の名前
+            context: 選択したときの文脈ベクトル
+            reward: 得られた報酬（0.0〜1.0）
+            pending: Trueの場合、select_arm(pending=True)で記録した報酬待ちを1つ解消する
+        """
+        if arm_name not in self._index:
+            raise ValueError(f"Unknown arm: {arm_name}")
+
+        index = self._index[arm_name]
+        context = np.asarray(context, dtype=float)
+        if pending and self.num_pending[index] > 0:
+            self.num_pending[index] -= 1
+        else:
+            self._add_context(index, context)
+        self.b[index] += reward * context
+        self.num_plays[index] += 1
+        self.total_reward[index] += reward
+        self.total_plays += 1
+
+    def cancel_pending(self, arm_name: str, context: np.ndarray):
+        """
+        select_arm(pending=True)で記録した報酬待ちを、報酬を与えずに1つ取り消す
+        （選択時にAに加えた文脈も取り除く）
+
+        Args:
+            arm_name: 選択した腕の名前
+            context: 選択したときの文脈ベクトル
+        """
+        index = self._index[arm_name]
+        if self.num_pending[index] > 0:
+            self.num_pending[index] -= 1
+            self._remove_context(index, np.asarray(context, dtype=float))
+
+    def get_best_arm(self, context: np.ndarray) -> str:
+        """
+        文脈に対して推定報酬が最も高い腕を返す
+
+        Args:
+            context: 文脈ベクトル
+
+        Returns:
+            最良の腕の名前
+        """
+        theta = np.einsum('kij,kj->ki', self.A_inv, self.b)
+        return self.arm_names[int(np.argmax(theta @ np.asarray(context, dtype=float)))]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        各腕の統計情報を取得（'weights'は文脈の各要素に対する推定報酬の係数）
+
+        'num_plays'と'effective_plays'はArrayBandit.get_statisticsと同じ
+
+        Returns:
+            統計情報の辞書
+        """
+        theta = np.einsum('kij,kj->ki', self.A_inv, self.b)
+        stats = {}
+        for index, arm_name in enumerate(self.arm_names):
+            plays = self.num_plays[index]
+            stats[arm_name] = {
+                'num_plays': int(round(plays - self.prior_plays[index])),
+                'effective_plays': float(plays),
+                'total_reward': float(self.total_reward[index]),
+                'average_reward': float(self.total_reward[index] / plays) if plays else 0.0,
+                'num_pending': int(self.num_pending[index]),
+                'play_rate': float(plays / self.total_plays) if self.total_plays > 0 else 0.0,
+                'weights': theta[index].tolist()
+            }
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        """保存用の辞書（JSONに変換可能）。報酬待ちの数は保存しない"""
+        return {
+            'policy': self.policy,
+            'arms': self.arm_names,
+            'num_features': self.num_features,
+            'alpha': self.alpha,
+            'regularization': self.regularization,
+            'A_inv': self.A_inv.tolist(),
+            'b': self.b.tolist(),
+            'num_plays': self.num_plays.tolist(),
+            'total_reward': self.total_reward.tolist()
+        }
+
+    def get_state(self) -> Dict[str, Any]:
+        """次の実行に引き継ぐ状態（to_dictと同じ）"""
+        return self.to_dict()
+
+    def load_state(self, state: Dict[str, Any], decay: float = 1.0):
+        """
+        過去の実行の状態を事前分布として読み込む
+
+        腕ごとに A = regularization * I + decay * (A_prev - regularization * I)、b = decay * b_prev とする。
+        文脈の次元が異なる状態は読み込まない
+
+        Args:
+            state: get_stateで取得した状態
+            decay: 引き継ぐ割合（0.0〜1.0）
+        """
+        if state.get('num_features') != self.num_features:
+            return
+        identity = np.eye(self.num_features) * self.regularization
+        for prev_index, name in enumerate(state.get('arms', [])):
+            if name not in self._index:
+                continue
+            index = self._index[name]
+            A_prev = np.linalg.inv(np.array(state['A_inv'][prev_index], dtype=float))
+            self.A_inv[index] = np.linalg.inv(identity + decay * (A_prev - identity))
+            self.b[index] = decay * np.array(state['b'][prev_index], dtype=float)
+            self.num_plays[index] = state['num_plays'][prev_index] * decay
+            self.prior_plays[index] = self.num_plays[index]
+            self.total_reward[index] = state['total_reward'][prev_index] * decay
+        self.total_plays = float(self.num_plays.sum())
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'LinUCBBandit':
+        """to_dictの逆変換"""
+        bandit = cls(
+            data['arms'], data['num_features'], data['alpha'], data.get('regularization', 1.0)
+        )
+        bandit.A_inv = np.array(data['A_inv'], dtype=float)
+        bandit.b = np.array(data['b'], dtype=float)
+        bandit.num_plays = np.array(data['num_plays'], dtype=float)
+        bandit.total_reward = np.array(data['total_reward'], dtype=float)
+        bandit.total_plays = float(bandit.num_plays.sum())
+        return bandit
+
 
 class StrategyBandit:
     """変異戦略を選択するためのバンディット"""
@@ -109,24 +815,142 @@ class StrategyBandit:
     def __init__(
         self,
         strategies: List[str],
-        exploration_coefficient: float = 1.0
+        exploration_coefficient: Optional[float] = None,
+        policy: str = 'ucb1',
+        **policy_params
     ):
         """
         Args:
             strategies: 変異戦略のリスト
-            exploration_coefficient: 探索係数
+            exploration_coefficient: 探索係数（Noneの場合は方策のデフォルト。UCB系の方策のみ）
+            policy: バンディットの方策（BANDIT_POLICIESのキー）
+            **policy_params: 方策のパラメータ（create_banditを参照）
         """
-        self.bandit = UCB1Bandit(strategies, exploration_coefficient)
+        if exploration_coefficient is not None:
+            policy_params['exploration_coefficient'] = exploration_coefficient
+        self.bandit = create_bandit(strategies, policy, **policy_params)
         self.strategies = strategies
 
-    def select_strategy(self) -> str:
+        # 評価待ちの子個体 -> [(戦略, 親の適応度, 登録した世代, 文脈)]。同じコードが複数回生成されることもある
+        self._pulls: Dict[Hashable, List[Tuple[str, float, int, Any]]] = {}
+        self._generation = 0
+        self.num_expired = 0
+        self.num_discarded = 0
+        # 島のスレッドと評価スレッドから同時に呼ばれる
+        self._lock = threading.Lock()
+
+    def select_strategy(self, pending: bool = False) -> str:
         """
         次に使用する変異戦略を選択
 
+        Args:
+            pending: Trueの場合、報酬待ちとして記録する（生成した子個体をtrackで登録し、
+                評価後にcomplete_pullで報酬を渡す）。報酬待ちの選択は腕のプレイ回数に数えるため、
+                並列評価中でも同じ戦略に偏らない
+
         Returns:
             選択された戦略名
         """
-        return self.bandit.select_arm()
+        with self._lock:
+            return self.bandit.select_arm(pending=pending)
+
+    def track(self, key: Hashable, strategy: str, parent_fitness: float, context: Any = None):
+        """
+        select_strategy(pending=True)で選んだ戦略で生成した子個体を評価待ちとして登録
+
+        Args:
+            key: 子個体を識別するキー（complete_pullで同じキーを渡す）
+            strategy: 子個体の生成に使った戦略
+            parent_fitness: 親の適応度（報酬は子の適応度との差）
+            context: 戦略を選んだときの文脈（ContextualStrategyBanditのみ）
+        """
+        with self._lock:
+            self._pulls.setdefault(key, []).append(
+                (strategy, parent_fitness, self._generation, context)
+            )
+
+    def _reward(self, strategy: str, reward: float, context: Any):
+        """報酬待ちの選択に報酬を渡す（ロックを取った状態で呼ぶ）"""
+        self.bandit.update(strategy, reward, pending=True)
+
+    def _cancel(self, strategy: str, context: Any):
+        """報酬待ちの選択を報酬なしで取り消す（ロックを取った状態で呼ぶ）"""
+        self.bandit.cancel_pending(strategy)
+
+    def complete_pull(self, key: Hashable, fitness: float) -> bool:
+        """
+        子個体の評価結果から、生成した戦略に報酬（親からの適応度の改善）を与える
+
+        Args:
+            key: trackで登録したキー
+            fitness: 子個体の適応度
+
+        Returns:
+            対応する評価待ちがあった場合True
+        """
+        with self._lock:
+            pulls = self._pulls.get(key)
+            if not pulls:
+                return False
+            strategy, parent_fitness, _, context = pulls.pop(0)
+            if not pulls:
+                del self._pulls[key]
+            self._reward(strategy, max(0.0, min(1.0, fitness - parent_fitness)), context)
+            return True
+
+    def discard_pull(self, key: Hashable) -> bool:
+        """
+        評価しないことにした子個体（新規性フィルタで除外・変異し直した子個体）の選択を、
+        報酬を与えずに取り消す（フィルタの判定を戦略の報酬として学習しない）
+
+        Args:
+            key: trackで登録したキー
+
+        Returns:
+            対応する評価待ちがあった場合True
+        """
+        with self._lock:
+            pulls = self._pulls.get(key)
+            if not pulls:
+                return False
+            strategy, _, _, context = pulls.pop(0)
+            if not pulls:
+                del self._pulls[key]
+            self.num_discarded += 1
+            self._cancel(strategy, context)
+            return True
+
+    def end_generation(self, max_age: int = 1) -> int:
+        """
+        世代の終わりに、評価されないまま残った選択を報酬0で打ち切る
+
+        評価に失敗した子個体などは報酬待ちのまま残る（新規性フィルタで除外した子個体はdiscard_pullで取り消す）。
+        非同期移住で島の世代がずれても打ち切らないよう、max_age世代前より古いものだけを対象にする
+
+        Args:
+            max_age: 打ち切るまでに待つ世代数
+
+        Returns:
+            打ち切った選択の数
+        """
+        with self._lock:
+            self._generation += 1
+            expired = 0
+            for key in list(self._pulls):
+                remaining = []
+                for pull in self._pulls[key]:
+                    strategy, _, generation, context = pull
+                    if self._generation - generation > max_age:
+                        self._reward(strategy, 0.0, context)
+                        expired += 1
+                    else:
+                        remaining.append(pull)
+                if remaining:
+                    self._pulls[key] = remaining
+                else:
+                    del self._pulls[key]
+            self.num_expired += expired
+            return expired
 
     def update_strategy(self, strategy: str, fitness_improvement: float):
         """
@@ -138,11 +962,127 @@ class StrategyBandit:
         """
         # 適応度改善度を報酬として使用
         reward = max(0.0, min(1.0, fitness_improvement))
-        self.bandit.update(strategy, reward)
+        with self._lock:
+            self.bandit.update(strategy, reward)
 
     def get_statistics(self) -> Dict[str, Any]:
         """戦略の統計情報を取得"""
-        return self.bandit.get_statistics()
+        with self._lock:
+            return self.bandit.get_statistics()
+
+    def get_state(self) -> Dict[str, Any]:
+        """次の実行に引き継ぐ状態（JSONに変換可能）"""
+        with self._lock:
+            return self.bandit.get_state()
+
+    def load_state(self, state: Dict[str, Any], decay: float = 1.0):
+        """
+        過去の実行の状態を事前分布として読み込む
+
+        Args:
+            state: get_stateで取得した状態
+            decay: 引き継ぐ割合（0.0〜1.0）
+        """
+        with self._lock:
+            self.bandit.load_state(state, decay)
+
+
+class ContextualStrategyBandit(StrategyBandit):
+    """
+    親ごとに変異戦略を選ぶ文脈付きバンディット（LinUCB）
+
+    文脈は親のテストスイートの特徴ベクトル（context_features）。
+    未カバーの分岐が多い親には分岐を狙う戦略、parametrizeのない親にはparametrize化、のように
+    スイートの状態に応じて効く戦略を学習する
+    """
+
+    def __init__(
+        self,
+        strategies: List[str],
+        num_features: int,
+        alpha: float = 1.0,
+        regularization: float = 1.0
+    ):
+        """
+        Args:
+            strategies: 変異戦略のリスト
+            num_features: 文脈ベクトルの次元
+            alpha: 信頼幅の係数（探索の強さ）
+            regularization: リッジ回帰の正則化係数
+        """
+        super().__init__(strategies)
+        self.bandit = LinUCBBandit(strategies, num_features, alpha, regularization)
+
+    def select_strategy(self, context: Optional[np.ndarray] = None, pending: bool = False) -> str:
+        """
+        親の文脈から次に使用する変異戦略を選択
+
+        Args:
+            context: 親の文脈ベクトル（Noneの場合はバイアス項だけの文脈）
+            pending: Trueの場合、報酬待ちとして記録する（trackには同じ文脈を渡す）
+
+        Returns:
+            選択された戦略名
+        """
+        if context is None:
+            context = np.eye(self.bandit.num_features)[0]
+        with self._lock:
+            return self.bandit.select_arm(context, pending=pending)
+
+    def _reward(self, strategy: str, reward: float, context: Any):
+        if context is None:
+            context = np.eye(self.bandit.num_features)[0]
+        self.bandit.update(strategy, context, reward, pending=True)
+
+    def _cancel(self, strategy: str, context: Any):
+        if context is None:
+            context = np.eye(self.bandit.num_features)[0]
+        self.bandit.cancel_pending(strategy, context)
+
+    def update_strategy(
+        self, strategy: str, fitness_improvement: float, context: Optional[np.ndarray] = None
+    ):
+        """
+        戦略の報酬を更新
+
+        Args:
+            strategy: 使用した戦略
+            fitness_improvement: 適応度の改善度（0.0〜1.0）
+            context: 戦略を選んだときの文脈ベクトル
+        """
+        if context is None:
+            context = np.eye(self.bandit.num_features)[0]
+        with self._lock:
+            self.bandit.update(strategy, context, max(0.0, min(1.0, fitness_improvement)))
+
+    def save(self, path: Path):
+        """
+        バンディットの状態をJSONファイルに保存
+
+        Args:
+            path: 保存先のパス
+        """
+        with self._lock:
+            data = self.bandit.to_dict()
+        Path(path).write_text(json.dumps(data), encoding='utf-8')
+
+    @classmethod
+    def load(cls, path: Path) -> 'ContextualStrategyBandit':
+        """
+        saveで保存した状態から復元
+
+        Args:
+            path: 保存したファイルのパス
+
+        Returns:
+            ContextualStrategyBandit
+        """
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+        contextual = cls(
+            data['arms'], data['num_features'], data['alpha'], data.get('regularization', 1.0)
+        )
+        contextual.bandit = LinUCBBandit.from_dict(data)
+        return contextual
 
 
 class ModelBandit:
@@ -151,14 +1091,20 @@ class ModelBandit:
     def __init__(
         self,
         models: List[str],
-        exploration_coefficient: float = 1.0
+        exploration_coefficient: Optional[float] = None,
+        policy: str = 'ucb1',
+        **policy_params
     ):
         """
         Args:
             models: LLMモデルのリスト
-            exploration_coefficient: 探索係数
+            exploration_coefficient: 探索係数（Noneの場合は方策のデフォルト。UCB系の方策のみ）
+            policy: バンディットの方策（BANDIT_POLICIESのキー）
+            **policy_params: 方策のパラメータ（create_banditを参照）
         """
-        self.bandit = UCB1Bandit(models, exploration_coefficient)
+        if exploration_coefficient is not None:
+            policy_params['exploration_coefficient'] = exploration_coefficient
+        self.bandit = create_bandit(models, policy, **policy_params)
         self.models = models
 
     def select_model(self) -> str:
@@ -186,6 +1132,262 @@ class ModelBandit:
         return self.bandit.get_statistics()
 
 
+class CostAwareModelBandit:
+    """
+    コストとレイテンシを考慮したLLMモデル（プロバイダー）選択バンディット
+
+    直近window回の呼び出しだけを使うスライディングウィンドウUCBで、
+    報酬は「適応度の改善 / (正規化したコスト + 正規化したレイテンシ)」。
+    プロバイダーが遅くなったり高くなったりすると、ウィンドウ内の値が入れ替わって選ばれにくくなる
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        window: int = 50,
+        exploration_coefficient: float = 0.2,
+        cost_weight: float = 1.0,
+        latency_weight: float = 1.0
+    ):
+        """
+        Args:
+            models: 腕の名前のリスト（MultiProviderLLMClientでは"<プロバイダー名>/<モデル名>"）
+            window: 報酬の計算に使う直近の呼び出し数
+            exploration_coefficient: 探索係数
+            cost_weight: 効率の分母に占めるコスト（ドル）の重み
+            latency_weight: 効率の分母に占めるレイテンシ（秒）の重み
+        """
+        self.models = list(models)
+        self.window = window
+        self.exploration_coefficient = exploration_coefficient
+        self.cost_weight = cost_weight
+        self.latency_weight = latency_weight
+
+        # 直近の呼び出し (モデル, 適応度の改善, コスト, レイテンシ)
+        self._observations: deque = deque(maxlen=window)
+        # 評価待ちの子個体 -> [(モデル, 親の適応度, コスト, レイテンシ, 登録した世代)]
+        self._pulls: Dict[Hashable, List[Tuple[str, float, float, float, int]]] = {}
+        self._generation = 0
+        self.num_calls = {model: 0 for model in self.models}
+        self.num_failures = {model: 0 for model in self.models}
+        # LLMを呼ぶ島のスレッドと評価スレッドから同時に呼ばれる
+        self._lock = threading.Lock()
+
+    def _window_summary(self) -> Dict[str, Tuple[int, float, float, float]]:
+        """ウィンドウ内のモデルごとの (呼び出し数, 改善の合計, コストの合計, レイテンシの合計)"""
+        summary = {model: [0, 0.0, 0.0, 0.0] for model in self.models}
+        for model, improvement, cost, latency in self._observations:
+            entry = summary.setdefault(model, [0, 0.0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += improvement
+            entry[2] += cost
+            entry[3] += latency
+        return {model: tuple(entry) for model, entry in summary.items()}
+
+    def _scores(self) -> Dict[str, float]:
+        """モデルごとのUCBスコア（ウィンドウ内で未使用のモデルは無限大）"""
+        summary = self._window_summary()
+        total = len(self._observations)
+        if total == 0:
+            return {model: math.inf for model in self.models}
+
+        # コストとレイテンシはウィンドウ全体の平均で割って無次元にする
+        mean_cost = sum(entry[2] for entry in summary.values()) / total
+        mean_latency = sum(entry[3] for entry in summary.values()) / total
+        cost_scale = mean_cost if mean_cost > 0 else 1.0
+        latency_scale = mean_latency if mean_latency > 0 else 1.0
+
+        efficiency = {}
+        for model, (count, improvement, cost, latency) in summary.items():
+            if count == 0:
+                continue
+            denominator = (
+                self.cost_weight * (cost / count) / cost_scale +
+                self.latency_weight * (latency / count) / latency_scale
+            )
+            efficiency[model] = (improvement / count) / max(denominator, 1e-9)
+
+        # 最も効率の良いモデルを1.0として正規化
+        best = max(efficiency.values(), default=0.0)
+        scores = {}
+        for model, (count, _, _, _) in summary.items():
+            if count == 0:
+                scores[model] = math.inf
+                continue
+            normalized = efficiency[model] / best if best > 0 else 0.0
+            scores[model] = normalized + self.exploration_coefficient * math.sqrt(
+                math.log(total) / count
+            )
+        return scores
+
+    def rank_models(self) -> List[str]:
+        """
+        次の呼び出しでモデルを試す順序（UCBスコアの高い順）
+
+        Returns:
+            モデル名のリスト
+        """
+        with self._lock:
+            scores = self._scores()
+        return sorted(scores, key=lambda model: -scores[model])
+
+    def select_model(self) -> str:
+        """
+        次に使用するLLMモデルを選択
+
+        Returns:
+            選択されたモデル名
+        """
+        return self.rank_models()[0]
+
+    def track(self, key: Hashable, model: str, parent_fitness: float, cost: float, latency: float):
+        """
+        LLMの呼び出しで生成した子個体を評価待ちとして登録
+
+        Args:
+            key: 子個体を識別するキー（complete_pullで同じキーを渡す）
+            model: 応答したモデル
+            parent_fitness: 親の適応度（改善は子の適応度との差）
+            cost: 呼び出しのコスト（ドル）
+            latency: 呼び出しのレイテンシ（秒）
+        """
+        with self._lock:
+            self.num_calls[model] = self.num_calls.get(model, 0) + 1
+            pull = (model, parent_fitness, cost, latency, self._generation)
+            self._pulls.setdefault(key, []).append(pull)
+
+    def complete_pull(self, key: Hashable, fitness: float) -> bool:
+        """
+        子個体の評価結果を、生成したモデルの呼び出しの報酬としてウィンドウに加える
+
+        Args:
+            key: trackで登録したキー
+            fitness: 子個体の適応度
+
+        Returns:
+            対応する評価待ちがあった場合True
+        """
+        with self._lock:
+            pulls = self._pulls.get(key)
+            if not pulls:
+                return False
+            model, parent_fitness, cost, latency, _ = pulls.pop(0)
+            if not pulls:
+                del self._pulls[key]
+            improvement = max(0.0, min(1.0, fitness - parent_fitness))
+            self._observations.append((model, improvement, cost, latency))
+            return True
+
+    def discard_pull(self, key: Hashable) -> bool:
+        """
+        評価しないことにした子個体（新規性フィルタで除外・変異し直した子個体）の呼び出しを、
+        ウィンドウに加えずに取り消す
+
+        Args:
+            key: trackで登録したキー
+
+        Returns:
+            対応する評価待ちがあった場合True
+        """
+        with self._lock:
+            pulls = self._pulls.get(key)
+            if not pulls:
+                return False
+            pulls.pop(0)
+            if not pulls:
+                del self._pulls[key]
+            return True
+
+    def record_failure(self, model: str, cost: float, latency: float):
+        """
+        失敗した呼び出し（エラー・タイムアウト）を改善0としてウィンドウに加える
+
+        Args:
+            model: 失敗したモデル
+            cost: 呼び出しのコスト（ドル）
+            latency: 失敗までにかかった時間（秒）
+        """
+        with self._lock:
+            self.num_failures[model] = self.num_failures.get(model, 0) + 1
+            self._observations.append((model, 0.0, cost, latency))
+
+    def end_generation(self, max_age: int = 1) -> int:
+        """
+        世代の終わりに、評価されないまま残った呼び出しを改善0としてウィンドウに加える
+
+        Args:
+            max_age: 打ち切るまでに待つ世代数
+
+        Returns:
+            打ち切った呼び出しの数
+        """
+        with self._lock:
+            self._generation += 1
+            expired = 0
+            for key in list(self._pulls):
+                remaining = []
+                for model, parent_fitness, cost, latency, generation in self._pulls[key]:
+                    if self._generation - generation > max_age:
+                        self._observations.append((model, 0.0, cost, latency))
+                        expired += 1
+                    else:
+                        remaining.append((model, parent_fitness, cost, latency, generation))
+                if remaining:
+                    self._pulls[key] = remaining
+                else:
+                    del self._pulls[key]
+            return expired
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        次の実行に引き継ぐ状態（ウィンドウ内の呼び出し）
+
+        Returns:
+            {'observations': [[モデル, 改善, コスト, レイテンシ], ...]}
+        """
+        with self._lock:
+            return {'observations': [list(observation) for observation in self._observations]}
+
+    def load_state(self, state: Dict[str, Any], decay: float = 1.0):
+        """
+        過去の実行のウィンドウのうち、直近のdecayの割合の呼び出しを引き継ぐ
+
+        Args:
+            state: get_stateで取得した状態
+            decay: 引き継ぐ割合（0.0〜1.0）
+        """
+        observations = [
+            tuple(observation) for observation in state.get('observations', [])
+            if observation[0] in self.models
+        ]
+        with self._lock:
+            kept = int(round(len(observations) * decay))
+            self._observations.extend(observations[len(observations) - kept:])
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        モデルごとの統計情報を取得（ウィンドウ内の平均値）
+
+        Returns:
+            統計情報の辞書
+        """
+        with self._lock:
+            summary = self._window_summary()
+            scores = self._scores()
+            stats = {}
+            for model, (count, improvement, cost, latency) in summary.items():
+                stats[model] = {
+                    'num_calls': self.num_calls.get(model, 0),
+                    'num_failures': self.num_failures.get(model, 0),
+                    'window_calls': count,
+                    'avg_improvement': improvement / count if count else 0.0,
+                    'avg_cost': cost / count if count else 0.0,
+                    'avg_latency': latency / count if count else 0.0,
+                    'score': scores[model] if count else None
+                }
+            return stats
+
+
 class AdaptiveBanditSelector:
     """戦略とモデルの両方を選択する統合バンディット"""
 
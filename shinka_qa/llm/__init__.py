@@ -7,12 +7,26 @@ from .llm_client import (
     LLMClient,
     create_llm_client,
     create_multi_provider_client,
-    MultiProviderLLMClient
+    MultiProviderLLMClient,
+    CachedLLMClient,
+    CacheMissError,
+    ResponseCache
 )
+from .async_pool import AsyncLLMPool, LLMRequest, ProviderRateLimiter, TokenBucket
+from .fake_llm import FakeLLMClient, FakeOpenAIServer
 
 __all__ = [
     'LLMClient',
     'create_llm_client',
     'create_multi_provider_client',
-    'MultiProviderLLMClient'
+    'MultiProviderLLMClient',
+    'CachedLLMClient',
+    'CacheMissError',
+    'ResponseCache',
+    'AsyncLLMPool',
+    'LLMRequest',
+    'ProviderRateLimiter',
+    'TokenBucket',
+    'FakeLLMClient',
+    'FakeOpenAIServer'
 ]
@@ -0,0 +1,302 @@
+"""
+非同期LLMリクエストプール
+1世代分のLLM変異をまとめて並行に送り、プロバイダーごとのレート制限（リクエスト数・トークン数/分）を守る
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .llm_client import CacheMissError, LLMClient, safe_print
+
+# 1件のリクエストの結果（nが2以上のリクエストはテキストのリスト）
+Generated = Union[str, List[str]]
+
+
+class TokenBucket:
+    """トークンバケット（1分あたりの上限を、容量と補充速度で表す）"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute: 1分あたりの補充量
+            capacity: バケットの容量（Noneの場合は1分ぶん）
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # 島ごとのスレッドから同じバケットを使うことがある
+        self._lock = threading.Lock()
+
+    def _try_take(self, amount: float) -> float:
+        """
+        取れる場合は取り出して0を、取れない場合は足りるまでの待ち時間（秒）を返す
+
+        容量を超える量は、バケットが満杯になった時点で取り出す（負の残量は後の呼び出しが待って返す）
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            needed = min(amount, self.capacity)
+            if self.tokens >= needed:
+                self.tokens -= amount
+                return 0.0
+            return (needed - self.tokens) / self.rate
+
+    async def acquire(self, amount: float = 1.0):
+        """
+        amountぶん取り出せるまで待つ
+
+        Args:
+            amount: 取り出す量（リクエスト数またはトークン数）
+        """
+        while True:
+            wait = self._try_take(amount)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self, amount: float = 1.0):
+        """acquireの同期版（取り出せるまでスレッドを止める）"""
+        while True:
+            wait = self._try_take(amount)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+class ProviderRateLimiter:
+    """プロバイダーごとのレート制限（リクエスト数/分 と トークン数/分）"""
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None
+    ):
+        """
+        Args:
+            requests_per_minute: 1分あたりのリクエスト数の上限（Noneで無制限）
+            tokens_per_minute: 1分あたりのトークン数（入力+最大出力）の上限（Noneで無制限）
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    async def acquire(self, tokens: int):
+        """
+        1リクエストぶんの枠を取る
+
+        Args:
+            tokens: リクエストのトークン数（入力の概算 + max_tokens）
+        """
+        if self.requests is not None:
+            await self.requests.acquire(1)
+        if self.tokens is not None:
+            await self.tokens.acquire(tokens)
+
+    def acquire_blocking(self, tokens: int):
+        """acquireの同期版（同期のgenerateから使う。非同期の呼び出しと同じバケットを共有する）"""
+        if self.requests is not None:
+            self.requests.acquire_blocking(1)
+        if self.tokens is not None:
+            self.tokens.acquire_blocking(tokens)
+
+
+@dataclass
+class LLMRequest:
+    """generate_manyに渡す1件のリクエスト"""
+    system_prompt: str
+    user_prompt: str
+    temperature: float = 0.7
+    max_tokens: int = 2000
+    # 2以上の場合はagenerate_nで独立した応答をn個生成する（結果はテキストのリスト）
+    n: int = 1
+
+
+class AsyncLLMPool:
+    """
+    LLMリクエストを並行に送るプール
+
+    専用スレッドでイベントループを1つ動かし、全ての呼び出し元（島のスレッドなど）の
+    リクエストを同じセマフォで max_concurrency 件までに制限する
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        max_concurrency: int = 8,
+        rate_limits: Optional[Dict[str, Dict[str, float]]] = None
+    ):
+        """
+        Args:
+            client: LLMクライアント（MultiProviderLLMClientの場合は各プロバイダーにレート制限を設定する）。
+                レート制限はプールを通さない同期のgenerateにもかかる
+            max_concurrency: 同時に送るリクエストの最大数
+            rate_limits: プロバイダー名（小文字の部分一致: 'openai', 'gemini', 'anthropic'）->
+                {'requests_per_minute': ..., 'tokens_per_minute': ...}
+        """
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.num_requests = 0
+        self.num_failures = 0
+        self.num_skipped = 0
+
+        for leaf in getattr(client, 'clients', [client]):
+            provider = leaf.get_provider_name().lower()
+            for name, limits in (rate_limits or {}).items():
+                if name.lower() in provider:
+                    leaf.set_rate_limiter(ProviderRateLimiter(
+                        limits.get('requests_per_minute'), limits.get('tokens_per_minute')
+                    ))
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """イベントループのスレッドを（初回だけ）起動"""
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                # 非同期クライアントのないプロバイダーはスレッドで呼ぶため、
+                # スレッド数も同時リクエスト数に合わせる
+                self._executor = ThreadPoolExecutor(self.max_concurrency)
+                self._loop.set_default_executor(self._executor)
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+            return self._loop
+
+    async def _generate(
+        self,
+        request: LLMRequest,
+        should_send: Optional[Callable[[], bool]]
+    ) -> Tuple[Optional[Generated], Optional[Dict[str, Any]]]:
+        """セマフォの枠内で1件生成し、結果と呼び出しの記録を返す（送らなかった場合は両方None）"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            # 枠が空くまでに先のリクエストが予算を使い切っていることがあるため、送る直前に確認する
+            if should_send is not None and not should_send():
+                self.num_skipped += 1
+                return None, None
+            try:
+                if request.n > 1:
+                    result = await self.client.agenerate_n(
+                        system_prompt=request.system_prompt,
+                        user_prompt=request.user_prompt,
+                        n=request.n,
+                        temperature=request.temperature,
+                        max_tokens=request.max_tokens
+                    )
+                else:
+                    result = await self.client.agenerate(
+                        system_prompt=request.system_prompt,
+                        user_prompt=request.user_prompt,
+                        temperature=request.temperature,
+                        max_tokens=request.max_tokens
+                    )
+            except CacheMissError:
+                raise
+            except Exception as e:
+                safe_print(f"❌ LLM request failed: {e}")
+                result = None
+            # 集計はイベントループのスレッドだけで行うので、ロックは要らない
+            self.num_requests += 1
+            self.num_failures += int(result is None)
+            # タスクごとの記録なので、並行する他のリクエストと混ざらない
+            return result, self.client.take_last_call()
+
+    async def agenerate_many(
+        self,
+        requests: Sequence[LLMRequest],
+        should_send: Optional[Callable[[], bool]] = None
+    ) -> List[Tuple[Optional[Generated], Optional[Dict[str, Any]]]]:
+        """
+        複数のリクエストを並行に生成（プールのイベントループ上で実行する）
+
+        Args:
+            requests: リクエストのリスト
+            should_send: リクエストごとに送る直前に呼ばれ、Falseを返すとそのリクエストを送らない関数
+                （実行予算の確認など）
+
+        Returns:
+            リクエストの順に (生成されたテキスト（nが2以上のリクエストはリスト） または None,
+            呼び出しの記録) のリスト
+        """
+        results = await asyncio.gather(
+            *(self._generate(request, should_send) for request in requests)
+        )
+        return list(results)
+
+    def generate_many_with_calls(
+        self,
+        requests: Sequence[LLMRequest],
+        should_send: Optional[Callable[[], bool]] = None
+    ) -> List[Tuple[Optional[Generated], Optional[Dict[str, Any]]]]:
+        """
+        複数のリクエストを並行に生成し、終わるまで待つ（どのスレッドからでも呼べる）
+
+        Args:
+            requests: リクエストのリスト
+            should_send: agenerate_manyと同じ
+
+        Returns:
+            リクエストの順に (生成されたテキスト（nが2以上のリクエストはリスト） または None,
+            呼び出しの記録) のリスト
+        """
+        if not requests:
+            return []
+        future = asyncio.run_coroutine_threadsafe(
+            self.agenerate_many(requests, should_send), self._ensure_loop()
+        )
+        return future.result()
+
+    def generate_many(self, requests: Sequence[LLMRequest]) -> List[Optional[Generated]]:
+        """
+        複数のリクエストを並行に生成
+
+        Args:
+            requests: リクエストのリスト
+
+        Returns:
+            リクエストの順に生成されたテキスト（nが2以上のリクエストはリスト、失敗時はNone）のリスト
+        """
+        return [text for text, _ in self.generate_many_with_calls(requests)]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            'max_concurrency': self.max_concurrency,
+            'num_requests': self.num_requests,
+            'num_failures': self.num_failures,
+            'num_skipped': self.num_skipped
+        }
+
+    def close(self):
+        """イベントループのスレッドと、スレッドで呼ぶためのスレッドプールを停止"""
+        with self._start_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._executor.shutdown(wait=True)
+                self._loop = None
+                self._executor = None
+                self._semaphore = None
+
+    def __enter__(self) -> 'AsyncLLMPool':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,484 @@
+"""
+オフライン用の疑似LLMプロバイダー
+APIキーやネットワークなしで、LLMモードの変異・並行リクエスト・キャッシュ・フォールバックを負荷試験する
+
+- FakeLLMClient: LLMClientの実装（レイテンシの分布、エラー率、429、固定またはテンプレートの出力、ストリーミング）
+- FakeOpenAIServer: OpenAI互換のChat Completions APIを話すローカルHTTPサーバー
+  （OpenAIClientのbase_urlに指定すると、SDKのリトライや接続処理も含めて試せる）
+"""
+
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .llm_client import LLMClient, estimate_tokens
+
+
+# レイテンシの分布
+LATENCY_DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'exponential', 'lognormal')
+
+# 既定のテンプレート: プロンプトの現在のテストコードに、通るテスト関数を1つ追加する
+DEFAULT_TEMPLATE = '''{test_code}
+
+
+def test_fake_generated_{index}():
+    """疑似LLMが追加したテスト"""
+    assert {index} == {index}'''
+
+# TestMutatorのプロンプトで、現在のテストコードを囲むコードブロック
+_CURRENT_TEST_CODE = re.compile(r'現在のテストコード:\s*```python\n(.*?)\n```', re.DOTALL)
+# TestMutator.mutate_manyのプロンプトで、変異版の数
+_VARIANT_COUNT = re.compile(r'(\d+)個の独立した変異版')
+
+
+class FakeAPIError(RuntimeError):
+    """疑似プロバイダーのエラー応答（500または429）"""
+
+    def __init__(self, status: int):
+        self.status = status
+        super().__init__(
+            '429 rate limit exceeded' if status == 429 else '500 internal server error'
+        )
+
+
+class FakeLLMClient(LLMClient):
+    """
+    応答をその場で作る疑似LLMクライアント
+
+    出力は responses（順に繰り返す）か template（str.formatで {test_code}, {index}, {model},
+    {system_prompt}, {user_prompt} を埋めて ```python で囲む）から作る。どちらもない場合は DEFAULT_TEMPLATE を使う。
+    テンプレートの場合、mutate_manyのプロンプトには変異版の区切り行付きで複数の変異版を返す
+    """
+
+    supports_n = True
+    supports_streaming = True
+
+    def __init__(
+        self,
+        model: str = "fake-model",
+        latency_mean: float = 0.0,
+        latency_sigma: float = 0.0,
+        latency_distribution: str = 'constant',
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        responses: Optional[Sequence[str]] = None,
+        template: Optional[str] = None,
+        cost_per_1m_tokens: Tuple[float, float] = (0.10, 0.40),
+        chunk_size: int = 16,
+        chunk_latency: float = 0.0,
+        trailing_text: str = '',
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            model: モデル名
+            latency_mean: レイテンシの平均（秒。lognormalの場合は中央値）
+            latency_sigma: レイテンシのばらつき（uniformは平均±sigma、normalは標準偏差、lognormalは対数の標準偏差）
+            latency_distribution: 'constant', 'uniform', 'normal', 'exponential', 'lognormal'
+            error_rate: サーバーエラー（500）を返す確率
+            rate_limit_rate: レート制限（429）を返す確率
+            responses: 固定の応答（呼び出しごとに順に使う）
+            template: 応答のコードのテンプレート（コードブロックのフェンスは付けない）
+            cost_per_1m_tokens: 1Mトークンあたりの (入力コスト, 出力コスト)
+            chunk_size: ストリーミングの1チャンクの文字数
+            chunk_latency: 1チャンクの生成にかかる時間（秒。ストリーミングでない場合は全チャンク分を待つ）
+            trailing_text: 応答の後に続ける説明文（ストリーミングの打ち切りの効果を試す）
+            seed: 乱数シード（レイテンシとエラーの再現用）
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution: {latency_distribution} "
+                f"(expected one of {', '.join(LATENCY_DISTRIBUTIONS)})"
+            )
+        self.model = model
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.latency_distribution = latency_distribution
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responses = list(responses) if responses else None
+        self.template = template if template is not None else DEFAULT_TEMPLATE
+        self.cost_per_1m_tokens = tuple(cost_per_1m_tokens)
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_latency = chunk_latency
+        self.trailing_text = trailing_text
+
+        self.num_calls = 0
+        self.num_errors = 0
+        self.num_rate_limited = 0
+        # 並行リクエストやHTTPサーバーのスレッドから呼ばれるため、乱数と集計をロックで守る
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_latency(self) -> float:
+        """
+        1回の呼び出しのレイテンシを分布から引く
+
+        Returns:
+            レイテンシ（秒、0以上）
+        """
+        mean, sigma = self.latency_mean, self.latency_sigma
+        with self._lock:
+            if self.latency_distribution == 'uniform':
+                latency = self._rng.uniform(mean - sigma, mean + sigma)
+            elif self.latency_distribution == 'normal':
+                latency = self._rng.gauss(mean, sigma)
+            elif self.latency_distribution == 'exponential':
+                latency = self._rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+            elif self.latency_distribution == 'lognormal':
+                latency = mean * self._rng.lognormvariate(0.0, sigma) if mean > 0 else 0.0
+            else:
+                latency = mean
+        return max(0.0, latency)
+
+    def next_index(self) -> int:
+        """
+        1回の呼び出しの結果を決める（呼び出し回数も数える）
+
+        Returns:
+            成功した呼び出しの通し番号（1から）
+
+        Raises:
+            FakeAPIError: 429または500を返す場合
+        """
+        with self._lock:
+            self.num_calls += 1
+            draw = self._rng.random()
+            if draw < self.rate_limit_rate:
+                self.num_rate_limited += 1
+                raise FakeAPIError(429)
+            if draw < self.rate_limit_rate + self.error_rate:
+                self.num_errors += 1
+                raise FakeAPIError(500)
+            return self.num_calls - self.num_rate_limited - self.num_errors
+
+    def render(self, system_prompt: str, user_prompt: str, index: int) -> str:
+        """
+        応答のテキストを作る（trailing_textを含む）
+
+        Args:
+            system_prompt: システムプロンプト
+            user_prompt: ユーザープロンプト
+            index: 成功した呼び出しの通し番号（1から）
+
+        Returns:
+            応答のテキスト
+        """
+        if self.responses:
+            return self.responses[(index - 1) % len(self.responses)] + self.trailing_text
+
+        match = _CURRENT_TEST_CODE.search(user_prompt)
+        variants = _VARIANT_COUNT.search(user_prompt)
+        if variants is None:
+            code = self.template.format(
+                test_code=match.group(1) if match else '',
+                index=index,
+                model=self.model,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt
+            )
+        else:
+            code = "\n\n".join(
+                f"# === variant {variant} ===\n" + self.template.format(
+                    test_code=match.group(1) if match else '',
+                    index=f"{index}_{variant}",
+                    model=self.model,
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt
+                )
+                for variant in range(1, int(variants.group(1)) + 1)
+            )
+        return f"```python\n{code}\n```{self.trailing_text}"
+
+    def chunks(self, text: str) -> List[str]:
+        """応答のテキストをストリーミングのチャンクに分ける"""
+        return [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)]
+
+    def _complete(self, system_prompt: str, user_prompt: str) -> str:
+        """結果を決めて応答を作り、トークン数を記録する"""
+        text = self.render(system_prompt, user_prompt, self.next_index())
+        self._record_usage(estimate_tokens(system_prompt + user_prompt), estimate_tokens(text))
+        return text
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens)
+        try:
+            if self.streaming and self.supports_streaming:
+                return self._generate_streaming(system_prompt, user_prompt, temperature, max_tokens)
+            time.sleep(self.sample_latency())
+            text = self._complete(system_prompt, user_prompt)
+            time.sleep(self.chunk_latency * len(self.chunks(text)))
+            return text
+
+        except FakeAPIError as e:
+            # 実際のクライアントと同じく、エラーは表示してNoneを返す
+            print(f"Fake API error: {e} ({self.model})")
+            return None
+
+    def generate_n(
+        self, system_prompt, user_prompt, n, temperature=0.7, max_tokens=2000
+    ) -> Optional[List[str]]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens * n)
+        try:
+            time.sleep(self.sample_latency())
+            index = self.next_index()
+            # 1回の呼び出しの中で応答ごとに別のテスト名になるよう、番号を分ける
+            texts = [self.render(system_prompt, user_prompt, index * 100 + i) for i in range(n)]
+            self._record_usage(
+                estimate_tokens(system_prompt + user_prompt), sum(estimate_tokens(t) for t in texts)
+            )
+            return texts
+
+        except FakeAPIError as e:
+            print(f"Fake API error: {e} ({self.model})")
+            return None
+
+    async def _agenerate(
+        self, system_prompt, user_prompt, temperature, max_tokens
+    ) -> Optional[str]:
+        # スレッドを使わずに待つので、並行数はプールのセマフォだけで決まる
+        try:
+            if self.streaming and self.supports_streaming:
+                return await self._agenerate_streaming(
+                    system_prompt, user_prompt, temperature, max_tokens
+                )
+            await asyncio.sleep(self.sample_latency())
+            text = self._complete(system_prompt, user_prompt)
+            await asyncio.sleep(self.chunk_latency * len(self.chunks(text)))
+            return text
+
+        except FakeAPIError as e:
+            print(f"Fake API error: {e} ({self.model})")
+            return None
+
+    def _stream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> Iterator[str]:
+        # 最初のチャンクまでの時間がレイテンシ、以降はチャンクごとにchunk_latency
+        time.sleep(self.sample_latency())
+        text = self.render(system_prompt, user_prompt, self.next_index())
+        for i, chunk in enumerate(self.chunks(text)):
+            if i > 0:
+                time.sleep(self.chunk_latency)
+            yield chunk
+
+    async def _astream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> AsyncIterator[str]:
+        await asyncio.sleep(self.sample_latency())
+        text = self.render(system_prompt, user_prompt, self.next_index())
+        for i, chunk in enumerate(self.chunks(text)):
+            if i > 0:
+                await asyncio.sleep(self.chunk_latency)
+            yield chunk
+
+    def get_provider_name(self) -> str:
+        return "Fake"
+
+    def get_model_name(self) -> str:
+        return self.model
+
+    def get_cost_per_1m_tokens(self) -> Tuple[float, float]:
+        return self.cost_per_1m_tokens
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        return {
+            'num_calls': self.num_calls,
+            'num_errors': self.num_errors,
+            'num_rate_limited': self.num_rate_limited
+        }
+
+
+class FakeOpenAIServer:
+    """
+    OpenAI互換のChat Completions APIを話すローカルHTTPサーバー
+
+    POST /v1/chat/completions に FakeLLMClient の振る舞い（レイテンシ、500、429）で応答する。
+    429にはRetry-Afterヘッダーを付ける。"stream": true の場合はServer-Sent Eventsでチャンクを送る
+    """
+
+    def __init__(
+        self,
+        fake: Optional[FakeLLMClient] = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+        retry_after: float = 1.0
+    ):
+        """
+        Args:
+            fake: 応答を作る疑似クライアント（Noneの場合は既定の設定）
+            host: 待ち受けるホスト
+            port: 待ち受けるポート（0の場合は空いているポート）
+            retry_after: 429の応答で返すRetry-After（秒）
+        """
+        self.fake = fake or FakeLLMClient()
+        self.retry_after = retry_after
+        self.requests: List[Dict[str, Any]] = []
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAIClientのbase_urlに渡すURL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(
+                self, status: int, body: Dict[str, Any],
+                headers: Optional[Dict[str, str]] = None
+            ):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+                    self._send_json(404, {'error': {
+                        'message': f'Unknown path: {self.path}', 'type': 'invalid_request_error'
+                    }})
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                try:
+                    request = json.loads(self.rfile.read(length) or b'{}')
+                except json.JSONDecodeError as e:
+                    self._send_json(400, {'error': {
+                        'message': str(e), 'type': 'invalid_request_error'
+                    }})
+                    return
+                server.requests.append(request)
+                status, body, headers = server.respond(request)
+                if isinstance(body, dict):
+                    self._send_json(status, body, headers)
+                    return
+
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                try:
+                    for event in body:
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # クライアントがストリームを打ち切った
+                    pass
+
+        return Handler
+
+    def respond(self, request: Dict[str, Any]) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Chat Completionsのリクエストに応答する（ハンドラーのスレッドで呼ばれる）
+
+        Args:
+            request: リクエストのJSON
+
+        Returns:
+            (ステータスコード, 応答のJSON または ストリーミングのイベントのイテレーター, 追加のヘッダー)
+        """
+        messages = request.get('messages', [])
+        system_prompt = '\n'.join(
+            m.get('content', '') for m in messages if m.get('role') == 'system'
+        )
+        user_prompt = '\n'.join(m.get('content', '') for m in messages if m.get('role') == 'user')
+
+        time.sleep(self.fake.sample_latency())
+        try:
+            index = self.fake.next_index()
+        except FakeAPIError as e:
+            if e.status == 429:
+                error = {'message': 'Rate limit exceeded', 'type': 'rate_limit_exceeded'}
+                return 429, {'error': error}, {'Retry-After': str(self.retry_after)}
+            return 500, {'error': {'message': 'Internal server error', 'type': 'server_error'}}, {}
+
+        text = self.fake.render(system_prompt, user_prompt, index)
+        usage = {
+            'prompt_tokens': estimate_tokens(system_prompt + user_prompt),
+            'completion_tokens': estimate_tokens(text),
+            'total_tokens': estimate_tokens(system_prompt + user_prompt) + estimate_tokens(text)
+        }
+        completion = {
+            'id': f'chatcmpl-fake-{index}',
+            'created': int(time.time()),
+            'model': request.get('model', self.fake.model)
+        }
+        if request.get('stream'):
+            include_usage = (request.get('stream_options') or {}).get('include_usage', False)
+            return 200, self._stream_events(completion, text, usage if include_usage else None), {}
+
+        return 200, dict(completion, **{
+            'object': 'chat.completion',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': text},
+                'finish_reason': 'stop'
+            }],
+            'usage': usage
+        }), {}
+
+    def _stream_events(
+        self,
+        completion: Dict[str, Any],
+        text: str,
+        usage: Optional[Dict[str, int]]
+    ) -> Iterator[Dict[str, Any]]:
+        """ストリーミングのチャンク（chat.completion.chunk）を生成する"""
+        chunk = dict(completion, object='chat.completion.chunk')
+        for i, piece in enumerate(self.fake.chunks(text)):
+            if i > 0:
+                time.sleep(self.fake.chunk_latency)
+            delta = {'content': piece}
+            yield dict(chunk, choices=[{'index': 0, 'delta': delta, 'finish_reason': None}])
+        yield dict(chunk, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}])
+        if usage is not None:
+            yield dict(chunk, choices=[], usage=usage)
+
+    def start(self) -> 'FakeOpenAIServer':
+        """バックグラウンドのスレッドで待ち受けを開始"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """待ち受けを停止"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeOpenAIServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -5,9 +5,113 @@ OpenAI, Gemini, Anthropicをサポート
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any, List, Tuple
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Iterator, AsyncIterator
+import asyncio
+import hashlib
+import json
 import os
+import sqlite3
 import sys
+import threading
+import time
+
+
+# 直前のLLM呼び出しの記録（モデル、トークン数、コスト、レイテンシ）。
+# スレッドごと・asyncioのタスクごとに別の値になる
+_last_call: ContextVar[Optional[Dict[str, Any]]] = ContextVar('last_llm_call', default=None)
+# ストリーミングの集計は島のスレッドと非同期プールのスレッドから更新される
+_stream_stats_lock = threading.Lock()
+# agenerateがレート制限の枠を取った後にスレッドでgenerateを呼ぶ間はTrue（同じ呼び出しで2回取らない）
+_rate_limit_taken: ContextVar[bool] = ContextVar('rate_limit_taken', default=False)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数の概算（レート制限の予約に使う）
+
+    Args:
+        text: テキスト
+
+    Returns:
+        概算トークン数（4文字 ≒ 1トークン）
+    """
+    return len(text) // 4 + 1
+
+
+class CodeBlockDetector:
+    """
+    ストリーミング中の応答から、最初のPythonコードブロックの終わりを検出する
+
+    言語指定がpython・pyまたはなしのブロックが閉じた時点で完了とする（他の言語のブロックは読み飛ばす）
+    """
+
+    def __init__(self):
+        self.text = ''
+        # 完了した場合、コードブロックの閉じフェンスの直後の位置
+        self.end: Optional[int] = None
+        self._scan = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        受け取ったテキストを追加
+
+        Args:
+            chunk: ストリームのテキストの断片
+
+        Returns:
+            最初のPythonコードブロックが閉じた場合True
+        """
+        self.text += chunk
+        while self.end is None:
+            opening = self.text.find('```', self._scan)
+            if opening == -1:
+                break
+            line_end = self.text.find('\n', opening)
+            if line_end == -1:
+                break  # 言語指定がまだ届いていない
+            closing = self.text.find('\n```', line_end)
+            if closing == -1:
+                break
+            if self.text[opening + 3:line_end].strip().lower() in ('python', 'py', ''):
+                self.end = closing + 4
+            else:
+                self._scan = closing + 4
+        return self.complete
+
+    def result(self) -> str:
+        """閉じフェンスまでのテキスト（完了していない場合は受け取った全て）"""
+        return self.text[:self.end] if self.complete else self.text
+
+
+def summarize_streams(stats: List[Dict[str, float]]) -> Dict[str, Any]:
+    """
+    クライアントごとのストリーミングの集計をまとめる
+
+    Args:
+        stats: LLMClientの_stream_statsのリスト
+
+    Returns:
+        {'calls', 'stopped_early', 'early_stop_rate', 'mean_time_to_first_token',
+         'mean_time_to_code', 'output_tokens'}
+    """
+    calls = sum(s['calls'] for s in stats)
+    stopped_early = sum(s['stopped_early'] for s in stats)
+    time_to_first_token = sum(s['time_to_first_token'] for s in stats)
+    time_to_code = sum(s['time_to_code'] for s in stats)
+    return {
+        'calls': calls,
+        'stopped_early': stopped_early,
+        'early_stop_rate': stopped_early / calls if calls else 0.0,
+        'mean_time_to_first_token': time_to_first_token / calls if calls else 0.0,
+        'mean_time_to_code': time_to_code / calls if calls else 0.0,
+        'output_tokens': sum(s['output_tokens'] for s in stats)
+    }
 
 
 def safe_print(message: str):
@@ -34,6 +138,19 @@ def safe_print(message: str):
 class LLMClient(ABC):
     """LLMクライアントの抽象基底クラス"""
 
+    # トークン数とコストを記録する実行予算（shinka_qa.core.BudgetManager）
+    budget = None
+    # レート制限（shinka_qa.llm.async_pool.ProviderRateLimiter）。generate・generate_n・agenerateにかかる
+    rate_limiter = None
+    # Trueの場合はストリーミングで生成し、最初のPythonコードブロックが閉じた時点で打ち切る
+    streaming = False
+    # Trueの場合、_stream_chunks・_astream_chunksを実装していてストリーミングで生成できる
+    supports_streaming = False
+    # ストリーミングの集計（最初のストリームで作成）
+    _stream_stats = None
+    # Trueの場合、generate_nで1回のリクエストから複数の応答を生成できる（OpenAIのn、Geminiのcandidate_count）
+    supports_n = False
+
     @abstractmethod
     def generate(
         self,
@@ -76,25 +193,440 @@ class LLMClient(ABC):
         """
         pass
 
+    def get_route_name(self) -> str:
+        """
+        ルーティングの腕の名前を取得（同じモデルを複数のプロバイダーで使う場合も区別する）
+
+        Returns:
+            "<プロバイダー名>/<モデル名>"
+        """
+        return f"{self.get_provider_name()}/{self.get_model_name()}"
+
+    def set_budget(self, budget):
+        """
+        トークン数とコストを記録する実行予算を設定
+
+        Args:
+            budget: BudgetManagerインスタンス
+        """
+        self.budget = budget
+
+    def _record_usage(self, input_tokens: int, output_tokens: int):
+        """
+        1回の呼び出しのトークン数を実行予算に記録
+
+        Args:
+            input_tokens: 入力トークン数
+            output_tokens: 出力トークン数
+        """
+        cost_per_1m = self.get_cost_per_1m_tokens()
+        input_tokens = input_tokens or 0
+        output_tokens = output_tokens or 0
+        _last_call.set({
+            'model': self.get_model_name(),
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'cost': (input_tokens * cost_per_1m[0] + output_tokens * cost_per_1m[1]) / 1_000_000
+        })
+        if self.budget is not None:
+            self.budget.record_llm_usage(input_tokens, output_tokens, cost_per_1m)
+
+    def take_last_call(self) -> Optional[Dict[str, Any]]:
+        """
+        このスレッドでの直前のLLM呼び出しの記録を取り出す（取り出した記録は消える）
+
+        Returns:
+            {'model', 'input_tokens', 'output_tokens', 'cost',
+            'route'と'latency'（MultiProviderLLMClientのみ）}、
+            記録がない場合はNone
+        """
+        last_call = _last_call.get()
+        _last_call.set(None)
+        return last_call
+
+    def set_rate_limiter(self, rate_limiter):
+        """
+        レート制限を設定（同期のgenerateと非同期のagenerateで同じ枠を共有する）
+
+        Args:
+            rate_limiter: ProviderRateLimiter（Noneで解除）
+        """
+        self.rate_limiter = rate_limiter
+
+    def _wait_for_rate_limit(self, prompt: str, max_tokens: int):
+        """
+        同期の呼び出しの前に、レート制限の枠が空くまで待つ（プロバイダーのgenerate・generate_nが呼ぶ）
+
+        Args:
+            prompt: システムプロンプト + ユーザープロンプト
+            max_tokens: 予約する出力トークン数
+        """
+        if self.rate_limiter is not None and not _rate_limit_taken.get():
+            self.rate_limiter.acquire_blocking(estimate_tokens(prompt) + max_tokens)
+
+    def generate_n(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        n: int,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[List[str]]:
+        """
+        1回のリクエストで独立した応答をn個生成（入力トークンは1回分）
+
+        Args:
+            system_prompt: システムプロンプト
+            user_prompt: ユーザープロンプト
+            n: 応答の数
+            temperature: 温度パラメータ (0.0-1.0)
+            max_tokens: 応答1つあたりの最大トークン数
+
+        Returns:
+            生成されたテキストのリスト、失敗時またはsupports_nがFalseの場合はNone
+        """
+        return None
+
+    def set_streaming(self, enabled: bool = True):
+        """
+        ストリーミング生成を設定
+
+        supports_streamingがFalseのクライアントは、設定しても通常の生成のまま
+
+        Args:
+            enabled: Trueの場合、応答をストリーミングで受け取り、最初のPythonコードブロックが閉じた時点で
+                打ち切る（コードの後の説明文の出力トークンとレイテンシを省く）
+        """
+        self.streaming = enabled
+
+    def get_streaming_statistics(self) -> Dict[str, Any]:
+        """
+        ストリーミングの統計情報を取得
+
+        Returns:
+            summarize_streamsの辞書
+        """
+        return summarize_streams([self._stream_stats] if self._stream_stats else [])
+
+    def _generate_streaming(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """
+        ストリーミングで生成し、最初のPythonコードブロックが閉じたらストリームを打ち切る
+
+        supports_streamingがTrueのプロバイダーは、応答のテキストを届いた順に返すジェネレーター
+        _stream_chunks(system_prompt, user_prompt, temperature, max_tokens, usage) を実装する。
+        途中でclose()された場合はストリームを閉じ、トークン数が分かればusageの
+        'input_tokens'・'output_tokens'に書き込む
+        """
+        started = time.monotonic()
+        usage: Dict[str, int] = {}
+        detector = CodeBlockDetector()
+        first_token = None
+        time_to_code = None
+        stopped_early = False
+        chunks = self._stream_chunks(system_prompt, user_prompt, temperature, max_tokens, usage)
+        try:
+            for chunk in chunks:
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                if detector.feed(chunk):
+                    time_to_code = time.monotonic() - started
+                    # 閉じフェンスが最後のチャンクだった場合は、打ち切ったことにしない
+                    stopped_early = next(chunks, None) is not None
+                    break
+        finally:
+            chunks.close()
+        return self._finish_stream(
+            detector, stopped_early, usage, started, first_token, time_to_code,
+            system_prompt + user_prompt
+        )
+
+    async def _agenerate_streaming(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """_generate_streamingの非同期版（プロバイダーは非同期ジェネレーター_astream_chunksを実装する）"""
+        started = time.monotonic()
+        usage: Dict[str, int] = {}
+        detector = CodeBlockDetector()
+        first_token = None
+        time_to_code = None
+        stopped_early = False
+        chunks = self._astream_chunks(system_prompt, user_prompt, temperature, max_tokens, usage)
+        try:
+            async for chunk in chunks:
+                if first_token is None:
+                    first_token = time.monotonic() - started
+                if detector.feed(chunk):
+                    time_to_code = time.monotonic() - started
+                    stopped_early = await anext(chunks, None) is not None
+                    break
+        finally:
+            await chunks.aclose()
+        return self._finish_stream(
+            detector, stopped_early, usage, started, first_token, time_to_code,
+            system_prompt + user_prompt
+        )
+
+    def _finish_stream(
+        self,
+        detector: CodeBlockDetector,
+        stopped_early: bool,
+        usage: Dict[str, int],
+        started: float,
+        first_token: Optional[float],
+        time_to_code: Optional[float],
+        prompt: str
+    ) -> Optional[str]:
+        """ストリームのトークン数と、最初の使える候補までの時間を記録"""
+        if time_to_code is None:
+            # コードブロックが閉じなかった場合は、ストリームの終わりまでの時間
+            time_to_code = time.monotonic() - started
+        if first_token is None:
+            first_token = time_to_code
+        text = detector.result()
+        # 打ち切った場合、プロバイダーは出力トークン数を返さないので受け取ったテキストから概算する
+        if stopped_early or 'output_tokens' not in usage:
+            output_tokens = estimate_tokens(text)
+        else:
+            output_tokens = usage['output_tokens']
+        self._record_usage(usage.get('input_tokens') or estimate_tokens(prompt), output_tokens)
+        _last_call.get().update({
+            'time_to_first_token': first_token,
+            'time_to_code': time_to_code,
+            'stopped_early': stopped_early
+        })
+
+        with _stream_stats_lock:
+            if self._stream_stats is None:
+                self._stream_stats = {
+                    'calls': 0,
+                    'stopped_early': 0,
+                    'time_to_first_token': 0.0,
+                    'time_to_code': 0.0,
+                    'output_tokens': 0
+                }
+            self._stream_stats['calls'] += 1
+            self._stream_stats['stopped_early'] += int(stopped_early)
+            self._stream_stats['time_to_first_token'] += first_token
+            self._stream_stats['time_to_code'] += time_to_code
+            self._stream_stats['output_tokens'] += output_tokens
+        return text or None
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """
+        非同期でテキストを生成（レート制限がある場合は枠が空くまで待つ）
+
+        Args:
+            system_prompt: システムプロンプト
+            user_prompt: ユーザープロンプト
+            temperature: 温度パラメータ (0.0-1.0)
+            max_tokens: 最大トークン数
+
+        Returns:
+            生成されたテキスト、失敗時はNone
+        """
+        if self.rate_limiter is not None:
+            # 出力はmax_tokensまで予約する（プロバイダーのトークン数制限と同じ数え方）
+            tokens = estimate_tokens(system_prompt + user_prompt) + max_tokens
+            await self.rate_limiter.acquire(tokens)
+        return await self._agenerate(system_prompt, user_prompt, temperature, max_tokens)
+
+    async def _agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Optional[str]:
+        """
+        agenerateの本体。非同期クライアントのないプロバイダーは、generateをスレッドで実行する
+        """
+        def call():
+            # 枠はagenerateで取ったので、generateでは待たない（スレッドのコンテキストはこのタスクのコピー）
+            _rate_limit_taken.set(self.rate_limiter is not None)
+            result = self.generate(system_prompt, user_prompt, temperature, max_tokens)
+            return result, self.take_last_call()
+
+        result, last_call = await asyncio.to_thread(call)
+        # スレッド側で記録した呼び出しを、このタスクの記録にする
+        _last_call.set(last_call)
+        return result
+
+    async def agenerate_n(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        n: int,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[List[str]]:
+        """
+        generate_nの非同期版（レート制限がある場合は枠が空くまで待ち、generate_nをスレッドで実行する）
+
+        Args:
+            system_prompt: システムプロンプト
+            user_prompt: ユーザープロンプト
+            n: 応答の数
+            temperature: 温度パラメータ (0.0-1.0)
+            max_tokens: 応答1つあたりの最大トークン数
+
+        Returns:
+            生成されたテキストのリスト、失敗時またはsupports_nがFalseの場合はNone
+        """
+        if self.rate_limiter is not None:
+            tokens = estimate_tokens(system_prompt + user_prompt) + max_tokens * n
+            await self.rate_limiter.acquire(tokens)
+
+        def call():
+            _rate_limit_taken.set(self.rate_limiter is not None)
+            result = self.generate_n(system_prompt, user_prompt, n, temperature, max_tokens)
+            return result, self.take_last_call()
+
+        result, last_call = await asyncio.to_thread(call)
+        _last_call.set(last_call)
+        return result
+
 
 class OpenAIClient(LLMClient):
     """OpenAI APIクライアント"""
 
+    supports_n = True
+    supports_streaming = True
+
     # モデルごとの料金 (USD per 1M tokens)
     PRICING = {
         "gpt-5-nano": (0.50, 2.00),
         "gpt-4-turbo": (10.00, 30.00),
     }
 
-    def __init__(self, api_key: str, model: str = "gpt-5-nano"):
+    def __init__(self, api_key: str, model: str = "gpt-5-nano", base_url: Optional[str] = None):
         """
         Args:
             api_key: OpenAI APIキー
             model: モデル名 (gpt-5-nano, gpt-4-turbo等)
+            base_url: OpenAI互換APIのURL（FakeOpenAIServerなど。Noneの場合はOpenAIのAPI）
         """
         from openai import OpenAI
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.api_key = api_key
+        self.base_url = base_url
         self.model = model
+        # 非同期クライアント（agenerateの初回呼び出しで作成）
+        self._async_client = None
+
+    def _request_params(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        """chat.completions.createの引数"""
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_completion_tokens": max_tokens
+        }
+
+        # gpt-5-nanoはtemperatureをサポートしない
+        if not ("gpt-5" in self.model.lower() and "nano" in self.model.lower()):
+            params["temperature"] = temperature
+        return params
+
+    def _read_response(self, response) -> str:
+        """応答からトークン数を記録し、テキストを取り出す"""
+        usage = getattr(response, 'usage', None)
+        self._record_usage(
+            getattr(usage, 'prompt_tokens', 0),
+            getattr(usage, 'completion_tokens', 0)
+        )
+        return response.choices[0].message.content
+
+    def _get_async_client(self):
+        """非同期クライアント（初回呼び出しで作成）"""
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._async_client
+
+    @staticmethod
+    def _read_chunk(chunk, usage: Dict[str, int]) -> str:
+        """ストリームの1チャンクからテキストを取り出す（最後のチャンクにはトークン数が入る）"""
+        if getattr(chunk, 'usage', None):
+            usage['input_tokens'] = chunk.usage.prompt_tokens
+            usage['output_tokens'] = chunk.usage.completion_tokens
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content
+        return ''
+
+    def _stream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> Iterator[str]:
+        stream = self.client.chat.completions.create(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            for chunk in stream:
+                text = self._read_chunk(chunk, usage)
+                if text:
+                    yield text
+        finally:
+            stream.close()
+
+    async def _astream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> AsyncIterator[str]:
+        stream = await self._get_async_client().chat.completions.create(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in stream:
+                text = self._read_chunk(chunk, usage)
+                if text:
+                    yield text
+        finally:
+            await stream.close()
+
+    def generate_n(
+        self, system_prompt, user_prompt, n, temperature=0.7, max_tokens=2000
+    ) -> Optional[List[str]]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens * n)
+        try:
+            response = self.client.chat.completions.create(
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens), n=n
+            )
+            # 出力トークン数は全ての応答の合計
+            usage = getattr(response, 'usage', None)
+            self._record_usage(
+                getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0)
+            )
+            return [choice.message.content for choice in response.choices]
+
+        except Exception as e:
+            print(f"OpenAI API error: {e}")
+            return None
 
     def generate(
         self,
@@ -103,22 +635,31 @@ class OpenAIClient(LLMClient):
         temperature: float = 0.7,
         max_tokens: int = 2000
     ) -> Optional[str]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens)
         try:
-            params = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "max_completion_tokens": max_tokens
-            }
+            if self.streaming and self.supports_streaming:
+                return self._generate_streaming(system_prompt, user_prompt, temperature, max_tokens)
+            response = self.client.chat.completions.create(
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+            )
+            return self._read_response(response)
 
-            # gpt-5-nanoはtemperatureをサポートしない
-            if not ("gpt-5" in self.model.lower() and "nano" in self.model.lower()):
-                params["temperature"] = temperature
+        except Exception as e:
+            print(f"OpenAI API error: {e}")
+            return None
 
-            response = self.client.chat.completions.create(**params)
-            return response.choices[0].message.content
+    async def _agenerate(
+        self, system_prompt, user_prompt, temperature, max_tokens
+    ) -> Optional[str]:
+        try:
+            if self.streaming and self.supports_streaming:
+                return await self._agenerate_streaming(
+                    system_prompt, user_prompt, temperature, max_tokens
+                )
+            response = await self._get_async_client().chat.completions.create(
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+            )
+            return self._read_response(response)
 
         except Exception as e:
             print(f"OpenAI API error: {e}")
@@ -138,6 +679,9 @@ class OpenAIClient(LLMClient):
 class GeminiClient(LLMClient):
     """Google Gemini APIクライアント"""
 
+    supports_n = True
+    supports_streaming = True
+
     # モデルごとの料金 (USD per 1M tokens)
     PRICING = {
         "gemini-2.5-flash": (0.075, 0.30),
@@ -155,6 +699,111 @@ class GeminiClient(LLMClient):
         self.model_name = model
         self.model = genai.GenerativeModel(model)
 
+    @staticmethod
+    def _request_params(
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        """generate_contentの引数"""
+        # Gemini APIでは、system_instructionをモデル初期化時に設定可能
+        # ただし、ここでは実行時に設定するため、プロンプトに統合
+        return {
+            "contents": f"{system_prompt}\n\n{user_prompt}",
+            "generation_config": {
+                "temperature": temperature,
+                "max_output_tokens": max_tokens,
+            }
+        }
+
+    def _read_response(self, response) -> str:
+        """応答からトークン数を記録し、テキストを取り出す"""
+        usage = getattr(response, 'usage_metadata', None)
+        self._record_usage(
+            getattr(usage, 'prompt_token_count', 0),
+            getattr(usage, 'candidates_token_count', 0)
+        )
+        return response.text
+
+    @staticmethod
+    def _read_chunk(chunk, usage: Dict[str, int]) -> str:
+        """ストリームの1チャンクからテキストを取り出す（チャンクごとにそこまでのトークン数が入る）"""
+        metadata = getattr(chunk, 'usage_metadata', None)
+        if metadata is not None:
+            usage['input_tokens'] = getattr(metadata, 'prompt_token_count', 0)
+            usage['output_tokens'] = getattr(metadata, 'candidates_token_count', 0)
+        try:
+            return chunk.text
+        except ValueError:
+            # テキストを含まないチャンク（終了理由のみなど）
+            return ''
+
+    @staticmethod
+    def _close_stream(response):
+        """
+        ストリーミングの応答を閉じる（途中で打ち切った場合に、残りのチャンクを受け取らないようにする）
+
+        応答自体にはcloseがないため、内部のイテレーターを閉じる（gRPCはcancel、RESTはclose）
+        """
+        iterator = getattr(response, '_iterator', None)
+        for method in ('cancel', 'close'):
+            if callable(getattr(iterator, method, None)):
+                getattr(iterator, method)()
+                return
+
+    def _stream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> Iterator[str]:
+        response = self.model.generate_content(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens),
+            stream=True
+        )
+        try:
+            for chunk in response:
+                text = self._read_chunk(chunk, usage)
+                if text:
+                    yield text
+        finally:
+            self._close_stream(response)
+
+    async def _astream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens),
+            stream=True
+        )
+        try:
+            async for chunk in response:
+                text = self._read_chunk(chunk, usage)
+                if text:
+                    yield text
+        finally:
+            self._close_stream(response)
+
+    def generate_n(
+        self, system_prompt, user_prompt, n, temperature=0.7, max_tokens=2000
+    ) -> Optional[List[str]]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens * n)
+        try:
+            params = self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+            params["generation_config"]["candidate_count"] = n
+            response = self.model.generate_content(**params)
+            usage = getattr(response, 'usage_metadata', None)
+            self._record_usage(
+                getattr(usage, 'prompt_token_count', 0),
+                getattr(usage, 'candidates_token_count', 0)
+            )
+            return [
+                ''.join(part.text for part in candidate.content.parts)
+                for candidate in response.candidates
+            ]
+
+        except Exception as e:
+            print(f"Gemini API error: {e}")
+            return None
+
     def generate(
         self,
         system_prompt: str,
@@ -162,22 +811,31 @@ class GeminiClient(LLMClient):
         temperature: float = 0.7,
         max_tokens: int = 2000
     ) -> Optional[str]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens)
         try:
-            # Gemini APIでは、system_instructionをモデル初期化時に設定可能
-            # ただし、ここでは実行時に設定するため、プロンプトに統合
-            combined_prompt = f"{system_prompt}\n\n{user_prompt}"
-
-            generation_config = {
-                "temperature": temperature,
-                "max_output_tokens": max_tokens,
-            }
-
+            if self.streaming and self.supports_streaming:
+                return self._generate_streaming(system_prompt, user_prompt, temperature, max_tokens)
             response = self.model.generate_content(
-                combined_prompt,
-                generation_config=generation_config
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
             )
+            return self._read_response(response)
 
-            return response.text
+        except Exception as e:
+            print(f"Gemini API error: {e}")
+            return None
+
+    async def _agenerate(
+        self, system_prompt, user_prompt, temperature, max_tokens
+    ) -> Optional[str]:
+        try:
+            if self.streaming and self.supports_streaming:
+                return await self._agenerate_streaming(
+                    system_prompt, user_prompt, temperature, max_tokens
+                )
+            response = await self.model.generate_content_async(
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+            )
+            return self._read_response(response)
 
         except Exception as e:
             print(f"Gemini API error: {e}")
@@ -197,6 +855,8 @@ class GeminiClient(LLMClient):
 class AnthropicClient(LLMClient):
     """Anthropic Claude APIクライアント"""
 
+    supports_streaming = True
+
     # モデルごとの料金 (USD per 1M tokens)
     PRICING = {
         "claude-4.5-haiku": (0.25, 1.25),
@@ -211,7 +871,78 @@ class AnthropicClient(LLMClient):
         """
         from anthropic import Anthropic
         self.client = Anthropic(api_key=api_key)
+        self.api_key = api_key
         self.model = model
+        # 非同期クライアント（agenerateの初回呼び出しで作成）
+        self._async_client = None
+
+    def _request_params(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        """messages.createの引数"""
+        return {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": system_prompt,
+            "messages": [
+                {"role": "user", "content": user_prompt}
+            ]
+        }
+
+    def _read_response(self, response) -> str:
+        """応答からトークン数を記録し、テキストを取り出す"""
+        usage = getattr(response, 'usage', None)
+        self._record_usage(
+            getattr(usage, 'input_tokens', 0),
+            getattr(usage, 'output_tokens', 0)
+        )
+        return response.content[0].text
+
+    def _get_async_client(self):
+        """非同期クライアント（初回呼び出しで作成）"""
+        if self._async_client is None:
+            from anthropic import AsyncAnthropic
+            self._async_client = AsyncAnthropic(api_key=self.api_key)
+        return self._async_client
+
+    @staticmethod
+    def _read_event(event, usage: Dict[str, int]) -> str:
+        """ストリームの1イベントからテキストを取り出す（開始時に入力、差分に出力のトークン数が入る）"""
+        if event.type == 'message_start':
+            usage['input_tokens'] = event.message.usage.input_tokens
+        elif event.type == 'message_delta':
+            usage['output_tokens'] = event.usage.output_tokens
+        elif event.type == 'content_block_delta' and event.delta.type == 'text_delta':
+            return event.delta.text
+        return ''
+
+    def _stream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> Iterator[str]:
+        # withを抜けるとHTTPの応答が閉じられる（途中で打ち切った場合も）
+        with self.client.messages.stream(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+        ) as stream:
+            for event in stream:
+                text = self._read_event(event, usage)
+                if text:
+                    yield text
+
+    async def _astream_chunks(
+        self, system_prompt, user_prompt, temperature, max_tokens, usage
+    ) -> AsyncIterator[str]:
+        async with self._get_async_client().messages.stream(
+            **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+        ) as stream:
+            async for event in stream:
+                text = self._read_event(event, usage)
+                if text:
+                    yield text
 
     def generate(
         self,
@@ -220,18 +951,31 @@ class AnthropicClient(LLMClient):
         temperature: float = 0.7,
         max_tokens: int = 2000
     ) -> Optional[str]:
+        self._wait_for_rate_limit(system_prompt + user_prompt, max_tokens)
         try:
+            if self.streaming and self.supports_streaming:
+                return self._generate_streaming(system_prompt, user_prompt, temperature, max_tokens)
             response = self.client.messages.create(
-                model=self.model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ]
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
             )
+            return self._read_response(response)
+
+        except Exception as e:
+            print(f"Anthropic API error: {e}")
+            return None
 
-            return response.content[0].text
+    async def _agenerate(
+        self, system_prompt, user_prompt, temperature, max_tokens
+    ) -> Optional[str]:
+        try:
+            if self.streaming and self.supports_streaming:
+                return await self._agenerate_streaming(
+                    system_prompt, user_prompt, temperature, max_tokens
+                )
+            response = await self._get_async_client().messages.create(
+                **self._request_params(system_prompt, user_prompt, temperature, max_tokens)
+            )
+            return self._read_response(response)
 
         except Exception as e:
             print(f"Anthropic API error: {e}")
@@ -253,10 +997,12 @@ class MultiProviderLLMClient(LLMClient):
     複数のLLMプロバイダーを管理し、コスト最適化とフォールバックを行うクライアント
     """
 
-    def __init__(self, clients: List[LLMClient]):
+    def __init__(self, clients: List[LLMClient], router=None):
         """
         Args:
             clients: LLMクライアントのリスト
+            router: プロバイダーを試す順序を決めるバンディット（CostAwareModelBandit）。
+                Noneの場合は常に最安のプロバイダーから試す
         """
         if not clients:
             raise ValueError("At least one client is required")
@@ -267,6 +1013,7 @@ class MultiProviderLLMClient(LLMClient):
             key=lambda c: sum(c.get_cost_per_1m_tokens()) / 2
         )
         self.current_client_index = 0
+        self.router = router
 
     def generate(
         self,
@@ -277,17 +1024,16 @@ class MultiProviderLLMClient(LLMClient):
     ) -> Optional[str]:
         """
         複数のプロバイダーを試して生成
-        最安のプロバイダーから順に試し、失敗したら次へフォールバック
+        最安のプロバイダー（routerがある場合はrouterが選んだ順）から試し、失敗したら次へフォールバック
         """
         last_error = None
 
-        for i, client in enumerate(self.clients):
+        for attempt, i in enumerate(self._provider_order()):
+            client = self.clients[i]
+            started = time.monotonic()
             try:
-                if i == 0:
-                    safe_print(f"💰 Using cheapest provider: {client.get_provider_name()} {client.get_model_name()}")
-                else:
-                    safe_print(f"⚠️  Fallback to: {client.get_provider_name()} {client.get_model_name()}")
-
+                self._announce(client, attempt)
+                self.take_last_call()
                 result = client.generate(
                     system_prompt=system_prompt,
                     user_prompt=user_prompt,
@@ -296,19 +1042,159 @@ class MultiProviderLLMClient(LLMClient):
                 )
 
                 if result is not None:
-                    self.current_client_index = i
-                    cost = client.get_cost_per_1m_tokens()
-                    safe_print(f"✅ Success! Cost: ${cost[0]:.3f}/${cost[1]:.3f} per 1M tokens (input/output)")
+                    self._on_success(i, started)
+                    return result
+
+            except Exception as e:
+                last_error = e
+                safe_print(f"❌ {client.get_provider_name()} failed: {e}")
+
+            self._on_failure(client, started)
+
+        safe_print(f"❌ All providers failed. Last error: {last_error}")
+        return None
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """
+        複数のプロバイダーを試して非同期で生成（generateと同じ順序・フォールバック。レート制限は各プロバイダーのもの）
+        """
+        last_error = None
+
+        for attempt, i in enumerate(self._provider_order()):
+            client = self.clients[i]
+            started = time.monotonic()
+            try:
+                self._announce(client, attempt)
+                self.take_last_call()
+                result = await client.agenerate(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+
+                if result is not None:
+                    self._on_success(i, started)
                     return result
 
             except Exception as e:
                 last_error = e
                 safe_print(f"❌ {client.get_provider_name()} failed: {e}")
-                continue
+
+            self._on_failure(client, started)
 
         safe_print(f"❌ All providers failed. Last error: {last_error}")
         return None
 
+    @property
+    def supports_n(self) -> bool:
+        return any(client.supports_n for client in self.clients)
+
+    def generate_n(
+        self, system_prompt, user_prompt, n, temperature=0.7, max_tokens=2000
+    ) -> Optional[List[str]]:
+        """
+        generate_nに対応するプロバイダーだけを、generateと同じ順序で試す
+        """
+        last_error = None
+
+        order = [i for i in self._provider_order() if self.clients[i].supports_n]
+        for attempt, i in enumerate(order):
+            client = self.clients[i]
+            started = time.monotonic()
+            try:
+                self._announce(client, attempt)
+                self.take_last_call()
+                results = client.generate_n(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    n=n,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+
+                if results:
+                    self._on_success(i, started)
+                    return results
+
+            except Exception as e:
+                last_error = e
+                safe_print(f"❌ {client.get_provider_name()} failed: {e}")
+
+            self._on_failure(client, started)
+
+        safe_print(f"❌ All providers failed. Last error: {last_error}")
+        return None
+
+    def _provider_order(self) -> List[int]:
+        """プロバイダーを試す順序（最安順、routerがある場合はrouterの順）"""
+        order = list(range(len(self.clients)))
+        if self.router is not None:
+            ranked = self.router.rank_models()
+            routes = [client.get_route_name() for client in self.clients]
+            order.sort(key=lambda i: ranked.index(routes[i])
+                       if routes[i] in ranked else len(ranked))
+        return order
+
+    def _announce(self, client: LLMClient, attempt: int):
+        """試すプロバイダーを表示"""
+        name = f"{client.get_provider_name()} {client.get_model_name()}"
+        if attempt > 0:
+            safe_print(f"⚠️  Fallback to: {name}")
+        elif self.router is None:
+            safe_print(f"💰 Using cheapest provider: {name}")
+        else:
+            safe_print(f"💰 Using routed provider: {name}")
+
+    def _on_success(self, index: int, started: float):
+        """成功した呼び出しの記録にルーティングの腕とレイテンシを加える（ルーティングの報酬に使う）"""
+        client = self.clients[index]
+        self.current_client_index = index
+        last_call = self.take_last_call() or {
+            'model': client.get_model_name(), 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0
+        }
+        last_call['route'] = client.get_route_name()
+        last_call['latency'] = time.monotonic() - started
+        _last_call.set(last_call)
+        cost = client.get_cost_per_1m_tokens()
+        safe_print(f"✅ Success! Cost: ${cost[0]:.3f}/${cost[1]:.3f} per 1M tokens (input/output)")
+
+    def _on_failure(self, client: LLMClient, started: float):
+        """失敗した呼び出しもレイテンシとコストをルーティングに反映する（遅い・落ちているプロバイダーを避ける）"""
+        if self.router is not None:
+            failed_call = self.take_last_call() or {}
+            self.router.record_failure(
+                client.get_route_name(), failed_call.get('cost', 0.0), time.monotonic() - started
+            )
+
+    def set_budget(self, budget):
+        """各プロバイダーのクライアントに実行予算を設定"""
+        self.budget = budget
+        for client in self.clients:
+            client.set_budget(budget)
+
+    @property
+    def supports_streaming(self) -> bool:
+        return any(client.supports_streaming for client in self.clients)
+
+    def set_streaming(self, enabled: bool = True):
+        """各プロバイダーのクライアントにストリーミング生成を設定"""
+        self.streaming = enabled
+        for client in self.clients:
+            client.set_streaming(enabled)
+
+    def get_streaming_statistics(self) -> Dict[str, Any]:
+        """全てのプロバイダーのストリーミングの統計情報"""
+        return summarize_streams(
+            [client._stream_stats for client in self.clients if client._stream_stats]
+        )
+
     def get_provider_name(self) -> str:
         """現在使用中のプロバイダー名を取得"""
         if self.current_client_index < len(self.clients):
@@ -338,18 +1224,407 @@ class MultiProviderLLMClient(LLMClient):
         ]
 
 
+_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    call TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_by_last_used ON responses (last_used);
+"""
+
+# キャッシュのモード
+CACHE_MODES = ('readwrite', 'record', 'replay')
+
+
+class CacheMissError(RuntimeError):
+    """replayモードでキャッシュにない呼び出しが発生した"""
+
+
+class ResponseCache:
+    """
+    LLMの応答をSQLiteに保存するキャッシュ
+
+    キーはプロバイダー・モデル・温度・最大トークン数・システムプロンプトとユーザープロンプトのハッシュと、
+    同じ実行で同じ呼び出しが何回目か（サンプル番号）。
+    合計サイズがmax_size_mbを超えたら、最後に使われたのが古い応答から削除する
+    """
+
+    def __init__(self, path: Path, max_size_mb: float = 200.0):
+        """
+        Args:
+            path: SQLiteファイルのパス（親ディレクトリがなければ作成する）
+            max_size_mb: 保存する応答の合計サイズの上限（MB、Noneで無制限）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # 島のスレッドと非同期プールのスレッドから使うため、1つの接続をロックで守る
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.executescript(_CACHE_SCHEMA)
+        self._total_size = self._connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        system_prompt: str,
+        user_prompt: str,
+        n: int = 1,
+        sample: int = 0
+    ) -> str:
+        """
+        キャッシュのキーを計算
+
+        Args:
+            n: 1回のリクエストで生成する応答の数（generate_n）
+            sample: 同じ実行で同じ呼び出しが何回目か（0から。同じプロンプトの呼び出しごとに別の応答を保存する）
+
+        Returns:
+            SHA-256の16進文字列
+        """
+        parts = [
+            provider, model, round(float(temperature), 4), int(max_tokens),
+            hashlib.sha256(system_prompt.encode('utf-8')).hexdigest(),
+            hashlib.sha256(user_prompt.encode('utf-8')).hexdigest()
+        ]
+        if n != 1:
+            parts.append(int(n))
+        if sample:
+            parts.append(['sample', int(sample)])
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        保存された応答を取得（最後に使われた時刻を更新する）
+
+        Args:
+            key: make_keyのキー
+
+        Returns:
+            (応答, 保存時の呼び出しの記録)、ない場合はNone
+        """
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT response, call FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._connection:
+                self._connection.execute(
+                    'UPDATE responses SET last_used = ? WHERE key = ?', (time.time(), key)
+                )
+        return row[0], json.loads(row[1])
+
+    def put(
+        self, key: str, provider: str, model: str, response: str,
+        call: Optional[Dict[str, Any]] = None
+    ):
+        """
+        応答を保存（同じキーの応答は上書きする）
+
+        Args:
+            key: make_keyのキー
+            provider: プロバイダー名
+            model: モデル名
+            response: 生成されたテキスト
+            call: 呼び出しの記録（モデル、トークン数、コスト、レイテンシ）
+        """
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self._lock, self._connection:
+            previous = self._connection.execute(
+                'SELECT size FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            self._connection.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, provider, model, response, json.dumps(call or {}), size, now, now)
+            )
+            self._total_size += size - (previous[0] if previous else 0)
+            self._evict()
+
+    def _evict(self):
+        """合計サイズが上限を超えていれば、古い応答から上限の9割まで削除（ロックの中で呼ぶ）"""
+        if self.max_size is None or self._total_size <= self.max_size:
+            return
+        target = self.max_size * 0.9
+        rows = self._connection.execute(
+            'SELECT key, size FROM responses ORDER BY last_used'
+        )
+        stale = []
+        for key, size in rows:
+            if self._total_size <= target:
+                break
+            stale.append((key,))
+            self._total_size -= size
+        self._connection.executemany('DELETE FROM responses WHERE key = ?', stale)
+        self.evictions += len(stale)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        統計情報を取得
+
+        Returns:
+            統計情報の辞書
+        """
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'size_mb': self._total_size / (1024 * 1024),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+        """接続を閉じる"""
+        with self._lock:
+            self._connection.close()
+
+
+class CachedLLMClient(LLMClient):
+    """
+    応答キャッシュ付きのLLMクライアント（任意のLLMClientを包む）
+
+    モード:
+        readwrite: キャッシュにあれば返し、なければ呼び出して保存する
+        record: 常に呼び出して保存する（キャッシュを作り直す）
+        replay: キャッシュからのみ返し、ない場合はCacheMissErrorを送出する（オフラインでの再現・ベンチマーク用）
+
+    キャッシュから返した呼び出しはコスト0として記録し、実行予算とレート制限を消費しない。
+    同じ実行で同じプロンプトを再び呼び出した場合（同じ親と戦略の子、新規性フィルターの再変異）は
+    サンプル番号の違う別のキーになるので、前の応答を使い回さない
+    """
+
+    def __init__(self, client: LLMClient, cache: ResponseCache, mode: str = 'readwrite'):
+        """
+        Args:
+            client: 包むLLMクライアント（MultiProviderLLMClientの場合は、検出されたモデルの組で1つのキーにする）
+            cache: 応答キャッシュ
+            mode: 'readwrite', 'record', 'replay'
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(
+                f"Unknown cache mode: {mode} (expected one of {', '.join(CACHE_MODES)})"
+            )
+        self.client = client
+        self.cache = cache
+        self.mode = mode
+        # 呼び出しのキー -> この実行で呼び出した回数（次のサンプル番号）
+        self._samples: Dict[str, int] = {}
+        self._samples_lock = threading.Lock()
+
+        if hasattr(client, 'clients'):
+            self._identity = ('multi', ','.join(sorted(c.get_model_name() for c in client.clients)))
+        else:
+            self._identity = (client.get_provider_name(), client.get_model_name())
+
+    @property
+    def clients(self) -> List[LLMClient]:
+        """包んでいるクライアントの各プロバイダー（AsyncLLMPoolがレート制限を設定する）"""
+        return getattr(self.client, 'clients', [self.client])
+
+    @property
+    def router(self):
+        return getattr(self.client, 'router', None)
+
+    @router.setter
+    def router(self, router):
+        self.client.router = router
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """キャッシュにあれば応答を返し、呼び出しの記録をコスト0で設定する"""
+        if self.mode == 'record':
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            if self.mode == 'replay':
+                raise CacheMissError(
+                    f"No cached response for {self._identity[0]} {self._identity[1]} "
+                    f"(key {key[:12]})"
+                )
+            return None
+        response, call = entry
+        # レイテンシを含めないので、プロバイダーのルーティングの報酬にはならない
+        _last_call.set({
+            'model': call.get('model', self._identity[1]),
+            'input_tokens': 0,
+            'output_tokens': 0,
+            'cost': 0.0,
+            'cached': True
+        })
+        return response
+
+    def _store(self, key: str, response: Optional[str]):
+        """呼び出した結果を保存（失敗は保存しない）"""
+        if response is None:
+            return
+        call = _last_call.get()
+        self.cache.put(key, self._identity[0], self._identity[1], response, call)
+
+    def _key(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        n: int = 1
+    ) -> str:
+        """呼び出しのキー（同じ呼び出しの2回目以降はサンプル番号で区別する）"""
+        base = ResponseCache.make_key(
+            self._identity[0], self._identity[1], temperature, max_tokens,
+            system_prompt, user_prompt, n
+        )
+        with self._samples_lock:
+            sample = self._samples.get(base, 0)
+            self._samples[base] = sample + 1
+        if sample == 0:
+            return base
+        return ResponseCache.make_key(
+            self._identity[0], self._identity[1], temperature, max_tokens,
+            system_prompt, user_prompt, n, sample
+        )
+
+    @property
+    def supports_n(self) -> bool:
+        return self.client.supports_n
+
+    def generate_n(
+        self, system_prompt, user_prompt, n, temperature=0.7, max_tokens=2000
+    ) -> Optional[List[str]]:
+        """キャッシュを確認してから複数の応答を生成（応答のリストをJSONで保存する）"""
+        key = self._key(system_prompt, user_prompt, temperature, max_tokens, n)
+        cached = self._lookup(key)
+        if cached is not None:
+            return json.loads(cached)
+        _last_call.set(None)
+        responses = self.client.generate_n(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            n=n,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        self._store(key, json.dumps(responses) if responses else None)
+        return responses
+
+    def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """キャッシュを確認してから生成"""
+        key = self._key(system_prompt, user_prompt, temperature, max_tokens)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        _last_call.set(None)
+        response = self.client.generate(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        self._store(key, response)
+        return response
+
+    async def agenerate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2000
+    ) -> Optional[str]:
+        """キャッシュを確認してから非同期で生成（キャッシュから返す場合はレート制限の枠を取らない）"""
+        key = self._key(system_prompt, user_prompt, temperature, max_tokens)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        _last_call.set(None)
+        response = await self.client.agenerate(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        self._store(key, response)
+        return response
+
+    def set_budget(self, budget):
+        """包んでいるクライアントに実行予算を設定"""
+        self.budget = budget
+        self.client.set_budget(budget)
+
+    def set_rate_limiter(self, rate_limiter):
+        """包んでいるクライアントにレート制限を設定"""
+        self.client.set_rate_limiter(rate_limiter)
+
+    @property
+    def supports_streaming(self) -> bool:
+        return self.client.supports_streaming
+
+    def set_streaming(self, enabled: bool = True):
+        """包んでいるクライアントにストリーミング生成を設定"""
+        self.client.set_streaming(enabled)
+
+    def get_streaming_statistics(self) -> Dict[str, Any]:
+        return self.client.get_streaming_statistics()
+
+    def get_provider_name(self) -> str:
+        return self.client.get_provider_name()
+
+    def get_model_name(self) -> str:
+        return self.client.get_model_name()
+
+    def get_cost_per_1m_tokens(self) -> Tuple[float, float]:
+        return self.client.get_cost_per_1m_tokens()
+
+    def get_available_providers(self) -> List[str]:
+        """利用可能なプロバイダーのリストを取得"""
+        if hasattr(self.client, 'get_available_providers'):
+            return self.client.get_available_providers()
+        return [f"{self.get_provider_name()} {self.get_model_name()}"]
+
+
 def create_llm_client(
     provider: str,
     model: str,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None
 ) -> Optional[LLMClient]:
     """
     LLMクライアントを作成
 
     Args:
-        provider: プロバイダー名 ("openai", "gemini", "google", "anthropic")
+        provider: プロバイダー名 ("openai", "gemini", "google", "anthropic", "fake")
         model: モデル名
         api_key: APIキー（指定しない場合は環境変数から取得）
+        base_url: OpenAI互換APIのURL（providerが"openai"の場合のみ）
+        options: FakeLLMClientの引数（providerが"fake"の場合のみ）
 
     Returns:
         LLMClientインスタンス、失敗時はNone
@@ -360,6 +1635,15 @@ def create_llm_client(
     if provider == "google":
         provider = "gemini"
 
+    # 疑似プロバイダーはAPIキーもネットワークも使わない
+    if provider == "fake":
+        from .fake_llm import FakeLLMClient
+        return FakeLLMClient(model=model, **(options or {}))
+
+    # ローカルのOpenAI互換サーバーはAPIキーを確認しない
+    if provider == "openai" and api_key is None and base_url:
+        api_key = os.getenv("OPENAI_API_KEY") or "local"
+
     # APIキーを環境変数から取得（指定されていない場合）
     if api_key is None:
         if provider == "openai":
@@ -375,7 +1659,7 @@ def create_llm_client(
 
     try:
         if provider == "openai":
-            return OpenAIClient(api_key=api_key, model=model)
+            return OpenAIClient(api_key=api_key, model=model, base_url=base_url)
         elif provider == "gemini":
             return GeminiClient(api_key=api_key, model=model)
         elif provider == "anthropic":
@@ -400,6 +1684,7 @@ def create_multi_provider_client(
     Args:
         auto_detect: Trueの場合、環境変数から自動検出
         providers: プロバイダー設定のリスト [{"provider": "gemini", "model": "gemini-2.5-flash"}, ...]
+            （"base_url"・"options"はcreate_llm_clientに渡す）
 
     Returns:
         MultiProviderLLMClientインスタンス、失敗時はNone
@@ -443,7 +1728,9 @@ def create_multi_provider_client(
         for config in providers:
             provider = config.get("provider", "").lower()
             model = config.get("model", "")
-            client = create_llm_client(provider, model)
+            client = create_llm_client(
+                provider, model, base_url=config.get("base_url"), options=config.get("options")
+            )
             if client:
                 clients.append(client)
 
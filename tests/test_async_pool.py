@@ -0,0 +1,110 @@
+"""
+AsyncLLMPool（LLMリクエストの並行送信とレート制限）のテスト
+"""
+
+import time
+
+import pytest
+
+from shinka_qa.llm.async_pool import AsyncLLMPool, LLMRequest, ProviderRateLimiter, TokenBucket
+from shinka_qa.llm.fake_llm import FakeLLMClient
+
+
+def _requests(count):
+    return [LLMRequest('system', f'prompt {i}') for i in range(count)]
+
+
+def test_requests_run_concurrently():
+    """max_concurrencyの数までは同時に送るので、直列より速く終わる"""
+    fake = FakeLLMClient(latency_mean=0.1)
+    with AsyncLLMPool(fake, max_concurrency=6) as pool:
+        started = time.monotonic()
+        results = pool.generate_many(_requests(6))
+        elapsed = time.monotonic() - started
+
+    assert all(result is not None for result in results)
+    assert elapsed < 0.4
+    assert pool.get_statistics()['num_requests'] == 6
+
+
+def test_concurrency_is_capped():
+    """max_concurrency=1では1件ずつ送る"""
+    fake = FakeLLMClient(latency_mean=0.05)
+    with AsyncLLMPool(fake, max_concurrency=1) as pool:
+        started = time.monotonic()
+        pool.generate_many(_requests(4))
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.2
+
+
+def test_results_keep_request_order_and_calls():
+    """終わる順序がばらばらでも、結果と呼び出しの記録はリクエストの順に対応する"""
+    fake = FakeLLMClient(
+        latency_mean=0.05, latency_sigma=0.05, latency_distribution='uniform',
+        template='{user_prompt}', seed=0
+    )
+    with AsyncLLMPool(fake, max_concurrency=8) as pool:
+        results = pool.generate_many_with_calls(_requests(8))
+
+    for i, (text, call) in enumerate(results):
+        assert f'prompt {i}' in text
+        assert call['model'] == 'fake-model'
+        assert call['output_tokens'] > 0
+
+
+def test_should_send_skips_remaining_requests():
+    """送る直前の確認でFalseになったリクエストは送らず、結果はNone"""
+    fake = FakeLLMClient()
+    allowed = iter([True, True, False, False])
+    with AsyncLLMPool(fake, max_concurrency=1) as pool:
+        results = pool.generate_many_with_calls(_requests(4), should_send=lambda: next(allowed))
+
+    assert [text is not None for text, _ in results] == [True, True, False, False]
+    assert results[2] == (None, None)
+    assert fake.num_calls == 2
+    assert pool.get_statistics()['num_skipped'] == 2
+
+
+def test_failures_are_counted():
+    """失敗したリクエストはNoneになり、失敗数に数える"""
+    fake = FakeLLMClient(error_rate=1.0)
+    with AsyncLLMPool(fake) as pool:
+        results = pool.generate_many(_requests(3))
+
+    assert results == [None, None, None]
+    assert pool.get_statistics()['num_failures'] == 3
+
+
+def test_token_bucket_waits_for_refill():
+    """容量を使い切ると、補充速度に合わせて待つ"""
+    bucket = TokenBucket(600, capacity=2)
+    started = time.monotonic()
+    for _ in range(4):
+        bucket.acquire_blocking()
+    assert time.monotonic() - started == pytest.approx(0.2, abs=0.1)
+
+
+def test_rate_limit_is_shared_by_pool_and_sync_calls():
+    """プロバイダー名で設定したレート制限は、プールと同期のgenerateで同じ枠を使う"""
+    fake = FakeLLMClient()
+    with AsyncLLMPool(fake, rate_limits={'fake': {'requests_per_minute': 600}}) as pool:
+        assert isinstance(fake.rate_limiter, ProviderRateLimiter)
+        fake.rate_limiter.requests = TokenBucket(600, capacity=1)
+
+        started = time.monotonic()
+        pool.generate_many(_requests(2))
+        fake.generate('system', 'sync prompt')
+        elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.15
+
+
+def test_pool_restarts_after_close():
+    """closeした後に呼び出すと、イベントループを起動し直す"""
+    fake = FakeLLMClient()
+    pool = AsyncLLMPool(fake)
+    assert pool.generate_many(_requests(1))[0] is not None
+    pool.close()
+    assert pool.generate_many(_requests(1))[0] is not None
+    pool.close()
@@ -0,0 +1,124 @@
+"""
+バンディットの方策（スライディングウィンドウUCB・割引UCB・トンプソンサンプリング・EXP3）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from shinka_qa.evolution.ucb_bandit import (
+    BANDIT_POLICIES, EXP3Bandit, SlidingWindowUCBBandit, ThompsonSamplingBandit,
+    create_bandit, policy_parameters
+)
+
+
+def _seeded(policy, arms):
+    """乱数を使う方策にはシードを渡して作成"""
+    params = {'seed': 0} if 'seed' in policy_parameters(policy) else {}
+    return create_bandit(arms, policy, **params)
+
+
+def _play(bandit, probabilities, rounds, rng):
+    """ベルヌーイ報酬で選択と更新を繰り返し、選んだ腕の列を返す"""
+    chosen = []
+    for _ in range(rounds):
+        arm = bandit.select_arm()
+        bandit.update(arm, float(rng.random() < probabilities[arm]))
+        chosen.append(arm)
+    return chosen
+
+
+@pytest.mark.parametrize('policy', sorted(BANDIT_POLICIES))
+def test_policy_prefers_better_arm(policy):
+    """報酬の分布が変わらない場合は、どの方策も良い腕を多く選ぶ"""
+    bandit = _seeded(policy, ['good', 'bad'])
+    chosen = _play(bandit, {'good': 0.8, 'bad': 0.2}, 400, np.random.default_rng(1))
+
+    assert chosen.count('good') > 2 * chosen.count('bad')
+    assert bandit.get_best_arm() == 'good'
+
+
+@pytest.mark.parametrize('policy', ['sliding_window_ucb', 'discounted_ucb'])
+def test_non_stationary_policy_follows_switch(policy):
+    """途中で良い腕が入れ替わっても、ウィンドウ・割引で古い報酬を忘れて追従する"""
+    bandit = create_bandit(['a', 'b'], policy)
+    rng = np.random.default_rng(2)
+    _play(bandit, {'a': 0.9, 'b': 0.1}, 300, rng)
+    chosen = _play(bandit, {'a': 0.1, 'b': 0.9}, 300, rng)
+
+    assert chosen[-100:].count('b') > 80
+    assert bandit.get_best_arm() == 'b'
+
+
+def test_sliding_window_forgets_old_rewards():
+    """ウィンドウから外れた報酬は推定に残らない"""
+    bandit = SlidingWindowUCBBandit(['a', 'b'], window=3)
+    for reward in [1.0, 1.0, 0.0, 0.0, 0.0]:
+        bandit.update('a', reward)
+
+    stats = bandit.get_statistics()['a']
+    assert stats['estimated_reward'] == 0.0
+    assert stats['average_reward'] == pytest.approx(0.4)
+
+
+def test_sliding_window_state_keeps_recent_history():
+    """引き継ぐウィンドウは直近のdecayの割合の報酬だけ"""
+    previous = SlidingWindowUCBBandit(['a', 'b'], window=10)
+    for reward in [0.0, 0.0, 1.0, 1.0]:
+        previous.update('a', reward)
+
+    bandit = SlidingWindowUCBBandit(['a', 'b'], window=10)
+    bandit.load_state(previous.get_state(), decay=0.5)
+
+    assert list(bandit._history) == [(0, 1.0), (0, 1.0)]
+    assert bandit.get_statistics()['a']['estimated_reward'] == 1.0
+
+
+@pytest.mark.parametrize('policy', ['thompson', 'exp3'])
+def test_seeded_policy_is_reproducible(policy):
+    """同じシードなら同じ報酬列に対して同じ腕を選ぶ"""
+    runs = [
+        _play(_seeded(policy, ['a', 'b', 'c']), {'a': 0.5, 'b': 0.4, 'c': 0.6}, 50,
+              np.random.default_rng(3))
+        for _ in range(2)
+    ]
+    assert runs[0] == runs[1]
+
+
+def test_thompson_gaussian_and_unknown_distribution():
+    """正規近似の事後分布でも選択でき、未知の分布はエラー"""
+    bandit = ThompsonSamplingBandit(['good', 'bad'], distribution='gaussian', seed=0)
+    chosen = _play(bandit, {'good': 0.9, 'bad': 0.1}, 200, np.random.default_rng(4))
+    assert chosen.count('good') > chosen.count('bad')
+
+    with pytest.raises(ValueError):
+        ThompsonSamplingBandit(['a'], distribution='poisson')
+
+
+def test_exp3_probabilities_keep_uniform_exploration():
+    """EXP3の選択確率は合計1で、どの腕もgamma/腕の数以上"""
+    bandit = EXP3Bandit(['a', 'b', 'c'], gamma=0.3, seed=0)
+    for _ in range(100):
+        bandit.update('a', 1.0)
+
+    probabilities = bandit.probabilities()
+    assert probabilities.sum() == pytest.approx(1.0)
+    assert probabilities.min() >= 0.1 - 1e-12
+    assert probabilities[0] == probabilities.max()
+
+
+def test_exp3_state_round_trip_decays_weights():
+    """EXP3の重みはdecay倍して引き継ぐ"""
+    previous = EXP3Bandit(['a', 'b'], seed=0)
+    previous.update('a', 1.0)
+    bandit = EXP3Bandit(['a', 'b'], seed=0)
+    bandit.load_state(previous.get_state(), decay=0.5)
+
+    assert bandit.log_weights[0] == pytest.approx(previous.log_weights[0] * 0.5)
+
+
+def test_create_bandit_rejects_unknown_parameters():
+    """方策が受け取らないパラメータ・未知の方策はエラー"""
+    with pytest.raises(ValueError, match='window'):
+        create_bandit(['a'], 'thompson', window=10)
+    with pytest.raises(ValueError):
+        create_bandit(['a'], 'epsilon_greedy')
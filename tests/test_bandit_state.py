@@ -0,0 +1,73 @@
+"""
+BanditStateStore（実行をまたいだバンディットの状態の引き継ぎ）のテスト
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from shinka_qa.evolution.bandit_state import BanditStateStore
+from shinka_qa.evolution.ucb_bandit import StrategyBandit
+
+
+def _save_many(path, worker, count):
+    """別プロセスから同じファイルに状態を保存する"""
+    store = BanditStateStore(path, 'target.py')
+    for i in range(count):
+        store.save(f'worker{worker}_{i}', {'value': i}, run_id=str(worker))
+
+
+def test_concurrent_saves_keep_every_state(tmp_path):
+    """複数のプロセスが同時に保存しても、互いの状態を消さない"""
+    path = tmp_path / 'state.json'
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(_save_many, path, worker, 10) for worker in range(4)]
+        for future in futures:
+            future.result()
+
+    store = BanditStateStore(path, 'target.py')
+    for worker in range(4):
+        for i in range(10):
+            assert store.load(f'worker{worker}_{i}') == {'value': i}
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_scopes_are_separate(tmp_path):
+    """範囲（テスト対象）が違う状態は読み込まない"""
+    path = tmp_path / 'state.json'
+    BanditStateStore(path, 'a.py').save('strategy', {'value': 1})
+    BanditStateStore(path, 'b.py').save('strategy', {'value': 2})
+
+    assert BanditStateStore(path, 'a.py').load('strategy') == {'value': 1}
+    assert BanditStateStore(path, 'b.py').load('strategy') == {'value': 2}
+    assert BanditStateStore(path, 'c.py').load('strategy') is None
+
+
+def test_corrupt_file_is_treated_as_empty(tmp_path):
+    """壊れたファイルは空として読み、次の保存で置き換える"""
+    path = tmp_path / 'state.json'
+    path.write_text('{not json', encoding='utf-8')
+    store = BanditStateStore(path, 'target.py')
+
+    assert store.load('strategy') is None
+    store.save('strategy', {'value': 1})
+    assert store.load('strategy') == {'value': 1}
+
+
+def test_strategy_bandit_warm_start_round_trip(tmp_path):
+    """保存した状態をdecay倍で読み込み、良かった戦略を最初から選ぶ"""
+    store = BanditStateStore(tmp_path / 'nested' / 'state.json', 'target.py')
+    previous = StrategyBandit(['a', 'b'])
+    for _ in range(10):
+        previous.update_strategy('a', 0.8)
+        previous.update_strategy('b', 0.1)
+    store.save('strategy', previous.get_state(), run_id='run1')
+
+    bandit = StrategyBandit(['a', 'b'])
+    bandit.load_state(store.load('strategy'), decay=0.5)
+
+    stats = bandit.get_statistics()
+    assert stats['a']['num_plays'] == 0
+    assert stats['a']['effective_plays'] == pytest.approx(5.0)
+    assert stats['a']['average_reward'] == pytest.approx(0.8)
+    assert bandit.select_strategy() == 'a'
@@ -0,0 +1,107 @@
+"""
+BehaviorNoveltyArchive（カバー行・検出したシードバグのビット集合による新規性）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from shinka_qa.core.evaluator import QualityEvaluator
+from shinka_qa.evolution.behavior_novelty import BehaviorNoveltyArchive, bit_distances, pack_bits
+
+TARGET = '''def add(a, b):
+    return a + b
+
+
+def subtract(a, b):
+    return a - b
+'''
+
+BUGGY_TARGET = TARGET.replace('a - b', 'b - a')
+
+SUITE = '''from calc import add, subtract
+
+
+def test_add():
+    assert add(1, 2) == 3
+
+
+def test_subtract():
+    assert subtract(5, 2) == 3
+'''
+
+
+def test_pack_bits_places_each_index_and_widens():
+    """ビットiはバイトi // 8に入り、足りない場合はバイト数を拡張する"""
+    packed = pack_bits({0, 9}, 1)
+    assert packed.tolist() == [0b10000000, 0b01000000]
+    assert pack_bits([], 3).tolist() == [0, 0, 0]
+
+
+def test_bit_distances_match_set_definitions():
+    """JaccardとハミングはPythonの集合で計算した距離と一致する"""
+    a, b, c = {1, 2, 3}, {2, 3, 4, 5}, set()
+    archive = np.stack([pack_bits(s, 1) for s in (b, c, a)])
+    candidate = pack_bits(a, 1)
+
+    jaccard = bit_distances(candidate, archive, 'jaccard')
+    assert np.allclose(jaccard, [1 - 2 / 5, 1.0, 0.0])
+
+    hamming = bit_distances(candidate, archive, 'hamming')
+    assert np.allclose(hamming, [len(a ^ b) / 8, len(a) / 8, 0.0])
+
+    empty = np.stack([pack_bits(c, 1)])
+    assert bit_distances(pack_bits(c, 1), empty).tolist() == [0.0]
+
+
+def test_novelty_is_mean_distance_to_nearest_neighbours():
+    """新規性はアーカイブ中のk近傍との距離の平均"""
+    archive = BehaviorNoveltyArchive(k=2, kill_weight=0.0)
+    archive.add_many([
+        {'covered_lines': {1, 2}},
+        {'covered_lines': {1, 2, 3, 4}},
+        {'covered_lines': {10, 11}},
+    ])
+
+    # {1, 2, 3}との距離: 1/3, 1/4, 1.0 -> 近い2つの平均
+    assert archive.novelty({'covered_lines': {1, 2, 3}}) == pytest.approx((1 / 3 + 1 / 4) / 2)
+
+
+def test_novelty_many_also_compares_candidates_with_each_other():
+    """バッチの新規性は、アーカイブに加えてバッチ内の他の候補（自分自身は除く）とも比べる"""
+    archive = BehaviorNoveltyArchive(k=1, kill_weight=0.5)
+    archive.add_many([{'covered_lines': {1}, 'killed_mutants': {0}}])
+
+    twins = [{'covered_lines': {100}, 'killed_mutants': {3}}] * 2
+    assert archive.novelty_many(twins).tolist() == [0.0, 0.0]
+
+    single = archive.novelty_many(twins[:1])
+    assert single.tolist() == [pytest.approx(archive.novelty(twins[0]))]
+    assert single[0] == pytest.approx(1.0)
+
+
+def test_full_archive_replaces_oldest_entries():
+    """満杯のアーカイブは最も古い行動データから置き換える"""
+    archive = BehaviorNoveltyArchive(k=1, archive_size=2, kill_weight=0.0)
+    archive.add_many([{'covered_lines': {1}}, {'covered_lines': {2}}, {'covered_lines': {3}}])
+
+    assert len(archive) == 2
+    assert archive.novelty({'covered_lines': {1}}) == 1.0
+    assert archive.novelty({'covered_lines': {3}}) == 0.0
+
+
+def test_evaluator_records_killed_mutant_hunks(tmp_path):
+    """評価器は、バグ版で失敗したテストがカバーした差分のハンクを検出したシードバグとして記録する"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    buggy = tmp_path / 'calc_buggy.py'
+    buggy.write_text(BUGGY_TARGET, encoding='utf-8')
+    suite = tmp_path / 'test_calc.py'
+    suite.write_text(SUITE, encoding='utf-8')
+
+    evaluator = QualityEvaluator(target, seeded_bugs_path=buggy)
+    behavior = {}
+    evaluator.evaluate(suite, behavior)
+
+    assert {2, 6} <= behavior['covered_lines']
+    assert behavior['test_coverage']['test_subtract'] >= {6}
+    assert behavior['killed_mutants'] == {0}
@@ -0,0 +1,96 @@
+"""
+BudgetManager（実行予算）と予算切れによる進化の打ち切りのテスト
+"""
+
+import pytest
+
+from shinka_qa.core.budget import BudgetManager
+from shinka_qa.evolution.island_model import IslandModel
+
+
+def test_evaluations_are_reserved_up_to_the_limit():
+    """評価回数は上限まで予約でき、使わなかった分は返却できる"""
+    budget = BudgetManager(max_evaluations=10)
+
+    assert budget.reserve_evaluations(6) == 6
+    assert budget.reserve_evaluations(6) == 4
+    assert budget.exhausted() == 'evaluations'
+
+    budget.release_evaluations(3)
+    assert budget.exhausted() is None
+    assert budget.reserve_evaluations(5) == 3
+
+
+def test_effort_scales_down_as_budget_runs_out():
+    """残り予算が閾値を下回ると子個体数を減らし、計測とLLM呼び出しを止める"""
+    budget = BudgetManager(
+        max_evaluations=100, reduce_population_below=0.5, skip_timing_below=0.3,
+        disable_llm_below=0.15
+    )
+    assert budget.population_scale() == 1.0
+    assert not budget.skip_timing() and budget.allow_llm()
+
+    budget.record_evaluations(80)
+    assert budget.remaining_fraction() == pytest.approx(0.2)
+    assert budget.population_scale() == pytest.approx(0.4)
+    assert budget.skip_timing() and budget.allow_llm()
+
+    budget.record_evaluations(10)
+    assert budget.population_scale() == 0.25
+    assert not budget.allow_llm()
+
+
+def test_llm_cost_budget_disables_llm():
+    """LLMのコストの上限に達するとLLM呼び出しだけを止める"""
+    budget = BudgetManager(max_llm_cost=1.0)
+    budget.record_llm_usage(200_000, 100_000, cost_per_1m_tokens=(2.0, 6.0))
+
+    assert budget.llm_cost == 1.0
+    assert budget.llm_tokens == 300_000
+    assert not budget.allow_llm()
+    assert budget.exhausted() is None
+
+
+def test_should_stop_when_next_generation_would_overrun():
+    """平均の世代時間から見て次の世代が時間内に終わらない場合は停止する"""
+    budget = BudgetManager(max_total_time=100.0, reserve_time=5.0)
+    assert budget.should_stop() is None
+
+    budget.record_generation(96.0)
+    assert budget.exhausted() is None
+    assert budget.should_stop() == 'time'
+
+
+def test_request_stop_and_from_config():
+    """外部からの停止要求を理由として返し、設定ファイルのlimitsから作成できる"""
+    budget = BudgetManager.from_config({
+        'limits': {'max_evaluations': 5, 'adaptive': {'skip_timing_below': 0.9}}
+    })
+    assert budget.max_evaluations == 5 and budget.skip_timing_below == 0.9
+
+    budget.request_stop('interrupted')
+    assert budget.should_stop() == 'interrupted'
+
+
+def test_evaluation_budget_stops_evolution():
+    """評価回数の予算を使い切ると、残りの世代を実行せずに停止理由を記録する"""
+    calls = []
+
+    def fitness(code):
+        calls.append(code)
+        return len(code) / 1000.0, {}
+
+    def mutate(code, target, rng=None):
+        return code + f'\n# {rng.random()}'
+
+    model = IslandModel(num_islands=2, population_size=5, elite_ratio=0.2, seed=0)
+    model.initialize('def test_a(): pass', fitness)
+    initial_calls = len(calls)
+
+    budget = BudgetManager(max_evaluations=12, reduce_population_below=0.0)
+    model.evolve(10, mutate, fitness, budget=budget)
+
+    assert model.stop_reason == 'evaluations'
+    assert len(calls) - initial_calls == 12
+    assert model.generation < 10
+    assert model.get_statistics()['stop_reason'] == 'evaluations'
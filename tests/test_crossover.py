@@ -0,0 +1,161 @@
+"""
+merge_suite_fragment（LLMが返した差分のテストスイートへの統合）のテスト
+"""
+
+import ast
+
+import random
+
+from shinka_qa.evolution.crossover import SuiteCrossover, merge_suite_fragment
+
+BASE_SUITE = '''"""電卓のテスト"""
+import pytest
+from calculator import add, subtract
+
+
+class TestCalculator:
+    """電卓のテスト"""
+
+    def test_add(self):
+        assert add(1, 1) == 2
+
+    def test_subtract(self):
+        assert subtract(2, 1) == 1
+
+
+def test_module_level():
+    assert add(0, 0) == 0
+'''
+
+
+def test_merge_class_fragment_keeps_untouched_methods():
+    """同じ名前のクラスはメンバーごとに統合し、差分にないメソッドを残す"""
+    fragment = '''import math
+
+class TestCalculator:
+    def test_subtract(self):
+        assert subtract(3, 1) == 2
+
+    @pytest.mark.parametrize("x", [1, 4])
+    def test_sqrt(self, x):
+        assert math.sqrt(x * x) == x
+'''
+    merged = merge_suite_fragment(BASE_SUITE, fragment)
+
+    tree = ast.parse(merged)
+    test_class = next(node for node in tree.body if isinstance(node, ast.ClassDef))
+    methods = [node.name for node in test_class.body if isinstance(node, ast.FunctionDef)]
+    assert methods == ['test_add', 'test_subtract', 'test_sqrt']
+    assert 'assert subtract(3, 1) == 2' in merged
+    assert 'assert subtract(2, 1) == 1' not in merged
+    assert '    @pytest.mark.parametrize("x", [1, 4])\n    def test_sqrt(self, x):' in merged
+    assert 'import math' in merged
+    # クラスの後のトップレベルの関数はそのまま残る
+    assert [node.name for node in tree.body if isinstance(node, ast.FunctionDef)] == [
+        'test_module_level'
+    ]
+
+
+def test_merge_replaces_function_and_appends_new_one():
+    """同じ名前の関数は置き換え、新しい関数は末尾に追加する"""
+    fragment = '''def test_module_level():
+    assert add(0, 1) == 1
+
+
+def test_new():
+    assert subtract(0, 0) == 0
+'''
+    merged = merge_suite_fragment(BASE_SUITE, fragment)
+
+    assert 'assert add(0, 1) == 1' in merged
+    assert 'assert add(0, 0) == 0' not in merged
+    assert merged.rstrip().endswith('assert subtract(0, 0) == 0')
+    assert 'def test_add(self):' in merged
+
+
+def test_merge_without_changes_returns_none():
+    """差分が元のスイートと同じ場合はNone"""
+    fragment = '''class TestCalculator:
+    def test_add(self):
+        assert add(1, 1) == 2
+'''
+    assert merge_suite_fragment(BASE_SUITE, fragment) is None
+
+
+SUITE_A = '''"""親A"""
+import pytest
+from calculator import add
+
+
+@pytest.fixture
+def numbers():
+    return 1, 2
+
+
+def test_add(numbers):
+    assert add(*numbers) == 3
+'''
+
+SUITE_B = '''"""親B"""
+from calculator import add, divide
+
+
+def test_add(numbers):
+    assert add(*numbers) == 3
+
+
+def test_divide():
+    assert divide(4, 2) == 2
+
+
+def test_divide_zero():
+    with pytest.raises(ZeroDivisionError):
+        divide(1, 0)
+'''
+
+
+def _function_names(code):
+    return [node.name for node in ast.parse(code).body if isinstance(node, ast.FunctionDef)]
+
+
+def test_union_crossover_merges_tests_imports_and_fixtures():
+    """同一内容のテストは1つにまとめ、importは同じモジュールごとに統合する"""
+    child = SuiteCrossover('union').crossover(SUITE_A, SUITE_B)
+
+    assert child.startswith('"""親A"""')
+    assert 'from calculator import add, divide' in child
+    assert _function_names(child) == ['numbers', 'test_add', 'test_divide', 'test_divide_zero']
+
+
+def test_conflicting_test_names_are_renamed():
+    """内容の異なる同名のテストは親Bの側を改名して残す"""
+    other = SUITE_B.replace('add(*numbers) == 3', 'add(0, 0) == 0')
+    child = SuiteCrossover('union').crossover(SUITE_A, other)
+
+    names = _function_names(child)
+    assert 'test_add' in names and 'test_add_2' in names
+    assert 'add(0, 0) == 0' in child
+
+
+def test_coverage_guided_crossover_takes_only_complementary_tests():
+    """カバレッジがある場合は、親Aに足りない行を補う親Bのテストだけを貪欲に選ぶ"""
+    coverage_a = {'test_add': {1, 2}}
+    coverage_b = {'test_add': {1, 2}, 'test_divide': {5, 6}, 'test_divide_zero': {5, 6}}
+    child = SuiteCrossover('union').crossover(SUITE_A, SUITE_B, coverage_a, coverage_b)
+
+    assert _function_names(child) == ['numbers', 'test_add', 'test_divide']
+
+
+def test_sample_crossover_keeps_a_test_from_each_parent():
+    """'sample'モードでも両親のテストを少なくとも1つずつ残す"""
+    crossover = SuiteCrossover('sample', sample_rate=0.0)
+    child = crossover.crossover(SUITE_A, SUITE_B, rng=random.Random(0))
+
+    tests = [name for name in _function_names(child) if name.startswith('test_')]
+    assert tests[0] == 'test_add'
+    assert len(tests) == 2 and tests[1] in ('test_divide', 'test_divide_zero')
+
+
+def test_unparseable_parent_returns_parent_a():
+    """どちらかの親が解析できない場合は親Aをそのまま返す"""
+    assert SuiteCrossover().crossover(SUITE_A, 'def test_(:') == SUITE_A
@@ -0,0 +1,48 @@
+"""
+QualityEvaluator（テストスイートの適応度）のテスト
+"""
+
+from shinka_qa.core.budget import BudgetManager
+from shinka_qa.core.evaluator import QualityEvaluator
+
+TARGET = '''def add(a, b):
+    return a + b
+'''
+
+FAST_SUITE = '''from calc import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+'''
+
+SLOW_SUITE = '''import time
+
+from calc import add
+
+
+def test_add_slowly():
+    time.sleep(1.0)
+    assert add(1, 2) == 3
+'''
+
+
+def test_skipped_timing_uses_each_suites_own_run(tmp_path):
+    """実行時間の計測を省略しても、別のスイートの計測結果を使い回さない"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    fast = tmp_path / 'test_fast.py'
+    fast.write_text(FAST_SUITE, encoding='utf-8')
+    slow = tmp_path / 'test_slow.py'
+    slow.write_text(SLOW_SUITE, encoding='utf-8')
+
+    # 残り予算にかかわらず常に計測を省略する
+    budget = BudgetManager(skip_timing_below=2.0)
+    evaluator = QualityEvaluator(target, budget=budget)
+    evaluator.set_baseline(fast)
+
+    _, slow_metrics = evaluator.evaluate(slow)
+    _, fast_metrics = evaluator.evaluate(fast)
+
+    assert slow_metrics['execution_time'] > fast_metrics['execution_time'] + 0.5
+    assert fast_metrics['efficiency'] > slow_metrics['efficiency']
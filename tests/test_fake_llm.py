@@ -0,0 +1,154 @@
+"""
+FakeLLMClient / FakeOpenAIServer（APIキーなしで試す疑似プロバイダー）のテスト
+"""
+
+import json
+import statistics
+import urllib.error
+import urllib.request
+
+import pytest
+
+from shinka_qa.llm import create_llm_client
+from shinka_qa.llm.fake_llm import FakeLLMClient, FakeOpenAIServer
+
+
+def _post(server, body, path='/v1/chat/completions'):
+    """サーバーにJSONをPOSTし、(ステータス, ヘッダー, 本文) を返す"""
+    request = urllib.request.Request(
+        server.base_url.rsplit('/v1', 1)[0] + path,
+        data=json.dumps(body).encode('utf-8'),
+        headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers, response.read().decode('utf-8')
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read().decode('utf-8')
+
+
+def _chat(prompt, **extra):
+    return dict({'model': 'fake-model', 'messages': [
+        {'role': 'system', 'content': 'system'}, {'role': 'user', 'content': prompt}
+    ]}, **extra)
+
+
+def test_seeded_errors_are_reproducible():
+    """同じシードなら、どの呼び出しが失敗するかも同じ"""
+    outcomes = []
+    for _ in range(2):
+        fake = FakeLLMClient(error_rate=0.3, rate_limit_rate=0.2, seed=5)
+        outcomes.append([fake.generate('system', 'prompt') is None for _ in range(30)])
+        assert fake.num_errors + fake.num_rate_limited == sum(outcomes[-1])
+
+    assert outcomes[0] == outcomes[1]
+    assert 0 < sum(outcomes[0]) < 30
+
+
+@pytest.mark.parametrize('distribution', ['uniform', 'normal', 'exponential', 'lognormal'])
+def test_latency_distributions_center_on_mean(distribution):
+    """レイテンシは分布の中心がlatency_meanになり、負にならない"""
+    fake = FakeLLMClient(
+        latency_mean=1.0, latency_sigma=0.3, latency_distribution=distribution, seed=0
+    )
+    samples = [fake.sample_latency() for _ in range(2000)]
+
+    assert min(samples) >= 0.0
+    center = statistics.median(samples) if distribution == 'lognormal' else statistics.mean(samples)
+    assert center == pytest.approx(1.0, abs=0.1)
+
+
+def test_unknown_latency_distribution_is_rejected():
+    """未知のレイテンシの分布はエラー"""
+    with pytest.raises(ValueError, match='pareto'):
+        FakeLLMClient(latency_distribution='pareto')
+
+
+def test_template_keeps_current_test_code_and_variants():
+    """テンプレートの応答は現在のテストコードを残してテストを足し、変異版の数だけ区切って返す"""
+    fake = FakeLLMClient()
+    prompt = '現在のテストコード:\n```python\ndef test_existing():\n    pass\n```'
+
+    text = fake.generate('system', prompt)
+    assert text.startswith('```python\ndef test_existing():')
+    assert 'def test_fake_generated_1():' in text
+
+    variants = fake.generate('system', prompt + '\n3個の独立した変異版を出力してください')
+    assert variants.count('# === variant') == 3
+    assert 'def test_fake_generated_2_3():' in variants
+
+
+def test_usage_is_recorded_for_budget_and_routing():
+    """呼び出しごとにトークン数とコストを記録する"""
+    fake = FakeLLMClient(responses=['x' * 400], cost_per_1m_tokens=(1.0, 2.0))
+    fake.generate('system', 'prompt')
+
+    call = fake.take_last_call()
+    assert call['model'] == 'fake-model'
+    assert call['output_tokens'] > 0
+    assert call['cost'] == pytest.approx(
+        (call['input_tokens'] * 1.0 + call['output_tokens'] * 2.0) / 1_000_000
+    )
+
+
+def test_create_llm_client_passes_fake_options():
+    """provider: "fake" の設定はFakeLLMClientの引数になる"""
+    client = create_llm_client('fake', 'my-model', options={'responses': ['fixed']})
+
+    assert isinstance(client, FakeLLMClient)
+    assert client.get_route_name() == 'Fake/my-model'
+    assert client.generate('system', 'prompt') == 'fixed'
+
+
+def test_server_answers_chat_completions():
+    """サーバーはChat Completions形式で応答し、受け取ったリクエストを記録する"""
+    with FakeOpenAIServer(FakeLLMClient(responses=['hello'])) as server:
+        status, _, body = _post(server, _chat('prompt'))
+
+    response = json.loads(body)
+    assert status == 200
+    assert response['choices'][0]['message']['content'] == 'hello'
+    assert response['usage']['total_tokens'] > 0
+    assert server.requests[0]['messages'][1]['content'] == 'prompt'
+
+
+def test_server_errors_and_retry_after():
+    """429にはRetry-Afterを付け、500と未知のパスはエラーのJSONを返す"""
+    with FakeOpenAIServer(FakeLLMClient(rate_limit_rate=1.0), retry_after=2.5) as server:
+        status, headers, body = _post(server, _chat('prompt'))
+        assert status == 429
+        assert headers['Retry-After'] == '2.5'
+        assert json.loads(body)['error']['type'] == 'rate_limit_exceeded'
+
+        assert _post(server, _chat('prompt'), path='/v1/embeddings')[0] == 404
+
+    with FakeOpenAIServer(FakeLLMClient(error_rate=1.0)) as server:
+        assert _post(server, _chat('prompt'))[0] == 500
+
+
+def test_server_streams_chunks_with_usage():
+    """"stream": true の場合はチャンクをServer-Sent Eventsで送り、最後に使用量を付ける"""
+    fake = FakeLLMClient(responses=['abcdefghij'], chunk_size=4)
+    with FakeOpenAIServer(fake) as server:
+        status, headers, body = _post(
+            server, _chat('prompt', stream=True, stream_options={'include_usage': True})
+        )
+
+    assert status == 200
+    assert headers['Content-Type'] == 'text/event-stream'
+    lines = [line[len('data: '):] for line in body.split('\n\n') if line]
+    assert lines[-1] == '[DONE]'
+    events = [json.loads(line) for line in lines[:-1]]
+    pieces = [
+        event['choices'][0]['delta'].get('content', '') for event in events if event['choices']
+    ]
+    assert pieces[:3] == ['abcd', 'efgh', 'ij']
+    assert events[-1]['usage']['completion_tokens'] > 0
+
+
+def test_openai_client_talks_to_server():
+    """OpenAIClientをbase_urlでサーバーに向けると、実際のAPIと同じ経路で生成できる"""
+    pytest.importorskip('openai')
+    with FakeOpenAIServer(FakeLLMClient(responses=['from server'])) as server:
+        client = create_llm_client('openai', 'fake-model', api_key='test', base_url=server.base_url)
+        assert client.generate('system', 'prompt') == 'from server'
@@ -0,0 +1,129 @@
+"""
+Island・IslandModel（島モデルの集団管理と選択）のテスト
+"""
+
+import zlib
+
+import numpy as np
+import pytest
+
+from shinka_qa.evolution.island_model import Individual, Island, IslandModel
+from shinka_qa.evolution.map_elites import MapElites
+
+FITNESS = [0.3, 0.9, 0.1, 0.5, 0.7, 0.2]
+
+
+def _individual(fitness, **metrics):
+    return Individual(
+        test_code=f'# {fitness}',
+        fitness=fitness,
+        metrics={'coverage': fitness * 100.0, **metrics},
+        generation=0,
+        island_id=0
+    )
+
+
+def _island(selection_mode='scalar', **kwargs):
+    island = Island(
+        0, len(FITNESS), selection_mode=selection_mode,
+        seed_sequence=np.random.SeedSequence(0), **kwargs
+    )
+    island._set_population([_individual(fitness) for fitness in FITNESS])
+    return island
+
+
+def test_population_arrays_follow_individuals():
+    """適応度配列・メトリクス行列・平均適応度が集団と一致する"""
+    island = _island()
+    assert island.fitness_array.tolist() == FITNESS
+    assert island.metrics_matrix[:, island.metric_keys.index('coverage')].tolist() == [
+        fitness * 100.0 for fitness in FITNESS
+    ]
+    assert np.isclose(island.avg_fitness, np.mean(FITNESS))
+
+
+def test_top_and_bottom_indices_are_ordered():
+    """上位は良い順、下位は悪い順に返し、集団サイズで頭打ちにする"""
+    island = _island()
+    assert island._top_indices(3).tolist() == [1, 4, 3]
+    assert island._bottom_indices(2).tolist() == [2, 5]
+    assert len(island._top_indices(100)) == len(FITNESS)
+    assert island._top_indices(0).tolist() == []
+
+
+def test_accept_migrants_replaces_worst_and_updates_aggregates():
+    """移住者は最も悪い個体と置き換わり、配列と平均適応度も差分更新される"""
+    island = _island()
+    island.accept_migrants([_individual(0.95), _individual(0.8)])
+
+    expected = [0.3, 0.9, 0.95, 0.5, 0.7, 0.8]
+    assert island.fitness_array.tolist() == expected
+    assert [ind.fitness for ind in island.population] == expected
+    assert np.isclose(island.avg_fitness, np.mean(expected))
+    assert island._top_indices(1).tolist() == [2]
+
+
+def test_tournament_selection_prefers_fitter_individuals():
+    """トーナメント選択は参加者の中で最も良い個体を選ぶので、選ばれた個体の平均は集団平均を上回る"""
+    island = _island()
+    selected = island._tournament_indices(2000, tournament_size=3)
+
+    assert selected.shape == (2000,)
+    assert island.fitness_array[selected].mean() > np.mean(FITNESS)
+    # 最も悪い個体が勝つのは3人とも最も悪い個体の場合だけ
+    assert np.mean(selected == 2) < 0.02
+
+
+def test_nsga2_orders_by_pareto_rank():
+    """nsga2モードでは非優越ランク順に並べ、第1フロントをパレートフロントとする"""
+    island = Island(0, 3, selection_mode='nsga2', seed_sequence=np.random.SeedSequence(0))
+    island._set_population([
+        _individual(0.5, bugs_detected=0.2),
+        _individual(0.4, bugs_detected=0.8),
+        _individual(0.3, bugs_detected=0.1),
+    ])
+
+    assert island.ranks.tolist() == [0, 0, 1]
+    assert island._bottom_indices(1).tolist() == [2]
+    assert sorted(ind.fitness for ind in island.get_pareto_front()) == [0.4, 0.5]
+
+
+def _mutate(code, target, rng=None):
+    return code + f'\n# {rng.randint(0, 10 ** 6)}'
+
+
+def _fitness(code):
+    return zlib.crc32(code.encode()) / 2 ** 32, {}
+
+
+def _run(seed, **kwargs):
+    model = IslandModel(
+        num_islands=3, population_size=4, migration_interval=2, seed=seed, **kwargs
+    )
+    model.initialize('def test_a(): pass', _fitness)
+    model.evolve(4, _mutate, _fitness)
+    return [[ind.test_code for ind in island.population] for island in model.islands]
+
+
+@pytest.mark.parametrize('max_workers', [1, 3])
+def test_same_seed_reproduces_run_regardless_of_workers(max_workers):
+    """同じシードなら、評価の並列度に関係なく逐次実行と同じ集団になる"""
+    assert _run(42, max_workers=max_workers) == _run(42)
+
+
+def test_islands_and_seeds_get_independent_streams():
+    """島ごとに別の乱数ストリームを使い、シードを変えると別の集団になる"""
+    populations = _run(42)
+    assert populations[0] != populations[1]
+    assert _run(43) != populations
+
+
+def test_map_elites_same_seed_reproduces_archive():
+    """MAP-Elitesも同じシードなら評価の並列度に関係なく同じアーカイブになる"""
+    def run(max_workers):
+        engine = MapElites(batch_size=6, max_workers=max_workers, seed=7)
+        engine.initialize('def test_a(): pass', _fitness)
+        engine.evolve(3, _mutate, _fitness)
+        return sorted(ind.test_code for ind in engine.get_elites())
+
+    assert run(3) == run(1)
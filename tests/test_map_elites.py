@@ -0,0 +1,138 @@
+"""
+MapElitesArchive（MAP-Elitesのアーカイブ）のテスト
+"""
+
+import numpy as np
+
+from shinka_qa.evolution.island_model import Individual
+from shinka_qa.evolution.map_elites import (
+    BehaviorDescriptor,
+    MapElitesArchive,
+    function_statement_lines,
+)
+
+DESCRIPTORS = [
+    BehaviorDescriptor('coverage', 0.0, 100.0, 10),
+    BehaviorDescriptor('bugs_detected', 0.0, 1.0, 2),
+]
+
+
+TARGET = '''def add(a, b):
+    """足し算"""
+    return a + b
+
+
+class Calculator:
+    def divide(self, a, b):
+        if b == 0:
+            raise ValueError("zero")
+        return a / b
+'''
+
+
+def _individual(fitness, coverage, bugs_detected=0.0, behavior=None):
+    return Individual(
+        test_code=f'# {fitness} {coverage} {bugs_detected}',
+        fitness=fitness,
+        metrics={'coverage': coverage, 'bugs_detected': bugs_detected},
+        generation=0,
+        island_id=0,
+        behavior=behavior or {}
+    )
+
+
+def test_cell_index_bins_and_clips_descriptors():
+    """記述子を等幅のビンに割り当て、範囲外の値は端のセルに入れる"""
+    archive = MapElitesArchive(DESCRIPTORS)
+    assert archive.shape == (10, 2)
+    assert archive.cell_index({'coverage': 35.0, 'bugs_detected': 0.7}) == 3 * 2 + 1
+    assert archive.cell_index({'coverage': 150.0, 'bugs_detected': -1.0}) == 9 * 2 + 0
+    assert archive.cell_index({}) == 0
+
+
+def test_add_keeps_only_the_best_individual_per_cell():
+    """同じセルには適応度が高い場合だけ上書きし、QDスコアも差し替える"""
+    archive = MapElitesArchive(DESCRIPTORS)
+
+    assert archive.add(_individual(0.5, 42.0))
+    assert not archive.add(_individual(0.4, 45.0))
+    assert not archive.add(_individual(0.5, 48.0))
+    assert archive.add(_individual(0.8, 41.0))
+    assert archive.add(_individual(0.3, 90.0, 1.0))
+
+    assert len(archive) == 2
+    assert sorted(ind.fitness for ind in archive.get_elites()) == [0.3, 0.8]
+    assert archive.get_best().fitness == 0.8
+
+    statistics = archive.get_statistics()
+    assert statistics['filled_cells'] == 2
+    assert np.isclose(statistics['qd_score'], 1.1)
+    assert np.isclose(statistics['avg_fitness'], 0.55)
+
+
+def test_add_many_matches_sequential_add():
+    """バッチ挿入は1個体ずつの挿入と同じアーカイブになる"""
+    individuals = [
+        _individual(0.2, 10.0), _individual(0.6, 15.0), _individual(0.1, 55.0, 0.9),
+        _individual(0.4, 18.0), _individual(0.9, 99.0)
+    ]
+    batched = MapElitesArchive(DESCRIPTORS)
+    sequential = MapElitesArchive(DESCRIPTORS)
+
+    assert batched.add_many(individuals) == 4
+    for individual in individuals:
+        sequential.add(individual)
+
+    assert np.array_equal(batched.fitness, sequential.fitness)
+    assert batched.get_statistics() == sequential.get_statistics()
+
+
+def test_sample_draws_only_from_occupied_cells():
+    """サンプリングは占有セルのエリートだけを返す"""
+    archive = MapElitesArchive(DESCRIPTORS)
+    assert archive.sample(3) == []
+
+    archive.add_many([_individual(0.5, 5.0), _individual(0.7, 95.0, 1.0)])
+    samples = archive.sample(20, np.random.default_rng(0))
+
+    assert len(samples) == 20
+    assert {ind.fitness for ind in samples} <= {0.5, 0.7}
+
+
+def test_function_statement_lines_skip_def_lines_and_docstrings():
+    """関数ごとの実行文の行には、インポート時に実行されるdef行とdocstringを含めない"""
+    assert function_statement_lines(TARGET) == {
+        'add': {3},
+        'Calculator.divide': {8, 9, 10},
+    }
+
+
+def test_behavior_descriptors_separate_suites_with_equal_metrics():
+    """関数ごとのカバレッジと検出したシードバグで、集計値が同じスイートを別のセルに入れる"""
+    archive = MapElitesArchive(
+        [
+            BehaviorDescriptor('function_coverage:Calculator.divide', 0.0, 1.0, 3),
+            BehaviorDescriptor('killed_mutant:1', 0.0, 1.0, 2),
+        ],
+        function_statement_lines(TARGET)
+    )
+    assert archive.uses_behavior
+
+    happy_path = _individual(0.5, 60.0, behavior={'covered_lines': {1, 3, 6, 7, 8, 10}})
+    error_path = _individual(
+        0.5, 60.0, behavior={'covered_lines': {1, 6, 7, 8, 9}, 'killed_mutants': {1}}
+    )
+    full = _individual(0.6, 60.0, behavior={'covered_lines': {8, 9, 10}, 'killed_mutants': {0}})
+
+    cells = archive.cell_indices(
+        [ind.metrics for ind in (happy_path, error_path, full)],
+        [ind.behavior for ind in (happy_path, error_path, full)]
+    )
+    # 前の2つはdivideの2/3をカバー（ビン2）し、シードバグ1を検出したかどうかだけが異なる
+    # fullはdivideを全てカバー（ビン2に切り詰め）
+    assert cells.tolist() == [2 * 2 + 0, 2 * 2 + 1, 2 * 2 + 0]
+    assert archive.add_many([happy_path, error_path, full]) == 3
+    assert len(archive) == 2
+
+    # 行動データのない個体は、行動データから計算する記述子が0.0になる
+    assert archive.cell_index({'coverage': 60.0}) == 0
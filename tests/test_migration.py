@@ -0,0 +1,108 @@
+"""
+移住トポロジーと移住キューのテスト
+"""
+
+import random
+
+import pytest
+
+from shinka_qa.evolution.island_model import Individual, IslandModel
+from shinka_qa.evolution.migration import MigrationQueues, create_topology
+
+
+def _degrees(topology):
+    in_degree = {i: 0 for i in topology}
+    for destinations in topology.values():
+        for destination in destinations:
+            in_degree[destination] += 1
+    out_degree = {i: len(destinations) for i, destinations in topology.items()}
+    return in_degree, out_degree
+
+
+def test_ring_and_fully_connected_topologies():
+    """ringは隣の島へ1つずつ、fully_connectedは自分以外の全ての島へ送る"""
+    assert create_topology('ring', 4) == {0: [3], 1: [0], 2: [1], 3: [2]}
+    assert create_topology('fully_connected', 3) == {0: [1, 2], 1: [0, 2], 2: [0, 1]}
+
+
+def test_hub_and_spoke_topology():
+    """ハブは全ての島へ送り、他の島はハブにだけ送る"""
+    assert create_topology('hub_and_spoke', 4, hub=1) == {0: [1], 1: [0, 2, 3], 2: [1], 3: [1]}
+
+
+@pytest.mark.parametrize('degree, expected', [(2, 2), (10, 5)])
+def test_random_k_regular_topology_is_regular(degree, expected):
+    """全ての島の入次数・出次数がk（島の数-1で頭打ち）で、自分には送らない"""
+    topology = create_topology('random_k_regular', 6, degree=degree, rng=random.Random(3))
+    in_degree, out_degree = _degrees(topology)
+
+    assert set(in_degree.values()) == {expected}
+    assert set(out_degree.values()) == {expected}
+    assert all(i not in destinations for i, destinations in topology.items())
+    assert all(len(set(destinations)) == expected for destinations in topology.values())
+
+
+def test_single_island_and_unknown_topology():
+    """島が1つの場合は移住しない。未知のトポロジー名はエラー"""
+    assert create_topology('ring', 1) == {0: []}
+    with pytest.raises(ValueError):
+        create_topology('star', 3)
+
+
+def test_queues_deliver_packets_without_waiting():
+    """送信した移住者は受信側が取り出すまでキューに残り、取り出した世代を記録する"""
+    queues = MigrationQueues(2)
+    migrant = Individual(test_code='', fitness=0.7, metrics={}, generation=1, island_id=0)
+
+    assert queues.receive(1, generation=0) == []
+    queues.send(generation=1, source=0, destination=1, migrants=[migrant])
+    assert queues.receive(0, generation=1) == []
+
+    packets = queues.receive(1, generation=3)
+    assert [p.migrants for p in packets] == [[migrant]]
+    assert packets[0].event.to_dict()['received_generation'] == 3
+    assert queues.receive(1, generation=3) == []
+
+    statistics = queues.get_statistics()
+    assert statistics['num_events'] == statistics['num_received'] == 1
+    assert statistics['total_migrants'] == 1
+
+
+def test_island_model_migrates_along_hub_and_spoke():
+    """同期移住では全ての島が送信してから受信する（ハブ経由で1回に1ホップだけ広がる）"""
+    model = IslandModel(
+        num_islands=3, population_size=4, migration_rate=0.25, topology='hub_and_spoke', seed=0
+    )
+    model.initialize('def test_a(): pass', lambda code: (0.1, {}))
+    model.islands[1].accept_migrants([
+        Individual(test_code='def test_b(): pass', fitness=0.9, metrics={}, generation=1,
+                   island_id=1)
+    ])
+
+    model._migrate()
+
+    best = [max(ind.fitness for ind in island.population) for island in model.islands]
+    assert best == [0.9, 0.9, 0.1]
+    assert len(model.get_migration_events()) == 4
+
+
+def test_async_migration_delivers_between_running_islands():
+    """非同期移住でも、送信した移住者は受信側の島の次の移住の機会に受け入れられる"""
+    model = IslandModel(
+        num_islands=2, population_size=3, migration_interval=1, topology='ring',
+        async_migration=True, seed=0
+    )
+
+    def mutate(code, target, rng=None):
+        return code + f'\n# {rng.random()}'
+
+    model.initialize('def test_a(): pass', lambda code: (0.1, {}))
+    model.evolve(3, mutate, lambda code: (len(code) / 1000.0, {}))
+
+    statistics = model.migration_queues.get_statistics()
+    assert statistics['num_events'] > 0
+    assert statistics['num_received'] > 0
+    assert all(
+        event['latency'] >= 0.0
+        for event in model.get_migration_events() if event['latency'] is not None
+    )
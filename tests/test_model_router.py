@@ -0,0 +1,106 @@
+"""
+CostAwareModelBandit（プロバイダーのルーティング）のテスト
+"""
+
+from shinka_qa.evolution.ucb_bandit import CostAwareModelBandit
+from shinka_qa.llm import MultiProviderLLMClient
+from shinka_qa.llm.fake_llm import FakeLLMClient
+
+
+class _NamedFakeClient(FakeLLMClient):
+    """プロバイダー名を変えた疑似クライアント（同じモデルを別のプロバイダーで提供する）"""
+
+    def __init__(self, provider, **kwargs):
+        super().__init__(**kwargs)
+        self.provider = provider
+
+    def get_provider_name(self) -> str:
+        return self.provider
+
+
+def test_same_model_on_two_providers_is_routed_separately():
+    """同じモデルでもプロバイダーが違えば別の腕として扱い、応答したプロバイダーを記録する"""
+    cheap = _NamedFakeClient('cheap', model='shared', responses=['a'] * 5,
+                             cost_per_1m_tokens=(0.1, 0.1))
+    premium = _NamedFakeClient('premium', model='shared', responses=['b'] * 5,
+                               cost_per_1m_tokens=(1.0, 1.0))
+    client = MultiProviderLLMClient([premium, cheap])
+    routes = [c.get_route_name() for c in client.clients]
+    assert routes == ['cheap/shared', 'premium/shared']
+
+    router = CostAwareModelBandit(routes, exploration_coefficient=0.0)
+    router.track('x', 'cheap/shared', 0.5, cost=1.0, latency=1.0)
+    router.complete_pull('x', 0.5)
+    router.track('y', 'premium/shared', 0.5, cost=1.0, latency=1.0)
+    router.complete_pull('y', 0.9)
+    client.router = router
+
+    assert client.generate('system', 'prompt') == 'b'
+    call = client.take_last_call()
+    assert call['route'] == 'premium/shared'
+    assert call['latency'] >= 0.0
+
+
+def test_failure_is_recorded_under_route_and_falls_back():
+    """失敗したプロバイダーは改善0としてウィンドウに入り、次のプロバイダーで生成する"""
+    broken = _NamedFakeClient('broken', model='m', error_rate=1.0, cost_per_1m_tokens=(0.1, 0.1))
+    working = _NamedFakeClient('working', model='m', responses=['ok'],
+                               cost_per_1m_tokens=(1.0, 1.0))
+    client = MultiProviderLLMClient([broken, working])
+    router = CostAwareModelBandit([c.get_route_name() for c in client.clients])
+    client.router = router
+
+    assert client.generate('system', 'prompt') == 'ok'
+    assert router.num_failures['broken/m'] == 1
+    [(route, improvement, _, latency)] = router.get_state()['observations']
+    assert (route, improvement) == ('broken/m', 0.0)
+    assert latency >= 0.0
+    assert client.take_last_call()['route'] == 'working/m'
+
+
+def test_old_calls_leave_the_window():
+    """ウィンドウから古い呼び出しが抜けると、遅くなったプロバイダーが選ばれなくなる"""
+    router = CostAwareModelBandit(['a/m', 'b/m'], window=4, exploration_coefficient=0.0)
+    for i in range(2):
+        router.track(('a', i), 'a/m', 0.0, cost=1.0, latency=1.0)
+        router.complete_pull(('a', i), 0.5)
+        router.track(('b', i), 'b/m', 0.0, cost=1.0, latency=1.0)
+        router.complete_pull(('b', i), 0.1)
+    assert router.select_model() == 'a/m'
+
+    for i in range(2):
+        router.track(('a2', i), 'a/m', 0.0, cost=1.0, latency=10.0)
+        router.complete_pull(('a2', i), 0.1)
+        router.track(('b2', i), 'b/m', 0.0, cost=1.0, latency=1.0)
+        router.complete_pull(('b2', i), 0.1)
+
+    assert len(router.get_state()['observations']) == 4
+    assert router.select_model() == 'b/m'
+
+
+def test_discarded_call_does_not_enter_window():
+    """評価しなかった子個体の呼び出しは、報酬もコストもウィンドウに加えない"""
+    router = CostAwareModelBandit(['a/m', 'b/m'])
+    router.track('child', 'a/m', 0.5, cost=1.0, latency=1.0)
+
+    assert router.discard_pull('child')
+    assert not router.complete_pull('child', 0.9)
+    assert router.get_state()['observations'] == []
+    assert router.num_calls['a/m'] == 1
+
+
+def test_state_round_trip_keeps_known_routes_and_decays():
+    """引き継ぐのは今のプロバイダー構成にある腕の、直近decayの割合の呼び出しだけ"""
+    previous = CostAwareModelBandit(['a/m', 'gone/m'])
+    for i, route in enumerate(['gone/m', 'a/m', 'a/m', 'a/m', 'a/m']):
+        previous.track(i, route, 0.0, cost=0.1, latency=0.1)
+        previous.complete_pull(i, 0.1 * i)
+
+    router = CostAwareModelBandit(['a/m', 'b/m'])
+    router.load_state(previous.get_state(), decay=0.5)
+
+    observations = router.get_state()['observations']
+    assert [observation[0] for observation in observations] == ['a/m', 'a/m']
+    assert [observation[1] for observation in observations] == [
+        previous.get_state()['observations'][3][1], previous.get_state()['observations'][4][1]
+    ]
@@ -0,0 +1,59 @@
+"""
+NSGA-II（非優越ソートと混雑距離）のテスト
+"""
+
+import numpy as np
+
+from shinka_qa.evolution.multi_objective import (
+    build_objective_matrix,
+    crowding_distance,
+    fast_non_dominated_sort,
+    nsga2_order,
+)
+
+# 最小化目的の既知のフロント: A〜Dが第1フロント、EはBに、FはEに支配される
+FRONT = np.array([
+    [0.0, 4.0],  # A
+    [1.0, 2.0],  # B
+    [3.0, 1.0],  # C
+    [4.0, 0.0],  # D
+    [2.0, 3.0],  # E
+    [3.0, 4.0],  # F
+])
+
+
+def test_non_dominated_sort_ranks_known_front():
+    """支配関係の段数どおりにランクを付ける"""
+    assert fast_non_dominated_sort(FRONT).tolist() == [0, 0, 0, 0, 1, 2]
+
+
+def test_equal_points_share_a_rank():
+    """同じ目的値の個体は互いに支配しない"""
+    objectives = np.array([[1.0, 1.0], [1.0, 1.0], [2.0, 2.0]])
+    assert fast_non_dominated_sort(objectives).tolist() == [0, 0, 1]
+
+
+def test_crowding_distance_on_known_front():
+    """端の個体は無限大、内側の個体は隣接個体との正規化した距離の和"""
+    distances = crowding_distance(FRONT, fast_non_dominated_sort(FRONT))
+
+    assert np.isinf(distances[[0, 3]]).all()
+    # B: (3 - 0) / 4 + (4 - 1) / 4、C: (4 - 1) / 4 + (2 - 0) / 4
+    assert np.allclose(distances[[1, 2]], [1.5, 1.25])
+    # 2個体以下のフロントは全て端として扱う
+    assert np.isinf(distances[[4, 5]]).all()
+
+
+def test_nsga2_order_sorts_by_rank_then_crowding():
+    """ランクの昇順、同じランクの中では混雑距離の降順に並べる"""
+    order, _, _ = nsga2_order(FRONT)
+    assert order.tolist() == [0, 3, 1, 2, 4, 5]
+
+
+def test_objective_matrix_negates_maximized_objectives():
+    """最大化する目的は符号を反転し、欠けたメトリクスは0とする"""
+    matrix = build_objective_matrix(
+        [{'coverage': 80.0, 'execution_time': 2.0}, {}],
+        [('coverage', True), ('execution_time', False)]
+    )
+    assert matrix.tolist() == [[-80.0, 2.0], [0.0, 0.0]]
@@ -0,0 +1,115 @@
+"""
+1回のLLM呼び出しで複数の変異版を生成する（mutate_many / mutate_batch）テスト
+"""
+
+import ast
+
+import pytest
+
+from shinka_qa.evolution.test_mutator import TestMutator as Mutator
+from shinka_qa.llm.async_pool import AsyncLLMPool
+from shinka_qa.llm.fake_llm import FakeLLMClient
+from shinka_qa.llm.llm_client import estimate_tokens
+
+TEST_CODE = '''def test_values():
+    assert clamp(5, 0, 10) == 5
+'''
+
+TARGET_CODE = '''def clamp(value, low, high):
+    return max(low, min(value, high))
+'''
+
+
+class _NoNFakeClient(FakeLLMClient):
+    """generate_nに対応しないプロバイダー"""
+
+    supports_n = False
+
+
+def _mutator(fake, **kwargs):
+    return Mutator(llm_client=fake, force_template=False, **kwargs)
+
+
+def test_same_strategy_uses_provider_n():
+    """同じ戦略の変異版は、プロバイダーのnパラメータで1回の呼び出しにまとめる"""
+    fake = FakeLLMClient()
+    variants = _mutator(fake).mutate_many(TEST_CODE, TARGET_CODE, ['add_edge_cases'], n=3)
+
+    assert fake.num_calls == 1
+    assert len(set(variants)) == 3
+    for code in variants:
+        ast.parse(code)
+        assert 'def test_values():' in code
+
+
+def test_mixed_strategies_share_one_response():
+    """戦略が違う変異版は、1つの応答に区切り行付きで書かせて分ける"""
+    fake = FakeLLMClient()
+    variants = _mutator(fake).mutate_many(
+        TEST_CODE, TARGET_CODE, ['add_edge_cases', 'add_negative_tests', 'add_edge_cases']
+    )
+
+    assert fake.num_calls == 1
+    assert [f'def test_fake_generated_1_{i}():' in code for i, code in enumerate(variants, 1)] == [
+        True, True, True
+    ]
+
+
+def test_without_n_support_falls_back_to_variants_prompt():
+    """generate_nに対応しないプロバイダーでは、同じ戦略でも区切り行の形式で生成する"""
+    fake = _NoNFakeClient()
+    variants = _mutator(fake).mutate_many(TEST_CODE, TARGET_CODE, ['add_edge_cases'], n=2)
+
+    assert fake.num_calls == 1
+    assert 'def test_fake_generated_1_2():' in variants[1]
+
+
+def test_broken_variant_falls_back_to_template():
+    """構文エラー・欠けている変異版だけテンプレートベースにフォールバックする"""
+    response = (
+        '```python\n# === variant 1 ===\n' + TEST_CODE +
+        '\ndef test_new():\n    assert clamp(-1, 0, 10) == 0\n'
+        '# === variant 2 ===\ndef test_broken(:\n```'
+    )
+    fake = _NoNFakeClient(responses=[response])
+    variants = _mutator(fake).mutate_many(
+        TEST_CODE, TARGET_CODE, ['add_edge_cases', 'add_negative_tests', 'add_edge_cases']
+    )
+
+    assert 'def test_new():' in variants[0]
+    for code in variants[1:]:
+        ast.parse(code)
+        assert 'test_broken' not in code
+
+
+def test_batch_groups_children_of_same_parent_and_splits_cost():
+    """mutate_batchは同じ親の子個体を1回の呼び出しにまとめ、コストを子個体の数で等分する"""
+    fake = FakeLLMClient()
+    other_parent = TEST_CODE + '\n\ndef test_other():\n    assert clamp(0, 0, 1) == 0\n'
+    jobs = [(TEST_CODE, 'add_edge_cases')] * 3 + [(other_parent, 'add_edge_cases')]
+    calls = {}
+
+    with AsyncLLMPool(fake) as pool:
+        mutated = _mutator(fake, llm_pool=pool, max_variants_per_request=3).mutate_batch(
+            jobs, TARGET_CODE, on_call=lambda i, call: calls.__setitem__(i, call)
+        )
+
+    assert fake.num_calls == 2
+    assert len(set(mutated)) == 4
+    assert 'def test_other():' in mutated[3]
+    assert sorted(calls) == [0, 1, 2, 3]
+    assert calls[0]['cost'] == calls[1]['cost'] == calls[2]['cost']
+    prompt = _mutator(fake)._build_prompt(TEST_CODE, TARGET_CODE, 'add_edge_cases', None)
+    input_tokens = estimate_tokens(Mutator.LLM_SYSTEM_PROMPT + prompt)
+    assert calls[0]['input_tokens'] == pytest.approx(input_tokens / 3)
+
+
+def test_batch_respects_max_variants_per_request():
+    """max_variants_per_requestを超える同じ親の子個体は、別の呼び出しに分ける"""
+    fake = FakeLLMClient()
+    jobs = [(TEST_CODE, 'add_edge_cases')] * 5
+
+    with AsyncLLMPool(fake) as pool:
+        _mutator(fake, llm_pool=pool, max_variants_per_request=2).mutate_batch(jobs, TARGET_CODE)
+
+    assert fake.num_calls == 3
@@ -0,0 +1,98 @@
+"""
+NearDuplicateIndex（MinHash/LSHによる準重複検出）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from shinka_qa.evolution.near_duplicate import NearDuplicateIndex, ast_tokens, shingle_hashes
+from shinka_qa.evolution.novelty_filter import NoveltyFilter
+
+SUITE = '''import pytest
+from calc import add, divide
+
+
+def test_add():
+    result = add(1, 2)
+    assert result == 3
+
+
+def test_divide_by_zero():
+    with pytest.raises(ZeroDivisionError):
+        divide(1, 0)
+'''
+
+# SUITEのテスト名とローカル変数名を付け替えただけ
+RENAMED = SUITE.replace('test_add', 'test_addition').replace('result', 'total')
+
+DIFFERENT = '''from calc import power
+
+
+class TestPower:
+    @staticmethod
+    def check(base, exponent, expected):
+        assert power(base, exponent) == expected
+
+    def test_squares(self):
+        for n in range(5):
+            self.check(n, 2, n * n)
+'''
+
+
+def test_renaming_does_not_change_tokens():
+    """テスト名・ローカル変数名は正規化され、importした名前と定数は残る"""
+    tokens = ast_tokens(SUITE)
+    assert tokens == ast_tokens(RENAMED)
+    assert 'add' in tokens and '3' in tokens
+    assert 'result' not in tokens
+
+
+def test_minhash_estimates_jaccard_similarity():
+    """署名の一致率はシングル集合のJaccard類似度の推定値になる"""
+    index = NearDuplicateIndex(num_perm=256, bands=32)
+    edited = SUITE.replace('add(1, 2)', 'add(10, 20)').replace('== 3', '== 30')
+
+    a = set(shingle_hashes(ast_tokens(SUITE)).tolist())
+    b = set(shingle_hashes(ast_tokens(edited)).tolist())
+    jaccard = len(a & b) / len(a | b)
+    estimate = np.mean(index.signature(SUITE) == index.signature(edited))
+
+    assert 0.3 < jaccard < 0.95
+    assert abs(estimate - jaccard) < 0.15
+
+
+def test_query_finds_near_duplicates_only():
+    """準重複は閾値以上の類似度で見つかり、構造の異なるコードは見つからない"""
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add('suite', index.signature(SUITE))
+
+    assert index.query(index.signature(RENAMED)) == ('suite', 1.0)
+    assert not index.is_near_duplicate(DIFFERENT)
+
+
+def test_remove_clears_buckets():
+    """削除した項目は候補に挙がらず、空のバケットも残らない"""
+    index = NearDuplicateIndex()
+    index.add('suite', index.signature(SUITE))
+    index.remove('suite')
+
+    assert len(index) == 0
+    assert not index.is_near_duplicate(SUITE)
+    assert all(not band for band in index._buckets)
+
+
+def test_bands_must_divide_permutations():
+    """置換の数はバンド数で割り切れる必要がある"""
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
+
+
+def test_novelty_filter_rejects_renamed_copies_until_evicted():
+    """新規性フィルタは名前を付け替えただけのコードを除外し、アーカイブから消えたコードは除外しない"""
+    novelty = NoveltyFilter(similarity_threshold=1.1, archive_size=1, near_duplicate_threshold=0.8)
+    novelty.add_to_archive(SUITE, 0.5)
+    assert novelty.is_novel_many([RENAMED, DIFFERENT]) == [False, True]
+
+    novelty.add_to_archive(DIFFERENT, 0.9)
+    assert novelty.is_novel(RENAMED)
+    assert len(novelty.near_duplicates) == 1
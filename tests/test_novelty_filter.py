@@ -0,0 +1,195 @@
+"""
+NoveltyFilter（評価前の重複・準重複の除外）のテスト
+"""
+
+import random
+
+import numpy as np
+
+from shinka_qa.core.budget import BudgetManager
+from shinka_qa.evolution.island_model import IslandModel
+from shinka_qa.evolution.novelty_filter import NoveltyFilter
+
+SUITE = '''from calc import add
+
+
+def test_add():
+    assert add(1, 2) == 3
+'''
+
+NOVEL_SUITE = '''import pytest
+from calc import add
+
+
+@pytest.mark.parametrize("a, b, expected", [(0, 0, 0), (-1, 1, 0), (10**9, 1, 10**9 + 1)])
+def test_add_cases(a, b, expected):
+    assert add(a, b) == expected
+
+
+def test_add_type_error():
+    with pytest.raises(TypeError):
+        add(None, 1)
+'''
+
+
+def test_screen_reports_discarded_children():
+    """除外した子個体と、変異し直す前の子個体をon_discardに渡す"""
+    novelty = NoveltyFilter(on_reject='remutate', max_retries=1)
+    novelty.add_to_archive(SUITE, 0.5)
+    discarded = []
+
+    screened = novelty.screen([SUITE, SUITE], lambda i: NOVEL_SUITE if i == 0 else SUITE,
+                              discarded.append)
+
+    assert screened == [NOVEL_SUITE, None]
+    # 2つとも変異し直す前に1回ずつ、変異し直しても重複だった2つ目は除外時にもう1回
+    assert discarded == [SUITE, SUITE, SUITE]
+    assert novelty.num_rejected == 1
+    assert novelty.num_remutated == 2
+
+
+def _random_suite(rng):
+    """特徴の異なるテストスイートを作る"""
+    lines = ['import pytest', 'from calc import add, divide', '']
+    for i in range(rng.randint(1, 8)):
+        if rng.random() < 0.3:
+            lines.append('@pytest.mark.parametrize("x", [0, 1, -1])')
+            lines.append(f'def test_case_{i}(x):')
+        else:
+            lines.append(f'def test_case_{i}():')
+            lines.append(f'    x = {rng.randint(0, 99)}')
+        for _ in range(rng.randint(1, 4)):
+            lines.append(f'    assert add(x, {rng.randint(0, 9)}) is not None')
+        if rng.random() < 0.3:
+            lines.append('    with pytest.raises(ZeroDivisionError):')
+            lines.append('        divide(x, 0)  # zero')
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def test_vectorized_similarity_matches_pairwise_reference():
+    """アーカイブ全体との類似度（ベクトル化版）が1組ずつ計算した値と一致する"""
+    rng = random.Random(0)
+    novelty = NoveltyFilter(archive_size=20)
+    codes = [_random_suite(rng) for _ in range(20)]
+    for code in codes:
+        novelty.add_to_archive(code)
+
+    probe = _random_suite(rng)
+    features = novelty._extract_features(probe)
+    numeric, bits = novelty._feature_matrix([features])
+    vectorized = novelty._similarity_to_slots(numeric[0], bits[0], 0, 20, novelty._buffers)
+    reference = [novelty._compute_similarity(features, entry['features'])
+                 for entry in novelty.code_archive]
+
+    assert np.allclose(vectorized, reference, atol=1e-5)
+
+
+def test_is_novel_many_matches_is_novel():
+    """バッチ内に重複がなければ、まとめた判定は1つずつの判定と同じ結果になる"""
+    rng = random.Random(1)
+    novelty = NoveltyFilter(similarity_threshold=0.9, archive_size=30)
+    for _ in range(30):
+        novelty.add_to_archive(_random_suite(rng))
+
+    codes = [_random_suite(rng) for _ in range(40)] + [novelty.code_archive[0]['code']]
+    expected = [novelty.is_novel(code) for code in codes]
+
+    assert novelty.is_novel_many(codes) == expected
+    assert expected[-1] is False
+    assert True in expected and False in expected[:-1]
+
+
+def test_is_novel_many_keeps_first_of_duplicates_in_batch():
+    """バッチ内の同一コードは最初の1つだけを新規とする"""
+    novelty = NoveltyFilter()
+    assert novelty.is_novel_many([SUITE, NOVEL_SUITE, SUITE]) == [True, True, False]
+
+
+def test_full_archive_evicts_lowest_fitness():
+    """満杯のアーカイブは最も適応度の低いエントリを置き換え、それ以下の適応度のコードは加えない"""
+    rng = random.Random(2)
+    codes = [_random_suite(rng) for _ in range(5)]
+    novelty = NoveltyFilter(archive_size=3)
+    for code, fitness in zip(codes[:3], [0.5, 0.2, 0.9]):
+        novelty.add_to_archive(code, fitness)
+
+    novelty.add_to_archive(codes[3], 0.6)
+    novelty.add_to_archive(codes[4], 0.1)
+
+    archived = {entry['code']: entry['fitness'] for entry in novelty.code_archive}
+    assert archived == {codes[0]: 0.5, codes[3]: 0.6, codes[2]: 0.9}
+    assert novelty._compute_hash(codes[1]) not in novelty.code_hashes
+    assert novelty._compute_hash(codes[4]) not in novelty.code_hashes
+
+
+def _exact_diversity(novelty):
+    """全ペアの類似度を比較し直して求めた多様性スコア"""
+    entries = novelty.code_archive
+    similarities = [
+        novelty._compute_similarity(a['features'], b['features'])
+        for i, a in enumerate(entries) for b in entries[i + 1:]
+    ]
+    if not similarities:
+        return 1.0
+    return max(0.0, min(1.0, 1.0 - sum(similarities) / len(similarities)))
+
+
+def test_incremental_diversity_matches_exact_after_evictions():
+    """追加・置き換えのたびに差分更新した多様性スコアが、全ペアの比較と一致する"""
+    rng = random.Random(3)
+    novelty = NoveltyFilter(archive_size=15)
+    assert novelty.get_diversity_score() == 1.0
+
+    for step in range(60):
+        novelty.add_to_archive(_random_suite(rng), rng.random())
+        if step % 7 == 0:
+            assert np.isclose(novelty.get_diversity_score(), _exact_diversity(novelty), atol=1e-6)
+
+    assert len(novelty.code_archive) == 15
+    assert np.isclose(novelty.get_diversity_score(), _exact_diversity(novelty), atol=1e-6)
+
+    novelty.clear()
+    assert novelty.get_diversity_score() == 1.0
+    novelty.add_to_archive(SUITE)
+    novelty.add_to_archive(NOVEL_SUITE)
+    assert np.isclose(novelty.get_diversity_score(), _exact_diversity(novelty), atol=1e-6)
+
+
+def test_from_config_reads_novelty_section():
+    """'novelty'セクションが無効ならNone、有効なら設定どおりに作る"""
+    assert NoveltyFilter.from_config({}) is None
+    novelty = NoveltyFilter.from_config({
+        'novelty': {'enabled': True, 'on_reject': 'remutate', 'near_duplicate_threshold': 0.8}
+    })
+    assert novelty.on_reject == 'remutate'
+    assert novelty.near_duplicates is not None
+
+
+def test_duplicate_children_are_not_evaluated():
+    """重複した子個体はpytestを実行する前に除外し、予約した評価回数を返却する"""
+    evaluated = []
+
+    def fitness(code):
+        evaluated.append(code)
+        return 0.5, {}
+
+    def mutate(code, target, rng=None):
+        # 半分の子個体は親と同じコードを返す
+        return code if rng.random() < 0.5 else code + f'\n# {rng.random()}'
+
+    model = IslandModel(num_islands=1, population_size=8, elite_ratio=0.25, seed=0)
+    model.initialize(SUITE, fitness)
+    evaluated.clear()
+
+    novelty = NoveltyFilter(similarity_threshold=1.1)
+    novelty.add_to_archive(SUITE)
+    budget = BudgetManager(reduce_population_below=0.0)
+    model.evolve(3, mutate, fitness, budget=budget, novelty_filter=novelty)
+
+    statistics = novelty.get_statistics()
+    assert statistics['num_rejected'] > 0
+    assert model.get_statistics()['num_rejected'] == statistics['num_rejected']
+    assert len(evaluated) == statistics['num_checked'] - statistics['num_rejected']
+    assert len(set(evaluated)) == len(evaluated) and SUITE not in evaluated
+    assert budget.evaluations == len(evaluated)
@@ -0,0 +1,153 @@
+"""
+PersistentArchive（実行をまたいで残すエリートのアーカイブ）のテスト
+"""
+
+import pytest
+
+from shinka_qa.evolution.island_model import Individual
+from shinka_qa.evolution.persistent_archive import PersistentArchive, archive_score
+
+TARGET = '''def add(a, b):
+    return a + b
+
+
+def subtract(a, b):
+    return a - b
+'''
+
+
+def _individual(test_code, coverage, covered_lines=None):
+    behavior = {'covered_lines': set(covered_lines)} if covered_lines is not None else {}
+    return Individual(
+        test_code=test_code,
+        fitness=coverage / 100.0,
+        metrics={'coverage': coverage, 'bugs_detected': 0.0, 'maintainability': 0.5},
+        generation=0,
+        island_id=0,
+        behavior=behavior
+    )
+
+
+def test_save_keeps_best_entries_by_score(tmp_path):
+    """スコアの高い順に上限まで残し、読み込むときも同じ順に返す"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    archive = PersistentArchive(tmp_path / 'archive.sqlite', target, max_entries=2)
+
+    archive.save([
+        _individual('def test_a(): pass', 40.0, [2]),
+        _individual('def test_b(): pass', 90.0, [2, 6]),
+        _individual('def test_c(): pass', 70.0, [6])
+    ], run_id='first')
+
+    elites = archive.load_elites(5)
+    assert [elite.test_code for elite in elites] == ['def test_b(): pass', 'def test_c(): pass']
+    assert elites[0].behavior['covered_lines'] == {2, 6}
+    archive.close()
+
+    # 開き直しても同じ内容を読める
+    reopened = PersistentArchive(tmp_path / 'archive.sqlite', target)
+    assert len(reopened) == 2
+    assert reopened.get_statistics()['runs'] == 1
+
+
+def test_invalidate_drops_only_entries_covering_changed_function(tmp_path):
+    """変更された関数をカバーしていたエリートだけを削除し、無関係なエリートは残す"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    archive = PersistentArchive(tmp_path / 'archive.sqlite', target)
+    archive.save([
+        # def行はインポート時に実行されるので、カバレッジには全ての関数のdef行が含まれる
+        _individual('def test_add(): pass', 50.0, [1, 2, 5]),
+        _individual('def test_subtract(): pass', 60.0, [1, 5, 6]),
+        _individual('def test_unknown(): pass', 30.0)
+    ])
+    archive.close()
+
+    # subtractだけを変更する
+    target.write_text(TARGET.replace('return a - b', 'return b - a'), encoding='utf-8')
+    reopened = PersistentArchive(tmp_path / 'archive.sqlite', target)
+
+    # カバー行のないエリートは全ての関数に依存しているものとして扱う
+    assert reopened.invalidate() == 2
+    assert [elite.test_code for elite in reopened.load_elites(5)] == ['def test_add(): pass']
+    reopened.close()
+
+
+def test_comment_only_edit_keeps_entries(tmp_path):
+    """コメントや空白だけの変更では関数のハッシュが変わらず、エリートを残す"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    with PersistentArchive(tmp_path / 'archive.sqlite', target) as archive:
+        archive.save([_individual('def test_add(): pass', 50.0, [2])])
+
+    target.write_text('# 電卓\n\n' + TARGET.replace('a + b', 'a  +  b'), encoding='utf-8')
+    with PersistentArchive(tmp_path / 'archive.sqlite', target) as archive:
+        assert archive.invalidate() == 0
+        assert len(archive) == 1
+
+
+def test_behavior_round_trips_as_sets(tmp_path):
+    """行動データの集合はJSONを経由しても集合として読み込む"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    individual = _individual('def test_add(): pass', 50.0, [2])
+    individual.behavior.update(killed_mutants={0}, test_coverage={'test_add': {1, 2}})
+
+    with PersistentArchive(tmp_path / 'archive.sqlite', target) as archive:
+        archive.save([individual])
+        behavior = archive.load_elites(1)[0].behavior
+
+    assert behavior == {'covered_lines': {2}, 'killed_mutants': {0}, 'test_coverage': {
+        'test_add': {1, 2}
+    }}
+
+
+def test_same_code_is_overwritten_only_by_a_better_score(tmp_path):
+    """同じテストコードは、スコアが高い場合だけ上書きする"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    with PersistentArchive(tmp_path / 'archive.sqlite', target) as archive:
+        archive.save([_individual('def test_a(): pass', 60.0)], run_id='first')
+        archive.save([_individual('def test_a(): pass', 40.0)], run_id='second')
+        assert archive.load_elites(1)[0].metrics['coverage'] == 60.0
+
+        archive.save([_individual('def test_a(): pass', 80.0)], run_id='third')
+        assert archive.load_elites(1)[0].metrics['coverage'] == 80.0
+        assert len(archive) == 1
+
+
+def test_load_elites_reevaluates_with_fitness_func(tmp_path):
+    """fitness_funcを渡すと、この実行で評価し直した適応度の順に返す"""
+    target = tmp_path / 'calc.py'
+    target.write_text(TARGET, encoding='utf-8')
+    with PersistentArchive(tmp_path / 'archive.sqlite', target) as archive:
+        archive.save([
+            _individual('def test_a(): pass', 90.0),
+            _individual('def test_bb(): pass', 30.0)
+        ])
+        elites = archive.load_elites(2, lambda code: (len(code) / 100.0, {'coverage': 1.0}))
+
+    assert [elite.test_code for elite in elites] == ['def test_bb(): pass', 'def test_a(): pass']
+    assert elites[0].fitness == pytest.approx(0.19)
+
+
+def test_targets_are_kept_apart(tmp_path):
+    """同じファイルに、テスト対象モジュールごとに別々のエリートを保存する"""
+    first = tmp_path / 'calc.py'
+    first.write_text(TARGET, encoding='utf-8')
+    second = tmp_path / 'other.py'
+    second.write_text(TARGET, encoding='utf-8')
+
+    with PersistentArchive(tmp_path / 'archive.sqlite', first) as archive:
+        archive.save([_individual('def test_a(): pass', 50.0)])
+    with PersistentArchive(tmp_path / 'archive.sqlite', second) as archive:
+        assert len(archive) == 0
+        assert archive.load_elites(5) == []
+
+
+def test_archive_score_ignores_baseline_relative_metrics():
+    """実行ごとのベースラインに対する値（efficiencyなど）はスコアに含めない"""
+    metrics = {'coverage': 50.0, 'bugs_detected': 0.4, 'maintainability': 1.0, 'efficiency': 1.0}
+    assert archive_score(metrics) == pytest.approx(0.4 * 0.5 + 0.35 * 0.4 + 0.1)
+    assert archive_score(metrics, {'coverage': 1.0}) == pytest.approx(0.5)
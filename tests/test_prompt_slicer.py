@@ -0,0 +1,110 @@
+"""
+TargetPromptBuilder（テスト対象の切り出しとテストコードの削減）のテスト
+"""
+
+from shinka_qa.evolution.context_features import TargetStructure
+from shinka_qa.evolution.prompt_slicer import TargetPromptBuilder
+
+TARGET_SOURCE = '''"""幾何の関数"""
+import math
+
+LIMIT = 10
+
+
+def area(radius):
+    """円の面積"""
+    if radius < 0:
+        raise ValueError("negative radius")
+    return math.pi * radius * radius
+
+
+def identity(value):
+    return value
+
+
+def increment(value):
+    return value + 1
+'''
+
+# area の raise（10行目）だけがカバーされていない
+COVERED_LINES = [2, 4, 9, 11, 15, 19]
+
+TEST_CODE = '''import pytest
+
+
+@pytest.fixture
+def radius():
+    return 2
+
+
+def test_area(radius):
+    assert area(radius) > 0
+
+
+def test_long():
+    expected = """{long_text}"""
+    assert expected
+'''.replace('{long_text}', 'x' * 800)
+
+
+def test_docstrings_are_not_statements():
+    """docstringの行は実行される文に数えない"""
+    structure = TargetStructure.from_source(TARGET_SOURCE)
+
+    assert 1 not in structure.statement_lines
+    assert 8 not in structure.statement_lines
+    assert {9, 10, 11} <= structure.statement_lines
+
+
+def test_slice_target_keeps_related_function():
+    """戦略に関係する関数と未カバーの行を優先し、残りの関数は省略する"""
+    builder = TargetPromptBuilder(max_units=1)
+
+    sliced = builder.slice_target(TARGET_SOURCE, ['add_negative_tests'], COVERED_LINES)
+
+    assert 'def area(radius):' in sliced
+    assert 'def identity(value):' not in sliced
+    assert 'def increment(value):' not in sliced
+    assert '# （省略した関数: identity, increment）' in sliced
+    # import文と定数は常に残す
+    assert 'import math' in sliced
+    assert 'LIMIT = 10' in sliced
+    assert builder.get_statistics()['num_sliced'] == 1
+
+
+def test_slice_target_annotates_uncovered_lines():
+    """選んだ関数に元の行範囲と未カバーの行を添える（docstringは未カバーに含めない）"""
+    builder = TargetPromptBuilder(max_units=3)
+
+    sliced = builder.slice_target(TARGET_SOURCE, ['add_edge_cases'], COVERED_LINES)
+
+    assert '# L7-11 未カバーの行: 10\n' in sliced
+    assert '# L14-15\n' in sliced
+
+
+def test_slice_target_returns_unparsable_source():
+    """解析できないソースはそのまま返す"""
+    builder = TargetPromptBuilder()
+
+    assert builder.slice_target('def broken(:', ['add_edge_cases']) == 'def broken(:'
+
+
+def test_fit_test_code_drops_tests_over_limit():
+    """上限を超える場合は、フィクスチャを残してテスト関数を削り、省略した名前を返す"""
+    builder = TargetPromptBuilder()
+
+    fitted, omitted = builder.fit_test_code(TEST_CODE, 60)
+
+    assert omitted == ['test_long']
+    assert 'def radius():' in fitted
+    assert 'def test_area(radius):' in fitted
+    assert 'def test_long():' not in fitted
+    assert 'test_long' in fitted.rstrip().splitlines()[-1]
+    assert builder.get_statistics()['num_trimmed'] == 1
+
+
+def test_fit_test_code_within_limit_is_unchanged():
+    """上限に収まる場合はそのまま返す"""
+    builder = TargetPromptBuilder()
+
+    assert builder.fit_test_code(TEST_CODE, 10_000) == (TEST_CODE, [])
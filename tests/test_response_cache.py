@@ -0,0 +1,124 @@
+"""
+ResponseCache / CachedLLMClient（LLMの応答キャッシュ）のテスト
+"""
+
+import asyncio
+
+import pytest
+
+from shinka_qa.llm import CachedLLMClient, CacheMissError, ResponseCache
+from shinka_qa.llm.fake_llm import FakeLLMClient
+
+
+def _cached(tmp_path, fake, mode='readwrite'):
+    return CachedLLMClient(fake, ResponseCache(tmp_path / 'cache.sqlite'), mode=mode)
+
+
+def test_repeated_prompt_gets_new_sample(tmp_path):
+    """同じ実行で同じプロンプトを呼び出すと、前の応答を使い回さずに新しく生成する"""
+    fake = FakeLLMClient(responses=['first', 'second', 'third'])
+    client = _cached(tmp_path, fake)
+
+    responses = [client.generate('system', 'same prompt') for _ in range(3)]
+
+    assert responses == ['first', 'second', 'third']
+    assert fake.num_calls == 3
+    assert client.cache.get_statistics()['hits'] == 0
+
+
+def test_next_run_replays_samples_in_order(tmp_path):
+    """次の実行では、同じプロンプトの何回目かごとに保存した応答を返す"""
+    recorded = _cached(tmp_path, FakeLLMClient(responses=['first', 'second']))
+    for _ in range(2):
+        recorded.generate('system', 'same prompt')
+    recorded.cache.close()
+
+    fake = FakeLLMClient(responses=['unused'])
+    replay = _cached(tmp_path, fake, mode='replay')
+
+    assert replay.generate('system', 'same prompt') == 'first'
+    assert replay.generate('system', 'same prompt') == 'second'
+    assert fake.num_calls == 0
+    with pytest.raises(CacheMissError):
+        replay.generate('system', 'same prompt')
+
+
+def test_cached_call_costs_nothing(tmp_path):
+    """キャッシュから返した呼び出しはコスト0で、レイテンシを含めない（ルーティングの報酬にしない）"""
+    _cached(tmp_path, FakeLLMClient(responses=['first'])).generate('system', 'prompt')
+
+    client = _cached(tmp_path, FakeLLMClient(responses=['unused']))
+    assert client.generate('system', 'prompt') == 'first'
+    call = client.take_last_call()
+    assert call['cost'] == 0.0
+    assert call['cached'] is True
+    assert 'latency' not in call
+
+
+def test_key_depends_on_call_parameters(tmp_path):
+    """温度・最大トークン数・モデルが違う呼び出しは別のキーになる"""
+    base = ResponseCache.make_key('Fake', 'm', 0.7, 100, 'system', 'prompt')
+
+    assert ResponseCache.make_key('Fake', 'm', 0.7, 100, 'system', 'prompt') == base
+    assert ResponseCache.make_key('Fake', 'm', 0.2, 100, 'system', 'prompt') != base
+    assert ResponseCache.make_key('Fake', 'm', 0.7, 200, 'system', 'prompt') != base
+    assert ResponseCache.make_key('Fake', 'other', 0.7, 100, 'system', 'prompt') != base
+    assert ResponseCache.make_key('Fake', 'm', 0.7, 100, 'system', 'prompt', n=3) != base
+
+
+def test_record_mode_always_calls_and_overwrites(tmp_path):
+    """recordモードはキャッシュを読まずに呼び出し、保存した応答を置き換える"""
+    _cached(tmp_path, FakeLLMClient(responses=['old'])).generate('system', 'prompt')
+
+    fake = FakeLLMClient(responses=['new'])
+    assert _cached(tmp_path, fake, mode='record').generate('system', 'prompt') == 'new'
+    assert fake.num_calls == 1
+
+    replay = _cached(tmp_path, FakeLLMClient(), mode='replay')
+    assert replay.generate('system', 'prompt') == 'new'
+    assert len(replay.cache) == 1
+
+
+def test_failures_are_not_stored(tmp_path):
+    """失敗した呼び出し（None）は保存しない"""
+    client = _cached(tmp_path, FakeLLMClient(error_rate=1.0))
+
+    assert client.generate('system', 'prompt') is None
+    assert len(client.cache) == 0
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    """合計サイズが上限を超えると、最後に使われたのが古い応答から削除する"""
+    cache = ResponseCache(tmp_path / 'cache.sqlite', max_size_mb=2500 / (1024 * 1024))
+    for key in ('a', 'b'):
+        cache.put(key, 'Fake', 'm', 'x' * 1000)
+    cache.get('a')
+    cache.put('c', 'Fake', 'm', 'x' * 1000)
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.get_statistics()['evictions'] == 1
+
+    # 開き直しても合計サイズを引き継ぐ
+    cache.close()
+    reopened = ResponseCache(tmp_path / 'cache.sqlite', max_size_mb=2500 / (1024 * 1024))
+    assert reopened.get_statistics()['size_mb'] * 1024 * 1024 == 2000
+
+
+def test_generate_n_and_agenerate_replay(tmp_path):
+    """generate_nの応答のリストと、非同期の応答も保存して再生する"""
+    recorded = _cached(tmp_path, FakeLLMClient(responses=['a', 'b', 'c']))
+    samples = recorded.generate_n('system', 'prompt', n=2)
+    single = asyncio.run(recorded.agenerate('system', 'other prompt'))
+    recorded.cache.close()
+
+    replay = _cached(tmp_path, FakeLLMClient(), mode='replay')
+    assert replay.generate_n('system', 'prompt', n=2) == samples
+    assert asyncio.run(replay.agenerate('system', 'other prompt')) == single
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    """未知のモードはエラー"""
+    with pytest.raises(ValueError):
+        _cached(tmp_path, FakeLLMClient(), mode='write_only')
@@ -0,0 +1,134 @@
+"""
+ストリーミング生成（最初のPythonコードブロックが閉じた時点での打ち切り）のテスト
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from shinka_qa.llm import MultiProviderLLMClient
+from shinka_qa.llm.fake_llm import FakeLLMClient
+from shinka_qa.llm.llm_client import CodeBlockDetector, summarize_streams
+
+TRAILING = '\n\nこのテストでは境界値を確認しています。' * 20
+
+
+def _feed_all(text, size):
+    """テキストをsize文字ずつ渡し、完了した時点までに渡したチャンクの数を返す"""
+    detector = CodeBlockDetector()
+    for count, start in enumerate(range(0, len(text), size), 1):
+        if detector.feed(text[start:start + size]):
+            return detector, count
+    return detector, None
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 1000])
+def test_detector_finds_block_across_chunk_boundaries(size):
+    """フェンスがチャンクの境界で分かれても、閉じフェンスの直後で完了する"""
+    text = '説明\n```python\ndef test_a():\n    pass\n```\nあとがき'
+    detector, _ = _feed_all(text, size)
+
+    assert detector.complete
+    assert detector.result() == '説明\n```python\ndef test_a():\n    pass\n```'
+
+
+def test_detector_skips_other_languages():
+    """python以外の言語のブロックは読み飛ばし、言語指定なしのブロックは対象にする"""
+    text = '```bash\npytest -q\n```\n```\nx = 1\n```\n後'
+    detector, _ = _feed_all(text, 4)
+
+    assert detector.result() == '```bash\npytest -q\n```\n```\nx = 1\n```'
+
+
+def test_detector_returns_everything_when_block_never_closes():
+    """コードブロックが閉じなければ、受け取った全てのテキストを返す"""
+    text = '```python\ndef test_a():\n    pass\n'
+    detector, count = _feed_all(text, 5)
+
+    assert count is None
+    assert not detector.complete
+    assert detector.result() == text
+
+
+def test_streaming_stops_after_code_block():
+    """コードの後の説明文は受け取らずに打ち切り、出力トークンを減らす"""
+    fake = FakeLLMClient(responses=['```python\nx = 1\n```'], trailing_text=TRAILING, chunk_size=8)
+    full = fake.generate('system', 'prompt')
+    full_tokens = fake.take_last_call()['output_tokens']
+
+    fake.set_streaming(True)
+    streamed = fake.generate('system', 'prompt')
+    call = fake.take_last_call()
+
+    assert full.endswith(TRAILING)
+    assert streamed == '```python\nx = 1\n```'
+    assert call['stopped_early'] is True
+    assert call['output_tokens'] < full_tokens
+    assert call['time_to_first_token'] <= call['time_to_code']
+    assert fake.get_streaming_statistics()['early_stop_rate'] == 1.0
+
+
+def test_block_at_end_of_stream_is_not_counted_as_stopped_early():
+    """閉じフェンスが最後のチャンクなら、打ち切ったことにしない"""
+    fake = FakeLLMClient(responses=['```python\nx = 1\n```'], chunk_size=4)
+    fake.set_streaming(True)
+
+    assert fake.generate('system', 'prompt') == '```python\nx = 1\n```'
+    assert fake.take_last_call()['stopped_early'] is False
+
+
+def test_streaming_saves_time_on_trailing_text():
+    """説明文を生成する時間を待たないので、ストリーミングの方が早く終わる"""
+    fake = FakeLLMClient(
+        responses=['```python\nx = 1\n```'], trailing_text=TRAILING, chunk_size=16,
+        chunk_latency=0.005
+    )
+    started = time.monotonic()
+    fake.generate('system', 'prompt')
+    full_time = time.monotonic() - started
+
+    fake.set_streaming(True)
+    started = time.monotonic()
+    fake.generate('system', 'prompt')
+    streamed_time = time.monotonic() - started
+
+    assert streamed_time < full_time / 2
+
+
+def test_async_streaming_matches_sync():
+    """非同期のストリーミングも同じ位置で打ち切る"""
+    fake = FakeLLMClient(responses=['```python\nx = 1\n```'], trailing_text=TRAILING, chunk_size=8)
+    fake.set_streaming(True)
+
+    assert asyncio.run(fake.agenerate('system', 'prompt')) == '```python\nx = 1\n```'
+    assert fake.take_last_call()['stopped_early'] is True
+
+
+def test_multi_provider_streaming_statistics():
+    """複数プロバイダーではストリーミングの設定を各プロバイダーに渡し、統計をまとめる"""
+    clients = [
+        FakeLLMClient(model=model, responses=['```python\nx = 1\n```'], trailing_text=TRAILING)
+        for model in ('a', 'b')
+    ]
+    client = MultiProviderLLMClient(clients)
+    client.set_streaming(True)
+    for _ in range(3):
+        client.generate('system', 'prompt')
+
+    assert all(c.streaming for c in clients)
+    stats = client.get_streaming_statistics()
+    assert stats['calls'] == 3
+    assert stats['stopped_early'] == 3
+
+
+def test_summarize_streams_without_calls():
+    """ストリーミングの呼び出しがなければ、率と平均は0"""
+    assert summarize_streams([]) == {
+        'calls': 0,
+        'stopped_early': 0,
+        'early_stop_rate': 0.0,
+        'mean_time_to_first_token': 0.0,
+        'mean_time_to_code': 0.0,
+        'output_tokens': 0
+    }
@@ -0,0 +1,68 @@
+"""
+TestMutatorのプロンプト構築のテスト
+"""
+
+# pytestがテストクラスとして集めないよう別名で読み込む
+from shinka_qa.evolution.test_mutator import TestMutator as Mutator
+
+# 空行や「-」「1.」で始まる行を含むテストコード（指示の書き換えで落ちてはいけない）
+TEST_CODE = '''import pytest
+
+
+def test_values():
+    values = [
+        -1,
+        1.5,
+    ]
+    assert values
+
+- not an instruction
+1. not an instruction either
+'''
+
+TARGET_CODE = '''def clamp(value, low, high):
+
+    return max(low, min(value, high))
+'''
+
+
+def _instructions(prompt: str) -> str:
+    """プロンプトの指示部分（現在のテストコードより前）"""
+    return prompt.split('現在のテストコード:')[0]
+
+
+def test_functions_mode_keeps_embedded_code():
+    """'functions'モードでも、埋め込むテストコードとテスト対象は変更しない"""
+    mutator = Mutator(output_mode='functions')
+
+    for strategy, template in Mutator.MUTATION_PROMPTS.items():
+        prompt = mutator._build_prompt(TEST_CODE, TARGET_CODE, strategy, None)
+        assert TEST_CODE in prompt, strategy
+        if '{target_function}' in template:
+            assert TARGET_CODE.strip() in prompt, strategy
+
+
+def test_functions_mode_drops_include_all_instruction():
+    """'functions'モードでは、テストファイル全体を求める指示を除いて出力形式の指示を付ける"""
+    full = Mutator(output_mode='full')
+    functions = Mutator(output_mode='functions')
+
+    full_prompt = full._build_prompt(TEST_CODE, TARGET_CODE, 'add_edge_cases', None)
+    prompt = functions._build_prompt(TEST_CODE, TARGET_CODE, 'add_edge_cases', None)
+
+    assert 'すべて含め' in _instructions(full_prompt)
+    assert 'すべて含め' not in _instructions(prompt)
+    assert prompt.endswith(Mutator.FUNCTIONS_OUTPUT_PROMPT)
+
+
+def test_functions_mode_variants_prompt():
+    """複数の変異版のプロンプトでも、指示だけを書き換える"""
+    mutator = Mutator(output_mode='functions')
+
+    prompt = mutator._build_variants_prompt(
+        TEST_CODE, TARGET_CODE, ['add_edge_cases', 'add_negative_tests'], None
+    )
+
+    assert TEST_CODE in prompt
+    assert 'すべて含め' not in _instructions(prompt)
+    assert '# === variant 番号 ===' in prompt
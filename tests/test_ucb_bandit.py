@@ -0,0 +1,121 @@
+"""
+バンディット（戦略・モデルの選択）のテスト
+"""
+
+import numpy as np
+import pytest
+
+from shinka_qa.evolution.ucb_bandit import (
+    BANDIT_POLICIES, ContextualStrategyBandit, StrategyBandit, create_bandit
+)
+
+
+@pytest.mark.parametrize('policy', ['ucb1', 'discounted_ucb', 'sliding_window_ucb'])
+def test_decayed_warm_start_keeps_selecting(policy):
+    """引き継いだプレイ回数の合計が1未満になっても選択できる"""
+    previous = create_bandit(['a', 'b'], policy)
+    previous.update('a', 0.5)
+    previous.update('b', 0.2)
+
+    bandit = StrategyBandit(['a', 'b'], policy=policy)
+    bandit.load_state(previous.get_state(), decay=0.3)
+
+    assert bandit.select_strategy() in ('a', 'b')
+
+
+def test_warm_start_play_counts_are_fractional():
+    """引き継いだプレイ回数はdecay倍した小数のまま持ち、この実行の回数とは分けて報告する"""
+    previous = create_bandit(['a', 'b'], 'ucb1')
+    for _ in range(3):
+        previous.update('a', 1.0)
+
+    for policy in BANDIT_POLICIES:
+        bandit = create_bandit(['a', 'b'], policy)
+        bandit.load_state(previous.get_state(), decay=0.5)
+        assert bandit.get_state()['arms']['a']['num_plays'] == pytest.approx(1.5)
+
+        bandit.update('a', 1.0)
+        stats = bandit.get_statistics()['a']
+        assert stats['num_plays'] == 1
+        assert stats['effective_plays'] == pytest.approx(2.5)
+
+
+def test_discarded_pull_gets_no_reward():
+    """評価しないことにした子個体の選択は、報酬0ではなく報酬なしで取り消す"""
+    bandit = StrategyBandit(['a', 'b'])
+    strategy = bandit.select_strategy(pending=True)
+    bandit.track('rejected', strategy, parent_fitness=0.5)
+
+    assert bandit.discard_pull('rejected')
+    assert not bandit.discard_pull('rejected')
+    assert bandit.end_generation(max_age=0) == 0
+
+    stats = bandit.get_statistics()[strategy]
+    assert stats['num_plays'] == 0
+    assert stats['num_pending'] == 0
+    assert bandit.num_discarded == 1
+
+
+def test_contextual_discard_restores_confidence():
+    """文脈付きバンディットでは、取り消した選択の文脈を信頼幅から取り除く"""
+    bandit = ContextualStrategyBandit(['a', 'b'], num_features=3)
+    context = np.array([1.0, 0.5, 0.0])
+    before = bandit.bandit.A_inv.copy()
+
+    strategy = bandit.select_strategy(context, pending=True)
+    bandit.track('rejected', strategy, 0.5, context)
+    bandit.discard_pull('rejected')
+
+    np.testing.assert_allclose(bandit.bandit.A_inv, before, atol=1e-12)
+    assert bandit.bandit.num_pending.sum() == 0
+
+
+def test_pending_selections_spread_over_arms():
+    """報酬待ちの選択もプレイ回数に数え、報酬が届く前に同じ腕を選び続けない"""
+    bandit = StrategyBandit(['a', 'b', 'c'])
+    chosen = [bandit.select_strategy(pending=True) for _ in range(3)]
+
+    assert sorted(chosen) == ['a', 'b', 'c']
+    assert all(stats['num_pending'] == 1 for stats in bandit.get_statistics().values())
+
+
+def test_complete_pull_rewards_clipped_improvement():
+    """評価後に、親からの適応度の改善（0〜1に切り詰め）を生成した戦略の報酬にする"""
+    bandit = StrategyBandit(['a', 'b'])
+    for key, (strategy, parent, child) in enumerate([('a', 0.2, 0.5), ('b', 0.5, 0.3)]):
+        assert bandit.select_strategy(pending=True) == strategy
+        bandit.track(key, strategy, parent)
+        assert bandit.complete_pull(key, child)
+
+    assert not bandit.complete_pull(0, 1.0)
+    stats = bandit.get_statistics()
+    assert stats['a']['total_reward'] == pytest.approx(0.3)
+    assert stats['b']['total_reward'] == 0.0
+    assert stats['a']['num_pending'] == stats['b']['num_pending'] == 0
+
+
+def test_same_child_tracked_twice_is_rewarded_in_order():
+    """同じコードの子個体が2回生成された場合は、登録した順に1つずつ報酬を渡す"""
+    bandit = StrategyBandit(['a', 'b'])
+    bandit.track('child', 'a', 0.1)
+    bandit.track('child', 'b', 0.4)
+
+    assert bandit.complete_pull('child', 0.6)
+    assert bandit.complete_pull('child', 0.6)
+    assert not bandit.complete_pull('child', 0.6)
+
+    stats = bandit.get_statistics()
+    assert stats['a']['total_reward'] == pytest.approx(0.5)
+    assert stats['b']['total_reward'] == pytest.approx(0.2)
+
+
+def test_unevaluated_pulls_expire_after_max_age():
+    """評価されないまま残った選択は、max_age世代を過ぎてから報酬0で打ち切る"""
+    bandit = StrategyBandit(['a', 'b'])
+    bandit.track('lost', bandit.select_strategy(pending=True), 0.5)
+
+    assert bandit.end_generation(max_age=1) == 0
+    assert bandit.end_generation(max_age=1) == 1
+    assert bandit.num_expired == 1
+    assert sum(stats['num_plays'] for stats in bandit.get_statistics().values()) == 1
+    assert not bandit.complete_pull('lost', 1.0)